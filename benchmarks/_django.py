@@ -0,0 +1,31 @@
+"""
+Benchmark 公共启动：SQLite 内存库 + 执行 migration，不依赖 Docker
+"""
+import os
+import sys
+from pathlib import Path
+
+
+def setup_django(db_path: str | None = None):
+    """
+    db_path：改用 SQLite 文件库（多线程各自连接时需要，内存库每个连接是独立的库）
+    文件库的事务以 BEGIN IMMEDIATE 开始（同 Django 5.1 的 transaction_mode），并发时按 timeout 等锁，
+    而不是读后写升级锁时直接报 database is locked
+    """
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "pharmacy_plan.settings")
+    os.environ.setdefault("USE_SQLITE_FOR_TESTS", "1")
+    os.environ.setdefault("STATSD_HOST", "localhost")
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    if db_path is not None:
+        from django.conf import settings
+        from django.db.backends.sqlite3.base import DatabaseWrapper
+
+        settings.DATABASES["default"]["NAME"] = db_path
+        settings.DATABASES["default"]["OPTIONS"] = {"timeout": 30}
+        DatabaseWrapper._start_transaction_under_autocommit = lambda self: self.cursor().execute("BEGIN IMMEDIATE")
+    call_command("migrate", verbosity=0)
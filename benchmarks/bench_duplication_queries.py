@@ -0,0 +1,101 @@
+"""
+重复检测查询次数对比：逐项检查（旧 create_careplan 路径） vs check_duplicates
+运行: python -m benchmarks.bench_duplication_queries
+"""
+from datetime import date, datetime, timedelta
+
+from benchmarks._django import setup_django
+
+setup_django()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from careplan.duplication_detection import (  # noqa: E402
+    check_duplicates,
+    check_order,
+    check_patient,
+    check_provider,
+)
+from careplan.models import CarePlan, Patient, Provider  # noqa: E402
+from careplan.services import _create_or_get  # noqa: E402
+
+ORDER = {
+    "npi": "1234567890",
+    "provider_name": "Dr. Jane",
+    "mrn": "123456",
+    "first_name": "John",
+    "last_name": "Doe",
+    "dob": "1990-01-15",
+    "medication_name": "Metformin",
+}
+
+
+def legacy_path():
+    """旧 create_careplan 在 INSERT CarePlan 之前的查询序列"""
+    provider = check_provider(ORDER["npi"], ORDER["provider_name"])
+    if provider is None:
+        provider, _ = Provider.objects.get_or_create(npi=ORDER["npi"], defaults={"name": ORDER["provider_name"]})
+    patient = check_patient(ORDER["mrn"], ORDER["first_name"], ORDER["last_name"], ORDER["dob"], confirm=True)
+    if patient is None:
+        patient, _ = Patient.objects.get_or_create(
+            mrn=ORDER["mrn"],
+            defaults={
+                "first_name": ORDER["first_name"],
+                "last_name": ORDER["last_name"],
+                "dob": datetime.strptime(ORDER["dob"], "%Y-%m-%d").date(),
+            },
+        )
+    check_order(patient, ORDER["medication_name"], confirm=True)
+
+
+def consolidated_path():
+    """新 create_careplan 在 INSERT CarePlan 之前的查询序列"""
+    provider, patient = check_duplicates(**ORDER, confirm=True)
+    if provider is None:
+        _create_or_get(Provider, defaults={"name": ORDER["provider_name"]}, npi=ORDER["npi"])
+    if patient is None:
+        _create_or_get(
+            Patient,
+            defaults={
+                "first_name": ORDER["first_name"],
+                "last_name": ORDER["last_name"],
+                "dob": datetime.strptime(ORDER["dob"], "%Y-%m-%d").date(),
+            },
+            mrn=ORDER["mrn"],
+        )
+
+
+def _reset(existing):
+    CarePlan.objects.all().delete()
+    Patient.objects.all().delete()
+    Provider.objects.all().delete()
+    if existing:
+        provider = Provider.objects.create(npi=ORDER["npi"], name=ORDER["provider_name"])
+        patient = Patient.objects.create(mrn=ORDER["mrn"], first_name="John", last_name="Doe", dob=date(1990, 1, 15))
+        cp = CarePlan.objects.create(
+            patient=patient, provider=provider, primary_diagnosis="E11.9",
+            medication_name=ORDER["medication_name"], patient_records="r",
+        )
+        CarePlan.objects.filter(id=cp.id).update(created_at=timezone.now() - timedelta(days=3))
+
+
+def count_queries(fn, existing):
+    _reset(existing)
+    with CaptureQueriesContext(connection) as ctx:
+        fn()
+    return len(ctx.captured_queries)
+
+
+def main():
+    print(f"{'scenario':<28}{'legacy':>8}{'consolidated':>14}")
+    for label, existing in (("new provider + patient", False), ("existing provider + patient", True)):
+        legacy = count_queries(legacy_path, existing)
+        consolidated = count_queries(consolidated_path, existing)
+        print(f"{label:<28}{legacy:>8}{consolidated:>14}")
+    print("(不含最后的 INSERT CarePlan；SQLite 下 SAVEPOINT/RELEASE 也计入)")
+
+
+if __name__ == "__main__":
+    main()
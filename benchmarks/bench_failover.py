@@ -0,0 +1,97 @@
+"""
+Provider 故障：改造前（每个任务对挂掉的 provider 重试 3 次后失败） vs 熔断 + 按 LLM_FAILOVER_ORDER 切换（llm_providers.circuit）
+- 故障注入 mock（FaultyLLMService）：openai 全部失败，每次 BENCH_FAULT_LATENCY 秒后才报错（模拟超时）；claude 正常，每次 BENCH_LLM_LATENCY 秒
+- 16 个线程并发生成 N 个 care plan，输出总耗时、打到 openai 的调用数、最终失败数、实际由哪个 provider 生成
+- 退避时间按 BACKOFF_UNIT 缩小（真实任务为 2 / 4 / 8 秒）
+运行: python -m benchmarks.bench_failover
+"""
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from benchmarks._django import setup_django
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+
+from careplan.llm_providers import clear_llm_services  # noqa: E402
+from careplan.llm_providers.factory import get_llm_service  # noqa: E402
+from careplan.llm_service import generate_careplan  # noqa: E402
+
+FAULT_LATENCY = float(os.getenv("BENCH_FAULT_LATENCY", "0.2"))
+LATENCY = float(os.getenv("BENCH_LLM_LATENCY", "0.05"))
+N = int(os.getenv("BENCH_N", "200"))
+THREADS = 16
+MAX_RETRIES = 3
+BACKOFF_UNIT = 0.05
+
+
+def _prompt_kwargs():
+    return dict(
+        patient=SimpleNamespace(first_name="John", last_name="Doe", mrn="123456", dob="1990-01-15"),
+        provider=SimpleNamespace(name="Dr. Jane", npi="1234567890"),
+        primary_diagnosis="E11.9",
+        additional_diagnosis="",
+        medication_name="Metformin",
+        medication_history="",
+        patient_records="Stable.",
+    )
+
+
+def _task():
+    """generate_careplan_task 的重试逻辑（退避缩小）；返回实际生成的 provider，失败返回 None"""
+    for retries in range(MAX_RETRIES + 1):
+        served = []
+        try:
+            generate_careplan(**_prompt_kwargs(), llm_provider="openai", on_provider=served.append)
+            return served[-1]
+        except Exception:
+            if retries == MAX_RETRIES:
+                return None
+            time.sleep(BACKOFF_UNIT * 2 ** retries)
+
+
+def _run(order, min_calls):
+    settings.LLM_FAILOVER_ORDER = order
+    settings.LLM_BREAKER_MIN_CALLS = min_calls
+    clear_llm_services()
+    openai = get_llm_service("openai")
+    calls = Counter()
+    original = openai.generate
+
+    def counted(*args, **kwargs):
+        calls["openai"] += 1
+        return original(*args, **kwargs)
+
+    openai.generate = counted
+    start = time.perf_counter()
+    with ThreadPoolExecutor(THREADS) as pool:
+        results = list(pool.map(lambda _: _task(), range(N)))
+    return time.perf_counter() - start, calls["openai"], Counter(results)
+
+
+def main():
+    settings.USE_MOCK_LLM = True
+    settings.LLM_RESULT_CACHE = "none"
+    settings.LLM_RATE_LIMITS = {}
+    settings.LLM_STREAMING = False
+    settings.LLM_FAULT_INJECTION = {
+        "openai": {"error_rate": 1.0, "latency": FAULT_LATENCY},
+        "claude": {"latency": LATENCY},
+    }
+    print(f"openai down (fails after {FAULT_LATENCY * 1e3:.0f} ms), claude {LATENCY * 1e3:.0f} ms, "
+          f"{THREADS} threads, {N} plans")
+    print(f"{'case':<24}{'total s':>10}{'openai calls':>14}{'failed':>8}{'served by claude':>18}")
+    for name, order, min_calls in (
+        ("retry same provider", ["openai"], 10 ** 9),
+        ("breaker + failover", ["openai", "claude"], settings.LLM_BREAKER_MIN_CALLS),
+    ):
+        elapsed, openai_calls, results = _run(order, min_calls)
+        print(f"{name:<24}{elapsed:>10.2f}{openai_calls:>14}{results[None]:>8}{results['claude']:>18}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+LLM 尾延迟：不对冲 vs 主调用超过 p90 仍未返回时对冲（careplan.llm_hedging，同 provider，预算 15%）
+- 假 provider：每次调用独立抽延迟，95% 为 BENCH_LLM_LATENCY 左右，5% 慢 20 倍（排队 / 长尾）
+- 8 个线程并发生成 N 个 care plan，输出 generate_careplan 的 p50 / p95 / p99、对冲率、对冲时哪一方先返回
+- 先各跑 WARMUP 次积累延迟样本（不计入结果）
+运行: python -m benchmarks.bench_hedging
+"""
+import os
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from benchmarks._django import setup_django
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+
+from careplan.llm_hedging import reset_hedging  # noqa: E402
+from careplan.llm_providers import MockLLMService  # noqa: E402
+from careplan.llm_service import generate_careplan  # noqa: E402
+
+LATENCY = float(os.getenv("BENCH_LLM_LATENCY", "0.05"))
+N = int(os.getenv("BENCH_N", "600"))
+WARMUP = 100
+THREADS = 8
+TAIL_RATE = 0.05
+TAIL_FACTOR = 20
+
+
+class _Provider:
+    def __init__(self, seed):
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate(self, *args, **kwargs):
+        with self._lock:
+            self.calls += 1
+            slow = self._random.random() < TAIL_RATE
+            jitter = self._random.uniform(0.8, 1.2)
+        time.sleep(LATENCY * jitter * (TAIL_FACTOR if slow else 1))
+        return "content"
+
+
+def _prompt_kwargs():
+    return dict(
+        patient=SimpleNamespace(first_name="John", last_name="Doe", mrn="123456", dob="1990-01-15"),
+        provider=SimpleNamespace(name="Dr. Jane", npi="1234567890"),
+        primary_diagnosis="E11.9",
+        additional_diagnosis="",
+        medication_name="Metformin",
+        medication_history="",
+        patient_records="Stable.",
+    )
+
+
+def _timed(_):
+    start = time.perf_counter()
+    generate_careplan(**_prompt_kwargs())
+    return time.perf_counter() - start
+
+
+def _run(hedging):
+    settings.LLM_HEDGING = hedging
+    reset_hedging()
+    provider = _Provider(seed=1)
+    wins = Counter()
+    with patch.object(MockLLMService, "generate", provider.generate), \
+            patch("careplan.llm_hedging.llm_hedge_win", lambda _, winner: wins.update([winner])), \
+            ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(_timed, range(WARMUP)))
+        provider.calls = 0
+        wins.clear()
+        times = list(pool.map(_timed, range(N)))
+    return times, provider.calls - N, wins
+
+
+def main():
+    settings.LLM_RESULT_CACHE = "none"
+    settings.LLM_RATE_LIMITS = {}
+    settings.LLM_HEDGE_PERCENTILE = 90
+    settings.LLM_HEDGE_MAX_RATE = 0.15
+    print(f"LLM {LATENCY * 1e3:.0f} ms, {TAIL_RATE:.0%} of calls {TAIL_FACTOR}x slower, {THREADS} threads, {N} plans")
+    print(f"{'case':<16}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'hedge rate':>12}{'hedge won':>11}")
+    for name, hedging in (("no hedging", False), ("hedge at p90", True)):
+        times, hedges, wins = _run(hedging)
+        cuts = statistics.quantiles(times, n=100)
+        print(f"{name:<16}{statistics.median(times) * 1e3:>10.0f}{cuts[94] * 1e3:>10.0f}{cuts[98] * 1e3:>10.0f}"
+              f"{hedges / N:>12.1%}{wins['hedge']:>6}/{sum(wins.values()):<4}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Adapter transform 对比：手写 transform（parsed.get 链 + 每请求新建 Adapter） vs 编译后的 mapping（单例 Adapter）
+- 只计 get_adapter + transform，不含 JSON / XML 解析
+运行: python -m benchmarks.bench_intake_transform
+"""
+import timeit
+from datetime import datetime
+
+from benchmarks._django import setup_django
+
+setup_django()
+
+from careplan.intake import factory  # noqa: E402
+from careplan.intake.adapters import _PHARMACORP_MEDICATION_PARTS  # noqa: E402
+from careplan.intake.types import CarePlanInfo, InternalOrder, PatientInfo, ProviderInfo  # noqa: E402
+
+WEBFORM = {
+    "patient_first_name": "John",
+    "patient_last_name": "Doe",
+    "patient_mrn": "123456",
+    "patient_dob": "1990-01-15",
+    "provider_name": "Dr. Jane Smith",
+    "provider_npi": "1234567890",
+    "primary_diagnosis": "E11.9",
+    "additional_diagnosis": "I10",
+    "medication_name": "Metformin",
+    "medication_history": "Lisinopril 10 mg daily",
+    "patient_records": "Patient has been stable on current regimen.",
+    "llm_provider": "claude",
+}
+MEDCENTER = {
+    "pt": {"mrn": "234567", "fname": "Jane", "lname": "Smith", "dob": "03/22/1985"},
+    "provider": {"name": "Dr. Lee", "npi_num": "2345678901"},
+    "dx": {"primary": "G70.01", "secondary": ["I10", "E78.5"]},
+    "rx": {"med_name": "IVIG"},
+    "med_hx": ["Pyridostigmine 60 mg", "Prednisone 10 mg"],
+    "allergies": ["Penicillin"],
+    "clinical_notes": "Worsening ptosis and diplopia over two weeks.",
+}
+PHARMACORP = {
+    "secondary_icds": ["I10", "E78.5"],
+    "medications": [{"MedicationName": "Pyridostigmine", "Dosage": "60 mg", "Route": "Oral", "Frequency": "q6h"}],
+    "mrn": "345678",
+    "first_name": "Robert",
+    "last_name": "Williams",
+    "dob": "1972-11-30",
+    "npi": "5678901234",
+    "provider_name": "Dr. Michael Chen",
+    "primary_icd": "G70.01",
+    "drug": "Octagam",
+    "narrative": "Stable.",
+}
+
+
+# ---------- 改造前的 transform（对照组） ----------
+
+def legacy_webform(parsed):
+    return InternalOrder(
+        patient=PatientInfo(
+            mrn=str(parsed.get("patient_mrn", "")).strip(),
+            first_name=str(parsed.get("patient_first_name", "")).strip(),
+            last_name=str(parsed.get("patient_last_name", "")).strip(),
+            dob=str(parsed.get("patient_dob", ""))[:10],
+        ),
+        provider=ProviderInfo(
+            npi=str(parsed.get("provider_npi", "")).strip(),
+            name=str(parsed.get("provider_name", "")).strip(),
+        ),
+        careplan=CarePlanInfo(
+            primary_diagnosis=str(parsed.get("primary_diagnosis", "")).strip(),
+            additional_diagnosis=str(parsed.get("additional_diagnosis", "")).strip(),
+            medication_name=str(parsed.get("medication_name", "")).strip(),
+            medication_history=str(parsed.get("medication_history", "")).strip(),
+            patient_records=str(parsed.get("patient_records", "")).strip(),
+        ),
+        source="webform",
+        request_flags={
+            "confirm": parsed.get("confirm") is True,
+            "llm_provider": (parsed.get("llm_provider") or "").strip() or None,
+            "use_llm_cache": parsed.get("use_llm_cache") is not False,
+        },
+    )
+
+
+def _legacy_dob(s):
+    if not s or not isinstance(s, str):
+        return ""
+    s = s.strip()
+    try:
+        return datetime.strptime(s[:10], "%m/%d/%Y").strftime("%Y-%m-%d")
+    except ValueError:
+        return s[:10]
+
+
+def legacy_medcenter(parsed):
+    pt = parsed.get("pt") or {}
+    provider = parsed.get("provider") or {}
+    dx = parsed.get("dx") or {}
+    rx = parsed.get("rx") or {}
+    secondary_raw = dx.get("secondary")
+    if isinstance(secondary_raw, list):
+        additional = ", ".join(str(x).strip() for x in secondary_raw if x)
+    else:
+        additional = str(secondary_raw or "").strip()
+    med_hx_raw = parsed.get("med_hx") or []
+    if isinstance(med_hx_raw, list):
+        medication_history = "; ".join(str(x) for x in med_hx_raw if x)
+    else:
+        medication_history = str(med_hx_raw or "")
+    clinical_notes = str(parsed.get("clinical_notes", "")).strip()
+    allergies_raw = parsed.get("allergies") or []
+    if isinstance(allergies_raw, list) and allergies_raw:
+        allergies_str = "Allergies: " + ", ".join(str(a) for a in allergies_raw)
+        patient_records = f"{allergies_str}\n\n{clinical_notes}" if clinical_notes else allergies_str
+    else:
+        patient_records = clinical_notes or "(No clinical notes)"
+    return InternalOrder(
+        patient=PatientInfo(
+            mrn=str(pt.get("mrn", "")).strip(),
+            first_name=str(pt.get("fname", "")).strip(),
+            last_name=str(pt.get("lname", "")).strip(),
+            dob=_legacy_dob(str(pt.get("dob", ""))),
+        ),
+        provider=ProviderInfo(npi=str(provider.get("npi_num", "")).strip(), name=str(provider.get("name", "")).strip()),
+        careplan=CarePlanInfo(
+            primary_diagnosis=str(dx.get("primary", "")).strip(),
+            additional_diagnosis=additional,
+            medication_name=str(rx.get("med_name", "")).strip(),
+            medication_history=medication_history,
+            patient_records=patient_records,
+        ),
+        source="medcenter",
+        request_flags={
+            "confirm": parsed.get("confirm") is True,
+            "llm_provider": (parsed.get("llm_provider") or "").strip() or None,
+            "use_llm_cache": parsed.get("use_llm_cache") is not False,
+        },
+    )
+
+
+def legacy_pharmacorp(fields):
+    medication_history = "; ".join(
+        " ".join(m.get(part, "") for part in _PHARMACORP_MEDICATION_PARTS)
+        for m in fields["medications"]
+    )
+    return InternalOrder(
+        patient=PatientInfo(
+            mrn=fields.get("mrn", ""),
+            first_name=fields.get("first_name", ""),
+            last_name=fields.get("last_name", ""),
+            dob=fields.get("dob", "")[:10],
+        ),
+        provider=ProviderInfo(npi=fields.get("npi", ""), name=fields.get("provider_name", "")),
+        careplan=CarePlanInfo(
+            primary_diagnosis=fields.get("primary_icd", ""),
+            additional_diagnosis=", ".join(fields["secondary_icds"]),
+            medication_name=fields.get("drug", ""),
+            medication_history=medication_history,
+            patient_records=fields.get("narrative") or "(No clinical documentation)",
+        ),
+        source="pharmacorp_portal",
+    )
+
+
+def _time(fn, number=50000):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    cases = [
+        ("webform", WEBFORM, legacy_webform),
+        ("medcenter", MEDCENTER, legacy_medcenter),
+        ("pharmacorp_portal", PHARMACORP, legacy_pharmacorp),
+    ]
+    print(f"{'source':<20}{'legacy us':>12}{'mapping us':>12}{'speedup':>10}")
+    for source, payload, legacy in cases:
+        adapter_cls = type(factory.get_adapter(source))
+        assert factory.get_adapter(source).transform(payload) == legacy(payload)
+
+        def before(cls=adapter_cls, p=payload, fn=legacy):
+            cls()  # 改造前 get_adapter 每次新建实例
+            return fn(p)
+
+        def after(s=source, p=payload):
+            return factory.get_adapter(s).transform(p)
+
+        t_before, t_after = _time(before), _time(after)
+        print(f"{source:<20}{t_before:>12.2f}{t_after:>12.2f}{t_before / t_after:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+JSON 编解码微基准：stdlib vs orjson（未安装时只跑 stdlib）
+- 每个 JSON Adapter：单条 process（parse + transform + validate）、批量 process_batch（500 条）
+- 响应编码：单条提交结果、500 条批量结果
+运行: python -m benchmarks.bench_json_codec
+"""
+import json
+import timeit
+
+from benchmarks._django import setup_django
+
+setup_django()
+
+from django.test import override_settings  # noqa: E402
+
+from careplan.intake import codec  # noqa: E402
+from careplan.intake.adapters import MedCenterJsonAdapter, WebFormAdapter  # noqa: E402
+
+WEBFORM = {
+    "patient_first_name": "John",
+    "patient_last_name": "Doe",
+    "patient_mrn": "123456",
+    "patient_dob": "1990-01-15",
+    "provider_name": "Dr. Jane Smith",
+    "provider_npi": "1234567890",
+    "primary_diagnosis": "E11.9",
+    "additional_diagnosis": "I10",
+    "medication_name": "Metformin",
+    "medication_history": "Lisinopril 10 mg daily",
+    "patient_records": "Patient has been stable on current regimen. " * 40,
+}
+MEDCENTER = {
+    "pt": {"mrn": "234567", "fname": "Jane", "lname": "Smith", "dob": "03/22/1985"},
+    "provider": {"name": "Dr. Lee", "npi_num": "2345678901"},
+    "dx": {"primary": "G70.01", "secondary": ["I10", "E78.5"]},
+    "rx": {"med_name": "IVIG"},
+    "med_hx": ["Pyridostigmine 60 mg", "Prednisone 10 mg"],
+    "allergies": ["Penicillin"],
+    "clinical_notes": "Worsening ptosis and diplopia over two weeks. " * 40,
+}
+SUBMIT_RESULT = {"success": True, "data": {"message": "已收到", "careplan_id": 12345, "status": "pending"}}
+BATCH_RESULT = {
+    "success": True,
+    "data": {
+        "total": 500,
+        "accepted": 500,
+        "rejected": 0,
+        "results": [{"index": i, "success": True, "careplan_id": i + 1, "status": "pending"} for i in range(500)],
+    },
+}
+
+
+def _time(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    backends = ["stdlib"] + (["orjson"] if codec.orjson is not None else [])
+    cases = []
+    for adapter, payload in ((WebFormAdapter(), WEBFORM), (MedCenterJsonAdapter(), MEDCENTER)):
+        single = json.dumps(payload).encode("utf-8")
+        batch = json.dumps([payload] * 500).encode("utf-8")
+        cases.append((f"{adapter.source_id} process", lambda a=adapter, b=single: a.process(b), 2000))
+        cases.append((f"{adapter.source_id} process_batch(500)", lambda a=adapter, b=batch: a.process_batch(b), 10))
+    cases.append(("response dumps (submit)", lambda: codec.dumps(SUBMIT_RESULT), 20000))
+    cases.append(("response dumps (batch 500)", lambda: codec.dumps(BATCH_RESULT), 200))
+
+    print(f"{'case':<34}" + "".join(f"{b + ' us':>14}" for b in backends))
+    for label, fn, number in cases:
+        row = f"{label:<34}"
+        for backend in backends:
+            with override_settings(JSON_CODEC=backend):
+                row += f"{_time(fn, number):>14.1f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
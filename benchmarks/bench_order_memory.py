@@ -0,0 +1,130 @@
+"""
+每个订单的内存占用：改造前（普通 dataclass + to_create_careplan_dict 再拷一份 dict） vs slots dataclass 直接交给 services
+- 字段字符串事先建好、两边共用，只统计订单对象本身（tracemalloc）
+- 同时统计 pickle 大小（import_careplans 的 worker 进程回传）
+运行: python -m benchmarks.bench_order_memory
+"""
+import pickle
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Any
+
+from benchmarks._django import setup_django
+
+setup_django()
+
+from careplan.intake.adapters import WebFormAdapter  # noqa: E402
+from careplan.intake.types import InternalOrder  # noqa: E402
+
+N = 100_000
+
+
+# ---------- 改造前的类型（对照组） ----------
+
+@dataclass
+class LegacyPatientInfo:
+    mrn: str
+    first_name: str
+    last_name: str
+    dob: str
+
+
+@dataclass
+class LegacyProviderInfo:
+    npi: str
+    name: str
+
+
+@dataclass
+class LegacyCarePlanInfo:
+    primary_diagnosis: str
+    medication_name: str
+    patient_records: str
+    additional_diagnosis: str = ""
+    medication_history: str = ""
+
+
+@dataclass
+class LegacyInternalOrder:
+    patient: LegacyPatientInfo
+    provider: LegacyProviderInfo
+    careplan: LegacyCarePlanInfo
+    source: str
+    raw_data: Any = field(default=None, repr=False)
+    request_flags: dict = field(default_factory=dict)
+
+
+def _legacy(order: InternalOrder) -> LegacyInternalOrder:
+    return LegacyInternalOrder(
+        patient=LegacyPatientInfo(order.patient.mrn, order.patient.first_name, order.patient.last_name, order.patient.dob),
+        provider=LegacyProviderInfo(order.provider.npi, order.provider.name),
+        careplan=LegacyCarePlanInfo(
+            order.careplan.primary_diagnosis, order.careplan.medication_name, order.careplan.patient_records,
+            order.careplan.additional_diagnosis, order.careplan.medication_history,
+        ),
+        source=order.source,
+        request_flags=dict(order.request_flags),
+    )
+
+
+def _payload(i):
+    return {
+        "patient_first_name": f"John{i}",
+        "patient_last_name": "Doe",
+        "patient_mrn": f"{100000 + i % 900000}",
+        "patient_dob": "1990-01-15",
+        "provider_name": "Dr. Jane Smith",
+        "provider_npi": "1234567890",
+        "primary_diagnosis": "E11.9",
+        "additional_diagnosis": "I10",
+        "medication_name": "Metformin",
+        "medication_history": "Lisinopril 10 mg daily",
+        "patient_records": f"Patient {i} has been stable on current regimen.",
+    }
+
+
+def _measure(build):
+    tracemalloc.start()
+    kept = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return kept, current / N
+
+
+def main():
+    adapter = WebFormAdapter()
+    payloads = [_payload(i) for i in range(N)]
+    templates = [adapter.transform(p) for p in payloads]
+
+    def legacy():
+        orders = [_legacy(o) for o in templates]
+        # 改造前 create_careplans_bulk 的入参：每个订单再拷一份 dict
+        return orders, [
+            {
+                "source": o.source, "patient_mrn": o.patient.mrn, "patient_first_name": o.patient.first_name,
+                "patient_last_name": o.patient.last_name, "patient_dob": o.patient.dob,
+                "provider_npi": o.provider.npi, "provider_name": o.provider.name,
+                "primary_diagnosis": o.careplan.primary_diagnosis,
+                "additional_diagnosis": o.careplan.additional_diagnosis,
+                "medication_name": o.careplan.medication_name,
+                "medication_history": o.careplan.medication_history,
+                "patient_records": o.careplan.patient_records, "confirm": False,
+            }
+            for o in orders
+        ]
+
+    def slotted():
+        return [adapter.transform(p) for p in payloads]
+
+    (legacy_orders, legacy_dicts), legacy_bytes = _measure(legacy)
+    slotted_orders, slotted_bytes = _measure(slotted)
+    legacy_pickle = len(pickle.dumps(legacy_dicts[:1000], protocol=pickle.HIGHEST_PROTOCOL)) / 1000
+    slotted_pickle = len(pickle.dumps(slotted_orders[:1000], protocol=pickle.HIGHEST_PROTOCOL)) / 1000
+
+    print(f"{'case':<28}{'bytes/order':>14}{'pickle bytes':>14}")
+    print(f"{'dataclass + create dict':<28}{legacy_bytes:>14.0f}{legacy_pickle:>14.0f}")
+    print(f"{'slots dataclass':<28}{slotted_bytes:>14.0f}{slotted_pickle:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+生成任务投递：改造前（请求里直接 generate_careplan_task.delay） vs outbox（请求里只多一次 INSERT，relay 批量投递）
+- broker 往返用 sleep 模拟（BROKER_RTT），关注请求路径的单条耗时
+- relay 一批在同一个 producer 上投递，另测每条的摊销耗时
+运行: python -m benchmarks.bench_outbox
+"""
+import statistics
+import time
+from unittest.mock import patch
+
+from benchmarks._django import setup_django
+
+setup_django()
+
+from careplan import outbox  # noqa: E402
+from careplan.models import CarePlan, CarePlanOutbox, Patient  # noqa: E402
+from careplan.services import create_careplan  # noqa: E402
+
+N = 300
+BROKER_RTT = 0.002  # 每次 publish 的往返（秒）
+
+
+def _payload(i):
+    return {
+        "provider_npi": "1234567890",
+        "provider_name": "Dr. Jane",
+        "patient_mrn": f"{100000 + i}",
+        "patient_first_name": f"John{i}",
+        "patient_last_name": "Doe",
+        "patient_dob": "1990-01-15",
+        "primary_diagnosis": "E11.9",
+        "medication_name": "Metformin",
+        "patient_records": "Stable.",
+    }
+
+
+class _FakeProducer:
+    def __enter__(self):
+        time.sleep(BROKER_RTT)  # 取连接
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _FakeTask:
+    class app:
+        @staticmethod
+        def producer_or_acquire():
+            return _FakeProducer()
+
+    @staticmethod
+    def delay(careplan_id):
+        time.sleep(BROKER_RTT)
+
+    @staticmethod
+    def apply_async(args, producer=None, queue=None):
+        pass  # 同一连接上的管道写入，相对往返可忽略
+
+
+def _legacy_dispatch(careplans):
+    """改造前：请求里同步 delay（替换 outbox.add，其余 create_careplan 流程相同）"""
+    for careplan in careplans:
+        _FakeTask.delay(careplan.id)
+
+
+def _reset():
+    CarePlanOutbox.objects.all().delete()
+    CarePlan.objects.all().delete()
+    Patient.objects.all().delete()
+
+
+def _per_request(create, offset):
+    timings = []
+    for i in range(N):
+        start = time.perf_counter()
+        create(_payload(offset + i))
+        timings.append((time.perf_counter() - start) * 1e3)
+    return statistics.median(timings), statistics.quantiles(timings, n=20)[-1]
+
+
+def main():
+    with patch("careplan.outbox.generate_careplan_task", _FakeTask):
+        with patch("careplan.outbox.add", _legacy_dispatch):
+            legacy_p50, legacy_p95 = _per_request(create_careplan, 0)
+        _reset()
+        outbox_p50, outbox_p95 = _per_request(create_careplan, 0)
+
+        start = time.perf_counter()
+        published = 0
+        while outbox.pending_count():
+            published += outbox.relay_batch(100)
+        relay_ms = (time.perf_counter() - start) * 1e3 / published
+
+    print(f"broker RTT {BROKER_RTT * 1e3:.1f} ms, {N} requests")
+    print(f"{'case':<24}{'p50 ms':>10}{'p95 ms':>10}")
+    print(f"{'delay in request':<24}{legacy_p50:>10.2f}{legacy_p95:>10.2f}")
+    print(f"{'outbox insert':<24}{outbox_p50:>10.2f}{outbox_p95:>10.2f}")
+    print(f"relay: {published} published, {relay_ms:.3f} ms/careplan (batch 100)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+PharmaCorp XML 解析对比：整树（ET.fromstring + find） vs 流式（XMLPullParser，streaming=True）
+- 单个订单 + 大 NarrativeText
+- CareOrderBatch 信封中的多个订单
+输出每次 parse+transform 的耗时和 tracemalloc 峰值内存
+运行: python -m benchmarks.bench_pharmacorp_xml
+"""
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from careplan.intake.adapters import PharmaCorpAdapter  # noqa: E402
+
+ORDER_XML = """<CareOrderRequest>
+    <RequestMetadata><SourceSystem>PharmaCorp_Portal</SourceSystem><RequestId>REQ-{i}</RequestId></RequestMetadata>
+    <PatientInformation>
+        <MedicalRecordNumber>{mrn}</MedicalRecordNumber>
+        <PatientName><FirstName>Robert</FirstName><LastName>Williams</LastName></PatientName>
+        <DateOfBirth>1972-11-30</DateOfBirth>
+    </PatientInformation>
+    <PrescriberInformation><FullName>Dr. Michael Chen</FullName><NPINumber>5678901234</NPINumber></PrescriberInformation>
+    <DiagnosisList>
+        <PrimaryDiagnosis><ICDCode>G70.01</ICDCode></PrimaryDiagnosis>
+        <SecondaryDiagnoses><Diagnosis><ICDCode>I10</ICDCode></Diagnosis><Diagnosis><ICDCode>E78.5</ICDCode></Diagnosis></SecondaryDiagnoses>
+    </DiagnosisList>
+    <MedicationOrder><DrugName>Octagam</DrugName></MedicationOrder>
+    <MedicationHistory>
+        <Medication><MedicationName>Pyridostigmine</MedicationName><Dosage>60 mg</Dosage><Route>Oral</Route><Frequency>q6h</Frequency></Medication>
+    </MedicationHistory>
+    <ClinicalDocumentation><NarrativeText>{narrative}</NarrativeText></ClinicalDocumentation>
+</CareOrderRequest>"""
+
+
+def _order(i, narrative):
+    return ORDER_XML.format(i=i, mrn=f"{100000 + i}", narrative=narrative)
+
+
+def measure(fn, raw, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(raw)
+    elapsed = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    fn(raw)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    cases = [
+        ("1 order, 2 MB narrative", _order(0, "Stable. " * 250_000).encode(), False, 5),
+        ("1000 orders, 1 KB narrative", (
+            "<CareOrderBatch>" + "".join(_order(i, "x" * 1024) for i in range(1000)) + "</CareOrderBatch>"
+        ).encode(), True, 5),
+    ]
+    print(f"{'case':<30}{'mode':<10}{'ms/doc':>10}{'peak MB':>10}")
+    for label, raw, batch, repeat in cases:
+        for mode, streaming in (("tree", False), ("stream", True)):
+            adapter = PharmaCorpAdapter(streaming=streaming)
+            if batch:
+                def fn(data):
+                    return [adapter.transform(item) for item in adapter.parse_batch(data)]
+            else:
+                def fn(data):
+                    return adapter.transform(adapter.parse(data))
+            elapsed, peak = measure(fn, raw, repeat)
+            print(f"{label:<30}{mode:<10}{elapsed * 1000:>10.1f}{peak / 1024 / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
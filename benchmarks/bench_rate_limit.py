@@ -0,0 +1,109 @@
+"""
+LLM 限流：改造前（直接发，429 后按任务重试 2^retries 退避） vs 调用前按 provider 限流等额度（llm_rate_limit，local 后端）
+- 假 provider 自己按 RPM 令牌桶限流（1 秒突发），超出返回 429 + Retry-After；每次调用 BENCH_LLM_LATENCY 秒
+- 16 个线程并发生成 N 个 care plan，输出总耗时、429 次数、用完重试仍失败的数量
+- 退避时间按 BACKOFF_UNIT 缩小（真实任务为 2 / 4 / 8 秒）
+运行: python -m benchmarks.bench_rate_limit
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from benchmarks._django import setup_django
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+
+from careplan.llm_providers import MockLLMService  # noqa: E402
+from careplan.llm_rate_limit import reset_rate_limiter  # noqa: E402
+from careplan.llm_service import generate_careplan  # noqa: E402
+
+RPM = 1200
+LATENCY = float(os.getenv("BENCH_LLM_LATENCY", "0.05"))
+N = int(os.getenv("BENCH_N", "100"))
+THREADS = 16
+MAX_RETRIES = 3
+BACKOFF_UNIT = 0.25
+
+
+class _RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after):
+        super().__init__("429")
+        self.response = SimpleNamespace(headers={"retry-after-ms": str(int(retry_after * 1000))})
+
+
+class _Provider:
+    """provider 端的限流：RPM / 60 每秒补充，容量 1 秒的额度"""
+
+    def __init__(self):
+        self.level = RPM / 60
+        self.ts = time.monotonic()
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def generate(self, *args, **kwargs):
+        with self._lock:
+            now = time.monotonic()
+            self.level = min(RPM / 60, self.level + (now - self.ts) * RPM / 60)
+            self.ts = now
+            if self.level < 1:
+                self.rejected += 1
+                raise _RateLimited((1 - self.level) * 60 / RPM)
+            self.level -= 1
+        time.sleep(LATENCY)
+        return "content"
+
+
+def _prompt_kwargs():
+    return dict(
+        patient=SimpleNamespace(first_name="John", last_name="Doe", mrn="123456", dob="1990-01-15"),
+        provider=SimpleNamespace(name="Dr. Jane", npi="1234567890"),
+        primary_diagnosis="E11.9",
+        additional_diagnosis="",
+        medication_name="Metformin",
+        medication_history="",
+        patient_records="Stable.",
+    )
+
+
+def _task():
+    """generate_careplan_task 的重试逻辑（退避缩小）"""
+    for retries in range(MAX_RETRIES + 1):
+        try:
+            return generate_careplan(**_prompt_kwargs())
+        except Exception:
+            if retries == MAX_RETRIES:
+                return None
+            time.sleep(BACKOFF_UNIT * 2 ** retries)
+
+
+def _run(backend):
+    settings.LLM_RATE_LIMIT = backend
+    reset_rate_limiter()
+    provider = _Provider()
+    start = time.perf_counter()
+    with patch.object(MockLLMService, "generate", provider.generate), ThreadPoolExecutor(THREADS) as pool:
+        results = list(pool.map(lambda _: _task(), range(N)))
+    elapsed = time.perf_counter() - start
+    return elapsed, provider.rejected, sum(1 for r in results if r is None)
+
+
+def main():
+    settings.LLM_RESULT_CACHE = "none"
+    settings.LLM_RATE_LIMITS = {"mock": {"rpm": RPM, "tpm": 0}}
+    settings.LLM_RATE_LIMIT_BURST_SECONDS = 1
+    print(f"provider {RPM} rpm, {THREADS} threads, {N} plans, LLM {LATENCY * 1e3:.0f} ms")
+    print(f"{'case':<24}{'total s':>10}{'429s':>8}{'failed':>8}")
+    for name, backend in (("retry on 429", "none"), ("client-side limiter", "local")):
+        elapsed, rejected, failed = _run(backend)
+        print(f"{name:<24}{elapsed:>10.2f}{rejected:>8}{failed:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+生成调度：改造前（所有单子进同一个先进先出队列） vs 优先级 lane + bulk 背压 + 按来源公平（careplan.scheduling）
+离散时间模拟，不连 broker / DB；公平分配用 scheduling.shares / interleave 本身
+- 8 个 worker（2 个只消费 interactive，6 个共享、两个队列轮流取，同 kombu 对多队列的轮询），每单 LLM 2 秒
+- t=0 pharmacorp_portal 夜间批量 3000 条；t=30s clinic_b 批量 100 条；webform 单条提交每 3 秒一条，持续 10 分钟
+- 输出各来源提交到完成的 p50 / p95（秒）
+运行: python -m benchmarks.bench_scheduling
+"""
+import statistics
+from collections import deque
+
+from benchmarks._django import setup_django
+
+setup_django()
+
+from careplan import scheduling  # noqa: E402
+
+WORKERS = 8
+DEDICATED = 2
+SERVICE = 2.0
+DT = 0.1
+RELAY_INTERVAL = 0.5
+MAX_DEPTH = 16
+
+
+def _arrivals():
+    """(到达时间, lane, source)"""
+    items = [(0.0, "bulk", "pharmacorp_portal")] * 3000
+    items += [(30.0, "bulk", "clinic_b")] * 100
+    items += [(t * 3.0, "interactive", "webform") for t in range(200)]
+    return sorted(items, key=lambda item: item[0])
+
+
+def _simulate(fair: bool) -> dict[str, list[float]]:
+    arrivals = deque(_arrivals())
+    queues = {"interactive": deque(), "bulk": deque()}
+    outbox = {}  # source -> deque，仅 fair 时使用
+    busy_until = [0.0] * WORKERS
+    turn = [0] * WORKERS
+    done: dict[str, list[float]] = {}
+    next_relay = 0.0
+    now = 0.0
+    remaining = len(arrivals)
+
+    while remaining:
+        while arrivals and arrivals[0][0] <= now:
+            submitted, lane, source = arrivals.popleft()
+            job = (submitted, source)
+            if not fair:
+                queues["interactive"].append(job)
+            elif lane == "interactive":
+                queues["interactive"].append(job)
+            else:
+                outbox.setdefault(source, deque()).append(job)
+
+        if fair and now >= next_relay:
+            next_relay = now + RELAY_INTERVAL
+            room = MAX_DEPTH - len(queues["bulk"])
+            weights = {source: scheduling.weight(source, "openai") for source, jobs in outbox.items() if jobs}
+            groups = {}
+            for source, quota in scheduling.shares(weights, room).items():
+                jobs = outbox[source]
+                groups[source] = [jobs.popleft() for _ in range(min(quota, len(jobs)))]
+            queues["bulk"].extend(scheduling.interleave(groups, weights))
+
+        for worker in range(WORKERS):
+            if busy_until[worker] > now:
+                continue
+            if worker < DEDICATED:
+                order = ["interactive"]
+            else:
+                order = ["interactive", "bulk"] if turn[worker] % 2 == 0 else ["bulk", "interactive"]
+            for lane in order:
+                if queues[lane]:
+                    submitted, source = queues[lane].popleft()
+                    busy_until[worker] = now + SERVICE
+                    done.setdefault(source, []).append(now + SERVICE - submitted)
+                    remaining -= 1
+                    turn[worker] += 1
+                    break
+        now = round(now + DT, 6)
+    return done
+
+
+def _report(name, done):
+    for source in ("webform", "clinic_b", "pharmacorp_portal"):
+        times = done[source]
+        p95 = statistics.quantiles(times, n=20)[-1]
+        print(f"  {name:<16} {source:<18} p50 {statistics.median(times):8.1f}s   p95 {p95:8.1f}s")
+
+
+def main():
+    print(f"{WORKERS} workers ({DEDICATED} interactive-only), LLM {SERVICE:.0f}s per plan")
+    _report("single FIFO", _simulate(fair=False))
+    _report("lanes + fair", _simulate(fair=True))
+
+
+if __name__ == "__main__":
+    main()
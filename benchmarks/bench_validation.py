@@ -0,0 +1,130 @@
+"""
+格式校验对比：改造前（serializers / Adapter.validate 各一份，.strip() 拷贝 + strptime） vs careplan.validation
+- 请求 dict（serializers）和 InternalOrder（Adapter）各测合法 / 不合法两种
+- InternalOrder 另测 500 条整批 errors_many
+运行: python -m benchmarks.bench_validation
+"""
+import re
+import timeit
+from datetime import datetime
+
+from benchmarks._django import setup_django
+
+setup_django()
+
+from careplan.intake.adapters import WebFormAdapter  # noqa: E402
+from careplan.validation import dict_validator, order_validator  # noqa: E402
+
+VALID = {
+    "provider_npi": "1234567890",
+    "provider_name": "Dr. Jane",
+    "patient_mrn": "123456",
+    "patient_first_name": "John",
+    "patient_last_name": "Doe",
+    "patient_dob": "1990-01-15",
+    "primary_diagnosis": "E11.9",
+    "medication_name": "Metformin",
+    "patient_records": "Patient stable.",
+}
+INVALID = {**VALID, "provider_npi": "123", "patient_dob": "1990-02-30", "primary_diagnosis": "D1"}
+
+# ---------- 改造前的校验（对照组） ----------
+
+NPI_PATTERN = re.compile(r"^\d{10}$")
+MRN_PATTERN = re.compile(r"^\d{6}$")
+ICD10_PATTERN = re.compile(r"^[A-Za-z][0-9]{2}(\.[0-9A-Za-z]{1,4})?$")
+REQUIRED_FIELDS = list(VALID)
+TEXT_FIELDS = ("provider_name", "patient_first_name", "patient_last_name", "medication_name", "patient_records")
+
+
+def _legacy_pattern(pattern, message):
+    def check(value):
+        if not value or not isinstance(value, str) or not pattern.match(value.strip()):
+            return message
+        return None
+    return check
+
+
+def _legacy_dob(value):
+    if not value or not isinstance(value, str):
+        return "出生日期格式应为 YYYY-MM-DD"
+    s = value.strip()[:10]
+    if len(s) != 10 or s[4] != "-" or s[7] != "-":
+        return "出生日期格式应为 YYYY-MM-DD"
+    try:
+        datetime.strptime(s, "%Y-%m-%d").date()
+    except ValueError:
+        return "出生日期必须是合法日期"
+    return None
+
+
+_LEGACY_FORMATS = [
+    ("provider_npi", _legacy_pattern(NPI_PATTERN, "NPI 必须为 10 位数字")),
+    ("patient_mrn", _legacy_pattern(MRN_PATTERN, "MRN 必须为 6 位数字")),
+    ("patient_dob", _legacy_dob),
+    ("primary_diagnosis", _legacy_pattern(ICD10_PATTERN, "主要诊断需符合 ICD-10 格式（如 A00, E11.9）")),
+]
+
+
+def legacy_dict_errors(data):
+    errors = []
+    for field in REQUIRED_FIELDS:
+        if field not in data:
+            errors.append({"field": field, "message": "该字段为必填"})
+        elif field in TEXT_FIELDS:
+            value = data[field]
+            if value is None or (isinstance(value, str) and not value.strip()):
+                errors.append({"field": field, "message": f"{field} 不能为空"})
+    for field, validator in _LEGACY_FORMATS:
+        if field in data and data[field] is not None:
+            msg = validator(data[field])
+            if msg:
+                errors.append({"field": field, "message": msg})
+    return errors
+
+
+def legacy_order_errors(order):
+    errors = []
+    if not order.patient.mrn or not MRN_PATTERN.match(order.patient.mrn.strip()):
+        errors.append({"field": "patient.mrn", "message": "MRN 必须为 6 位数字"})
+    if not order.provider.npi or not NPI_PATTERN.match(order.provider.npi.strip()):
+        errors.append({"field": "provider.npi", "message": "NPI 必须为 10 位数字"})
+    msg = _legacy_dob(order.patient.dob)
+    if msg:
+        errors.append({"field": "patient.dob", "message": msg})
+    if not order.careplan.primary_diagnosis:
+        errors.append({"field": "careplan.primary_diagnosis", "message": "主要诊断不能为空"})
+    elif not ICD10_PATTERN.match(order.careplan.primary_diagnosis.strip()):
+        errors.append({"field": "careplan.primary_diagnosis", "message": "主要诊断需符合 ICD-10 格式（如 A00, E11.9）"})
+    if not order.careplan.medication_name:
+        errors.append({"field": "careplan.medication_name", "message": "药物名称不能为空"})
+    if not order.careplan.patient_records:
+        errors.append({"field": "careplan.patient_records", "message": "患者记录不能为空"})
+    return errors
+
+
+def _time(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    adapter = WebFormAdapter()
+    valid_order, invalid_order = adapter.transform(VALID), adapter.transform(INVALID)
+    batch = [valid_order] * 450 + [invalid_order] * 50
+    cases = [
+        ("dict valid", lambda: legacy_dict_errors(VALID), lambda: dict_validator.errors(VALID), 50000),
+        ("dict invalid", lambda: legacy_dict_errors(INVALID), lambda: dict_validator.errors(INVALID), 50000),
+        ("order valid", lambda: legacy_order_errors(valid_order), lambda: order_validator.errors(valid_order), 50000),
+        ("order invalid", lambda: legacy_order_errors(invalid_order),
+         lambda: order_validator.errors(invalid_order), 50000),
+        ("order batch 500", lambda: [legacy_order_errors(o) for o in batch],
+         lambda: order_validator.errors_many(batch), 100),
+    ]
+    print(f"{'case':<20}{'legacy us':>12}{'unified us':>12}{'speedup':>10}")
+    for label, before, after, number in cases:
+        t_before, t_after = _time(before, number), _time(after, number)
+        print(f"{label:<20}{t_before:>12.2f}{t_after:>12.2f}{t_before / t_after:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Redis 队列 worker 吞吐：改造前（BLPOP 一个 id → 生成 → 下一个） vs CarePlanWorker（批量可靠出队，thread / async 并发）
+- LLM 用 sleep 模拟（BENCH_LLM_LATENCY 秒，默认 0.2），Redis 用进程内的假 list 实现，只测 worker 本身
+- SQLite 文件库（worker 线程各自连接）；每种情况处理 N 个 pending care plan
+运行: python -m benchmarks.bench_worker
+     BENCH_LLM_LATENCY=0.05 BENCH_N=400 python -m benchmarks.bench_worker
+"""
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+from benchmarks._django import setup_django
+
+_DB = tempfile.NamedTemporaryFile(suffix=".sqlite3", delete=False)
+setup_django(db_path=_DB.name)
+
+from django.conf import settings  # noqa: E402
+
+from careplan.llm_providers import MockLLMService  # noqa: E402
+from careplan.llm_service import generate_careplan  # noqa: E402
+from careplan.models import CarePlan, Patient, Provider  # noqa: E402
+from careplan.worker import CarePlanWorker  # noqa: E402
+
+LATENCY = float(os.getenv("BENCH_LLM_LATENCY", "0.2"))
+N = int(os.getenv("BENCH_N", "200"))
+
+
+class _FakeRedis:
+    """可靠队列用到的 list / key 命令"""
+
+    def __init__(self):
+        self.lists = {}
+        self.keys = {}
+        self._lock = threading.Lock()
+
+    def rpush(self, key, *values):
+        with self._lock:
+            self.lists.setdefault(key, []).extend(str(v).encode() for v in values)
+
+    def lmove(self, src, dst, wherefrom, whereto):
+        with self._lock:
+            items = self.lists.get(src)
+            if not items:
+                return None
+            value = items.pop(0 if wherefrom == "LEFT" else -1)
+            target = self.lists.setdefault(dst, [])
+            target.insert(0 if whereto == "LEFT" else len(target), value)
+            return value
+
+    def blmove(self, src, dst, timeout, wherefrom, whereto):
+        value = self.lmove(src, dst, wherefrom, whereto)
+        if value is None:
+            time.sleep(min(timeout, 0.01))
+        return value
+
+    def blpop(self, key, timeout):
+        with self._lock:
+            items = self.lists.get(key)
+            if items:
+                return key, items.pop(0)
+        return None
+
+    def lrem(self, key, count, value):
+        with self._lock:
+            items = self.lists.get(key, [])
+            value = str(value).encode()
+            if value in items:
+                items.remove(value)
+
+    def llen(self, key):
+        return len(self.lists.get(key, []))
+
+    def set(self, key, value, ex=None):
+        self.keys[key] = value
+
+    def exists(self, key):
+        return int(key in self.keys)
+
+    def delete(self, key):
+        self.keys.pop(key, None)
+
+    def scan_iter(self, match):
+        return []
+
+    def pipeline(self, transaction=True):
+        redis = self
+        calls = []
+
+        class _Pipe:
+            def __getattr__(self, name):
+                return lambda *a, **kw: calls.append((name, a, kw))
+
+            def execute(self):
+                return [getattr(redis, name)(*a, **kw) for name, a, kw in calls]
+
+        return _Pipe()
+
+
+def _fake_generate(self, *args, **kwargs):
+    time.sleep(LATENCY)
+    return "care plan"
+
+
+async def _fake_agenerate(self, *args, **kwargs):
+    await asyncio.sleep(LATENCY)
+    return "care plan"
+
+
+def _seed(offset):
+    provider, _ = Provider.objects.get_or_create(npi="1234567890", defaults={"name": "Dr. Jane"})
+    patients = Patient.objects.bulk_create([
+        Patient(mrn=f"{offset + i}", first_name="John", last_name="Doe", dob="1990-01-15") for i in range(N)
+    ])
+    careplans = CarePlan.objects.bulk_create([
+        CarePlan(patient=p, provider=provider, primary_diagnosis="E11.9", medication_name="Metformin",
+                 patient_records="r", use_llm_cache=False)
+        for p in patients
+    ])
+    r = _FakeRedis()
+    r.rpush(settings.CAREPLAN_QUEUE_KEY, *[cp.id for cp in careplans])
+    return r
+
+
+def legacy(r):
+    """改造前的 process_one_task 循环：BLPOP 一个 id，逐个生成"""
+    while True:
+        result = r.blpop(settings.CAREPLAN_QUEUE_KEY, timeout=5)
+        if not result:
+            return
+        careplan = CarePlan.objects.select_related("patient", "provider").get(id=int(result[1]))
+        if careplan.status != "pending":
+            continue
+        careplan.status = "processing"
+        careplan.save()
+        careplan.generated_content = generate_careplan(
+            patient=careplan.patient,
+            provider=careplan.provider,
+            primary_diagnosis=careplan.primary_diagnosis,
+            additional_diagnosis="",
+            medication_name=careplan.medication_name,
+            medication_history="",
+            patient_records=careplan.patient_records,
+            use_cache=False,
+        )
+        careplan.status = "completed"
+        careplan.save()
+
+
+def main():
+    settings.LLM_STREAMING = False
+    settings.CAREPLAN_STATUS_NOTIFY = "none"
+    settings.CAREPLAN_STATUS_CACHE = "none"
+    cases = [("legacy 1 at a time", None, 1, 1)] + [
+        (f"{mode} x{concurrency}", mode, concurrency, 16)
+        for mode, concurrency in [("thread", 8), ("thread", 32), ("async", 32), ("async", 128)]
+    ]
+    print(f"fake LLM latency {LATENCY * 1e3:.0f} ms, {N} care plans per case")
+    print(f"{'case':<22}{'seconds':>10}{'plans/s':>10}{'speedup':>10}")
+    baseline = None
+    with patch.object(MockLLMService, "generate", _fake_generate), \
+            patch.object(MockLLMService, "agenerate", _fake_agenerate):
+        for i, (label, mode, concurrency, batch_size) in enumerate(cases):
+            r = _seed(100000 + i * N)
+            start = time.perf_counter()
+            if mode is None:
+                legacy(r)
+            else:
+                worker = CarePlanWorker(mode=mode, concurrency=concurrency, batch_size=batch_size,
+                                        redis=r, poll_timeout=0.05)
+                worker.run(threading.Event(), drain=True)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"{label:<22}{elapsed:>10.2f}{N / elapsed:>10.1f}{baseline / elapsed:>9.1f}x")
+    assert not CarePlan.objects.exclude(status="completed").exists()
+    os.unlink(_DB.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_save
 
 
 class CareplanConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'careplan'
+
+    def ready(self):
+        from .models import CarePlan
+        from .search_index import on_careplan_saved
+
+        # completed 的 care plan 同步写入搜索文档
+        post_save.connect(on_careplan_saved, sender=CarePlan, dispatch_uid='careplan_search_index')
@@ -0,0 +1,161 @@
+"""
+异步生成：一个事件循环同时跑多个 care plan 生成，在途数量由信号量限制
+- LLM 调用走 agenerate，等待期间不占线程，单进程可同时挂起几百个请求
+- DB 读写走 Django async ORM（内部 sync_to_async 串行到一个线程上，都是短操作）
+- 重试与 generate_careplan_task 一致：最多 3 次，2^retries 秒指数退避
+- 认领、续约、写结果与 generate_careplan_task 共用 careplan/leases.py 的租约
+"""
+import asyncio
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+
+from . import leases, scheduling
+from .llm_service import agenerate_careplan
+from .models import CarePlan
+from .status_events import notify_status
+from .statsd_metrics import (
+    careplan_completed,
+    careplan_failed,
+    celery_task_duration_seconds,
+    celery_task_failure,
+    celery_task_retry,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRIES = 3
+
+_claim = sync_to_async(leases.claim)
+_renew = sync_to_async(leases.renew)
+_finish = sync_to_async(leases.finish)
+
+
+async def agenerate_careplan_for(careplan_id, *, max_retries=MAX_RETRIES, retry_base_delay=1.0):
+    """
+    生成单个 care plan：pending → processing → completed/failed
+    返回最终状态 'completed' / 'failed'；没认领到（已被处理/不存在）或中途租约被接手时返回 None
+    """
+    # 租约认领，避免和其他 worker 重复处理
+    owner = leases.new_owner()
+    if not await _claim(careplan_id, owner):
+        return None
+    careplan = await CarePlan.objects.select_related('patient', 'provider').aget(id=careplan_id)
+    return await agenerate_claimed(careplan, owner, max_retries=max_retries, retry_base_delay=retry_base_delay)
+
+
+async def agenerate_claimed(careplan, owner, *, max_retries=MAX_RETRIES, retry_base_delay=1.0):
+    """
+    生成已由 owner 认领的 care plan（带 patient / provider）
+    返回 'completed' / 'failed'；中途租约被其他 worker 接手时返回 None
+    """
+    start = time.perf_counter()
+    careplan_id = careplan.id
+    await asyncio.to_thread(notify_status, careplan_id, 'processing')
+    scheduling.record_started(careplan)
+
+    retries = 0
+    served = []
+    while True:
+        try:
+            content = await agenerate_careplan(
+                patient=careplan.patient,
+                provider=careplan.provider,
+                primary_diagnosis=careplan.primary_diagnosis,
+                additional_diagnosis=careplan.additional_diagnosis or '',
+                medication_name=careplan.medication_name,
+                medication_history=careplan.medication_history or '',
+                patient_records=careplan.patient_records,
+                llm_provider=careplan.llm_provider or None,
+                use_cache=careplan.use_llm_cache,
+                on_provider=served.append,
+            )
+        except Exception as exc:
+            if retries >= max_retries:
+                if await _finish(careplan, owner, 'failed', error=str(exc)):
+                    await asyncio.to_thread(notify_status, careplan_id, 'failed', error=careplan.error_message)
+                    careplan_failed()
+                    scheduling.record_finished(careplan)
+                celery_task_failure()
+                celery_task_duration_seconds(time.perf_counter() - start)
+                return 'failed'
+            celery_task_retry()
+            delay = retry_base_delay * 2 ** retries
+            if not await _renew(careplan_id, owner, delay):
+                # 租约已被其他 worker 接手
+                return None
+            await asyncio.sleep(delay)
+            retries += 1
+            continue
+
+        if not await _finish(careplan, owner, 'completed', content=content, llm_provider=served[-1] if served else ''):
+            return None
+        await asyncio.to_thread(notify_status, careplan_id, 'completed')
+        careplan_completed()
+        scheduling.record_finished(careplan)
+        celery_task_duration_seconds(time.perf_counter() - start)
+        return 'completed'
+
+
+class AsyncCarePlanRunner:
+    """
+    在一个事件循环里并发生成 care plan，同时在途的数量不超过 max_in_flight
+    用法：await runner.submit(id) 在有空位时启动并立即返回；await runner.wait_idle() 等全部结束
+    """
+
+    def __init__(self, max_in_flight: int, *, retry_base_delay: float = 1.0):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be >= 1")
+        self.max_in_flight = max_in_flight
+        self.retry_base_delay = retry_base_delay
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._tasks: set[asyncio.Task] = set()
+
+    async def acquire_slot(self) -> None:
+        """等一个空位；拿到后必须调用 start() 或 release_slot()"""
+        await self._slots.acquire()
+
+    def release_slot(self) -> None:
+        self._slots.release()
+
+    def start(self, careplan_id) -> asyncio.Task:
+        """在已占用的空位上启动生成"""
+        task = asyncio.create_task(self._run(careplan_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def submit(self, careplan_id) -> asyncio.Task:
+        await self.acquire_slot()
+        return self.start(careplan_id)
+
+    async def wait_idle(self) -> None:
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def run(self, careplan_ids) -> None:
+        """处理一批 id，全部结束后返回"""
+        for careplan_id in careplan_ids:
+            await self.submit(careplan_id)
+        await self.wait_idle()
+
+    async def _run(self, careplan_id) -> None:
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            status = await agenerate_careplan_for(careplan_id, retry_base_delay=self.retry_base_delay)
+            if status == 'completed':
+                self.completed += 1
+            elif status == 'failed':
+                self.failed += 1
+        except Exception:
+            self.failed += 1
+            logger.exception("careplan %s: async generation crashed", careplan_id)
+        finally:
+            self.in_flight -= 1
+            self.release_slot()
@@ -0,0 +1,72 @@
+"""
+NDJSON 批量导入（import_careplans 命令使用）
+- 每行一个订单，格式与对应 Adapter 的单条请求体一致（默认 webform）
+- iter_batches：按字节偏移流式读文件，每批固定行数，内存只与批大小有关
+- parse_lines：在进程池里跑 get_adapter(source).process，只做解析 / 校验，不碰 DB
+  返回值只含可 pickle 的基础类型（dict / str），异常转成 to_dict()
+- Checkpoint：记录已写入 DB 的最后一批结束处的字节偏移，--resume 时从这里继续
+"""
+import json
+import os
+
+from pharmacy_plan.exceptions import BaseAppException
+
+from .intake import get_adapter
+
+
+def iter_batches(f, batch_size, start_offset=0, start_line=0):
+    """
+    f 为二进制文件对象；产出 (lines, end_offset, end_line)
+    lines 为 [(行号, 原始字节)]，空行跳过但计入行号；end_offset / end_line 为该批最后一行之后的位置
+    """
+    f.seek(start_offset)
+    offset = yielded = start_offset
+    line_no = start_line
+    batch = []
+    for raw in f:
+        offset += len(raw)
+        line_no += 1
+        if raw.strip():
+            batch.append((line_no, raw))
+        if len(batch) >= batch_size:
+            yield batch, offset, line_no
+            batch = []
+            yielded = offset
+    if batch or offset != yielded:
+        yield batch, offset, line_no
+
+
+def parse_lines(source, lines):
+    """
+    进程池 worker：逐行 adapter.process
+    返回 [(行号, InternalOrder 或 None, 错误 dict 或 None)]；原始行不回传（raw_data 置空）
+    """
+    adapter = get_adapter(source)
+    results = []
+    for line_no, raw in lines:
+        try:
+            order = adapter.process(raw, source=source)
+        except BaseAppException as e:
+            results.append((line_no, None, e.to_dict()))
+            continue
+        order.raw_data = None
+        results.append((line_no, order, None))
+    return results
+
+
+def read_checkpoint(path):
+    """返回 (offset, line)；文件不存在时从头开始"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return 0, 0
+    return int(data["offset"]), int(data["line"])
+
+
+def write_checkpoint(path, offset, line):
+    """先写临时文件再 rename，进程中途退出也不会留下半个 checkpoint"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"offset": offset, "line": line}, f)
+    os.replace(tmp, path)
@@ -3,11 +3,20 @@
 - Provider: NPI 相同 + 名字不同 → 必须阻止 (BlockError)
 - Patient: MRN 相同 + 名字/DOB 不同 → 警告 (WarningException)；名字+DOB 相同 + MRN 不同 → 警告
 - Order (CarePlan): 同一患者 + 同一药物 + 同一天 → 必须阻止；不同天 → 警告（confirm 可跳过）
+
+check_provider / check_patient / check_order 为逐项检查；
+check_duplicates 用两次查询取齐三项检查所需数据，再在 Python 中套用同样的规则（create_careplan 使用）
+check_duplicates_bulk 对整批订单集合式查询（每 BULK_QUERY_CHUNK 条三次查询），按提交顺序逐条套用同样的规则，
+同一批内先被接受的订单也参与后续订单的判断（create_careplans_bulk 使用）
 """
-from datetime import date, datetime
+from datetime import date, datetime, time, timedelta
+
+from django.db.models import Case, Exists, IntegerField, Max, OuterRef, Q, Value, When
+from django.utils import timezone
 
 from pharmacy_plan.exceptions import BlockError, WarningException
 
+from .intake.types import InternalOrder
 from .models import Patient, Provider, CarePlan
 
 
@@ -74,29 +83,212 @@ def check_patient(mrn, first_name, last_name, dob, confirm=False):
     return None
 
 
+def _day_range(day):
+    """
+    某天在当前时区的 [00:00, 次日 00:00) 区间
+    用范围条件代替 created_at__date，(patient, medication_name, created_at) 组合索引可直接 seek
+    """
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
 def check_order(patient, medication_name, confirm=False):
     """
     同一患者 + 同一药物 + 同一天 → 抛出 DuplicationError (409)
     同一患者 + 同一药物 + 不同天 → 警告；confirm 则跳过
     """
-    today = date.today()
-    same_day = CarePlan.objects.filter(
-        patient=patient,
-        medication_name=medication_name,
-        created_at__date=today
-    ).exists()
+    day_start, day_end = _day_range(date.today())
+    orders = CarePlan.objects.filter(patient=patient, medication_name=medication_name)
+    same_day = orders.filter(created_at__gte=day_start, created_at__lt=day_end).exists()
     if same_day:
         raise BlockError(
             message="同一患者同日已有相同药物订单，无法重复提交",
             code="ORDER_SAME_DAY_DUPLICATE",
         )
 
-    diff_day = CarePlan.objects.filter(
-        patient=patient,
-        medication_name=medication_name
-    ).exclude(created_at__date=today).exists()
+    # 走到这里说明当天没有，存在的订单必然是不同天
+    diff_day = orders.exists()
     if diff_day and not confirm:
         raise WarningException(
             message="同一患者已有相同药物订单（不同日期），请确认后继续",
             code="ORDER_DIFF_DAY_DUPLICATE",
         )
+
+
+def check_duplicates(npi, provider_name, mrn, first_name, last_name, dob, medication_name, confirm=False):
+    """
+    合并版重复检测，规则与 check_provider → check_patient → check_order 完全一致
+    查询 1：按 NPI 取 provider
+    查询 2：按 MRN 或 姓名+DOB 取 patient，同时用 EXISTS 子查询带出该患者同药物的当天/历史订单
+    返回 (provider, patient)，为 None 表示需要新建
+    """
+    dob = _parse_dob(dob)
+
+    provider = Provider.objects.filter(npi=npi).first()
+    if provider is not None and provider.name != provider_name:
+        raise BlockError(
+            message="NPI 已存在但提供者姓名不一致，必须修正",
+            code="PROVIDER_NPI_NAME_MISMATCH",
+        )
+
+    day_start, day_end = _day_range(date.today())
+    orders = CarePlan.objects.filter(patient=OuterRef('pk'), medication_name=medication_name)
+    candidates = list(
+        Patient.objects
+        .filter(Q(mrn=mrn) | Q(first_name=first_name, last_name=last_name, dob=dob))
+        .annotate(
+            is_mrn_match=Case(When(mrn=mrn, then=Value(1)), default=Value(0), output_field=IntegerField()),
+            has_same_day_order=Exists(orders.filter(created_at__gte=day_start, created_at__lt=day_end)),
+            has_order=Exists(orders),
+        )
+        # MRN 命中的行（最多一条）排在最前；姓名+DOB 命中只需知道有没有
+        .order_by('-is_mrn_match')[:2]
+    )
+    existing_by_mrn = candidates[0] if candidates and candidates[0].is_mrn_match else None
+    has_name_dob_duplicate = any(not c.is_mrn_match for c in candidates)
+
+    patient = None
+    if existing_by_mrn:
+        if not (existing_by_mrn.first_name == first_name and
+                existing_by_mrn.last_name == last_name and
+                existing_by_mrn.dob == dob) and not confirm:
+            raise WarningException(
+                message="MRN 已存在但患者姓名或出生日期不一致，请确认后继续",
+                code="PATIENT_MRN_MISMATCH",
+            )
+        patient = existing_by_mrn
+    elif has_name_dob_duplicate and not confirm:
+        raise WarningException(
+            message="姓名和出生日期已存在但 MRN 不同，请确认后继续",
+            code="PATIENT_NAME_DOB_DUPLICATE",
+        )
+
+    # 新患者不可能有历史订单
+    if patient is not None:
+        if patient.has_same_day_order:
+            raise BlockError(
+                message="同一患者同日已有相同药物订单，无法重复提交",
+                code="ORDER_SAME_DAY_DUPLICATE",
+            )
+        if patient.has_order and not confirm:
+            raise WarningException(
+                message="同一患者已有相同药物订单（不同日期），请确认后继续",
+                code="ORDER_DIFF_DAY_DUPLICATE",
+            )
+
+    return provider, patient
+
+
+# 集合查询每次最多带的订单数，控制 IN 列表长度（SQLite 绑定参数上限）
+BULK_QUERY_CHUNK = 500
+
+
+def _chunks(seq, size):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+
+def check_duplicates_bulk(items):
+    """
+    批量重复检测：items 为 InternalOrder 列表（旧的 create_careplan dict 格式也接受）
+    返回 (errors, providers, patients)
+    - errors：与 items 等长，None 表示通过，否则为该条的 BlockError / WarningException
+    - providers：{npi: Provider}，patients：{mrn: Patient}，只含 DB 中已存在的
+      通过的订单按 npi / mrn 取已有记录，取不到的需要新建（MRN 唯一，新患者一律按 MRN 建）
+    """
+    items = [d if isinstance(d, InternalOrder) else InternalOrder.from_create_careplan_dict(d) for d in items]
+    npis = list({d.provider.npi for d in items})
+    mrns = list({d.patient.mrn for d in items})
+    keys = [(d.patient.first_name, d.patient.last_name, _parse_dob(d.patient.dob)) for d in items]
+    name_dobs = set(keys)
+
+    providers = {}
+    for chunk in _chunks(npis, BULK_QUERY_CHUNK):
+        providers.update((p.npi, p) for p in Provider.objects.filter(npi__in=chunk))
+
+    # MRN 命中的取实体；姓名+DOB 先按三列 IN 取超集，再在 Python 中精确匹配
+    patients = {}
+    name_dob_mrns = {}
+    name_dob_list = list(name_dobs)
+    for i in range(0, max(len(mrns), len(name_dob_list)), BULK_QUERY_CHUNK):
+        mrn_chunk = mrns[i:i + BULK_QUERY_CHUNK]
+        nd_chunk = name_dob_list[i:i + BULK_QUERY_CHUNK]
+        query = Q(mrn__in=mrn_chunk)
+        if nd_chunk:
+            query |= Q(
+                first_name__in={nd[0] for nd in nd_chunk},
+                last_name__in={nd[1] for nd in nd_chunk},
+                dob__in={nd[2] for nd in nd_chunk},
+            )
+        for p in Patient.objects.filter(query):
+            patients[p.mrn] = p
+            key = (p.first_name, p.last_name, p.dob)
+            if key in name_dobs:
+                name_dob_mrns.setdefault(key, set()).add(p.mrn)
+
+    # 已有患者同药物订单：按 (patient, medication) 聚合，只带回是否有当天订单
+    day_start, day_end = _day_range(date.today())
+    orders = {}  # (mrn, medication_name) -> 是否当天
+    mrn_set = set(mrns)
+    relevant = [p for p in patients.values() if p.mrn in mrn_set]
+    meds = list({d.careplan.medication_name for d in items})
+    for chunk in _chunks(relevant, BULK_QUERY_CHUNK):
+        mrn_by_id = {p.id: p.mrn for p in chunk}
+        rows = (
+            CarePlan.objects
+            .filter(patient_id__in=list(mrn_by_id), medication_name__in=meds)
+            .values('patient_id', 'medication_name')
+            .annotate(same_day=Max(Case(
+                When(created_at__gte=day_start, created_at__lt=day_end, then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField(),
+            )))
+        )
+        for row in rows:
+            orders[(mrn_by_id[row['patient_id']], row['medication_name'])] = bool(row['same_day'])
+
+    # 按提交顺序逐条判断；通过的订单写回内存状态，供同批后续订单使用
+    provider_names = {npi: p.name for npi, p in providers.items()}
+    patient_keys = {mrn: (p.first_name, p.last_name, p.dob) for mrn, p in patients.items()}
+    errors = []
+    for d, key in zip(items, keys):
+        confirm = d.confirm
+        npi, mrn, med = d.provider.npi, d.patient.mrn, d.careplan.medication_name
+        try:
+            if npi in provider_names and provider_names[npi] != d.provider.name:
+                raise BlockError(
+                    message="NPI 已存在但提供者姓名不一致，必须修正",
+                    code="PROVIDER_NPI_NAME_MISMATCH",
+                )
+            if mrn in patient_keys:
+                if patient_keys[mrn] != key and not confirm:
+                    raise WarningException(
+                        message="MRN 已存在但患者姓名或出生日期不一致，请确认后继续",
+                        code="PATIENT_MRN_MISMATCH",
+                    )
+                if orders.get((mrn, med)):
+                    raise BlockError(
+                        message="同一患者同日已有相同药物订单，无法重复提交",
+                        code="ORDER_SAME_DAY_DUPLICATE",
+                    )
+                if (mrn, med) in orders and not confirm:
+                    raise WarningException(
+                        message="同一患者已有相同药物订单（不同日期），请确认后继续",
+                        code="ORDER_DIFF_DAY_DUPLICATE",
+                    )
+            elif name_dob_mrns.get(key, set()) - {mrn} and not confirm:
+                raise WarningException(
+                    message="姓名和出生日期已存在但 MRN 不同，请确认后继续",
+                    code="PATIENT_NAME_DOB_DUPLICATE",
+                )
+        except (BlockError, WarningException) as e:
+            errors.append(e)
+            continue
+        errors.append(None)
+        provider_names.setdefault(npi, d.provider.name)
+        if mrn not in patient_keys:
+            patient_keys[mrn] = key
+            name_dob_mrns.setdefault(key, set()).add(mrn)
+        orders[(mrn, med)] = True
+
+    return errors, providers, patients
@@ -1,30 +1,121 @@
 """
 多数据源 Adapter：解析、转换、校验
 """
-import json
 import re
-from datetime import datetime
+from datetime import date, datetime
 import xml.etree.ElementTree as ET
 from abc import ABC, abstractmethod
 from typing import Any
 
 from pharmacy_plan.exceptions import ValidationError
 
-from .types import InternalOrder, PatientInfo, ProviderInfo, CarePlanInfo
+from ..validation import order_validator, validation_error
+from . import codec
+from .mapping import Field, compile_mapping, computed, field, text
+from .types import InternalOrder
+
+
+def _loads_json(raw: bytes | str):
+    """直接解析 bytes（codec 按 JSON_CODEC 选 orjson / stdlib），失败统一为 INVALID_JSON"""
+    try:
+        return codec.loads(raw)
+    except codec.JSONDecodeError as e:
+        raise ValidationError(
+            message="Invalid JSON format",
+            code="INVALID_JSON",
+            detail={"error": str(e)},
+        )
+
+
+def _parse_json_batch(raw: bytes | str) -> list:
+    """
+    批量 JSON：顶层为数组，或 {"orders": [...]}
+    单条不是对象时对应位置放该条的 ValidationError，不影响其他条
+    """
+    parsed = _loads_json(raw)
+    if isinstance(parsed, dict):
+        parsed = parsed.get("orders")
+    if not isinstance(parsed, list):
+        raise ValidationError(
+            message="Batch body must be a JSON array or {\"orders\": [...]}",
+            code="INVALID_BATCH",
+        )
+    return [
+        item if isinstance(item, dict) else ValidationError(
+            message="Each order must be a JSON object",
+            code="INVALID_BATCH_ITEM",
+        )
+        for item in parsed
+    ]
+
+
+# ---------- mapping 用到的转换函数 ----------
+
+_MMDDYYYY_PATTERN = re.compile(r"(\d{2})/(\d{2})/(\d{4})", re.ASCII)
 
-# 与 serializers 一致的格式校验
-_NPI_PATTERN = re.compile(r"^\d{10}$")
-_MRN_PATTERN = re.compile(r"^\d{6}$")
-_ICD10_PATTERN = re.compile(r"^[A-Za-z][0-9]{2}(\.[0-9A-Za-z]{1,4})?$")
+
+def _dob_mmddyyyy_to_iso(v) -> str:
+    """将 MM/DD/YYYY 转为 YYYY-MM-DD"""
+    s = str(v).strip()
+    if not s:
+        return ""
+    head = s[:10]
+    m = _MMDDYYYY_PATTERN.fullmatch(head)
+    try:
+        if m:
+            # 常见的两位月日：不走 strptime
+            month, day, year = m.groups()
+            date(int(year), int(month), int(day))
+            return f"{year}-{month}-{day}"
+        return datetime.strptime(head, "%m/%d/%Y").strftime("%Y-%m-%d")
+    except ValueError:
+        return head  # 原样返回前 10 字符，由 validate 报错
+
+
+def _join_list_or_text(sep: str, strip_items: bool, strip_text: bool):
+    """列表按 sep 拼接（跳过空项），否则按文本处理"""
+    def convert(v) -> str:
+        if isinstance(v, list):
+            return sep.join((str(x).strip() if strip_items else str(x)) for x in v if x)
+        s = str(v or "")
+        return s.strip() if strip_text else s
+    return convert
+
+
+def _medcenter_records(clinical_notes, allergies) -> str:
+    clinical_notes = str(clinical_notes).strip()
+    if isinstance(allergies, list) and allergies:
+        allergies_str = "Allergies: " + ", ".join(str(a) for a in allergies)
+        return f"{allergies_str}\n\n{clinical_notes}" if clinical_notes else allergies_str
+    return clinical_notes or "(No clinical notes)"
+
+
+# JSON 数据源共用的请求级选项
+_REQUEST_FLAGS = {
+    "request_flags.confirm": field("confirm", convert="is_true", default=None),
+    "request_flags.llm_provider": field("llm_provider", convert="optional_text", default=None),
+    "request_flags.use_llm_cache": field("use_llm_cache", convert="not_false", default=None),
+}
 
 
 class BaseIntakeAdapter(ABC):
     """
     抽象基类：所有数据源 Adapter 的父类
-    新增数据源时只需继承此类并实现 parse/transform/validate
+    新增数据源时只需继承此类，实现 parse 并声明 mapping（字段映射，类定义时编译为 _extract，
+    未覆盖 transform 时直接作为 transform）；映射表达不了的格式可直接覆盖 transform
+    Adapter 由 get_adapter 按类缓存为单例，实例上不要保存请求级状态
     """
 
     source_id: str = "unknown"  # 子类覆盖，如 "webform", "pharmacorp_portal"
+    mapping: dict[str, Field] | None = None  # InternalOrder 字段 -> 源字段，见 mapping.py
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.__dict__.get("mapping"):
+            extract = staticmethod(compile_mapping(cls.mapping, cls.source_id))
+            cls._extract = extract
+            if "transform" not in cls.__dict__:
+                cls.transform = extract  # 省掉一层方法调用
 
     def process(self, raw: bytes | str, source: str | None = None) -> InternalOrder:
         """
@@ -38,6 +129,44 @@ class BaseIntakeAdapter(ABC):
         order.raw_data = raw
         return order
 
+    def process_batch(self, raw: bytes | str, source: str | None = None) -> list:
+        """
+        批量流程：parse_batch 一次解析整个请求体，逐条 transform，再 validate_batch 整批校验
+        返回与输入顺序一致的列表，元素为 InternalOrder 或该条的 ValidationError（单条失败不影响其他条）
+        整体无法解析时直接抛出 ValidationError
+        """
+        results = []
+        orders = []  # (结果下标, 原始条目, InternalOrder)
+        for item in self.parse_batch(raw):
+            if isinstance(item, ValidationError):
+                results.append(item)
+                continue
+            try:
+                orders.append((len(results), item, self.transform(item)))
+            except ValidationError as e:
+                results.append(e)
+                continue
+            results.append(None)
+        errors = self.validate_batch([order for _, _, order in orders])
+        for (index, item, order), error in zip(orders, errors):
+            if error is not None:
+                results[index] = error
+                continue
+            order.source = source or self.source_id
+            order.raw_data = item
+            results[index] = order
+        return results
+
+    def parse_batch(self, raw: bytes | str) -> list:
+        """
+        解析批量请求体，返回可逐条传给 transform 的列表
+        不支持批量的数据源无需覆盖
+        """
+        raise ValidationError(
+            message=f"Batch intake is not supported for {self.source_id}",
+            code="BATCH_NOT_SUPPORTED",
+        )
+
     @abstractmethod
     def parse(self, raw: bytes | str) -> Any:
         """
@@ -46,48 +175,22 @@ class BaseIntakeAdapter(ABC):
         """
         pass
 
-    @abstractmethod
     def transform(self, parsed: Any) -> InternalOrder:
         """
-        将解析后的结构转换为 InternalOrder
+        将解析后的结构转换为 InternalOrder；声明了 mapping 的子类会被替换为编译后的函数
         """
-        pass
+        raise NotImplementedError(f"{type(self).__name__} must define mapping or override transform")
 
     def validate(self, order: InternalOrder) -> None:
         """
         验证转换后的 InternalOrder
-        与 serializers 格式校验一致：NPI 10 位、MRN 6 位、DOB、ICD-10
+        规则与 serializers 共用（careplan.validation）：NPI 10 位、MRN 6 位、DOB、ICD-10、必填文本
         """
-        errors = []
-        if not order.patient.mrn or not _MRN_PATTERN.match(order.patient.mrn.strip()):
-            errors.append({"field": "patient.mrn", "message": "MRN 必须为 6 位数字"})
-        if not order.provider.npi or not _NPI_PATTERN.match(order.provider.npi.strip()):
-            errors.append({"field": "provider.npi", "message": "NPI 必须为 10 位数字"})
-        if not order.patient.dob:
-            errors.append({"field": "patient.dob", "message": "出生日期格式应为 YYYY-MM-DD"})
-        else:
-            s = order.patient.dob.strip()[:10]
-            if len(s) != 10 or s[4] != "-" or s[7] != "-":
-                errors.append({"field": "patient.dob", "message": "出生日期格式应为 YYYY-MM-DD"})
-            else:
-                try:
-                    datetime.strptime(s, "%Y-%m-%d").date()
-                except ValueError:
-                    errors.append({"field": "patient.dob", "message": "出生日期必须是合法日期"})
-        if not order.careplan.primary_diagnosis:
-            errors.append({"field": "careplan.primary_diagnosis", "message": "主要诊断不能为空"})
-        elif not _ICD10_PATTERN.match(order.careplan.primary_diagnosis.strip()):
-            errors.append({"field": "careplan.primary_diagnosis", "message": "主要诊断需符合 ICD-10 格式（如 A00, E11.9）"})
-        if not order.careplan.medication_name:
-            errors.append({"field": "careplan.medication_name", "message": "药物名称不能为空"})
-        if not order.careplan.patient_records:
-            errors.append({"field": "careplan.patient_records", "message": "患者记录不能为空"})
-        if errors:
-            raise ValidationError(
-                message="数据格式校验失败",
-                code="VALIDATION_ERROR",
-                detail={"errors": errors},
-            )
+        order_validator.validate(order)
+
+    def validate_batch(self, orders: list[InternalOrder]) -> list[ValidationError | None]:
+        """整批校验，返回与输入等长的列表：该条的 ValidationError 或 None（覆盖 validate 时需一并覆盖）"""
+        return [validation_error(errors) if errors else None for errors in order_validator.errors_many(orders)]
 
 
 class WebFormAdapter(BaseIntakeAdapter):
@@ -97,44 +200,26 @@ class WebFormAdapter(BaseIntakeAdapter):
     """
 
     source_id = "webform"
+    mapping = {
+        "patient.mrn": text("patient_mrn"),
+        "patient.first_name": text("patient_first_name"),
+        "patient.last_name": text("patient_last_name"),
+        "patient.dob": field("patient_dob", convert="date"),
+        "provider.npi": text("provider_npi"),
+        "provider.name": text("provider_name"),
+        "careplan.primary_diagnosis": text("primary_diagnosis"),
+        "careplan.additional_diagnosis": text("additional_diagnosis"),
+        "careplan.medication_name": text("medication_name"),
+        "careplan.medication_history": text("medication_history"),
+        "careplan.patient_records": text("patient_records"),
+        **_REQUEST_FLAGS,
+    }
 
     def parse(self, raw: bytes | str) -> dict:
-        if isinstance(raw, bytes):
-            raw = raw.decode("utf-8")
-        try:
-            return json.loads(raw)
-        except json.JSONDecodeError as e:
-            raise ValidationError(
-                message="Invalid JSON format",
-                code="INVALID_JSON",
-                detail={"error": str(e)},
-            )
+        return _loads_json(raw)
 
-    def transform(self, parsed: dict) -> InternalOrder:
-        return InternalOrder(
-            patient=PatientInfo(
-                mrn=str(parsed.get("patient_mrn", "")).strip(),
-                first_name=str(parsed.get("patient_first_name", "")).strip(),
-                last_name=str(parsed.get("patient_last_name", "")).strip(),
-                dob=str(parsed.get("patient_dob", ""))[:10],
-            ),
-            provider=ProviderInfo(
-                npi=str(parsed.get("provider_npi", "")).strip(),
-                name=str(parsed.get("provider_name", "")).strip(),
-            ),
-            careplan=CarePlanInfo(
-                primary_diagnosis=str(parsed.get("primary_diagnosis", "")).strip(),
-                additional_diagnosis=str(parsed.get("additional_diagnosis", "")).strip(),
-                medication_name=str(parsed.get("medication_name", "")).strip(),
-                medication_history=str(parsed.get("medication_history", "")).strip(),
-                patient_records=str(parsed.get("patient_records", "")).strip(),
-            ),
-            source=self.source_id,
-            request_flags={
-                "confirm": parsed.get("confirm") is True,
-                "llm_provider": (parsed.get("llm_provider") or "").strip() or None,
-            },
-        )
+    def parse_batch(self, raw: bytes | str) -> list:
+        return _parse_json_batch(raw)
 
 
 class MedCenterJsonAdapter(BaseIntakeAdapter):
@@ -145,100 +230,106 @@ class MedCenterJsonAdapter(BaseIntakeAdapter):
     """
 
     source_id = "medcenter"
-
-    def _dob_mmddyyyy_to_iso(self, s: str) -> str:
-        """将 MM/DD/YYYY 转为 YYYY-MM-DD"""
-        if not s or not isinstance(s, str):
-            return ""
-        s = s.strip()
-        try:
-            dt = datetime.strptime(s[:10], "%m/%d/%Y")
-            return dt.strftime("%Y-%m-%d")
-        except ValueError:
-            return s[:10]  # 原样返回前 10 字符，由 validate 报错
+    mapping = {
+        "patient.mrn": text("pt.mrn"),
+        "patient.first_name": text("pt.fname"),
+        "patient.last_name": text("pt.lname"),
+        "patient.dob": field("pt.dob", convert=_dob_mmddyyyy_to_iso),
+        "provider.npi": text("provider.npi_num"),
+        "provider.name": text("provider.name"),
+        "careplan.primary_diagnosis": text("dx.primary"),
+        "careplan.additional_diagnosis": field(
+            "dx.secondary", convert=_join_list_or_text(", ", strip_items=True, strip_text=True), default=None,
+        ),
+        "careplan.medication_name": text("rx.med_name"),
+        "careplan.medication_history": field(
+            "med_hx", convert=_join_list_or_text("; ", strip_items=False, strip_text=False), default=None,
+        ),
+        "careplan.patient_records": computed(_medcenter_records, "clinical_notes", "allergies", default=""),
+        **_REQUEST_FLAGS,
+    }
 
     def parse(self, raw: bytes | str) -> dict:
-        if isinstance(raw, bytes):
-            raw = raw.decode("utf-8")
-        try:
-            return json.loads(raw)
-        except json.JSONDecodeError as e:
-            raise ValidationError(
-                message="Invalid JSON format",
-                code="INVALID_JSON",
-                detail={"error": str(e)},
-            )
+        return _loads_json(raw)
+
+    def parse_batch(self, raw: bytes | str) -> list:
+        return _parse_json_batch(raw)
 
-    def transform(self, parsed: dict) -> InternalOrder:
-        pt = parsed.get("pt") or {}
-        provider = parsed.get("provider") or {}
-        dx = parsed.get("dx") or {}
-        rx = parsed.get("rx") or {}
-
-        mrn = str(pt.get("mrn", "")).strip()
-        fname = str(pt.get("fname", "")).strip()
-        lname = str(pt.get("lname", "")).strip()
-        dob_raw = str(pt.get("dob", ""))
-        dob = self._dob_mmddyyyy_to_iso(dob_raw)
-
-        npi = str(provider.get("npi_num", "")).strip()
-        provider_name = str(provider.get("name", "")).strip()
-
-        primary = str(dx.get("primary", "")).strip()
-        secondary_raw = dx.get("secondary")
-        if isinstance(secondary_raw, list):
-            additional = ", ".join(str(x).strip() for x in secondary_raw if x)
-        else:
-            additional = str(secondary_raw or "").strip()
-
-        med_name = str(rx.get("med_name", "")).strip()
-
-        med_hx_raw = parsed.get("med_hx") or []
-        if isinstance(med_hx_raw, list):
-            medication_history = "; ".join(str(x) for x in med_hx_raw if x)
-        else:
-            medication_history = str(med_hx_raw or "")
-
-        clinical_notes = str(parsed.get("clinical_notes", "")).strip()
-        allergies_raw = parsed.get("allergies") or []
-        if isinstance(allergies_raw, list) and allergies_raw:
-            allergies_str = "Allergies: " + ", ".join(str(a) for a in allergies_raw)
-            patient_records = f"{allergies_str}\n\n{clinical_notes}" if clinical_notes else allergies_str
-        else:
-            patient_records = clinical_notes or "(No clinical notes)"
-
-        return InternalOrder(
-            patient=PatientInfo(mrn=mrn, first_name=fname, last_name=lname, dob=dob),
-            provider=ProviderInfo(npi=npi, name=provider_name),
-            careplan=CarePlanInfo(
-                primary_diagnosis=primary,
-                additional_diagnosis=additional,
-                medication_name=med_name,
-                medication_history=medication_history,
-                patient_records=patient_records,
-            ),
-            source=self.source_id,
-            request_flags={
-                "confirm": parsed.get("confirm") is True,
-                "llm_provider": (parsed.get("llm_provider") or "").strip() or None,
-            },
-        )
+
+# 流式解析只取 transform 需要的字段：CareOrderRequest 下的相对路径 -> 字段名
+_PHARMACORP_FIELDS = {
+    ("PatientInformation", "MedicalRecordNumber"): "mrn",
+    ("PatientInformation", "PatientName", "FirstName"): "first_name",
+    ("PatientInformation", "PatientName", "LastName"): "last_name",
+    ("PatientInformation", "DateOfBirth"): "dob",
+    ("PrescriberInformation", "NPINumber"): "npi",
+    ("PrescriberInformation", "FullName"): "provider_name",
+    ("DiagnosisList", "PrimaryDiagnosis", "ICDCode"): "primary_icd",
+    ("MedicationOrder", "DrugName"): "drug",
+    ("ClinicalDocumentation", "NarrativeText"): "narrative",
+}
+_PHARMACORP_SECONDARY_ICD = ("DiagnosisList", "SecondaryDiagnoses", "Diagnosis", "ICDCode")
+_PHARMACORP_MEDICATION = ("MedicationHistory", "Medication")
+_PHARMACORP_MEDICATION_PARTS = ("MedicationName", "Dosage", "Route", "Frequency")
+
+# 流式解析每次喂给 parser 的字节数
+_XML_FEED_CHUNK = 64 * 1024
+
+
+def _pharmacorp_medication_history(medications) -> str:
+    return "; ".join(" ".join(m.get(part, "") for part in _PHARMACORP_MEDICATION_PARTS) for m in medications)
 
 
 class PharmaCorpAdapter(BaseIntakeAdapter):
     """
     PharmaCorp Portal XML 格式（partner_c_data 示例）
     字段：MedicalRecordNumber, PatientName/FirstName, NPINumber, ICDCode 等
+    streaming=True（默认）：XMLPullParser 增量解析字节，只提取需要的字段，处理完的元素立即清空，
+    不构建整棵树；批量信封中的多个订单逐个产出。streaming=False 为 ET.fromstring 整树解析
     """
 
     source_id = "pharmacorp_portal"
+    streaming = True
+    # 作用在 _stream_orders / _tree_fields 产出的字段 dict 上，值已 strip
+    mapping = {
+        "patient.mrn": field("mrn"),
+        "patient.first_name": field("first_name"),
+        "patient.last_name": field("last_name"),
+        "patient.dob": field("dob", convert="date"),
+        "provider.npi": field("npi"),
+        "provider.name": field("provider_name"),
+        "careplan.primary_diagnosis": field("primary_icd"),
+        "careplan.additional_diagnosis": field("secondary_icds", convert=", ".join, default=()),
+        "careplan.medication_name": field("drug"),
+        "careplan.medication_history": field("medications", convert=_pharmacorp_medication_history, default=()),
+        "careplan.patient_records": field("narrative", fallback="(No clinical documentation)"),
+    }
+
+    def __init__(self, streaming: bool | None = None):
+        if streaming is not None:
+            self.streaming = streaming
 
     def _text(self, elem: ET.Element | None, default: str = "") -> str:
         if elem is None:
             return default
         return (elem.text or "").strip()
 
-    def parse(self, raw: bytes | str) -> ET.Element:
+    def parse(self, raw: bytes | str) -> ET.Element | dict:
+        if self.streaming:
+            orders = self._stream_orders(raw, batch=False)
+            return orders[0]
+        return self._parse_tree(raw)
+
+    def parse_batch(self, raw: bytes | str) -> list:
+        """批量信封：<CareOrderBatch> 下多个 <CareOrderRequest>；单个 CareOrderRequest 视为一条的批量"""
+        if self.streaming:
+            return self._stream_orders(raw, batch=True)
+        root = self._parse_tree(raw, allowed_roots=("CareOrderRequest", "CareOrderBatch"))
+        if root.tag == "CareOrderRequest":
+            return [root]
+        return root.findall("CareOrderRequest")
+
+    def _parse_tree(self, raw: bytes | str, allowed_roots=("CareOrderRequest",)) -> ET.Element:
         if isinstance(raw, bytes):
             raw = raw.decode("utf-8")
         try:
@@ -249,32 +340,106 @@ class PharmaCorpAdapter(BaseIntakeAdapter):
                 code="INVALID_XML",
                 detail={"error": str(e)},
             )
-        if root.tag != "CareOrderRequest":
+        if root.tag not in allowed_roots:
             raise ValidationError(
-                message="Expected CareOrderRequest root element",
+                message=f"Expected {allowed_roots[-1]} root element",
                 code="INVALID_XML",
                 detail={"root": root.tag},
             )
         return root
 
-    def transform(self, parsed: ET.Element) -> InternalOrder:
+    def _stream_orders(self, raw, batch: bool) -> list[dict]:
+        """
+        增量解析，返回每个 CareOrderRequest 的字段 dict（与 _tree_fields 结构一致）
+        raw 可以是 bytes / str / 二进制文件对象（按 _XML_FEED_CHUNK 分块读取）
+        """
+        allowed_roots = ("CareOrderRequest", "CareOrderBatch") if batch else ("CareOrderRequest",)
+        parser = ET.XMLPullParser(events=("start", "end"))
+        orders = []
+        path = []  # 当前元素相对 CareOrderRequest 的路径
+        stack = []  # 当前打开的元素，用于清理已处理完的子树
+        fields = None
+        medication = None
+
+        def handle(events):
+            nonlocal fields, medication
+            for event, elem in events:
+                if event == "start":
+                    if not stack:
+                        if elem.tag not in allowed_roots:
+                            raise ValidationError(
+                                message=f"Expected {allowed_roots[-1]} root element",
+                                code="INVALID_XML",
+                                detail={"root": elem.tag},
+                            )
+                    if fields is None:
+                        if elem.tag == "CareOrderRequest" and (not stack or stack[-1].tag == "CareOrderBatch"):
+                            fields = {"secondary_icds": [], "medications": []}
+                            path.clear()
+                    else:
+                        path.append(elem.tag)
+                        if tuple(path) == _PHARMACORP_MEDICATION:
+                            medication = {}
+                    stack.append(elem)
+                    continue
+
+                stack.pop()
+                if fields is not None:
+                    key = tuple(path)
+                    if not path:
+                        # CareOrderRequest 结束
+                        orders.append(fields)
+                        fields = None
+                    elif key in _PHARMACORP_FIELDS:
+                        fields.setdefault(_PHARMACORP_FIELDS[key], self._text(elem))
+                    elif key == _PHARMACORP_SECONDARY_ICD:
+                        icd = self._text(elem)
+                        if icd:
+                            fields["secondary_icds"].append(icd)
+                    elif medication is not None and key[:-1] == _PHARMACORP_MEDICATION \
+                            and key[-1] in _PHARMACORP_MEDICATION_PARTS:
+                        medication.setdefault(key[-1], self._text(elem))
+                    elif key == _PHARMACORP_MEDICATION:
+                        fields["medications"].append(medication)
+                        medication = None
+                    if path:
+                        path.pop()
+                # 文本已取出，子树不再需要
+                elem.clear()
+                if stack:
+                    stack[-1].remove(elem)
+
+        try:
+            if isinstance(raw, (bytes, str)):
+                for i in range(0, len(raw), _XML_FEED_CHUNK):
+                    parser.feed(raw[i:i + _XML_FEED_CHUNK])
+                    handle(parser.read_events())
+            else:
+                for chunk in iter(lambda: raw.read(_XML_FEED_CHUNK), b""):
+                    parser.feed(chunk)
+                    handle(parser.read_events())
+            parser.close()
+            handle(parser.read_events())
+        except ET.ParseError as e:
+            raise ValidationError(
+                message="Invalid XML format",
+                code="INVALID_XML",
+                detail={"error": str(e)},
+            )
+        return orders
+
+    def _tree_fields(self, parsed: ET.Element) -> dict:
+        """整树模式：从 CareOrderRequest 元素取出与流式模式相同的字段 dict"""
         ns = {}  # 无 namespace
 
-        # Patient
         pi = parsed.find("PatientInformation", ns)
-        mrn = self._text(pi.find("MedicalRecordNumber", ns)) if pi is not None else ""
         pn = pi.find("PatientName", ns) if pi is not None else None
-        first = self._text(pn.find("FirstName", ns)) if pn is not None else ""
-        last = self._text(pn.find("LastName", ns)) if pn is not None else ""
-        dob = self._text(pi.find("DateOfBirth", ns))[:10] if pi is not None else ""
-
-        # Provider
         pr = parsed.find("PrescriberInformation", ns)
-        npi = self._text(pr.find("NPINumber", ns)) if pr is not None else ""
-        name = self._text(pr.find("FullName", ns)) if pr is not None else ""
-
-        # Diagnosis
         dl = parsed.find("DiagnosisList", ns)
+        mo = parsed.find("MedicationOrder", ns)
+        mh = parsed.find("MedicationHistory", ns)
+        cd = parsed.find("ClinicalDocumentation", ns)
+
         primary_icd = ""
         secondary_icds = []
         if dl is not None:
@@ -287,37 +452,26 @@ class PharmaCorpAdapter(BaseIntakeAdapter):
                     icd = self._text(d.find("ICDCode", ns))
                     if icd:
                         secondary_icds.append(icd)
-        additional = ", ".join(secondary_icds)
 
-        # Medication
-        mo = parsed.find("MedicationOrder", ns)
-        drug = self._text(mo.find("DrugName", ns)) if mo is not None else ""
-
-        # Medication History
-        mh = parsed.find("MedicationHistory", ns)
-        med_lines = []
+        medications = []
         if mh is not None:
             for m in mh.findall("Medication", ns):
-                name_med = self._text(m.find("MedicationName", ns))
-                dose = self._text(m.find("Dosage", ns))
-                route = self._text(m.find("Route", ns))
-                freq = self._text(m.find("Frequency", ns))
-                med_lines.append(f"{name_med} {dose} {route} {freq}")
-        medication_history = "; ".join(med_lines)
-
-        # Clinical Documentation -> patient_records
-        cd = parsed.find("ClinicalDocumentation", ns)
-        narrative = self._text(cd.find("NarrativeText", ns)) if cd is not None else ""
-
-        return InternalOrder(
-            patient=PatientInfo(mrn=mrn, first_name=first, last_name=last, dob=dob),
-            provider=ProviderInfo(npi=npi, name=name),
-            careplan=CarePlanInfo(
-                primary_diagnosis=primary_icd,
-                additional_diagnosis=additional,
-                medication_name=drug,
-                medication_history=medication_history,
-                patient_records=narrative or "(No clinical documentation)",
-            ),
-            source=self.source_id,
-        )
+                medications.append({part: self._text(m.find(part, ns)) for part in _PHARMACORP_MEDICATION_PARTS})
+
+        return {
+            "mrn": self._text(pi.find("MedicalRecordNumber", ns)) if pi is not None else "",
+            "first_name": self._text(pn.find("FirstName", ns)) if pn is not None else "",
+            "last_name": self._text(pn.find("LastName", ns)) if pn is not None else "",
+            "dob": self._text(pi.find("DateOfBirth", ns)) if pi is not None else "",
+            "npi": self._text(pr.find("NPINumber", ns)) if pr is not None else "",
+            "provider_name": self._text(pr.find("FullName", ns)) if pr is not None else "",
+            "primary_icd": primary_icd,
+            "secondary_icds": secondary_icds,
+            "drug": self._text(mo.find("DrugName", ns)) if mo is not None else "",
+            "medications": medications,
+            "narrative": self._text(cd.find("NarrativeText", ns)) if cd is not None else "",
+        }
+
+    def transform(self, parsed: ET.Element | dict) -> InternalOrder:
+        fields = parsed if isinstance(parsed, dict) else self._tree_fields(parsed)
+        return self._extract(fields)
@@ -0,0 +1,103 @@
+"""
+JSON 编解码：intake Adapter 解析请求体、views 输出响应都走这里
+- 直接处理 bytes：loads 不先 decode 成 str，dumps 直接产出 UTF-8 bytes
+- 后端由 settings.JSON_CODEC 选择：auto（装了 orjson 就用，否则 stdlib，默认）| orjson | stdlib
+- orjson 不接受的输入（NaN、超大整数等）回退到 stdlib，解析结果和错误与 stdlib 完全一致；
+  解析失败统一抛 JSONDecodeError（stdlib 的错误信息），不同后端下 INVALID_JSON 的 detail 相同
+"""
+import json
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+
+class JSONDecodeError(ValueError):
+    """解析失败；str(e) 为 stdlib json 的错误信息"""
+
+
+class BaseJSONCodec(ABC):
+    name = "base"
+
+    @abstractmethod
+    def loads(self, data: bytes | str):
+        pass
+
+    @abstractmethod
+    def dumps(self, obj) -> bytes:
+        """UTF-8 bytes，非 ASCII 字符原样输出；datetime / Decimal 等与 DjangoJSONEncoder 一致"""
+        pass
+
+
+class StdlibJSONCodec(BaseJSONCodec):
+    name = "stdlib"
+
+    def loads(self, data):
+        try:
+            return json.loads(data)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise JSONDecodeError(str(e)) from e
+
+    def dumps(self, obj):
+        return json.dumps(obj, cls=DjangoJSONEncoder, ensure_ascii=False).encode("utf-8")
+
+
+class OrjsonCodec(BaseJSONCodec):
+    name = "orjson"
+
+    _OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson is not None else 0
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("orjson is not installed")
+        self._django_default = DjangoJSONEncoder().default
+        self._fallback = StdlibJSONCodec()
+
+    def loads(self, data):
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # 失败路径交给 stdlib：它能解析的照常返回，否则抛出 stdlib 的错误信息
+            return self._fallback.loads(data)
+
+    def dumps(self, obj):
+        # orjson 原生支持 datetime，但格式与 DjangoJSONEncoder 不同（微秒 / 时区写法），统一交给 default
+        try:
+            return orjson.dumps(obj, default=self._django_default, option=self._OPTIONS)
+        except TypeError:
+            return self._fallback.dumps(obj)
+
+
+_codec: BaseJSONCodec | None = None
+_codec_backend: str | None = None
+
+
+def get_json_codec() -> BaseJSONCodec:
+    """按 settings.JSON_CODEC 返回编解码器（进程内复用）"""
+    global _codec, _codec_backend
+    backend = getattr(settings, "JSON_CODEC", "auto")
+    if backend == _codec_backend:
+        return _codec
+    if backend == "auto":
+        _codec = OrjsonCodec() if orjson is not None else StdlibJSONCodec()
+    elif backend == "orjson":
+        _codec = OrjsonCodec()
+    elif backend == "stdlib":
+        _codec = StdlibJSONCodec()
+    else:
+        raise ValueError(f"Unknown JSON_CODEC backend: {backend}. Known: ['auto', 'orjson', 'stdlib']")
+    _codec_backend = backend
+    return _codec
+
+
+def loads(data: bytes | str):
+    return get_json_codec().loads(data)
+
+
+def dumps(obj) -> bytes:
+    return get_json_codec().dumps(obj)
@@ -1,6 +1,7 @@
 """
 工厂函数：根据来源返回对应 Adapter
 新增数据源时在此注册，业务代码无需修改
+Adapter 无请求级状态，按类缓存为单例（别名共用同一实例）
 """
 from typing import Dict, Type
 
@@ -9,11 +10,14 @@ from .adapters import BaseIntakeAdapter, WebFormAdapter, PharmaCorpAdapter, MedC
 # 来源标识 -> Adapter 类
 _ADAPTER_REGISTRY: Dict[str, Type[BaseIntakeAdapter]] = {
     "webform": WebFormAdapter,
-    "medcenter":MedCenterJsonAdapter,
+    "medcenter": MedCenterJsonAdapter,
     "pharmacorp_portal": PharmaCorpAdapter,
     "pharmacorp": PharmaCorpAdapter,  # 别名
 }
 
+# Adapter 类 -> 实例
+_ADAPTER_INSTANCES: Dict[Type[BaseIntakeAdapter], BaseIntakeAdapter] = {}
+
 
 def get_adapter(source: str) -> BaseIntakeAdapter:
     """
@@ -23,9 +27,13 @@ def get_adapter(source: str) -> BaseIntakeAdapter:
     adapter_cls = _ADAPTER_REGISTRY.get(source.lower())
     if adapter_cls is None:
         raise ValueError(f"Unknown intake source: {source}. Known: {list(_ADAPTER_REGISTRY.keys())}")
-    return adapter_cls()
+    adapter = _ADAPTER_INSTANCES.get(adapter_cls)
+    if adapter is None:
+        adapter = _ADAPTER_INSTANCES.setdefault(adapter_cls, adapter_cls())
+    return adapter
 
 
 def register_adapter(source: str, adapter_cls: Type[BaseIntakeAdapter]) -> None:
     """注册新 Adapter（可选，用于动态扩展）"""
     _ADAPTER_REGISTRY[source.lower()] = adapter_cls
+    _ADAPTER_INSTANCES.pop(adapter_cls, None)
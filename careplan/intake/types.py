@@ -1,11 +1,18 @@
 """
 内部标准格式：业务逻辑唯一认识的格式
+均为 slots dataclass：无实例 __dict__，批量接入 / 导入时内存中同时保留大量订单
+（未设 frozen：frozen 的 __init__ 逐字段 object.__setattr__，构造慢数倍，且 process 需回填 source / raw_data）
 """
 from dataclasses import dataclass, field
 from typing import Any, Optional
 
 
-@dataclass
+def _reduce_positional(self):
+    """pickle 为 (cls, 位置参数)：slots 默认按 {字段名: 值} 存，import_careplans 的 worker 回传时更大"""
+    return type(self), tuple(getattr(self, name) for name in self.__slots__)
+
+
+@dataclass(slots=True)
 class PatientInfo:
     """患者信息（内部标准）"""
     mrn: str
@@ -13,15 +20,19 @@ class PatientInfo:
     last_name: str
     dob: str  # YYYY-MM-DD
 
+    __reduce__ = _reduce_positional
+
 
-@dataclass
+@dataclass(slots=True)
 class ProviderInfo:
     """提供者信息（内部标准）"""
     npi: str
     name: str
 
+    __reduce__ = _reduce_positional
 
-@dataclass
+
+@dataclass(slots=True)
 class CarePlanInfo:
     """Care Plan 订单信息（内部标准）"""
     primary_diagnosis: str
@@ -30,22 +41,60 @@ class CarePlanInfo:
     additional_diagnosis: str = ""
     medication_history: str = ""
 
+    __reduce__ = _reduce_positional
+
 
-@dataclass
+@dataclass(slots=True)
 class InternalOrder:
     """
     内部标准订单格式
-    业务逻辑（如 create_careplan）只认识此格式
+    业务逻辑（如 create_careplan / create_careplans_bulk）直接消费此格式
     """
     patient: PatientInfo
     provider: ProviderInfo
     careplan: CarePlanInfo
     source: str  # 数据来源标识，如 "webform", "pharmacorp_portal"
     raw_data: Any = field(default=None, repr=False)  # 保留原始数据用于排查
-    request_flags: dict = field(default_factory=dict)  # 如 confirm，由各 Adapter 填充
+    request_flags: dict = field(default_factory=dict)  # 如 confirm / llm_provider / use_llm_cache，由各 Adapter 填充
+
+    __reduce__ = _reduce_positional
+
+    @property
+    def confirm(self) -> bool:
+        return self.request_flags.get("confirm") is True
+
+    @property
+    def llm_provider(self) -> str:
+        return self.request_flags.get("llm_provider") or ""
+
+    @property
+    def use_llm_cache(self) -> bool:
+        return self.request_flags.get("use_llm_cache") is not False
+
+    @classmethod
+    def from_create_careplan_dict(cls, data: dict) -> "InternalOrder":
+        """create_careplan 旧的 dict 入参 -> InternalOrder（兼容直接传 dict 的调用方）"""
+        get = data.get
+        return cls(
+            patient=PatientInfo(
+                get("patient_mrn", ""), get("patient_first_name", ""), get("patient_last_name", ""),
+                get("patient_dob", ""),
+            ),
+            provider=ProviderInfo(get("provider_npi", ""), get("provider_name", "")),
+            careplan=CarePlanInfo(
+                get("primary_diagnosis", ""), get("medication_name", ""), get("patient_records", ""),
+                get("additional_diagnosis", ""), get("medication_history", ""),
+            ),
+            source=get("source", "unknown"),
+            request_flags={
+                "confirm": get("confirm") is True,
+                "llm_provider": get("llm_provider") or None,
+                "use_llm_cache": get("use_llm_cache") is not False,
+            },
+        )
 
     def to_create_careplan_dict(self, confirm: bool | None = None) -> dict:
-        """转换为 create_careplan 所需的 dict 格式"""
+        """转换为 dict 格式（与 from_create_careplan_dict 对应，用于排查 / 序列化）"""
         if confirm is None:
             confirm = self.request_flags.get("confirm", False)
         d = {
@@ -65,4 +114,6 @@ class InternalOrder:
         }
         if self.request_flags.get("llm_provider"):
             d["llm_provider"] = self.request_flags["llm_provider"]
+        if self.request_flags.get("use_llm_cache") is False:
+            d["use_llm_cache"] = False
         return d
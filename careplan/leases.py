@@ -0,0 +1,151 @@
+"""
+Care plan 生成租约：worker 以条件 UPDATE 认领，租约过期后可被其他 worker 接手或由 reaper 放回队列
+- claim：UPDATE ... WHERE status='pending' SET status='processing', lease_owner, lease_expires_at
+  只有一个 worker 更新成功，其他 worker 得到 0 行直接跳过，不重复调 LLM
+  同一 owner 再次认领（celery 重试）视为续约；持有者失联、租约已过期的 processing 可以直接接手（stolen）
+- claim_many：run_careplan_worker 一批 id 一条 UPDATE 认领，再一次查询取出 CarePlan
+- renew：调 LLM 前 / 重试等待前延长自己持有的租约
+- finish：写 completed / failed 同样以 lease_owner 为条件；租约已被接手时写入 0 行，本次结果丢弃（lease_lost）
+- reap_expired：celery beat 周期调用，把租约过期的 processing 放回 pending 并写 outbox 重新投递；
+  认领满 CAREPLAN_MAX_CLAIMS 次仍未完成的标记 failed，避免一直卡住 worker 的单子无限循环
+"""
+import os
+import socket
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CarePlan
+from .search_index import index_careplan
+from .status_events import notify_status
+from .statsd_metrics import careplan_failed, lease_claimed, lease_lost, lease_reaped, lease_stolen
+
+REAPED_ERROR = "Worker lost the care plan too many times"
+
+
+def new_owner() -> str:
+    """worker 内单次生成的 owner：主机 + 进程 + 随机后缀"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def celery_owner(task_id) -> str:
+    """celery 任务以 task id 为 owner，重试（task id 不变）时可重新认领"""
+    return f"celery:{task_id}"
+
+
+def _expires(now, extra_seconds: float = 0):
+    return now + timedelta(seconds=settings.CAREPLAN_LEASE_SECONDS + extra_seconds)
+
+
+def claim(careplan_id, owner: str) -> bool:
+    """认领 careplan 并取得租约；已被他人持有、已完成或不存在时返回 False"""
+    now = timezone.now()
+    lease = {'lease_owner': owner, 'lease_expires_at': _expires(now), 'updated_at': now}
+    rows = CarePlan.objects.filter(id=careplan_id)
+    if rows.filter(status='pending').update(status='processing', claim_count=F('claim_count') + 1, **lease):
+        lease_claimed()
+        return True
+    if rows.filter(status='processing', lease_owner=owner).update(**lease):
+        return True
+    if rows.filter(status='processing', lease_expires_at__lt=now).update(claim_count=F('claim_count') + 1, **lease):
+        lease_stolen()
+        return True
+    return False
+
+
+def claim_many(careplan_ids, owner: str) -> dict[int, CarePlan]:
+    """
+    一批 id 一次条件 UPDATE 认领，再一次查询取出认领到的 CarePlan（带 patient / provider）
+    只认领 pending；已被他人持有、已完成或不存在的 id 不在返回值里
+    """
+    now = timezone.now()
+    claimed = CarePlan.objects.filter(id__in=careplan_ids, status='pending').update(
+        status='processing',
+        claim_count=F('claim_count') + 1,
+        lease_owner=owner,
+        lease_expires_at=_expires(now),
+        updated_at=now,
+    )
+    if not claimed:
+        return {}
+    lease_claimed(claimed)
+    rows = CarePlan.objects.select_related('patient', 'provider').filter(
+        id__in=careplan_ids, status='processing', lease_owner=owner
+    )
+    return {careplan.id: careplan for careplan in rows}
+
+
+def renew(careplan_id, owner: str, extra_seconds: float = 0) -> bool:
+    """把租约延长到 now + CAREPLAN_LEASE_SECONDS + extra_seconds；租约已不属于 owner 时返回 False"""
+    now = timezone.now()
+    return bool(
+        CarePlan.objects
+        .filter(id=careplan_id, status='processing', lease_owner=owner)
+        .update(lease_expires_at=_expires(now, extra_seconds), updated_at=now)
+    )
+
+
+def finish(careplan, owner: str, status: str, *, content: str = '', error: str = '', llm_provider: str = '') -> bool:
+    """
+    写入最终状态（completed / failed）并释放租约；租约已被其他 worker 接手时不写，返回 False
+    llm_provider: completed 时实际生成的 provider（熔断切换后与提交时不同），空则不改
+    成功时同步更新 careplan 实例并建检索文档（.update() 不触发 post_save）
+    """
+    fields = {'status': status, 'lease_owner': '', 'lease_expires_at': None, 'updated_at': timezone.now()}
+    if status == 'completed':
+        fields['generated_content'] = content
+        if llm_provider:
+            fields['llm_provider'] = llm_provider
+    else:
+        fields['error_message'] = error
+    updated = CarePlan.objects.filter(id=careplan.id, status='processing', lease_owner=owner).update(**fields)
+    if not updated:
+        lease_lost()
+        return False
+    for name, value in fields.items():
+        setattr(careplan, name, value)
+    index_careplan(careplan)
+    return True
+
+
+def reap_expired(batch_size: int | None = None) -> tuple[int, int]:
+    """
+    处理一批租约过期的 processing，返回 (放回队列数, 标记 failed 数)
+    放回的单子与 outbox 行在同一事务里写入，由 relay 重新投递
+    """
+    # outbox -> tasks -> leases：在函数内引用，避免循环导入
+    from . import outbox
+
+    batch_size = batch_size or settings.CAREPLAN_REAPER_BATCH_SIZE
+    now = timezone.now()
+    expired = CarePlan.objects.filter(status='processing', lease_expires_at__lt=now)
+    with transaction.atomic():
+        rows = list(
+            expired
+            .select_for_update(skip_locked=True)
+            .order_by('lease_expires_at')
+            .only('id', 'claim_count', 'lane', 'source', 'llm_provider')[:batch_size]
+        )
+        requeue = [careplan for careplan in rows if careplan.claim_count < settings.CAREPLAN_MAX_CLAIMS]
+        give_up = [careplan.id for careplan in rows if careplan.claim_count >= settings.CAREPLAN_MAX_CLAIMS]
+        released = {'lease_owner': '', 'lease_expires_at': None, 'updated_at': now}
+        if requeue:
+            expired.filter(id__in=[careplan.id for careplan in requeue]).update(
+                status='pending', generated_content='', **released
+            )
+            outbox.add(requeue)
+        if give_up:
+            expired.filter(id__in=give_up).update(status='failed', error_message=REAPED_ERROR, **released)
+
+    for careplan in requeue:
+        notify_status(careplan.id, 'pending')
+    for careplan_id in give_up:
+        notify_status(careplan_id, 'failed', error=REAPED_ERROR)
+        careplan_failed()
+    if requeue:
+        lease_reaped(len(requeue))
+    return len(requeue), len(give_up)
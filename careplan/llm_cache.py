@@ -0,0 +1,160 @@
+"""
+LLM 结果缓存：按内容寻址，key = hash(provider, model, temperature, max_tokens, system prompt, 规范化后的 user prompt)
+重复提交 / 确认后的重复订单与之前的输入完全一致时，直接复用上次生成的结果，不再调用 LLM
+后端：
+- local：进程内 LRU（TTL + 条数上限），适合单进程 / 开发
+- redis：多个 worker 共享（SETEX 控制 TTL，有序集合记录写入顺序并按条数上限裁剪）
+- none：关闭
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_prompt(text: str) -> str:
+    """统一换行、去掉行尾空白和首尾空行，避免格式差异导致缓存不命中"""
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+def build_cache_key(*, provider_id, model, temperature, max_tokens, system_message, user_message) -> str:
+    payload = json.dumps(
+        [provider_id, model, temperature, max_tokens, normalize_prompt(system_message), normalize_prompt(user_message)],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class BaseResultCache(ABC):
+    """结果缓存接口：get 未命中返回 None"""
+
+    @abstractmethod
+    def get(self, key: str) -> str | None:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: str) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+
+class LocalLRUCache(BaseResultCache):
+    """进程内 LRU：超过 max_entries 淘汰最久未用，超过 ttl 视为未命中"""
+
+    def __init__(self, *, max_entries: int = 1000, ttl_seconds: float = 86400):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisResultCache(BaseResultCache):
+    """
+    Redis 共享缓存：值用 SETEX 存（过期由 Redis 处理）
+    写入顺序记在有序集合里，超过 max_entries 时删掉最早写入的
+    Redis 出错时视为未命中，不影响生成
+    """
+
+    def __init__(self, client, *, prefix: str = "careplan:llmcache:", max_entries: int = 100000, ttl_seconds: int = 86400):
+        self._client = client
+        self.prefix = prefix
+        self.max_entries = max_entries
+        self.ttl_seconds = int(ttl_seconds)
+        self._index_key = f"{prefix}index"
+
+    def get(self, key):
+        try:
+            value = self._client.get(self.prefix + key)
+        except Exception:
+            logger.warning("llm cache get failed", exc_info=True)
+            return None
+        if value is None:
+            return None
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    def set(self, key, value):
+        try:
+            pipe = self._client.pipeline()
+            pipe.setex(self.prefix + key, self.ttl_seconds, value)
+            pipe.zadd(self._index_key, {key: time.time()})
+            pipe.zrange(self._index_key, 0, -(self.max_entries + 1))
+            pipe.zremrangebyrank(self._index_key, 0, -(self.max_entries + 1))
+            evicted = pipe.execute()[2]
+            if evicted:
+                self._client.delete(*[
+                    self.prefix + (k.decode("utf-8") if isinstance(k, bytes) else k) for k in evicted
+                ])
+        except Exception:
+            logger.warning("llm cache set failed", exc_info=True)
+
+
+_cache: BaseResultCache | None = None
+_cache_backend: str | None = None
+
+
+def get_result_cache() -> BaseResultCache | None:
+    """按 settings.LLM_RESULT_CACHE 返回缓存实例（进程内复用）；none 返回 None"""
+    global _cache, _cache_backend
+    backend = getattr(settings, "LLM_RESULT_CACHE", "local")
+    if backend == _cache_backend:
+        return _cache
+    ttl = getattr(settings, "LLM_RESULT_CACHE_TTL", 86400)
+    max_entries = getattr(settings, "LLM_RESULT_CACHE_MAX_ENTRIES", 1000)
+    if backend == "redis":
+        from .queue import get_redis
+
+        _cache = RedisResultCache(get_redis(), max_entries=max_entries, ttl_seconds=ttl)
+    elif backend == "local":
+        _cache = LocalLRUCache(max_entries=max_entries, ttl_seconds=ttl)
+    elif backend == "none":
+        _cache = None
+    else:
+        raise ValueError(f"Unknown LLM_RESULT_CACHE backend: {backend}. Known: ['local', 'redis', 'none']")
+    _cache_backend = backend
+    return _cache
+
+
+def reset_result_cache() -> None:
+    """丢弃当前缓存实例（测试 / 切换配置时用）"""
+    global _cache, _cache_backend
+    if _cache is not None:
+        _cache.clear()
+    _cache = None
+    _cache_backend = None
@@ -0,0 +1,206 @@
+"""
+LLM 请求对冲（hedging）：主调用超过该 provider 最近延迟的 LLM_HEDGE_PERCENTILE 分位仍未返回时，
+再发一个（LLM_HEDGE_TARGET：same 同 provider / alternate 按 LLM_FAILOVER_ORDER 的下一个），取先成功的结果，取消另一个
+- 延迟样本按 provider 在进程内保留最近 LLM_HEDGE_WINDOW 个成功调用，不足 LLM_HEDGE_MIN_SAMPLES 时不对冲
+- 预算：每次可对冲的主调用攒 LLM_HEDGE_MAX_RATE 个额度（最多攒 LLM_HEDGE_BURST 个），对冲一次花 1 个，
+  对冲请求数长期不超过主调用的 LLM_HEDGE_MAX_RATE；对冲请求也过限流，当下没有余量就不发
+- 同步调用在线程里跑，输的一方无法中断，结果丢弃（其延迟仍计入样本）；异步调用直接 cancel 输的 task
+只对非流式调用（generate / agenerate）生效；LLM_HEDGING=0（默认）关闭
+"""
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+
+from .llm_providers import CircuitOpenError, get_llm_service
+from .llm_providers.circuit import candidates
+from .statsd_metrics import llm_hedge, llm_hedge_skipped, llm_hedge_win
+
+PRIMARY = "primary"
+HEDGE = "hedge"
+
+
+class LatencyTracker:
+    """按 provider 保留最近 window 个成功调用的延迟"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self._samples: dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, provider_id: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(provider_id, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, provider_id: str, percentile: float, min_samples: int) -> float | None:
+        """样本不足 min_samples 时返回 None"""
+        with self._lock:
+            samples = sorted(self._samples.get(provider_id, ()))
+        if not samples or len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * percentile / 100))]
+
+
+class HedgeBudget:
+    """对冲额度：earn 每次 +rate（上限 burst），spend 花 1 个"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.credits = 0.0
+        self._lock = threading.Lock()
+
+    def earn(self) -> None:
+        with self._lock:
+            self.credits = min(self.burst, self.credits + self.rate)
+
+    def spend(self) -> bool:
+        with self._lock:
+            if self.credits < 1:
+                return False
+            self.credits -= 1
+            return True
+
+    def refund(self) -> None:
+        with self._lock:
+            self.credits = min(self.burst, self.credits + 1)
+
+
+_tracker: LatencyTracker | None = None
+_budget: HedgeBudget | None = None
+
+
+def _get_tracker() -> LatencyTracker:
+    global _tracker
+    if _tracker is None:
+        _tracker = LatencyTracker(settings.LLM_HEDGE_WINDOW)
+    return _tracker
+
+
+def _get_budget() -> HedgeBudget:
+    global _budget
+    if _budget is None:
+        _budget = HedgeBudget(settings.LLM_HEDGE_MAX_RATE, settings.LLM_HEDGE_BURST)
+    return _budget
+
+
+def reset_hedging() -> None:
+    """清空延迟样本和对冲额度（测试 / 切换配置时用）"""
+    global _tracker, _budget
+    _tracker = None
+    _budget = None
+
+
+def record_latency(provider_id: str, seconds: float) -> None:
+    _get_tracker().record(provider_id, seconds)
+
+
+def hedge_delay(provider_id: str) -> float | None:
+    """本次调用多少秒未返回就对冲；未开启或样本不足返回 None（不对冲）"""
+    if not getattr(settings, "LLM_HEDGING", False):
+        return None
+    _get_budget().earn()
+    return _get_tracker().percentile(provider_id, settings.LLM_HEDGE_PERCENTILE, settings.LLM_HEDGE_MIN_SAMPLES)
+
+
+def hedge_target(service, provider_id: str):
+    """
+    对冲请求发给谁，返回 (service, provider_id)；alternate 时其他 provider 都熔断则仍用主 provider
+    只做路由、不占熔断探测名额：限流放行、真正发出对冲时才由 llm_service 占用
+    """
+    if getattr(settings, "LLM_HEDGE_TARGET", "same") == "alternate":
+        others = candidates(provider_id)[1:]
+        if others:
+            try:
+                alternate = get_llm_service(others[0])
+            except CircuitOpenError:
+                return service, provider_id
+            return alternate, getattr(alternate, "provider_id", others[0])
+    return service, provider_id
+
+
+def _spend(provider_id: str) -> bool:
+    if _get_budget().spend():
+        return True
+    llm_hedge_skipped(provider_id, "budget")
+    return False
+
+
+def _skipped_by_rate_limit(provider_id: str) -> None:
+    _get_budget().refund()
+    llm_hedge_skipped(provider_id, "rate_limit")
+
+
+def _winner(results, provider_id):
+    """results: [(角色, 异常或 None, 值)]，按 primary 优先取第一个成功的值；都失败返回 None"""
+    for role, error, value in sorted(results, key=lambda item: item[0] != PRIMARY):
+        if error is None:
+            llm_hedge_win(provider_id, role)
+            return value
+    return None
+
+
+def race(primary, make_hedge, delay: float, provider_id: str):
+    """
+    primary(): 主调用，返回 (结果, 实际调用的 service)
+    make_hedge(): delay 秒后主调用仍未返回时调用，返回对冲调用（返回值同 primary），None 为不对冲
+    返回先成功的一方的结果；都失败时抛主调用的异常
+    """
+    pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="llm-hedge")
+    try:
+        first = pool.submit(primary)
+        done, _ = wait([first], timeout=delay)
+        if done or not _spend(provider_id):
+            return first.result()
+        hedge = make_hedge()
+        if hedge is None:
+            _skipped_by_rate_limit(provider_id)
+            return first.result()
+        llm_hedge(provider_id)
+        second = pool.submit(hedge)
+        roles = {first: PRIMARY, second: HEDGE}
+        pending = set(roles)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            outcome = [(roles[f], f.exception(), f.result() if f.exception() is None else None) for f in done]
+            value = _winner(outcome, provider_id)
+            if value is not None:
+                return value
+        return first.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def arace(primary, make_hedge, delay: float, provider_id: str):
+    """
+    race 的异步版本：primary / 对冲调用为协程函数，make_hedge 为协程函数（返回对冲调用或 None）
+    输的一方直接 cancel
+    """
+    first = asyncio.ensure_future(primary())
+    tasks = [first]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done or not _spend(provider_id):
+            return await first
+        hedge = await make_hedge()
+        if hedge is None:
+            _skipped_by_rate_limit(provider_id)
+            return await first
+        llm_hedge(provider_id)
+        second = asyncio.ensure_future(hedge())
+        tasks.append(second)
+        roles = {first: PRIMARY, second: HEDGE}
+        pending = set(roles)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            outcome = [(roles[t], t.exception(), t.result() if t.exception() is None else None) for t in done]
+            value = _winner(outcome, provider_id)
+            if value is not None:
+                return value
+        return first.result()
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -6,12 +6,17 @@ from .base import BaseLLMService
 from .openai_service import OpenAIService
 from .claude_service import ClaudeService
 from .mock_service import MockLLMService
-from .factory import get_llm_service
+from .faulty_service import FaultyLLMService
+from .circuit import CircuitOpenError
+from .factory import get_llm_service, clear_llm_services
 
 __all__ = [
     "BaseLLMService",
     "OpenAIService",
     "ClaudeService",
     "MockLLMService",
+    "FaultyLLMService",
+    "CircuitOpenError",
     "get_llm_service",
+    "clear_llm_services",
 ]
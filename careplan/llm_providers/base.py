@@ -2,17 +2,24 @@
 LLM 服务抽象基类
 业务代码只依赖此接口，不关心具体实现
 """
+import asyncio
 from abc import ABC, abstractmethod
+from typing import Iterator
 
 
 class BaseLLMService(ABC):
     """
     抽象基类：所有 LLM 服务的父类
-    新增 LLM 时只需继承此类并实现 generate
+    新增 LLM 时只需继承此类并实现 generate；agenerate 可选覆盖
     """
 
     provider_id: str = "unknown"  # 子类覆盖，如 "openai", "claude"
 
+    @property
+    def model_name(self) -> str:
+        """实际使用的模型名（结果缓存 key 等用），子类一般存于 self._model"""
+        return getattr(self, "_model", "") or self.provider_id
+
     @abstractmethod
     def generate(
         self,
@@ -31,3 +38,42 @@ class BaseLLMService(ABC):
         :return: 生成的文本内容
         """
         pass
+
+    async def agenerate(
+        self,
+        system_message: str,
+        user_message: str,
+        *,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+    ) -> str:
+        """
+        异步版 generate，参数与返回值相同
+        默认在线程池里跑 generate；有原生 async SDK 的子类应覆盖，避免占线程
+        """
+        return await asyncio.to_thread(
+            self.generate,
+            system_message,
+            user_message,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+
+    def stream(
+        self,
+        system_message: str,
+        user_message: str,
+        *,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+    ) -> Iterator[str]:
+        """
+        流式生成：按 provider 返回的顺序逐段 yield 文本，拼起来等于 generate 的结果
+        默认一次性 yield generate 的结果；支持流式的子类应覆盖
+        """
+        yield self.generate(
+            system_message,
+            user_message,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
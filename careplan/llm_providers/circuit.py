@@ -0,0 +1,179 @@
+"""
+Provider 熔断：按 provider 记录最近 LLM_BREAKER_WINDOW 次调用的失败率与延迟
+- closed：正常放行；窗口内调用数 ≥ LLM_BREAKER_MIN_CALLS 且失败率 ≥ LLM_BREAKER_ERROR_RATE
+  或慢调用（> LLM_BREAKER_SLOW_SECONDS）比例 ≥ LLM_BREAKER_SLOW_RATE 时 → open
+- open：不放行，factory 把新的生成请求转给 LLM_FAILOVER_ORDER 里下一个健康的 provider；LLM_BREAKER_COOLDOWN 秒后 → half_open
+- half_open：只放行一个探测请求，成功 → closed（清空窗口），失败 → open；探测超过冷却时间未回报则再放一个
+路由（factory.get_llm_service）只看 available，不占探测名额；llm_service 在真正调用 LLM 前才 allow 占名额，
+命中结果缓存 / 限流没有余量而没发出的请求不会占住探测
+状态在进程内（每个 worker 进程各自判断），限流（429）不算失败，由 llm_rate_limit 处理
+"""
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+from ..statsd_metrics import llm_circuit_opened, llm_circuit_state
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# gauge 值：越大越不健康
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """provider 熔断不可用：所有候选都 open，或 half_open 的探测名额已被其他请求占用"""
+
+
+class CircuitBreaker:
+    """单个 provider 的熔断器（线程安全）"""
+
+    def __init__(
+        self,
+        provider: str,
+        *,
+        window: int = 20,
+        min_calls: int = 5,
+        error_rate: float = 0.5,
+        slow_seconds: float = 60.0,
+        slow_rate: float = 0.8,
+        cooldown: float = 30.0,
+    ):
+        self.provider = provider
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate
+        self.slow_seconds = slow_seconds
+        self.slow_rate_threshold = slow_rate
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self._calls = deque(maxlen=window)  # (failed, latency)
+        self._opened_at = 0.0
+        self._probe_at = None
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """能否把新请求路由到该 provider（不占探测名额；真正调用前再 allow）"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == OPEN:
+                return now - self._opened_at >= self.cooldown
+            return self._probe_at is None or now - self._probe_at >= self.cooldown
+
+    def allow(self) -> bool:
+        """是否放行一次新调用；half_open 时占用探测名额，只在真正调用 LLM 前调用"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == OPEN:
+                if now - self._opened_at < self.cooldown:
+                    return False
+                self._set_state(HALF_OPEN)
+                self._probe_at = None
+            if self._probe_at is not None and now - self._probe_at < self.cooldown:
+                return False
+            self._probe_at = now
+            return True
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._calls.clear()
+                self._set_state(CLOSED)
+            self._calls.append((False, latency))
+            self._evaluate()
+
+    def record_failure(self, latency: float | None = None) -> None:
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._open()
+                return
+            self._calls.append((True, latency))
+            self._evaluate()
+
+    def stats(self) -> dict:
+        """窗口内调用数、失败率、慢调用比例、成功调用的 p95 延迟（秒）"""
+        with self._lock:
+            calls = list(self._calls)
+        latencies = sorted(latency for failed, latency in calls if not failed and latency is not None)
+        return {
+            "state": self.state,
+            "calls": len(calls),
+            "error_rate": _rate(calls, lambda failed, latency: failed),
+            "slow_rate": _rate(calls, self._is_slow),
+            "p95_latency": latencies[int(0.95 * (len(latencies) - 1))] if latencies else None,
+        }
+
+    def _is_slow(self, failed, latency) -> bool:
+        return latency is not None and latency > self.slow_seconds
+
+    def _evaluate(self) -> None:
+        if self.state != CLOSED or len(self._calls) < self.min_calls:
+            return
+        calls = list(self._calls)
+        if (
+            _rate(calls, lambda failed, latency: failed) >= self.error_rate_threshold
+            or _rate(calls, self._is_slow) >= self.slow_rate_threshold
+        ):
+            self._open()
+
+    def _open(self) -> None:
+        self._opened_at = time.monotonic()
+        self._probe_at = None
+        self._calls.clear()
+        self._set_state(OPEN)
+        llm_circuit_opened(self.provider)
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        llm_circuit_state(self.provider, _STATE_VALUES[state])
+
+
+def _rate(calls, predicate) -> float:
+    if not calls:
+        return 0.0
+    return sum(1 for failed, latency in calls if predicate(failed, latency)) / len(calls)
+
+
+# provider -> CircuitBreaker（进程内）
+_BREAKERS: dict[str, CircuitBreaker] = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    breaker = _BREAKERS.get(provider)
+    if breaker is None:
+        with _BREAKERS_LOCK:
+            breaker = _BREAKERS.get(provider)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    provider,
+                    window=settings.LLM_BREAKER_WINDOW,
+                    min_calls=settings.LLM_BREAKER_MIN_CALLS,
+                    error_rate=settings.LLM_BREAKER_ERROR_RATE,
+                    slow_seconds=settings.LLM_BREAKER_SLOW_SECONDS,
+                    slow_rate=settings.LLM_BREAKER_SLOW_RATE,
+                    cooldown=settings.LLM_BREAKER_COOLDOWN,
+                )
+                _BREAKERS[provider] = breaker
+    return breaker
+
+
+def reset_breakers() -> None:
+    """清空所有熔断状态（测试 / 手动恢复时用）"""
+    with _BREAKERS_LOCK:
+        _BREAKERS.clear()
+
+
+def failover_order() -> list[str]:
+    return [p.strip().lower() for p in settings.LLM_FAILOVER_ORDER if p.strip()]
+
+
+def candidates(provider: str) -> list[str]:
+    """先请求的 provider，再按 LLM_FAILOVER_ORDER 其余的"""
+    return [provider] + [p for p in failover_order() if p != provider]
@@ -1,11 +1,13 @@
 """
 Anthropic Claude 实现
 """
+import asyncio
 import os
 
 from django.conf import settings
 
 from .base import BaseLLMService
+from .clients import get_client
 
 
 class ClaudeService(BaseLLMService):
@@ -13,9 +15,47 @@ class ClaudeService(BaseLLMService):
 
     provider_id = "claude"
 
-    def __init__(self, *, api_key: str | None = None, model: str = "claude-3-5-sonnet-20241022"):
+    def __init__(self, *, api_key: str | None = None, model: str = "claude-3-5-sonnet-20241022", base_url: str | None = None):
         self._api_key = api_key or os.getenv("ANTHROPIC_API_KEY") or getattr(settings, "ANTHROPIC_API_KEY", "")
         self._model = model or getattr(settings, "CLAUDE_MODEL", "claude-3-5-sonnet-20241022")
+        self._base_url = base_url or getattr(settings, "ANTHROPIC_BASE_URL", "") or None
+
+    def _client(self):
+        """进程内复用的 Anthropic client（连接池 keep-alive）"""
+        from anthropic import Anthropic
+
+        return get_client(
+            self.provider_id,
+            self._model,
+            self._api_key,
+            lambda: Anthropic(api_key=self._api_key, base_url=self._base_url),
+            base_url=self._base_url,
+        )
+
+    def _async_client(self):
+        """
+        AsyncAnthropic client，按事件循环区分缓存
+        httpx.AsyncClient 的连接绑定创建它的 loop，不能跨 loop 复用
+        """
+        from anthropic import AsyncAnthropic
+
+        loop_id = id(asyncio.get_running_loop())
+        return get_client(
+            f"{self.provider_id}:async:{loop_id}",
+            self._model,
+            self._api_key,
+            lambda: AsyncAnthropic(api_key=self._api_key, base_url=self._base_url),
+            base_url=self._base_url,
+        )
+
+    @staticmethod
+    def _join_text(message) -> str:
+        # Claude 返回 content 为 ContentBlock 列表，取 text 类型拼接
+        text_parts = []
+        for block in message.content:
+            if hasattr(block, "text"):
+                text_parts.append(block.text)
+        return "".join(text_parts) if text_parts else ""
 
     def generate(
         self,
@@ -28,9 +68,7 @@ class ClaudeService(BaseLLMService):
         if not self._api_key:
             raise ValueError("ANTHROPIC_API_KEY not found in environment or settings")
 
-        from anthropic import Anthropic
-
-        client = Anthropic(api_key=self._api_key)
+        client = self._client()
         message = client.messages.create(
             model=self._model,
             max_tokens=max_tokens,
@@ -38,9 +76,48 @@ class ClaudeService(BaseLLMService):
             messages=[{"role": "user", "content": user_message}],
             temperature=temperature,
         )
-        # Claude 返回 content 为 ContentBlock 列表，取 text 类型拼接
-        text_parts = []
-        for block in message.content:
-            if hasattr(block, "text"):
-                text_parts.append(block.text)
-        return "".join(text_parts) if text_parts else ""
+        return self._join_text(message)
+
+    async def agenerate(
+        self,
+        system_message: str,
+        user_message: str,
+        *,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+    ) -> str:
+        if not self._api_key:
+            raise ValueError("ANTHROPIC_API_KEY not found in environment or settings")
+
+        client = self._async_client()
+        message = await client.messages.create(
+            model=self._model,
+            max_tokens=max_tokens,
+            system=system_message,
+            messages=[{"role": "user", "content": user_message}],
+            temperature=temperature,
+        )
+        return self._join_text(message)
+
+    def stream(
+        self,
+        system_message: str,
+        user_message: str,
+        *,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+    ):
+        if not self._api_key:
+            raise ValueError("ANTHROPIC_API_KEY not found in environment or settings")
+
+        client = self._client()
+        with client.messages.stream(
+            model=self._model,
+            max_tokens=max_tokens,
+            system=system_message,
+            messages=[{"role": "user", "content": user_message}],
+            temperature=temperature,
+        ) as stream:
+            for text in stream.text_stream:
+                if text:
+                    yield text
@@ -0,0 +1,79 @@
+"""
+进程级 SDK client 注册表：每个 worker 进程对每组 (provider, model, api_key, base_url) 只建一个 client
+SDK client 内部持有 httpx 连接池（keep-alive），复用后后续调用不再重复 TLS 握手
+Celery prefork 下 fork 出的子进程不能共用父进程的 socket，fork 后子进程清空注册表重新建
+"""
+import hashlib
+import inspect
+import os
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+_clients: Dict[Tuple[str, str, str, str], Any] = {}
+_lock = threading.Lock()
+_owner_pid = os.getpid()
+
+
+def _reset_after_fork() -> None:
+    """
+    子进程：只丢弃引用，不 close
+    close 会对和父进程共享的 socket 做关闭握手，影响父进程的连接
+    """
+    global _lock, _owner_pid
+    _clients.clear()
+    _lock = threading.Lock()
+    _owner_pid = os.getpid()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _key(provider: str, model: str, api_key: str, base_url: str | None) -> Tuple[str, str, str, str]:
+    # 注册表里不留明文 key
+    key_digest = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()
+    return (provider, model, key_digest, base_url or "")
+
+
+def get_client(
+    provider: str,
+    model: str,
+    api_key: str,
+    factory: Callable[[], Any],
+    *,
+    base_url: str | None = None,
+) -> Any:
+    """
+    返回缓存的 client；不存在时调用 factory() 新建并缓存
+    factory 只在当前进程第一次用到这组参数时调用
+    """
+    if os.getpid() != _owner_pid:
+        # 兜底：不支持 register_at_fork 或 fork 方式特殊时，按 pid 判断
+        _reset_after_fork()
+    key = _key(provider, model, api_key, base_url)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = factory()
+            _clients[key] = client
+    return client
+
+
+def clear_clients() -> None:
+    """关闭并清空当前进程的所有 client（测试 / 轮换 API key 时用）"""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        close = getattr(client, "close", None)
+        if callable(close):
+            try:
+                result = close()
+                if inspect.iscoroutine(result):
+                    # async client 只能在自己的 loop 里关闭，这里只丢弃引用
+                    result.close()
+            except Exception:
+                pass
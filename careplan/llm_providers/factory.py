@@ -1,13 +1,18 @@
 """
 工厂函数：根据配置返回对应 LLM Service
+请求的 provider 熔断（circuit.py）时按 LLM_FAILOVER_ORDER 换下一个健康的 provider
 """
 from typing import Dict, Type
 
 from django.conf import settings
 
+from ..statsd_metrics import llm_failover
+from . import circuit
 from .base import BaseLLMService
+from .clients import clear_clients
 from .openai_service import OpenAIService
 from .claude_service import ClaudeService
+from .faulty_service import FaultyLLMService
 from .mock_service import MockLLMService
 
 # provider 标识 -> Service 类
@@ -17,26 +22,87 @@ _SERVICE_REGISTRY: Dict[str, Type[BaseLLMService]] = {
     "mock": MockLLMService,
 }
 
+# provider 标识 -> Service 实例（进程内复用；Service 本身无连接状态，连接池在 clients 注册表里）
+_SERVICE_INSTANCES: Dict[str, BaseLLMService] = {}
+
+
+def _get_instance(provider: str, service_cls: Type[BaseLLMService]) -> BaseLLMService:
+    service = _SERVICE_INSTANCES.get(provider)
+    if service is None or type(service) is not service_cls:
+        service = service_cls()
+        _SERVICE_INSTANCES[provider] = service
+    return service
+
+
+def _get_faulty_instance(provider: str, faults: dict) -> BaseLLMService:
+    key = f"faulty:{provider}"
+    service = _SERVICE_INSTANCES.get(key)
+    if service is None:
+        service = FaultyLLMService(provider, **faults.get(provider, {}))
+        _SERVICE_INSTANCES[key] = service
+    return service
+
+
+def _resolve(provider: str, faults: dict | None) -> BaseLLMService:
+    if faults is not None:
+        return _get_faulty_instance(provider, faults)
+    service_cls = _SERVICE_REGISTRY.get(provider)
+    if service_cls is None:
+        raise ValueError(f"Unknown LLM provider: {provider}. Known: {list(_SERVICE_REGISTRY.keys())}")
+    return _get_instance(provider, service_cls)
+
 
 def get_llm_service(provider: str | None = None) -> BaseLLMService:
     """
-    根据 provider 返回对应的 LLM Service 实例
+    根据 provider 返回对应的 LLM Service 实例（同一进程内复用）
     provider: 从参数传入，或从 settings.LLM_PROVIDER 读取，默认 "openai"
+    请求的 provider 熔断时返回下一个健康 provider 的 Service（service.provider_id 为实际使用的）；
+    全部熔断时抛 CircuitOpenError
     """
     if provider is None:
         provider = getattr(settings, "LLM_PROVIDER", "openai")
     provider = str(provider).lower()
 
-    # Mock 模式优先：USE_MOCK_LLM=1 时强制使用 mock
+    # Mock 模式优先：USE_MOCK_LLM=1 时强制使用 mock；配置了故障注入时每个 provider 各一个故障注入 mock
+    faults = None
     if getattr(settings, "USE_MOCK_LLM", True):
-        return MockLLMService()
+        faults = getattr(settings, "LLM_FAULT_INJECTION", None)
+        if not isinstance(faults, dict) or not faults:
+            return _get_instance("mock", MockLLMService)
 
-    service_cls = _SERVICE_REGISTRY.get(provider)
-    if service_cls is None:
-        raise ValueError(f"Unknown LLM provider: {provider}. Known: {list(_SERVICE_REGISTRY.keys())}")
-    return service_cls()
+    primary = _resolve(provider, faults)
+    for candidate in circuit.candidates(provider):
+        if not circuit.get_breaker(candidate).available():
+            continue
+        if candidate == provider:
+            return primary
+        llm_failover(provider, candidate)
+        return _resolve(candidate, faults)
+    raise circuit.CircuitOpenError(f"All LLM providers are unavailable: {circuit.candidates(provider)}")
+
+
+def acquire_llm_call(provider: str) -> bool:
+    """真正调用 LLM 前占用熔断器的放行（half_open 时即探测名额）；返回 False 时不应调用"""
+    return circuit.get_breaker(provider).allow()
+
+
+def record_llm_result(provider: str, ok: bool, latency: float | None = None) -> None:
+    """llm_service 每次调用后回报结果，更新该 provider 的熔断器"""
+    breaker = circuit.get_breaker(provider)
+    if ok:
+        breaker.record_success(latency)
+    else:
+        breaker.record_failure(latency)
 
 
 def register_llm_service(provider: str, service_cls: Type[BaseLLMService]) -> None:
     """注册新 LLM Service（可选，用于动态扩展）"""
     _SERVICE_REGISTRY[provider.lower()] = service_cls
+    _SERVICE_INSTANCES.pop(provider.lower(), None)
+
+
+def clear_llm_services() -> None:
+    """清空缓存的 Service 实例、SDK client 和熔断状态（测试 / 轮换 API key 时用）"""
+    _SERVICE_INSTANCES.clear()
+    clear_clients()
+    circuit.reset_breakers()
@@ -0,0 +1,82 @@
+"""
+故障注入 Mock：按配置的失败率 / 延迟返回 mock 文本或抛错，离线验证熔断与切换
+USE_MOCK_LLM=1 且配置了 LLM_FAULT_INJECTION 时，factory 为每个 provider 建一个实例（provider_id 即 provider 名）
+例：LLM_FAULT_INJECTION='{"openai": {"error_rate": 1.0}, "claude": {"latency": 0.2}}'
+"""
+import asyncio
+import random
+import time
+
+from .mock_service import MOCK_CAREPLAN_TEXT, MockLLMService
+
+
+class InjectedFault(Exception):
+    """故障注入抛出的错误，模拟 provider 5xx / 超时"""
+
+    status_code = 503
+
+
+class FaultyLLMService(MockLLMService):
+    """
+    provider_id: 扮演的 provider
+    error_rate: 每次调用失败的概率 0-1
+    latency: 每次调用前等待的秒数（失败也等，模拟超时后才报错）
+    seed: 随机种子，测试 / benchmark 里固定失败序列
+    """
+
+    def __init__(self, provider_id: str = "faulty", *, error_rate: float = 0.0, latency: float = 0.0, seed=None):
+        self.provider_id = provider_id
+        self.error_rate = error_rate
+        self.latency = latency
+        self._random = random.Random(seed)
+
+    def _should_fail(self) -> bool:
+        return self.error_rate > 0 and self._random.random() < self.error_rate
+
+    def _fault(self):
+        return InjectedFault(f"injected fault ({self.provider_id})")
+
+    def generate(
+        self,
+        system_message: str,
+        user_message: str,
+        *,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+    ) -> str:
+        fail = self._should_fail()
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise self._fault()
+        return MOCK_CAREPLAN_TEXT
+
+    async def agenerate(
+        self,
+        system_message: str,
+        user_message: str,
+        *,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+    ) -> str:
+        fail = self._should_fail()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if fail:
+            raise self._fault()
+        return MOCK_CAREPLAN_TEXT
+
+    def stream(
+        self,
+        system_message: str,
+        user_message: str,
+        *,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+    ):
+        fail = self._should_fail()
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise self._fault()
+        yield from MOCK_CAREPLAN_TEXT.splitlines(keepends=True)
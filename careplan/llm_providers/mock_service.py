@@ -38,3 +38,24 @@ class MockLLMService(BaseLLMService):
         max_tokens: int = 2000,
     ) -> str:
         return MOCK_CAREPLAN_TEXT
+
+    async def agenerate(
+        self,
+        system_message: str,
+        user_message: str,
+        *,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+    ) -> str:
+        return MOCK_CAREPLAN_TEXT
+
+    def stream(
+        self,
+        system_message: str,
+        user_message: str,
+        *,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+    ):
+        # 按行切分，模拟逐段返回
+        yield from MOCK_CAREPLAN_TEXT.splitlines(keepends=True)
@@ -1,11 +1,13 @@
 """
 OpenAI GPT 实现
 """
+import asyncio
 import os
 
 from django.conf import settings
 
 from .base import BaseLLMService
+from .clients import get_client
 
 
 class OpenAIService(BaseLLMService):
@@ -13,9 +15,44 @@ class OpenAIService(BaseLLMService):
 
     provider_id = "openai"
 
-    def __init__(self, *, api_key: str | None = None, model: str = "gpt-4o-mini"):
+    def __init__(self, *, api_key: str | None = None, model: str = "gpt-4o-mini", base_url: str | None = None):
         self._api_key = api_key or os.getenv("OPENAI_API_KEY") or getattr(settings, "OPENAI_API_KEY", "")
         self._model = model or getattr(settings, "OPENAI_MODEL", "gpt-4o-mini")
+        self._base_url = base_url or getattr(settings, "OPENAI_BASE_URL", "") or None
+
+    def _client(self):
+        """进程内复用的 OpenAI client（连接池 keep-alive）"""
+        from openai import OpenAI
+
+        return get_client(
+            self.provider_id,
+            self._model,
+            self._api_key,
+            lambda: OpenAI(api_key=self._api_key, base_url=self._base_url),
+            base_url=self._base_url,
+        )
+
+    def _async_client(self):
+        """
+        AsyncOpenAI client，按事件循环区分缓存
+        httpx.AsyncClient 的连接绑定创建它的 loop，不能跨 loop 复用
+        """
+        from openai import AsyncOpenAI
+
+        loop_id = id(asyncio.get_running_loop())
+        return get_client(
+            f"{self.provider_id}:async:{loop_id}",
+            self._model,
+            self._api_key,
+            lambda: AsyncOpenAI(api_key=self._api_key, base_url=self._base_url),
+            base_url=self._base_url,
+        )
+
+    def _messages(self, system_message: str, user_message: str) -> list:
+        return [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": user_message},
+        ]
 
     def generate(
         self,
@@ -28,16 +65,57 @@ class OpenAIService(BaseLLMService):
         if not self._api_key:
             raise ValueError("OPENAI_API_KEY not found in environment or settings")
 
-        from openai import OpenAI
-
-        client = OpenAI(api_key=self._api_key)
+        client = self._client()
         response = client.chat.completions.create(
             model=self._model,
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": user_message},
-            ],
+            messages=self._messages(system_message, user_message),
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+        return response.choices[0].message.content or ""
+
+    async def agenerate(
+        self,
+        system_message: str,
+        user_message: str,
+        *,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+    ) -> str:
+        if not self._api_key:
+            raise ValueError("OPENAI_API_KEY not found in environment or settings")
+
+        client = self._async_client()
+        response = await client.chat.completions.create(
+            model=self._model,
+            messages=self._messages(system_message, user_message),
             temperature=temperature,
             max_tokens=max_tokens,
         )
         return response.choices[0].message.content or ""
+
+    def stream(
+        self,
+        system_message: str,
+        user_message: str,
+        *,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+    ):
+        if not self._api_key:
+            raise ValueError("OPENAI_API_KEY not found in environment or settings")
+
+        client = self._client()
+        chunks = client.chat.completions.create(
+            model=self._model,
+            messages=self._messages(system_message, user_message),
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+        )
+        for chunk in chunks:
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content
+            if text:
+                yield text
@@ -0,0 +1,325 @@
+"""
+LLM 客户端限流：按 provider + model 共享每分钟请求数（rpm）与 token 数（tpm）预算，调用前等到有余量再发
+- 两个令牌桶（请求 / token），按 limit / 60 每秒匀速补充，上限为 LLM_RATE_LIMIT_BURST_SECONDS 秒的额度
+  （provider 在比一分钟更短的窗口上也会限，不能一次把整分钟的额度打出去）
+- token 按 prompt 字符数 / 4 + max_tokens 预估（与 provider 计入 TPM 的方式一致），返回后按实际长度退回多扣的部分
+- 429：读 Retry-After（retry-after-ms / retry-after），整个 key 暂停到那之后，所有 worker 一起等，再重发
+- 等待超过 LLM_RATE_LIMIT_MAX_WAIT 抛 RateLimitTimeout，由任务按原有逻辑重试
+- 每次预留后上报剩余额度比例（gauge llm_rate_headroom）
+后端（LLM_RATE_LIMIT）：
+- redis：多个 worker 共享（Lua 脚本原子地补充、判断、扣减），Redis 出错时放行，不影响生成
+- local：进程内，适合单进程 / 开发
+- none：关闭
+未在 LLM_RATE_LIMITS 中配置的 provider（如 mock）不限流
+"""
+import asyncio
+import logging
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+
+from .statsd_metrics import llm_rate_headroom, llm_rate_limit_wait_seconds, llm_rate_limited
+
+logger = logging.getLogger(__name__)
+
+# 没有 Retry-After 头的 429 暂停这么多秒
+DEFAULT_RETRY_AFTER = 1.0
+
+
+class RateLimitTimeout(Exception):
+    """在 LLM_RATE_LIMIT_MAX_WAIT 内等不到额度"""
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / 4)
+
+
+def retry_after_seconds(exc) -> float | None:
+    """provider SDK 的 429 异常返回应等待的秒数，其他异常返回 None"""
+    if getattr(exc, "status_code", None) != 429:
+        return None
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return DEFAULT_RETRY_AFTER
+
+
+class BaseRateLimiter(ABC):
+    """
+    acquire 成功时扣减并返回 (0, 剩余请求数, 剩余 token 数)；额度不够时不扣减，返回 (需等待秒数, ...)
+    rpm / tpm 为 0 表示该维度不限；桶容量为 burst 秒的额度
+    """
+
+    @abstractmethod
+    def acquire(self, key: str, rpm: int, tpm: int, tokens: int, burst: float) -> tuple[float, float, float]:
+        pass
+
+    @abstractmethod
+    def refund(self, key: str, tokens: int) -> None:
+        pass
+
+    @abstractmethod
+    def block(self, key: str, seconds: float) -> None:
+        """Retry-After：key 暂停 seconds 秒"""
+
+    def clear(self) -> None:
+        pass
+
+
+def _capacity(limit, burst):
+    return max(1.0, limit * burst / 60)
+
+
+def _refill(level, elapsed, limit, capacity):
+    return min(capacity, level + elapsed * limit / 60)
+
+
+def _take(req, tok, rpm, tpm, tokens):
+    """两个桶都够时返回 0，否则返回补够所需的秒数"""
+    wait = 0.0
+    if rpm and req < 1:
+        wait = (1 - req) * 60 / rpm
+    if tpm and tok < tokens:
+        wait = max(wait, (tokens - tok) * 60 / tpm)
+    return wait
+
+
+class LocalRateLimiter(BaseRateLimiter):
+    """进程内令牌桶"""
+
+    def __init__(self):
+        self._buckets: dict[str, list[float]] = {}  # key -> [req, tok, ts, blocked_until]
+        self._lock = threading.Lock()
+
+    def acquire(self, key, rpm, tpm, tokens, burst):
+        req_cap, tok_cap = _capacity(rpm, burst), _capacity(tpm, burst)
+        tokens = min(tokens, tok_cap)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.setdefault(key, [req_cap, tok_cap, now, 0.0])
+            if bucket[3] > now:
+                return bucket[3] - now, bucket[0], bucket[1]
+            elapsed = now - bucket[2]
+            req, tok = _refill(bucket[0], elapsed, rpm, req_cap), _refill(bucket[1], elapsed, tpm, tok_cap)
+            wait = _take(req, tok, rpm, tpm, tokens)
+            if not wait:
+                req, tok = req - 1, tok - tokens
+            bucket[:3] = [req, tok, now]
+            return wait, req, tok
+
+    def refund(self, key, tokens):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket[1] += tokens
+
+    def block(self, key, seconds):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket[3] = max(bucket[3], time.monotonic() + seconds)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+# KEYS[1]: 桶（hash: req tok ts blocked）；ARGV: rpm tpm tokens 请求桶容量 token 桶容量
+# 时间用 Redis 服务器时钟，各 worker 一致
+_ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local rpm, tpm, tokens = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local req_cap, tok_cap = tonumber(ARGV[4]), tonumber(ARGV[5])
+local s = redis.call('HMGET', KEYS[1], 'req', 'tok', 'ts', 'blocked')
+local req, tok = tonumber(s[1]) or req_cap, tonumber(s[2]) or tok_cap
+local elapsed = math.max(0, now - (tonumber(s[3]) or now))
+local blocked = tonumber(s[4]) or 0
+if blocked > now then
+    return {tostring(blocked - now), tostring(req), tostring(tok)}
+end
+req = math.min(req_cap, req + elapsed * rpm / 60)
+tok = math.min(tok_cap, tok + elapsed * tpm / 60)
+local wait = 0
+if rpm > 0 and req < 1 then wait = (1 - req) * 60 / rpm end
+if tpm > 0 and tok < tokens then wait = math.max(wait, (tokens - tok) * 60 / tpm) end
+if wait == 0 then
+    req = req - 1
+    tok = tok - tokens
+end
+redis.call('HSET', KEYS[1], 'req', tostring(req), 'tok', tostring(tok), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], 120)
+return {tostring(wait), tostring(req), tostring(tok)}
+"""
+
+_BLOCK_SCRIPT = """
+local t = redis.call('TIME')
+local until_ = tonumber(t[1]) + tonumber(t[2]) / 1000000 + tonumber(ARGV[1])
+if until_ > (tonumber(redis.call('HGET', KEYS[1], 'blocked')) or 0) then
+    redis.call('HSET', KEYS[1], 'blocked', tostring(until_))
+end
+redis.call('EXPIRE', KEYS[1], 120 + math.ceil(tonumber(ARGV[1])))
+"""
+
+# 桶已过期（闲置）时不退回，避免只剩 tok 字段的半个桶
+_REFUND_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('HINCRBYFLOAT', KEYS[1], 'tok', ARGV[1])
+end
+"""
+
+
+class RedisRateLimiter(BaseRateLimiter):
+    """多个 worker 共享的令牌桶；Redis 出错时放行"""
+
+    def __init__(self, client, *, prefix: str = "careplan:llmrate:"):
+        self._client = client
+        self.prefix = prefix
+        self._acquire = client.register_script(_ACQUIRE_SCRIPT)
+        self._block = client.register_script(_BLOCK_SCRIPT)
+        self._refund = client.register_script(_REFUND_SCRIPT)
+
+    def acquire(self, key, rpm, tpm, tokens, burst):
+        req_cap, tok_cap = _capacity(rpm, burst), _capacity(tpm, burst)
+        tokens = min(tokens, tok_cap)
+        try:
+            wait, req, tok = self._acquire(keys=[self.prefix + key], args=[rpm, tpm, tokens, req_cap, tok_cap])
+        except Exception:
+            logger.warning("llm rate limit acquire failed", exc_info=True)
+            return 0.0, req_cap, tok_cap
+        return float(wait), float(req), float(tok)
+
+    def refund(self, key, tokens):
+        try:
+            self._refund(keys=[self.prefix + key], args=[tokens])
+        except Exception:
+            logger.warning("llm rate limit refund failed", exc_info=True)
+
+    def block(self, key, seconds):
+        try:
+            self._block(keys=[self.prefix + key], args=[seconds])
+        except Exception:
+            logger.warning("llm rate limit block failed", exc_info=True)
+
+
+_limiter: BaseRateLimiter | None = None
+_limiter_backend: str | None = None
+
+
+def get_rate_limiter() -> BaseRateLimiter | None:
+    """按 settings.LLM_RATE_LIMIT 返回限流器实例（进程内复用）；none 返回 None"""
+    global _limiter, _limiter_backend
+    backend = getattr(settings, "LLM_RATE_LIMIT", "redis")
+    if backend == _limiter_backend:
+        return _limiter
+    if backend == "redis":
+        from .queue import get_redis
+
+        _limiter = RedisRateLimiter(get_redis())
+    elif backend == "local":
+        _limiter = LocalRateLimiter()
+    elif backend == "none":
+        _limiter = None
+    else:
+        raise ValueError(f"Unknown LLM_RATE_LIMIT backend: {backend}. Known: ['redis', 'local', 'none']")
+    _limiter_backend = backend
+    return _limiter
+
+
+def reset_rate_limiter() -> None:
+    """丢弃当前限流器实例（测试 / 切换配置时用）"""
+    global _limiter, _limiter_backend
+    if _limiter is not None:
+        _limiter.clear()
+    _limiter = None
+    _limiter_backend = None
+
+
+def _limits_for(provider_id: str, model: str) -> tuple[int, int] | None:
+    limits = getattr(settings, "LLM_RATE_LIMITS", {})
+    config = limits.get(f"{provider_id}:{model}") or limits.get(provider_id)
+    if not config:
+        return None
+    return int(config.get("rpm", 0)), int(config.get("tpm", 0))
+
+
+class LimitedCall:
+    """
+    一次 LLM 调用的限流：wait / await_capacity 预留额度，backoff 处理 429，settle 退回多扣的 token
+    用法见 llm_service.generate_careplan
+    """
+
+    def __init__(self, limiter: BaseRateLimiter, provider_id: str, model: str, limits, prompt: str, max_tokens: int):
+        self.limiter = limiter
+        self.provider_id = provider_id
+        self.model = model
+        self.key = f"{provider_id}:{model}"
+        self.rpm, self.tpm = limits
+        self.prompt_tokens = estimate_tokens(prompt)
+        self.tokens = self.prompt_tokens + max_tokens
+        self.burst = settings.LLM_RATE_LIMIT_BURST_SECONDS
+        self.deadline = time.monotonic() + settings.LLM_RATE_LIMIT_MAX_WAIT
+        self.waited = 0.0
+
+    def _try(self) -> float:
+        """预留额度；返回还需等待的秒数（0 为已预留），超过 deadline 抛 RateLimitTimeout"""
+        wait, req, tok = self.limiter.acquire(self.key, self.rpm, self.tpm, self.tokens, self.burst)
+        if not wait:
+            for dimension, limit, level in (("requests", self.rpm, req), ("tokens", self.tpm, tok)):
+                if limit:
+                    llm_rate_headroom(self.provider_id, self.model, dimension, max(0.0, level / _capacity(limit, self.burst)))
+            if self.waited:
+                llm_rate_limit_wait_seconds(self.provider_id, self.waited)
+            return 0.0
+        if time.monotonic() + wait > self.deadline:
+            raise RateLimitTimeout(f"{self.key}: no rate limit capacity within {settings.LLM_RATE_LIMIT_MAX_WAIT}s")
+        self.waited += wait
+        return wait
+
+    def wait(self) -> None:
+        while delay := self._try():
+            time.sleep(delay)
+
+    async def await_capacity(self) -> None:
+        while delay := await asyncio.to_thread(self._try):
+            await asyncio.sleep(delay)
+
+    def try_acquire(self) -> bool:
+        """不等待：有额度时预留并返回 True，没有返回 False（对冲请求用，没有余量就不发）"""
+        wait, _, _ = self.limiter.acquire(self.key, self.rpm, self.tpm, self.tokens, self.burst)
+        return not wait
+
+    def backoff(self, exc) -> bool:
+        """429：暂停整个 key 到 Retry-After 之后，还在 deadline 内则返回 True（调用方重发）"""
+        retry_after = retry_after_seconds(exc)
+        if retry_after is None:
+            return False
+        llm_rate_limited(self.provider_id)
+        self.limiter.block(self.key, retry_after)
+        return time.monotonic() + retry_after <= self.deadline
+
+    def settle(self, result: str) -> None:
+        """按实际输出长度退回预估多扣的 token"""
+        unused = self.tokens - self.prompt_tokens - estimate_tokens(result or "")
+        if self.tpm and unused > 0:
+            self.limiter.refund(self.key, unused)
+
+
+def limited_call(service, provider_id: str, prompt: str, max_tokens: int) -> LimitedCall | None:
+    """provider 配置了限额且限流开启时返回 LimitedCall，否则 None（不限流）"""
+    model = getattr(service, "model_name", provider_id)
+    limits = _limits_for(provider_id, model)
+    if limits is None:
+        return None
+    limiter = get_rate_limiter()
+    if limiter is None:
+        return None
+    return LimitedCall(limiter, provider_id, model, limits, prompt, max_tokens)
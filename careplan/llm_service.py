@@ -1,13 +1,24 @@
 """
 LLM 生成 Care Plan 统一入口
-业务代码只调用 generate_careplan，不关心具体 LLM 实现
+业务代码只调用 generate_careplan（异步 worker 用 agenerate_careplan），不关心具体 LLM 实现
+调用前按 provider 限流（llm_rate_limit）：等到有额度再发，429 时按 Retry-After 暂停后重发，不消耗任务重试次数
+每次调用的成败与延迟回报给 provider 熔断器（llm_providers.circuit），熔断时 get_llm_service 换用下一个健康的 provider
+LLM_HEDGING=1 时非流式调用超过最近延迟分位仍未返回会再发一个对冲请求，取先返回的（llm_hedging）
 """
+import asyncio
 import time
 
-from .llm_providers import get_llm_service
+from .llm_cache import build_cache_key, get_result_cache
+from .llm_hedging import arace, hedge_delay, hedge_target, race, record_latency
+from .llm_rate_limit import limited_call, retry_after_seconds
+from .llm_providers import CircuitOpenError, get_llm_service
+from .llm_providers.factory import acquire_llm_call, record_llm_result
 from .statsd_metrics import (
     llm_api_error,
     llm_api_latency_seconds,
+    llm_cache_hit,
+    llm_cache_miss,
+    llm_first_token_latency_seconds,
     llm_provider_usage,
 )
 
@@ -58,6 +69,172 @@ Please generate a comprehensive care plan with the following sections:
 Format the output clearly with section headers."""
 
 
+TEMPERATURE = 0.7
+MAX_TOKENS = 2000
+
+
+def _prepare(llm_provider, use_cache, prompt_kwargs):
+    """取 service、拼 prompt、算缓存 key；返回 (service, provider_id, user_prompt, cache, cache_key)"""
+    service = get_llm_service(provider=llm_provider)
+    provider_id = getattr(service, "provider_id", "unknown")
+    user_prompt = _build_user_prompt(**prompt_kwargs)
+    cache = get_result_cache() if use_cache else None
+    cache_key = _cache_key(service, provider_id, user_prompt) if cache is not None else None
+    return service, provider_id, user_prompt, cache, cache_key
+
+
+def _cache_key(service, provider_id, user_prompt):
+    return build_cache_key(
+        provider_id=provider_id,
+        model=getattr(service, "model_name", provider_id),
+        temperature=TEMPERATURE,
+        max_tokens=MAX_TOKENS,
+        system_message=SYSTEM_PROMPT,
+        user_message=user_prompt,
+    )
+
+
+def _cache_lookup(cache, cache_key):
+    if cache is None:
+        return None
+    cached = cache.get(cache_key)
+    if cached is not None:
+        llm_cache_hit()
+    else:
+        llm_cache_miss()
+    return cached
+
+
+def _record_failure(provider_id, exc, start):
+    """非限流错误计入熔断器；429 由限流处理，不代表 provider 故障"""
+    if retry_after_seconds(exc) is None:
+        record_llm_result(provider_id, False, time.perf_counter() - start)
+
+
+def _record_success(provider_id, start):
+    latency = time.perf_counter() - start
+    record_llm_result(provider_id, True, latency)
+    record_latency(provider_id, latency)
+
+
+def _acquire(provider_id):
+    """调用前占熔断器放行；half_open 的探测名额已被其他请求占用时抛 CircuitOpenError（不计入失败）"""
+    if not acquire_llm_call(provider_id):
+        raise CircuitOpenError(f"LLM provider {provider_id} is unavailable (circuit open)")
+
+
+def _call(service, fn):
+    """一次 LLM 调用：结果回报熔断器，成功的延迟计入对冲样本；返回 (结果, service)"""
+    provider_id = getattr(service, "provider_id", "unknown")
+    _acquire(provider_id)
+    start = time.perf_counter()
+    try:
+        result = fn()
+    except Exception as exc:
+        _record_failure(provider_id, exc, start)
+        raise
+    _record_success(provider_id, start)
+    return result, service
+
+
+async def _acall(service, coro_fn):
+    """_call 的异步版本；被对冲取消时已等的时间作为延迟下限计入样本"""
+    provider_id = getattr(service, "provider_id", "unknown")
+    _acquire(provider_id)
+    start = time.perf_counter()
+    try:
+        result = await coro_fn()
+    except asyncio.CancelledError:
+        record_latency(provider_id, time.perf_counter() - start)
+        raise
+    except Exception as exc:
+        _record_failure(provider_id, exc, start)
+        raise
+    _record_success(provider_id, start)
+    return result, service
+
+
+def _messages(user_prompt):
+    return dict(system_message=SYSTEM_PROMPT, user_message=user_prompt, temperature=TEMPERATURE, max_tokens=MAX_TOKENS)
+
+
+def _consume_stream(service, user_prompt, on_progress, start):
+    """逐段消费 service.stream，回调 on_progress，记录首 token 延迟，返回完整文本"""
+    parts = []
+    for chunk in service.stream(**_messages(user_prompt)):
+        if not parts:
+            llm_first_token_latency_seconds(time.perf_counter() - start)
+        parts.append(chunk)
+        on_progress(chunk)
+    return "".join(parts)
+
+
+def _hedge_limit(service, provider_id, user_prompt):
+    """对冲发给谁及其限流，返回 (service, LimitedCall 或 None)；先看限流，熔断探测名额到 _call 里才占"""
+    target, target_id = hedge_target(service, provider_id)
+    return target, limited_call(target, target_id, SYSTEM_PROMPT + user_prompt, MAX_TOKENS)
+
+
+def _generate(service, provider_id, user_prompt):
+    """非流式调用，返回 (结果, 实际生成的 service)；开启对冲时见 llm_hedging"""
+    def primary():
+        return _call(service, lambda: service.generate(**_messages(user_prompt)))
+
+    delay = hedge_delay(provider_id)
+    if delay is None:
+        return primary()
+
+    def make_hedge():
+        target, limit = _hedge_limit(service, provider_id, user_prompt)
+        if limit is not None and not limit.try_acquire():
+            return None
+
+        def hedge():
+            result = _call(target, lambda: target.generate(**_messages(user_prompt)))
+            if limit is not None:
+                limit.settle(result[0])
+            return result
+        return hedge
+
+    return race(primary, make_hedge, delay, provider_id)
+
+
+async def _agenerate(service, provider_id, user_prompt):
+    """_generate 的异步版本"""
+    def primary():
+        return _acall(service, lambda: service.agenerate(**_messages(user_prompt)))
+
+    delay = hedge_delay(provider_id)
+    if delay is None:
+        return await primary()
+
+    async def make_hedge():
+        target, limit = _hedge_limit(service, provider_id, user_prompt)
+        if limit is not None and not await asyncio.to_thread(limit.try_acquire):
+            return None
+
+        async def hedge():
+            result = await _acall(target, lambda: target.agenerate(**_messages(user_prompt)))
+            if limit is not None:
+                limit.settle(result[0])
+            return result
+        return hedge
+
+    return await arace(primary, make_hedge, delay, provider_id)
+
+
+def _served(served, provider_id, user_prompt, cache, cache_key, on_provider):
+    """对冲由另一个 provider 赢得时：回调实际 provider，缓存 key 按它重算"""
+    served_id = getattr(served, "provider_id", "unknown")
+    if served_id == provider_id:
+        return cache_key
+    if on_provider is not None:
+        on_provider(served_id)
+    if cache is None:
+        return None
+    return _cache_key(served, served_id, user_prompt)
+
+
 def generate_careplan(
     patient,
     provider,
@@ -68,14 +245,19 @@ def generate_careplan(
     patient_records,
     *,
     llm_provider: str | None = None,
+    use_cache: bool = True,
+    on_progress=None,
+    on_provider=None,
 ):
     """
     统一入口：根据配置调用对应 LLM 生成 care plan
     llm_provider: 可选，指定使用的 LLM（openai/claude），不传则用 settings.LLM_PROVIDER
+    use_cache: 输入与之前完全一致时复用缓存结果（见 llm_cache）；False 则强制调用 LLM
+    on_progress: 可选回调，传入时走 service.stream，每收到一段文本调用 on_progress(chunk)
+    on_provider: 可选回调，确定实际使用的 provider 后调用 on_provider(provider_id)（熔断切换时与 llm_provider 不同）；
+        对冲请求由另一个 provider 先返回时再以它调用一次，以最后一次为准
     """
-    service = get_llm_service(provider=llm_provider)
-    provider_id = getattr(service, "provider_id", "unknown")
-    user_prompt = _build_user_prompt(
+    service, provider_id, user_prompt, cache, cache_key = _prepare(llm_provider, use_cache, dict(
         patient=patient,
         provider=provider,
         primary_diagnosis=primary_diagnosis,
@@ -83,18 +265,89 @@ def generate_careplan(
         medication_name=medication_name,
         medication_history=medication_history,
         patient_records=patient_records,
-    )
-    start = time.perf_counter()
-    try:
-        result = service.generate(
-            system_message=SYSTEM_PROMPT,
-            user_message=user_prompt,
-            temperature=0.7,
-            max_tokens=2000,
-        )
-        llm_api_latency_seconds(time.perf_counter() - start)
-        llm_provider_usage(provider_id)
-        return result
-    except Exception:
-        llm_api_error()
-        raise
+    ))
+    if on_provider is not None:
+        on_provider(provider_id)
+    cached = _cache_lookup(cache, cache_key)
+    if cached is not None:
+        return cached
+
+    limit = limited_call(service, provider_id, SYSTEM_PROMPT + user_prompt, MAX_TOKENS)
+    while True:
+        if limit is not None:
+            limit.wait()
+        start = time.perf_counter()
+        try:
+            if on_progress is None:
+                result, served = _generate(service, provider_id, user_prompt)
+            else:
+                result, served = _call(service, lambda: _consume_stream(service, user_prompt, on_progress, start))
+            llm_api_latency_seconds(time.perf_counter() - start)
+            llm_provider_usage(served.provider_id)
+        except Exception as exc:
+            if limit is not None and limit.backoff(exc):
+                continue
+            llm_api_error()
+            raise
+        break
+    if limit is not None:
+        limit.settle(result)
+    cache_key = _served(served, provider_id, user_prompt, cache, cache_key, on_provider)
+    if cache is not None and result:
+        cache.set(cache_key, result)
+    return result
+
+
+async def agenerate_careplan(
+    patient,
+    provider,
+    primary_diagnosis,
+    additional_diagnosis,
+    medication_name,
+    medication_history,
+    patient_records,
+    *,
+    llm_provider: str | None = None,
+    use_cache: bool = True,
+    on_provider=None,
+):
+    """
+    generate_careplan 的异步版本，参数、缓存和指标一致
+    await 期间不占线程，单个事件循环可同时挂起大量生成请求
+    """
+    service, provider_id, user_prompt, cache, cache_key = _prepare(llm_provider, use_cache, dict(
+        patient=patient,
+        provider=provider,
+        primary_diagnosis=primary_diagnosis,
+        additional_diagnosis=additional_diagnosis,
+        medication_name=medication_name,
+        medication_history=medication_history,
+        patient_records=patient_records,
+    ))
+    if on_provider is not None:
+        on_provider(provider_id)
+    cached = _cache_lookup(cache, cache_key)
+    if cached is not None:
+        return cached
+
+    limit = limited_call(service, provider_id, SYSTEM_PROMPT + user_prompt, MAX_TOKENS)
+    while True:
+        if limit is not None:
+            await limit.await_capacity()
+        start = time.perf_counter()
+        try:
+            result, served = await _agenerate(service, provider_id, user_prompt)
+            llm_api_latency_seconds(time.perf_counter() - start)
+            llm_provider_usage(served.provider_id)
+        except Exception as exc:
+            if limit is not None and limit.backoff(exc):
+                continue
+            llm_api_error()
+            raise
+        break
+    if limit is not None:
+        limit.settle(result)
+    cache_key = _served(served, provider_id, user_prompt, cache, cache_key, on_provider)
+    if cache is not None and result:
+        cache.set(cache_key, result)
+    return result
@@ -0,0 +1,126 @@
+"""
+NDJSON 批量导入：每行一个订单，走 get_adapter(source).process → create_careplans_bulk
+运行: python manage.py import_careplans orders.jsonl [--source webform] [--batch-size 500] [--workers 4] [--resume]
+- 解析 / 校验在进程池里并行，DB 写入在主进程按批 bulk_create，按文件顺序提交
+- 同时在途的批数不超过 workers * 2，内存与文件大小无关
+- 每批写入后更新 checkpoint（默认 <文件>.checkpoint），--resume 从上次写入的位置继续
+- 出错的行写到 --errors-file（NDJSON，每行 {"line", "code", "message", "detail"}），默认输出到 stderr
+"""
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+
+from careplan.bulk_import import iter_batches, parse_lines, read_checkpoint, write_checkpoint
+from careplan.services import create_careplans_bulk
+
+
+class _InlineFuture:
+    """workers=0 时在主进程内同步解析，接口与 Future.result() 一致"""
+
+    def __init__(self, value):
+        self._value = value
+
+    def result(self):
+        return self._value
+
+
+class Command(BaseCommand):
+    help = '从 NDJSON 文件批量导入订单（进程池解析校验 + 批量写库，支持断点续传）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='NDJSON / JSONL 文件，每行一个订单')
+        parser.add_argument('--source', default='webform', help='每行的格式（intake 来源），默认 webform')
+        parser.add_argument('--batch-size', type=int, default=500, help='每批行数，默认 500')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='解析进程数，默认 CPU 核数；0 表示在主进程内解析',
+        )
+        parser.add_argument('--checkpoint', default=None, help='checkpoint 文件，默认 <path>.checkpoint')
+        parser.add_argument('--resume', action='store_true', help='从 checkpoint 记录的位置继续')
+        parser.add_argument('--errors-file', default=None, help='出错行写到该文件（NDJSON），默认 stderr')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'文件不存在: {path}')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size 必须 >= 1')
+        source = options['source']
+        workers = options['workers']
+        checkpoint = options['checkpoint'] or f'{path}.checkpoint'
+
+        start_offset, start_line = read_checkpoint(checkpoint) if options['resume'] else (0, 0)
+        if start_offset:
+            self.stdout.write(f'从 checkpoint 继续：第 {start_line} 行之后（offset={start_offset}）')
+
+        self.lines = self.accepted = self.rejected = 0
+        self.started = time.perf_counter()
+        errors_out = open(options['errors_file'], 'a', encoding='utf-8') if options['errors_file'] else None
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 0 else nullcontext()
+        try:
+            with open(path, 'rb') as f, pool:
+                pending = deque()
+                for lines, end_offset, end_line in iter_batches(f, options['batch_size'], start_offset, start_line):
+                    if workers > 0:
+                        future = pool.submit(parse_lines, source, lines)
+                    else:
+                        future = _InlineFuture(parse_lines(source, lines))
+                    pending.append((future, end_offset, end_line))
+                    # 在途批数有上限：读文件不会远远跑在写库前面
+                    if len(pending) >= max(workers, 1) * 2:
+                        self._write(*pending.popleft(), checkpoint, errors_out)
+                while pending:
+                    self._write(*pending.popleft(), checkpoint, errors_out)
+        finally:
+            if errors_out is not None:
+                errors_out.close()
+
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(
+            f'完成：{self.lines} 行，成功 {self.accepted}，失败 {self.rejected}，'
+            f'用时 {elapsed:.1f}s（{self.lines / elapsed if elapsed else 0:.0f} 行/秒）'
+        )
+
+    def _write(self, future, end_offset, end_line, checkpoint, errors_out):
+        """按文件顺序写库：整批 bulk_create 后再推进 checkpoint"""
+        parsed = future.result()
+        valid = [(line_no, order) for line_no, order, _ in parsed if order is not None]
+        failures = [(line_no, error) for line_no, order, error in parsed if order is None]
+
+        if valid:
+            results = create_careplans_bulk([order for _, order in valid])['data']['results']
+            for (line_no, _), result in zip(valid, results):
+                if not result['success']:
+                    failures.append((line_no, result))
+
+        for line_no, error in sorted(failures, key=lambda item: item[0]):
+            record = {
+                "line": line_no,
+                "code": error.get("code"),
+                "message": error.get("message"),
+                "detail": error.get("detail"),
+            }
+            if errors_out is not None:
+                errors_out.write(json.dumps(record, ensure_ascii=False) + '\n')
+            else:
+                self.stderr.write(json.dumps(record, ensure_ascii=False))
+        if errors_out is not None:
+            errors_out.flush()
+
+        write_checkpoint(checkpoint, end_offset, end_line)
+
+        self.lines += len(parsed)
+        self.rejected += len(failures)
+        self.accepted += len(parsed) - len(failures)
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(
+            f'第 {end_line} 行：累计 {self.lines} 行，成功 {self.accepted}，失败 {self.rejected}，'
+            f'{self.lines / elapsed if elapsed else 0:.0f} 行/秒'
+        )
@@ -0,0 +1,63 @@
+"""
+异步 Worker：从 Redis 队列拉 careplan_id，在一个事件循环里并发生成
+运行: python manage.py run_careplan_async_worker [--max-in-flight 200]
+需配合 CAREPLAN_DISPATCH=redis（run_outbox_relay 把 id 推到各 lane 的队列，BLPOP 先取 interactive）
+"""
+import asyncio
+import signal
+
+import redis.asyncio as aioredis
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from careplan import queue
+from careplan.async_worker import AsyncCarePlanRunner
+
+
+class Command(BaseCommand):
+    help = '从 Redis 队列拉任务，在单个事件循环中并发调 LLM 生成 Care Plan'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-in-flight',
+            type=int,
+            default=None,
+            help='同时在途的生成数上限（默认 settings.CAREPLAN_ASYNC_MAX_IN_FLIGHT）',
+        )
+
+    def handle(self, *args, **options):
+        max_in_flight = options['max_in_flight'] or settings.CAREPLAN_ASYNC_MAX_IN_FLIGHT
+        self.stdout.write(f'Async worker 启动，max_in_flight={max_in_flight}，等待任务... (Ctrl+C 退出)')
+        asyncio.run(self._consume(max_in_flight))
+        self.stdout.write('Async worker 已退出')
+
+    async def _consume(self, max_in_flight):
+        runner = AsyncCarePlanRunner(max_in_flight)
+        r = aioredis.from_url(settings.REDIS_URL)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+
+        try:
+            while not stop.is_set():
+                # 先占空位再出队，满载时 id 留在队列里给其他 worker
+                await runner.acquire_slot()
+                try:
+                    # BLPOP timeout=5 秒便于检查退出信号
+                    result = await r.blpop(queue.lane_keys(), timeout=5)
+                except Exception as e:
+                    runner.release_slot()
+                    self.stderr.write(f'Redis 出错: {e}')
+                    await asyncio.sleep(1)
+                    continue
+                if not result:
+                    runner.release_slot()
+                    continue
+                _, careplan_id = result
+                runner.start(int(careplan_id))
+        finally:
+            # 优雅退出：不再出队，等在途的生成结束
+            self.stdout.write(f'等待 {runner.in_flight} 个在途任务结束...')
+            await runner.wait_idle()
+            await r.aclose()
@@ -1,70 +1,55 @@
 """
-手写 Worker：从 Redis 拉任务 → 调 LLM 生成 → 存数据库
-运行: python manage.py run_careplan_worker
+Redis 队列 Worker：批量可靠出队 → 一次认领整批 → 线程池 / 事件循环并发调 LLM 生成
+运行: python manage.py run_careplan_worker [--mode thread|async] [--concurrency 8] [--batch-size 16] [--drain]
+需配合 CAREPLAN_DISPATCH=redis（run_outbox_relay 把 id 推到 CAREPLAN_QUEUE_KEY）
+SIGINT / SIGTERM：不再出队，等在途生成结束后退出；已出队未开始的 id 放回队列
 """
-import redis
+import signal
+import threading
+
 from django.conf import settings
 from django.core.management.base import BaseCommand
-from careplan.models import CarePlan
-from careplan.llm_service import generate_careplan_with_llm
-
-
-def process_one_task(r):
-    """从 Redis 拉一个 careplan_id，处理完返回 True；无任务返回 False"""
-    # BLPOP 阻塞等待，timeout=5 秒便于 Ctrl+C 退出
-    result = r.blpop(settings.CAREPLAN_QUEUE_KEY, timeout=5)
-    if not result:
-        return False
-
-    _, careplan_id_str = result
-    careplan_id = int(careplan_id_str)
-
-    try:
-        careplan = CarePlan.objects.select_related('patient', 'provider').get(id=careplan_id)
-    except CarePlan.DoesNotExist:
-        return True  # 任务无效，跳过
-
-    if careplan.status != 'pending':
-        return True  # 已处理过，跳过
-
-    careplan.status = 'processing'
-    careplan.save()
 
-    try:
-        content = generate_careplan_with_llm(
-            patient=careplan.patient,
-            provider=careplan.provider,
-            primary_diagnosis=careplan.primary_diagnosis,
-            additional_diagnosis=careplan.additional_diagnosis or '',
-            medication_name=careplan.medication_name,
-            medication_history=careplan.medication_history or '',
-            patient_records=careplan.patient_records,
-        )
-        careplan.status = 'completed'
-        careplan.generated_content = content
-        careplan.save()
-    except Exception as e:
-        careplan.status = 'failed'
-        careplan.error_message = str(e)
-        careplan.save()
-
-    return True
+from careplan.worker import MODES, CarePlanWorker
 
 
 class Command(BaseCommand):
-    help = '从 Redis 队列拉任务，调 LLM 生成 Care Plan，存数据库'
+    help = '从 Redis 队列批量拉任务，并发调 LLM 生成 Care Plan，存数据库'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mode',
+            choices=MODES,
+            default=None,
+            help='thread：线程池；async：单个事件循环（默认 settings.CAREPLAN_WORKER_MODE）',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=None,
+            help='同时生成数上限（默认 settings.CAREPLAN_WORKER_CONCURRENCY）',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='每次最多出队 id 数（默认 settings.CAREPLAN_WORKER_BATCH_SIZE）',
+        )
+        parser.add_argument('--drain', action='store_true', help='处理完当前积压后退出')
 
     def handle(self, *args, **options):
-        r = redis.from_url(settings.REDIS_URL)
-        self.stdout.write('Worker 启动，等待任务... (Ctrl+C 退出)')
+        worker = CarePlanWorker(
+            mode=options['mode'] or settings.CAREPLAN_WORKER_MODE,
+            concurrency=options['concurrency'] or settings.CAREPLAN_WORKER_CONCURRENCY,
+            batch_size=options['batch_size'] or settings.CAREPLAN_WORKER_BATCH_SIZE,
+        )
+        stop = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop.set())
 
-        while True:
-            try:
-                processed = process_one_task(r)
-                if processed:
-                    self.stdout.write('处理完成一个任务')
-            except KeyboardInterrupt:
-                self.stdout.write('Worker 已退出')
-                break
-            except Exception as e:
-                self.stderr.write(f'处理出错: {e}')
+        self.stdout.write(
+            f'Worker {worker.owner} 启动，mode={worker.mode}，concurrency={worker.concurrency}，'
+            f'batch_size={worker.batch_size} (Ctrl+C 退出)'
+        )
+        worker.run(stop, drain=options['drain'])
+        self.stdout.write(f'Worker 已退出：完成 {worker.completed}，失败 {worker.failed}，跳过 {worker.skipped}')
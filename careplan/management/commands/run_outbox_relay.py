@@ -0,0 +1,69 @@
+"""
+Outbox relay：把 CarePlanOutbox 里的行批量投递到 broker（celery 或 redis 队列，按 CAREPLAN_DISPATCH）
+运行: python manage.py run_outbox_relay [--batch-size 500] [--interval 0.5] [--once]
+可多进程并行（SKIP LOCKED）；有积压时连续投递，取到不满一批时才 sleep
+每 BACKLOG_REPORT_INTERVAL 秒上报一次各 lane 在 outbox 里的积压
+"""
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from careplan import outbox, scheduling
+
+BACKLOG_REPORT_INTERVAL = 10
+
+
+class Command(BaseCommand):
+    help = '把 outbox 中待投递的 Care Plan 生成任务批量投递到 broker'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='每批投递行数（默认 settings.CAREPLAN_OUTBOX_BATCH_SIZE）',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=None,
+            help='没有积压时的轮询间隔秒数（默认 settings.CAREPLAN_OUTBOX_POLL_INTERVAL）',
+        )
+        parser.add_argument('--once', action='store_true', help='投递完当前积压后退出')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size'] or settings.CAREPLAN_OUTBOX_BATCH_SIZE
+        interval = options['interval'] if options['interval'] is not None else settings.CAREPLAN_OUTBOX_POLL_INTERVAL
+
+        if options['once']:
+            total = 0
+            while True:
+                published = outbox.relay_batch(batch_size)
+                total += published
+                if published < batch_size:
+                    break
+            self.stdout.write(f'已投递 {total} 条')
+            return
+
+        stop = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop.set())
+
+        self.stdout.write(f'Outbox relay 启动，batch_size={batch_size}，interval={interval}s (Ctrl+C 退出)')
+        last_report = 0.0
+        while not stop.is_set():
+            try:
+                if time.monotonic() - last_report >= BACKLOG_REPORT_INTERVAL:
+                    last_report = time.monotonic()
+                    scheduling.report_backlog()
+                published = outbox.relay_batch(batch_size)
+            except Exception as e:
+                # 数据库不可用等：稍后重试，行仍在 outbox 里
+                self.stderr.write(f'Relay 出错: {e}')
+                published = 0
+            if published < batch_size:
+                stop.wait(interval)
+        self.stdout.write('Outbox relay 已退出')
@@ -0,0 +1,73 @@
+# Generated manually for care plan search index
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+TRGM_INDEX_NAME = "careplan_search_document_trgm"
+
+
+def create_trigram_index(apps, schema_editor):
+    """pg_trgm GIN 索引只在 Postgres 上建，SQLite（测试）跳过"""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {TRGM_INDEX_NAME} "
+        "ON careplan_careplansearchdocument USING gin (document gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX IF EXISTS {TRGM_INDEX_NAME}")
+
+
+def backfill_search_documents(apps, schema_editor):
+    """为已有的 completed care plan 建检索文档（逻辑与 search_index.build_search_document 一致）"""
+    CarePlan = apps.get_model("careplan", "CarePlan")
+    CarePlanSearchDocument = apps.get_model("careplan", "CarePlanSearchDocument")
+    queryset = (
+        CarePlan.objects
+        .filter(status="completed")
+        .select_related("patient", "provider")
+        .order_by("id")
+    )
+    batch = []
+    for cp in queryset.iterator(chunk_size=1000):
+        document = " ".join(" ".join([
+            cp.patient.first_name,
+            cp.patient.last_name,
+            cp.patient.mrn,
+            cp.provider.name,
+            cp.provider.npi,
+            cp.medication_name,
+            cp.primary_diagnosis,
+        ]).lower().split())
+        batch.append(CarePlanSearchDocument(careplan_id=cp.id, document=document, created_at=cp.created_at))
+        if len(batch) >= 1000:
+            CarePlanSearchDocument.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        CarePlanSearchDocument.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("careplan", "0002_add_llm_provider"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CarePlanSearchDocument",
+            fields=[
+                ("careplan", models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name="search_document", serialize=False, to="careplan.careplan")),
+                ("document", models.TextField()),
+                ("created_at", models.DateTimeField(db_index=True)),
+            ],
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+    ]
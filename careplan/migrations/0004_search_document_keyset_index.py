@@ -0,0 +1,22 @@
+# Generated manually for keyset pagination on care plan search
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("careplan", "0003_careplansearchdocument"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="careplansearchdocument",
+            name="created_at",
+            field=models.DateTimeField(),
+        ),
+        migrations.AddIndex(
+            model_name="careplansearchdocument",
+            index=models.Index(fields=["created_at", "careplan"], name="careplan_search_created_idx"),
+        ),
+    ]
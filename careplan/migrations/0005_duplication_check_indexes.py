@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('careplan', '0004_search_document_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='careplan',
+            index=models.Index(fields=['patient', 'medication_name', 'created_at'], name='careplan_pt_med_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['first_name', 'last_name', 'dob'], name='patient_name_dob_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('careplan', '0005_duplication_check_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='careplan',
+            name='use_llm_cache',
+            field=models.BooleanField(default=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('careplan', '0006_careplan_use_llm_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarePlanOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('careplan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='careplan.careplan')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['available_at', 'id'], name='careplan_outbox_avail_idx')],
+            },
+        ),
+    ]
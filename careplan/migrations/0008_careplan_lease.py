@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('careplan', '0007_careplanoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='careplan',
+            name='claim_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='careplan',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='careplan',
+            name='lease_owner',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='careplan',
+            index=models.Index(fields=['status', 'lease_expires_at'], name='careplan_lease_idx'),
+        ),
+    ]
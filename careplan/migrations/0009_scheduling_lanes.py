@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('careplan', '0008_careplan_lease'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='careplanoutbox',
+            name='careplan_outbox_avail_idx',
+        ),
+        migrations.AddField(
+            model_name='careplan',
+            name='lane',
+            field=models.CharField(choices=[('interactive', 'Interactive'), ('bulk', 'Bulk')], default='interactive', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='careplan',
+            name='source',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='careplanoutbox',
+            name='lane',
+            field=models.CharField(default='interactive', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='careplanoutbox',
+            name='provider',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='careplanoutbox',
+            name='source',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='careplanoutbox',
+            index=models.Index(fields=['lane', 'available_at', 'id'], name='careplan_outbox_lane_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='careplanoutbox',
+            index=models.Index(fields=['lane', 'source', 'provider', 'available_at'], name='careplan_outbox_fair_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 """
 Patient字段:
@@ -12,6 +13,12 @@ class Patient(models.Model):
     dob = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # check_patient：姓名 + DOB 查重
+        indexes = [
+            models.Index(fields=['first_name', 'last_name', 'dob'], name='patient_name_dob_idx'),
+        ]
+
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.mrn})"
 
@@ -34,7 +41,8 @@ id(id 是 Django 自动帮加的字段，不用特地写出来。)
 patient (外键 → 指向 Patient.id)
 provider (外键 → 指向 Provider.id)
 primary_diagnosis; medication_name; medication_history; patient_records; status
-generated_content; error_message; created_at; updated_at
+generated_content; error_message; llm_provider; use_llm_cache; created_at; updated_at
+lease_owner; lease_expires_at; claim_count: processing 时的租约（谁在处理、何时过期、被认领过几次），见 careplan/leases.py
 """
 class CarePlan(models.Model):
     STATUS_CHOICES = [
@@ -43,6 +51,11 @@ class CarePlan(models.Model):
         ('completed', 'Completed'),
         ('failed', 'Failed'),
     ]
+    # 生成优先级（careplan/scheduling.py）：单条提交 interactive，批量接口 / 导入 bulk
+    LANE_CHOICES = [
+        ('interactive', 'Interactive'),
+        ('bulk', 'Bulk'),
+    ]
 
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE)
     provider = models.ForeignKey(Provider, on_delete=models.CASCADE)
@@ -55,8 +68,78 @@ class CarePlan(models.Model):
     generated_content = models.TextField(blank=True)
     error_message = models.TextField(blank=True)
     llm_provider = models.CharField(max_length=50, blank=True)  # openai/claude，空则用 settings
+    use_llm_cache = models.BooleanField(default=True)  # False 时跳过 LLM 结果缓存，强制重新生成
+    source = models.CharField(max_length=50, blank=True)  # intake 来源，如 webform / pharmacorp_portal
+    lane = models.CharField(max_length=20, choices=LANE_CHOICES, default='interactive')
+    lease_owner = models.CharField(max_length=100, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    claim_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # check_order：同一患者 + 同一药物 + created_at 范围查重
+        indexes = [
+            models.Index(fields=['patient', 'medication_name', 'created_at'], name='careplan_pt_med_created_idx'),
+            # reaper：status='processing' 且租约已过期
+            models.Index(fields=['status', 'lease_expires_at'], name='careplan_lease_idx'),
+        ]
+
     def __str__(self):
         return f"CarePlan for {self.patient} - {self.medication_name} ({self.status})"
+
+
+"""
+CarePlanSearchDocument字段:
+careplan (一对一 → 指向 CarePlan.id，同时作为主键)
+document: 小写拼接的检索文本（患者姓名、MRN、provider、NPI、药物、诊断）
+created_at: 冗余 careplan.created_at，排序时不用 join
+只为 completed 的 care plan 建文档；Postgres 上 document 有 pg_trgm GIN 索引（见 0003 migration）
+(created_at, careplan) 组合索引支撑 keyset 分页
+"""
+class CarePlanSearchDocument(models.Model):
+    careplan = models.OneToOneField(
+        CarePlan,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_document',
+    )
+    document = models.TextField()
+    created_at = models.DateTimeField()
+
+    class Meta:
+        # keyset 分页按 (created_at, id) 翻页
+        indexes = [
+            models.Index(fields=['created_at', 'careplan'], name='careplan_search_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"SearchDocument for CarePlan {self.careplan_id}"
+
+
+"""
+CarePlanOutbox字段（transactional outbox，见 careplan/outbox.py）:
+careplan (外键 → 指向 CarePlan.id)：与 CarePlan 在同一事务中写入，待投递的生成任务
+created_at; available_at(此时间之后才可投递，失败退避用); attempts(投递失败次数); last_error
+lane / source / provider：冗余 CarePlan 的 lane、来源与实际 LLM provider，relay 按 lane 优先级与来源公平投递
+run_outbox_relay 投递成功后删除该行
+"""
+class CarePlanOutbox(models.Model):
+    careplan = models.ForeignKey(CarePlan, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    lane = models.CharField(max_length=20, default='interactive')
+    source = models.CharField(max_length=50, blank=True)
+    provider = models.CharField(max_length=50, blank=True)
+
+    class Meta:
+        # relay 按 lane 取到期的行：interactive 按 available_at、id 顺序，bulk 再按 (source, provider) 分组
+        indexes = [
+            models.Index(fields=['lane', 'available_at', 'id'], name='careplan_outbox_lane_idx'),
+            models.Index(fields=['lane', 'source', 'provider', 'available_at'], name='careplan_outbox_fair_idx'),
+        ]
+
+    def __str__(self):
+        return f"Outbox CarePlan {self.careplan_id} (attempts={self.attempts})"
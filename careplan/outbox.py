@@ -0,0 +1,105 @@
+"""
+Transactional outbox：生成任务的投递与请求解耦
+- create_careplan / create_careplans_bulk 在创建 CarePlan 的同一事务里写 CarePlanOutbox（add），请求路径不碰 broker；
+  事务回滚则两者都不存在，提交则一定有待投递的行，broker 故障不会丢单
+- run_outbox_relay 进程循环调用 relay_batch：批量取出到期的行，按 CAREPLAN_DISPATCH 投递（celery：同一 producer
+  连接上逐个 generate_careplan_task；redis：一次 RPUSH），成功后删除
+- 至少一次：投递成功但删除前崩溃会重复投递；generate_careplan_task / worker 只处理 pending，重复消息无副作用
+- 多个 relay 并行：Postgres 上 SELECT ... FOR UPDATE SKIP LOCKED，互不重复取同一行
+- 投递失败：整批 attempts + 1，available_at 按 2^attempts 秒（上限 CAREPLAN_OUTBOX_MAX_BACKOFF）推迟
+- lane（careplan/scheduling.py）：每批先取 interactive，剩余名额在 bulk 背压允许的范围内按来源 / provider 公平取，
+  各 lane 投递到自己的队列
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import scheduling
+from .models import CarePlanOutbox
+from .queue import enqueue_careplans
+from .statsd_metrics import outbox_lag_seconds, outbox_publish_failure, outbox_published
+from .tasks import generate_careplan_task
+
+logger = logging.getLogger(__name__)
+
+
+def add(careplans) -> None:
+    """写入待投递的行（lane / source / provider 取自 CarePlan）；须在创建这些 CarePlan 的事务内调用"""
+    CarePlanOutbox.objects.bulk_create([
+        CarePlanOutbox(
+            careplan_id=careplan.id,
+            lane=careplan.lane,
+            source=careplan.source,
+            provider=careplan.llm_provider or settings.LLM_PROVIDER,
+        )
+        for careplan in careplans
+    ])
+
+
+def publish(careplan_ids, lane: str = scheduling.INTERACTIVE) -> None:
+    """按 CAREPLAN_DISPATCH 把一批 careplan_id 投递到 lane 的队列（失败时抛出 broker 的异常）"""
+    if getattr(settings, 'CAREPLAN_DISPATCH', 'celery') == 'redis':
+        enqueue_careplans(careplan_ids, lane=lane)
+        return
+    queue = scheduling.queue_name(lane)
+    with generate_careplan_task.app.producer_or_acquire() as producer:
+        for careplan_id in careplan_ids:
+            generate_careplan_task.apply_async((careplan_id,), producer=producer, queue=queue)
+
+
+def _backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=min(2 ** attempts, settings.CAREPLAN_OUTBOX_MAX_BACKOFF))
+
+
+def relay_batch(batch_size: int | None = None) -> int:
+    """
+    投递一批到期的 outbox 行，返回成功投递的条数（没有到期的行或投递失败时为 0）
+    行锁持有到投递完成：其他 relay 跳过这些行，本事务回滚（进程崩溃）时行仍在，下次重试
+    """
+    batch_size = batch_size or settings.CAREPLAN_OUTBOX_BATCH_SIZE
+    now = timezone.now()
+    due = (
+        CarePlanOutbox.objects
+        .filter(available_at__lte=now)
+        .only('id', 'careplan_id', 'created_at', 'attempts', 'lane')
+    )
+    with transaction.atomic():
+        rows = list(
+            due.select_for_update(skip_locked=True)
+            .filter(lane=scheduling.INTERACTIVE)
+            .order_by('available_at', 'id')[:batch_size]
+        )
+        if len(rows) < batch_size:
+            room = scheduling.bulk_capacity(batch_size - len(rows))
+            rows.extend(scheduling.fair_pick(due.filter(lane=scheduling.BULK), room))
+        if not rows:
+            return 0
+        row_ids = [row.id for row in rows]
+        try:
+            for lane in scheduling.LANES:
+                careplan_ids = [row.careplan_id for row in rows if row.lane == lane]
+                if careplan_ids:
+                    publish(careplan_ids, lane)
+        except Exception as e:
+            attempts = max(row.attempts for row in rows) + 1
+            CarePlanOutbox.objects.filter(id__in=row_ids).update(
+                attempts=F('attempts') + 1,
+                available_at=now + _backoff(attempts),
+                last_error=str(e)[:1000],
+            )
+            outbox_publish_failure()
+            logger.warning("Outbox publish failed for %d careplans (attempt %d): %s", len(rows), attempts, e)
+            return 0
+        CarePlanOutbox.objects.filter(id__in=row_ids).delete()
+
+    outbox_published(len(rows))
+    outbox_lag_seconds((now - min(row.created_at for row in rows)).total_seconds())
+    return len(rows)
+
+
+def pending_count() -> int:
+    return CarePlanOutbox.objects.count()
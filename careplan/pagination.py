@@ -0,0 +1,93 @@
+"""
+Keyset（cursor）分页：按 (rank, created_at, id) 倒序翻页
+不用 OFFSET，每一页都是从上一页最后一行往后走索引，翻到多深代价都一样
+cursor 对客户端是不透明字符串（base64 编码的 JSON）
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+from pharmacy_plan.exceptions import ValidationError
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(row) -> str:
+    """row 为 CarePlanSearchDocument；有 rank 注解时一并编码"""
+    payload = {"c": row.created_at.isoformat(), "i": row.careplan_id}
+    rank = getattr(row, "rank", None)
+    if rank is not None:
+        payload["r"] = rank
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> dict:
+    """解析 cursor，格式不对时抛出 ValidationError"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        cursor = {
+            "created_at": datetime.fromisoformat(payload["c"]),
+            "id": int(payload["i"]),
+        }
+        if "r" in payload:
+            cursor["rank"] = int(payload["r"])
+        return cursor
+    except (ValueError, TypeError, KeyError, UnicodeError, json.JSONDecodeError):
+        raise ValidationError(
+            message="Invalid cursor",
+            code="INVALID_CURSOR",
+            detail={"cursor": token},
+        )
+
+
+def parse_page_size(value) -> int:
+    """page_size 为空用默认值；超出范围截断到 [1, MAX_PAGE_SIZE]"""
+    if value in (None, ""):
+        return DEFAULT_PAGE_SIZE
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        raise ValidationError(
+            message="page_size 必须为整数",
+            code="INVALID_PAGE_SIZE",
+            detail={"page_size": value},
+        )
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def _after_cursor(cursor: dict) -> Q:
+    """排序为 (-rank, -created_at, -id)，取严格在 cursor 之后的行"""
+    after = Q(created_at__lt=cursor["created_at"]) | Q(
+        created_at=cursor["created_at"], careplan_id__lt=cursor["id"]
+    )
+    if "rank" in cursor:
+        after = Q(rank__lt=cursor["rank"]) | (Q(rank=cursor["rank"]) & after)
+    return after
+
+
+def paginate(queryset, cursor: str | None = None, page_size: int = DEFAULT_PAGE_SIZE):
+    """
+    对 search_index.search_documents 返回的 queryset 取一页
+    返回 (rows, next_cursor)；没有下一页时 next_cursor 为 None
+    """
+    if cursor:
+        decoded = decode_cursor(cursor)
+        # cursor 必须来自同一种查询（有 q 带 rank，无 q 不带）
+        if ("rank" in decoded) != ("rank" in queryset.query.annotations):
+            raise ValidationError(
+                message="Invalid cursor",
+                code="INVALID_CURSOR",
+                detail={"cursor": cursor},
+            )
+        queryset = queryset.filter(_after_cursor(decoded))
+    # 多取一行判断是否还有下一页
+    rows = list(queryset[:page_size + 1])
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
@@ -0,0 +1,110 @@
+"""
+Redis 队列：CAREPLAN_DISPATCH=redis 时 outbox relay 把 careplan_id 推到 CAREPLAN_QUEUE_KEY，
+由 run_careplan_worker / run_careplan_async_worker 消费（默认 celery，不走这里）
+可靠出队（run_careplan_worker）：id 原子地从队列移到该 worker 的 processing 列表，处理完才 ack 删除；
+worker 定期刷新心跳 key，心跳过期的 processing 列表由 recover_orphans 放回队列
+优先级 lane（careplan/scheduling.py）：interactive 用 CAREPLAN_QUEUE_KEY，bulk 用 CAREPLAN_QUEUE_KEY:bulk，
+出队总是先取 interactive
+"""
+import redis
+from django.conf import settings
+
+_client = None
+
+
+def get_redis():
+    """进程内复用的 Redis client（redis-py 连接池自带 fork 检测）"""
+    global _client
+    if _client is None:
+        _client = redis.from_url(settings.REDIS_URL)
+    return _client
+
+
+def enqueue_careplan(careplan_id: int) -> None:
+    get_redis().rpush(settings.CAREPLAN_QUEUE_KEY, careplan_id)
+
+
+def lane_key(lane: str) -> str:
+    if lane == 'interactive':
+        return settings.CAREPLAN_QUEUE_KEY
+    return f"{settings.CAREPLAN_QUEUE_KEY}:{lane}"
+
+
+def lane_keys() -> list[str]:
+    """按优先级排列的队列 key"""
+    return [lane_key('interactive'), lane_key('bulk')]
+
+
+def enqueue_careplans(careplan_ids, lane: str = 'interactive') -> None:
+    """批量接入：一次 RPUSH 推入整批 id"""
+    if careplan_ids:
+        get_redis().rpush(lane_key(lane), *careplan_ids)
+
+
+def processing_key(owner: str) -> str:
+    return f"{settings.CAREPLAN_QUEUE_KEY}:processing:{owner}"
+
+
+def heartbeat_key(owner: str) -> str:
+    return f"{settings.CAREPLAN_QUEUE_KEY}:worker:{owner}"
+
+
+def _move(r, queue_key: str, processing: str, count: int) -> list:
+    pipe = r.pipeline(transaction=False)
+    for _ in range(count):
+        pipe.lmove(queue_key, processing, "LEFT", "RIGHT")
+    return [value for value in pipe.execute() if value is not None]
+
+
+def reserve(r, processing: str, count: int, timeout: float) -> list[int]:
+    """
+    可靠出队最多 count 个 id：先在 pipeline 里按 lane 优先级 LMOVE，interactive 不够再取 bulk；
+    两个队列都空时 BLMOVE 等 interactive（最多 timeout 秒，期间到达的 bulk 下一轮取）
+    每个 id 任何时刻都只在队列或 processing 列表之一里
+    """
+    ids = []
+    for queue_key in lane_keys():
+        ids.extend(_move(r, queue_key, processing, count - len(ids)))
+        if len(ids) >= count:
+            break
+    if not ids:
+        first = r.blmove(lane_key('interactive'), processing, timeout, "LEFT", "RIGHT")
+        if first is not None:
+            ids.append(first)
+    return [int(value) for value in ids]
+
+
+def ack(r, processing: str, careplan_ids) -> None:
+    """处理完（或无需处理）的 id 从 processing 列表删除，重复出现的 id 每次删一个"""
+    if not careplan_ids:
+        return
+    pipe = r.pipeline(transaction=False)
+    for careplan_id in careplan_ids:
+        pipe.lrem(processing, 1, careplan_id)
+    pipe.execute()
+
+
+def requeue_processing(r, processing: str) -> int:
+    """processing 列表里的 id 按原顺序放回 interactive 队列头（已经排过一次队），返回条数"""
+    count = r.llen(processing)
+    if not count:
+        return 0
+    pipe = r.pipeline(transaction=False)
+    for _ in range(count):
+        pipe.lmove(processing, settings.CAREPLAN_QUEUE_KEY, "RIGHT", "LEFT")
+    return sum(1 for value in pipe.execute() if value is not None)
+
+
+def heartbeat(r, owner: str, ttl: int) -> None:
+    r.set(heartbeat_key(owner), 1, ex=ttl)
+
+
+def recover_orphans(r) -> int:
+    """心跳已过期（worker 崩溃）的 processing 列表放回队列，返回放回的 id 数"""
+    prefix = processing_key("")
+    recovered = 0
+    for key in r.scan_iter(match=f"{prefix}*"):
+        key = key.decode() if isinstance(key, bytes) else key
+        if not r.exists(heartbeat_key(key[len(prefix):])):
+            recovered += requeue_processing(r, key)
+    return recovered
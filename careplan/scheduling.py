@@ -0,0 +1,127 @@
+"""
+生成调度：优先级 lane + 按来源 / LLM provider 加权公平投递
+- lane：interactive（单条提交，create_careplan）| bulk（批量接口、NDJSON 导入，create_careplans_bulk）
+  两个 lane 各用一个 broker 队列（celery：CAREPLAN_LANE_QUEUES；redis：queue.lane_key），
+  interactive 有专用 worker，批量积压不会排在单条提交前面
+- bulk 背压：relay 只在 broker 里 bulk 队列深度低于 CAREPLAN_BULK_MAX_DEPTH 时补投，其余留在 outbox
+- 公平：补投时按 (source, provider) 分组，名额按 CAREPLAN_SOURCE_WEIGHTS × CAREPLAN_PROVIDER_WEIGHTS 分配，
+  再按虚拟完成时间交错排列；一家合作方的夜间大批量只占它那份，其他来源后提交的单子很快排到
+- 指标：各 lane 在 broker / outbox 的积压（gauge），提交到开始生成、提交到完成的时间（按 lane，看 p95 SLO）
+"""
+import math
+
+from django.conf import settings
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from . import queue
+from .models import CarePlanOutbox
+from .statsd_metrics import lane_backlog, lane_depth, lane_submit_to_complete_seconds, lane_wait_seconds
+
+INTERACTIVE = 'interactive'
+BULK = 'bulk'
+LANES = (INTERACTIVE, BULK)
+
+
+def queue_name(lane: str) -> str:
+    """lane 对应的 celery 队列"""
+    return settings.CAREPLAN_LANE_QUEUES[lane]
+
+
+def _broker_key(lane: str) -> str:
+    # celery 的 redis broker 以队列名为 list key
+    if getattr(settings, 'CAREPLAN_DISPATCH', 'celery') == 'redis':
+        return queue.lane_key(lane)
+    return queue_name(lane)
+
+
+def broker_depths() -> dict[str, int]:
+    """各 lane 在 broker 里排队的消息数（一次 pipeline）"""
+    pipe = queue.get_redis().pipeline(transaction=False)
+    for lane in LANES:
+        pipe.llen(_broker_key(lane))
+    depths = dict(zip(LANES, pipe.execute()))
+    for lane, depth in depths.items():
+        lane_depth(lane, depth)
+    return depths
+
+
+def bulk_capacity(limit: int) -> int:
+    """本批最多还能投递多少 bulk 行；CAREPLAN_BULK_MAX_DEPTH=0 时不限（不查 broker）"""
+    max_depth = settings.CAREPLAN_BULK_MAX_DEPTH
+    if not max_depth:
+        return limit
+    return max(0, min(limit, max_depth - broker_depths()[BULK]))
+
+
+def weight(source: str, provider: str) -> float:
+    """(source, provider) 组的权重，未配置的来源 / provider 为 1"""
+    return settings.CAREPLAN_SOURCE_WEIGHTS.get(source, 1) * settings.CAREPLAN_PROVIDER_WEIGHTS.get(provider, 1)
+
+
+def shares(weights: dict, n: int) -> dict:
+    """n 个名额按权重分给各组（最大余数法）；余数相同时先给 weights 中靠前（等得最久）的组"""
+    total = sum(weights.values())
+    if not total or n <= 0:
+        return {key: 0 for key in weights}
+    exact = {key: n * w / total for key, w in weights.items()}
+    result = {key: math.floor(value) for key, value in exact.items()}
+    rest = n - sum(result.values())
+    by_remainder = sorted(weights, key=lambda key: exact[key] - result[key], reverse=True)
+    for key in by_remainder[:rest]:
+        result[key] += 1
+    return result
+
+
+def interleave(groups: dict, weights: dict) -> list:
+    """各组的行按虚拟完成时间 (i + 1) / weight 合并：broker 队列先进先出，投递顺序即生成顺序"""
+    order = {key: index for index, key in enumerate(groups)}
+    tagged = [
+        ((i + 1) / weights[key], order[key], row)
+        for key, rows in groups.items()
+        for i, row in enumerate(rows)
+    ]
+    tagged.sort(key=lambda item: item[:2])
+    return [row for _, _, row in tagged]
+
+
+def fair_pick(due, n: int) -> list:
+    """
+    从 due（bulk lane 到期的 outbox 行）里按 (source, provider) 加权公平取最多 n 行并交错排列
+    每组一条 SKIP LOCKED 查询，组内按 available_at、id 先进先出
+    """
+    if n <= 0:
+        return []
+    keys = [
+        (source, provider)
+        for source, provider, _ in (
+            due.values_list('source', 'provider').annotate(oldest=Min('available_at')).order_by('oldest')
+        )
+    ]
+    weights = {key: weight(*key) for key in keys}
+    groups = {}
+    for (source, provider), quota in shares(weights, n).items():
+        if quota:
+            groups[(source, provider)] = list(
+                due.select_for_update(skip_locked=True)
+                .filter(source=source, provider=provider)
+                .order_by('available_at', 'id')[:quota]
+            )
+    return interleave(groups, weights)
+
+
+def report_backlog() -> None:
+    """各 lane 还在 outbox 里（未投递到 broker）的行数"""
+    counts = dict(CarePlanOutbox.objects.values_list('lane').annotate(count=Count('id')).order_by())
+    for lane in LANES:
+        lane_backlog(lane, counts.get(lane, 0))
+
+
+def record_started(careplan) -> None:
+    """开始生成：提交到开始的排队时间"""
+    lane_wait_seconds(careplan.lane, (timezone.now() - careplan.created_at).total_seconds())
+
+
+def record_finished(careplan) -> None:
+    """生成结束（completed / 最终 failed）：提交到完成的时间"""
+    lane_submit_to_complete_seconds(careplan.lane, (timezone.now() - careplan.created_at).total_seconds())
@@ -0,0 +1,93 @@
+"""
+Care plan 搜索索引：每个 completed care plan 一条反范式化的检索文档
+- 写入：CarePlan 保存为 completed 时（generate_careplan_task 完成时）由 post_save 同步
+- 查询：document 上的子串匹配；Postgres 走 pg_trgm GIN 索引，SQLite（测试）退化为 LIKE
+- 排序：词首命中优先，其次按 created_at 倒序
+"""
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from .models import CarePlan, CarePlanSearchDocument
+
+# 词首命中（如 "metf" 命中 "metformin"）排在词中命中（如 "form"）之前
+RANK_WORD_PREFIX = 2
+RANK_SUBSTRING = 1
+
+
+def normalize_query(q) -> str:
+    """查询词与文档同样规范化：小写、合并空白"""
+    return " ".join(str(q or "").lower().split())
+
+
+def build_search_document(careplan) -> str:
+    """拼接检索文本，字段顺序固定，便于 "john doe" 这类跨字段查询命中"""
+    patient = careplan.patient
+    provider = careplan.provider
+    return normalize_query(" ".join([
+        patient.first_name,
+        patient.last_name,
+        patient.mrn,
+        provider.name,
+        provider.npi,
+        careplan.medication_name,
+        careplan.primary_diagnosis,
+    ]))
+
+
+def index_careplan(careplan) -> None:
+    """为 completed care plan 写入/更新检索文档；其他状态不建文档"""
+    if careplan.status != 'completed':
+        return
+    CarePlanSearchDocument.objects.update_or_create(
+        careplan_id=careplan.id,
+        defaults={
+            'document': build_search_document(careplan),
+            'created_at': careplan.created_at,
+        },
+    )
+
+
+def on_careplan_saved(sender, instance, **kwargs):
+    """post_save 回调（在 CareplanConfig.ready 中注册）"""
+    if kwargs.get('raw'):
+        return
+    index_careplan(instance)
+
+
+def search_documents(q):
+    """
+    返回匹配的 CarePlanSearchDocument queryset（已排序）
+    q 为空时返回全部文档，按 created_at 倒序
+    """
+    queryset = CarePlanSearchDocument.objects.all()
+    term = normalize_query(q)
+    if not term:
+        return queryset.order_by('-created_at', '-careplan_id')
+
+    return (
+        queryset
+        .filter(document__contains=term)
+        .annotate(rank=Case(
+            When(
+                Q(document__startswith=term) | Q(document__contains=f" {term}"),
+                then=Value(RANK_WORD_PREFIX),
+            ),
+            default=Value(RANK_SUBSTRING),
+            output_field=IntegerField(),
+        ))
+        .order_by('-rank', '-created_at', '-careplan_id')
+    )
+
+
+def rebuild_search_index(batch_size=1000) -> int:
+    """全量重建（数据修复用），返回写入的文档数"""
+    count = 0
+    queryset = (
+        CarePlan.objects
+        .filter(status='completed')
+        .select_related('patient', 'provider')
+        .order_by('id')
+    )
+    for careplan in queryset.iterator(chunk_size=batch_size):
+        index_careplan(careplan)
+        count += 1
+    return count
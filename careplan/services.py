@@ -3,66 +3,104 @@
 """
 from datetime import datetime
 import csv
-from django.db.models import Q
-from django.http import HttpResponse
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, TextField, Value, When
+from django.http import StreamingHttpResponse
 
-from pharmacy_plan.exceptions import BlockError
+from pharmacy_plan.exception_handler import record_exception_metric
+from pharmacy_plan.exceptions import BaseAppException, BlockError
 
+from . import outbox, scheduling
+from .intake.types import InternalOrder
 from .metrics import CAREPLAN_SUBMITTED
 from .models import Patient, Provider, CarePlan
-from .tasks import generate_careplan_task
-from .duplication_detection import check_provider, check_patient, check_order
+from .duplication_detection import check_duplicates, check_duplicates_bulk
+from .pagination import DEFAULT_PAGE_SIZE, paginate
+from .search_index import search_documents
+from .status_events import cache_status_if_missing, get_cached_status
 
 
-def create_careplan(data):
+def _create_or_get(model, defaults, **lookup):
     """
-    创建 CarePlan，投递 Celery 任务，返回提交结果
-    先执行重复检测，通过后再创建
+    重复检测已确认不存在 → 直接 INSERT，省掉 get_or_create 的那次 SELECT
+    并发下被其他请求抢先插入（唯一键冲突）时回退为 get
     """
-    confirm = data.get('confirm') is True
+    try:
+        with transaction.atomic():
+            return model.objects.create(**lookup, **defaults)
+    except IntegrityError:
+        return model.objects.get(**lookup)
 
-    provider = check_provider(data['provider_npi'], data['provider_name'])
-    if provider is None:
-        provider, _ = Provider.objects.get_or_create(
-            npi=data['provider_npi'],
-            defaults={'name': data['provider_name']}
-        )
 
-    patient = check_patient(
-        data['patient_mrn'],
-        data['patient_first_name'],
-        data['patient_last_name'],
-        data['patient_dob'],
-        confirm=confirm
-    )
-    if patient is None:
-        patient, _ = Patient.objects.get_or_create(
-            mrn=data['patient_mrn'],
-            defaults={
-                'first_name': data['patient_first_name'],
-                'last_name': data['patient_last_name'],
-                'dob': datetime.strptime(data['patient_dob'], '%Y-%m-%d').date()
-            }
-        )
+def _as_order(data):
+    """create_careplan 入参：InternalOrder（Adapter 产出），或旧的 dict 格式"""
+    if isinstance(data, InternalOrder):
+        return data
+    return InternalOrder.from_create_careplan_dict(data)
 
-    check_order(patient, data['medication_name'], confirm=confirm)
 
-    careplan = CarePlan.objects.create(
+def _new_careplan(order, patient, provider, lane):
+    c = order.careplan
+    return CarePlan(
         patient=patient,
         provider=provider,
-        primary_diagnosis=data['primary_diagnosis'],
-        additional_diagnosis=data.get('additional_diagnosis', ''),
-        medication_name=data['medication_name'],
-        medication_history=data.get('medication_history', ''),
-        patient_records=data['patient_records'],
+        primary_diagnosis=c.primary_diagnosis,
+        additional_diagnosis=c.additional_diagnosis,
+        medication_name=c.medication_name,
+        medication_history=c.medication_history,
+        patient_records=c.patient_records,
         status='pending',
-        llm_provider=data.get('llm_provider', ''),
+        llm_provider=order.llm_provider,
+        use_llm_cache=order.use_llm_cache,
+        source=order.source or "unknown",
+        lane=lane,
     )
 
-    generate_careplan_task.delay(careplan.id)
 
-    source = data.get("source", "unknown")
-    CAREPLAN_SUBMITTED.labels(source=source).inc()
+def create_careplan(order):
+    """
+    创建 CarePlan，返回提交结果
+    order 为 InternalOrder（也接受旧的 dict 格式）
+    先执行重复检测（check_duplicates 两次查询完成全部检查），通过后再创建
+    CarePlan 与 outbox 行在同一事务里写入，由 run_outbox_relay 投递生成任务，请求不等 broker
+    单条提交走 interactive lane，优先于批量积压生成
+    """
+    order = _as_order(order)
+    pt, pr = order.patient, order.provider
+
+    provider, patient = check_duplicates(
+        npi=pr.npi,
+        provider_name=pr.name,
+        mrn=pt.mrn,
+        first_name=pt.first_name,
+        last_name=pt.last_name,
+        dob=pt.dob,
+        medication_name=order.careplan.medication_name,
+        confirm=order.confirm,
+    )
+    with transaction.atomic():
+        if provider is None:
+            provider = _create_or_get(
+                Provider,
+                defaults={'name': pr.name},
+                npi=pr.npi,
+            )
+        if patient is None:
+            patient = _create_or_get(
+                Patient,
+                defaults={
+                    'first_name': pt.first_name,
+                    'last_name': pt.last_name,
+                    'dob': datetime.strptime(pt.dob, '%Y-%m-%d').date()
+                },
+                mrn=pt.mrn,
+            )
+
+        careplan = _new_careplan(order, patient, provider, scheduling.INTERACTIVE)
+        careplan.save(force_insert=True)
+        outbox.add([careplan])
+
+    CAREPLAN_SUBMITTED.labels(source=order.source or "unknown").inc()
 
     return {
         "success": True,
@@ -74,6 +112,85 @@ def create_careplan(data):
     }
 
 
+def create_careplans_bulk(entries):
+    """
+    批量创建：entries 为 InternalOrder（也接受旧的 dict 格式），或该条校验失败的 BaseAppException
+    重复检测整批集合式查询，新 Provider / Patient / CarePlan / outbox 行各一次 bulk_create
+    返回每条的结果（顺序与输入一致）；单条失败不影响其他条
+    走 bulk lane：按来源公平投递，不挤占单条提交
+    """
+    results = [None] * len(entries)
+    valid = []
+    for index, entry in enumerate(entries):
+        if isinstance(entry, BaseAppException):
+            results[index] = entry
+        else:
+            valid.append((index, _as_order(entry)))
+
+    with transaction.atomic():
+        errors, providers, patients = check_duplicates_bulk([order for _, order in valid])
+        accepted = []
+        for (index, order), error in zip(valid, errors):
+            if error is None:
+                accepted.append((index, order))
+            else:
+                results[index] = error
+
+        # 并发下被其他请求抢先插入的行忽略冲突，统一回查取 id
+        new_providers = {}
+        new_patients = {}
+        for _, order in accepted:
+            pr, pt = order.provider, order.patient
+            if pr.npi not in providers and pr.npi not in new_providers:
+                new_providers[pr.npi] = Provider(npi=pr.npi, name=pr.name)
+            if pt.mrn not in patients and pt.mrn not in new_patients:
+                new_patients[pt.mrn] = Patient(
+                    mrn=pt.mrn,
+                    first_name=pt.first_name,
+                    last_name=pt.last_name,
+                    dob=datetime.strptime(pt.dob, '%Y-%m-%d').date(),
+                )
+        if new_providers:
+            Provider.objects.bulk_create(new_providers.values(), ignore_conflicts=True)
+            providers.update((p.npi, p) for p in Provider.objects.filter(npi__in=list(new_providers)))
+        if new_patients:
+            Patient.objects.bulk_create(new_patients.values(), ignore_conflicts=True)
+            patients.update((p.mrn, p) for p in Patient.objects.filter(mrn__in=list(new_patients)))
+
+        careplans = CarePlan.objects.bulk_create([
+            _new_careplan(order, patients[order.patient.mrn], providers[order.provider.npi], scheduling.BULK)
+            for _, order in accepted
+        ])
+        for (index, _), careplan in zip(accepted, careplans):
+            results[index] = careplan
+        outbox.add(careplans)
+
+    submitted = {}
+    for _, order in accepted:
+        source = order.source or "unknown"
+        submitted[source] = submitted.get(source, 0) + 1
+    for source, count in submitted.items():
+        CAREPLAN_SUBMITTED.labels(source=source).inc(count)
+
+    items = []
+    for index, result in enumerate(results):
+        if isinstance(result, BaseAppException):
+            record_exception_metric(result)
+            items.append({"index": index, **result.to_dict()})
+        else:
+            items.append({"index": index, "success": True, "careplan_id": result.id, "status": result.status})
+
+    return {
+        "success": True,
+        "data": {
+            "total": len(entries),
+            "accepted": len(careplans),
+            "rejected": len(entries) - len(careplans),
+            "results": items,
+        },
+    }
+
+
 def get_careplan_detail(careplan_id):
     """
     获取单个 care plan 详情（仅 completed 有内容）
@@ -115,25 +232,83 @@ def get_careplan_detail(careplan_id):
 def get_careplan_status(careplan_id):
     """
     获取 care plan 状态（供轮询）
+    先查 Redis 状态缓存（worker 每次状态变化时写入）：pending / processing / failed 命中时不查 DB
+    未命中或 completed 时只 SELECT 状态相关的列，generated_content 仅在 completed 时取出
     """
-    try:
-        careplan = CarePlan.objects.get(id=careplan_id)
-    except CarePlan.DoesNotExist:
-        raise BlockError(
-            message="Care plan not found",
-            code="NOT_FOUND",
-            http_status=404,
+    snapshot = get_cached_status(careplan_id)
+    if snapshot is None or snapshot["status"] == "completed":
+        row = (
+            CarePlan.objects
+            .filter(id=careplan_id)
+            .annotate(content=Case(When(status="completed", then=F("generated_content")), default=Value(""), output_field=TextField()))
+            .values("status", "error_message", "content")
+            .first()
         )
+        if row is None:
+            raise BlockError(
+                message="Care plan not found",
+                code="NOT_FOUND",
+                http_status=404,
+            )
+        snapshot = {"status": row["status"]}
+        if row["status"] == "failed":
+            snapshot["error"] = row["error_message"]
+        cache_status_if_missing(careplan_id, snapshot)
+        if row["status"] == "completed":
+            snapshot = {"status": "completed", "content": row["content"]}
 
-    data = {"success": True, "data": {"status": careplan.status}}
-    if careplan.status == "completed":
-        data["data"]["content"] = careplan.generated_content
-    elif careplan.status == "failed":
-        data["data"]["error"] = careplan.error_message or "Generation failed"
+    data = {"success": True, "data": {"status": snapshot["status"]}}
+    if snapshot["status"] == "completed":
+        data["data"]["content"] = snapshot["content"]
+    elif snapshot["status"] == "failed":
+        data["data"]["error"] = snapshot.get("error") or "Generation failed"
 
     return data
 
 
+# 导出 CSV 的列：表头与 values_list 字段一一对应
+_EXPORT_COLUMNS = [
+    ('patient_mrn', 'careplan__patient__mrn'),
+    ('patient_first_name', 'careplan__patient__first_name'),
+    ('patient_last_name', 'careplan__patient__last_name'),
+    ('patient_dob', 'careplan__patient__dob'),
+    ('provider_name', 'careplan__provider__name'),
+    ('provider_npi', 'careplan__provider__npi'),
+    ('medication_name', 'careplan__medication_name'),
+    ('primary_diagnosis', 'careplan__primary_diagnosis'),
+    ('careplan_created_at', 'careplan__created_at'),
+]
+EXPORT_CHUNK_SIZE = 2000
+
+
+class _Echo:
+    """csv.writer 的伪文件：writerow 直接返回这一行文本，不做缓冲"""
+
+    def write(self, value):
+        return value
+
+
+def _iter_export_rows(documents):
+    """逐行产出 CSV 文本；只取需要的列，按 chunk 从服务端游标读取，内存不随行数增长"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow([header for header, _ in _EXPORT_COLUMNS] + ['duplication_warning'])
+    rows = documents.values_list(*[field for _, field in _EXPORT_COLUMNS])
+    for mrn, first_name, last_name, dob, provider_name, npi, medication, diagnosis, created_at in rows.iterator(
+        chunk_size=EXPORT_CHUNK_SIZE
+    ):
+        yield writer.writerow([
+            mrn, first_name, last_name, dob.isoformat(),
+            provider_name, npi, medication, diagnosis,
+            created_at.isoformat(), '',
+        ])
+
+
+def _export_careplans_csv(documents):
+    response = StreamingHttpResponse(_iter_export_rows(documents), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = 'attachment; filename="careplans_report.csv"'
+    return response
+
+
 def get_careplan_download(careplan_id):
     """
     获取 care plan 下载内容
@@ -159,49 +334,22 @@ def get_careplan_download(careplan_id):
     return careplan.generated_content, filename
 
 
-def search_careplans(q, export=False):
+def search_careplans(q, export=False, cursor=None, page_size=DEFAULT_PAGE_SIZE):
     """
-    搜索 care plans
-    export=False: 返回 list of dicts
-    export=True: 返回 HttpResponse (CSV)
+    搜索 care plans（走 search_index 的检索文档，按相关度排序）
+    export=False: 返回一页结果 + next cursor（keyset 分页）
+    export=True: 返回 StreamingHttpResponse (CSV)，不分页
     """
-    queryset = (
-        CarePlan.objects
-        .filter(status='completed')
-        .select_related('patient', 'provider')
-        .order_by('-created_at')
-    )
-
-    if q:
-        queryset = queryset.filter(
-            Q(patient__first_name__icontains=q)
-            | Q(patient__last_name__icontains=q)
-            | Q(patient__mrn__icontains=q)
-            | Q(provider__name__icontains=q)
-            | Q(provider__npi__icontains=q)
-            | Q(medication_name__icontains=q)
-            | Q(primary_diagnosis__icontains=q)
-        )
-
     if export:
-        response = HttpResponse(content_type='text/csv; charset=utf-8')
-        response['Content-Disposition'] = 'attachment; filename="careplans_report.csv"'
-        writer = csv.writer(response)
-        writer.writerow([
-            'patient_mrn', 'patient_first_name', 'patient_last_name', 'patient_dob',
-            'provider_name', 'provider_npi', 'medication_name', 'primary_diagnosis',
-            'careplan_created_at', 'duplication_warning',
-        ])
-        for cp in queryset:
-            writer.writerow([
-                cp.patient.mrn, cp.patient.first_name, cp.patient.last_name, cp.patient.dob.isoformat(),
-                cp.provider.name, cp.provider.npi, cp.medication_name, cp.primary_diagnosis,
-                cp.created_at.isoformat(), '',
-            ])
-        return response
+        return _export_careplans_csv(search_documents(q))
 
+    documents = search_documents(q).select_related(
+        'careplan__patient', 'careplan__provider'
+    )
+    page, next_cursor = paginate(documents, cursor=cursor, page_size=page_size)
     items = []
-    for cp in queryset[:50]:
+    for doc in page:
+        cp = doc.careplan
         items.append({
             "id": cp.id,
             "patient_name": f"{cp.patient.first_name} {cp.patient.last_name}",
@@ -213,4 +361,4 @@ def search_careplans(q, export=False):
             "created_at": cp.created_at.isoformat(),
             "download_url": f"/download-careplan/{cp.id}/",
         })
-    return {"success": True, "data": {"results": items}}
+    return {"success": True, "data": {"results": items, "next": next_cursor}}
@@ -50,5 +50,113 @@ def llm_api_latency_seconds(seconds: float):
     _get_client().timing("llm_api_latency", int(seconds * 1000))
 
 
+def llm_first_token_latency_seconds(seconds: float):
+    _get_client().timing("llm_first_token_latency", int(seconds * 1000))
+
+
 def llm_api_error():
     _get_client().incr("llm_api_error")
+
+
+def llm_cache_hit():
+    _get_client().incr("llm_cache_hit")
+
+
+def llm_cache_miss():
+    _get_client().incr("llm_cache_miss")
+
+
+def outbox_published(count: int):
+    _get_client().incr("outbox_published", count)
+
+
+def outbox_publish_failure():
+    _get_client().incr("outbox_publish_failure")
+
+
+def outbox_lag_seconds(seconds: float):
+    # 本批最早一行从写入到投递的时间
+    _get_client().timing("outbox_lag", int(seconds * 1000))
+
+
+def lease_claimed(count: int = 1):
+    _get_client().incr("lease_claimed", count)
+
+
+def lease_stolen():
+    # 接手了租约已过期（持有者失联）的 processing
+    _get_client().incr("lease_stolen")
+
+
+def lease_reaped(count: int):
+    _get_client().incr("lease_reaped", count)
+
+
+def lease_lost():
+    # 生成结束时租约已被其他 worker 接手，本次结果丢弃
+    _get_client().incr("lease_lost")
+
+
+def lane_depth(lane: str, depth: int):
+    # lane 队列在 broker 里排队的消息数
+    _get_client().gauge(f"lane_depth.{lane}", depth)
+
+
+def lane_backlog(lane: str, count: int):
+    # lane 还在 outbox 里、未投递到 broker 的行数
+    _get_client().gauge(f"lane_backlog.{lane}", count)
+
+
+def lane_wait_seconds(lane: str, seconds: float):
+    # 提交到开始生成
+    _get_client().timing(f"lane_wait.{lane}", int(seconds * 1000))
+
+
+def lane_submit_to_complete_seconds(lane: str, seconds: float):
+    # 提交到生成结束（completed / 最终 failed），按 lane 看 p95 SLO
+    _get_client().timing(f"lane_submit_to_complete.{lane}", int(seconds * 1000))
+
+
+def llm_rate_headroom(provider: str, model: str, dimension: str, fraction: float):
+    # 限流桶预留后剩余额度占每分钟限额的比例（dimension: requests / tokens）
+    _get_client().gauge(f"llm_rate_headroom.{provider}.{model.replace('.', '_')}.{dimension}", round(fraction, 4))
+
+
+def llm_rate_limit_wait_seconds(provider: str, seconds: float):
+    # 调用前为等限流额度 / Retry-After 累计等待的时间
+    _get_client().timing(f"llm_rate_limit_wait.{provider}", int(seconds * 1000))
+
+
+def llm_rate_limited(provider: str):
+    # provider 返回 429
+    _get_client().incr(f"llm_rate_limited.{provider}")
+
+
+def llm_circuit_state(provider: str, state: int):
+    # 熔断器状态：0 closed / 1 half_open / 2 open
+    _get_client().gauge(f"llm_circuit_state.{provider}", state)
+
+
+def llm_circuit_opened(provider: str):
+    # 熔断器打开（含 half_open 探测失败重新打开）
+    _get_client().incr(f"llm_circuit_opened.{provider}")
+
+
+def llm_failover(primary: str, served: str):
+    # 请求的 provider 熔断，改用 served
+    _get_client().incr(f"llm_failover.{primary}.{served}")
+
+
+def llm_hedge(provider: str):
+    # 主调用超过延迟分位，发出对冲请求（对冲率 = 此计数 / llm_provider_usage）
+    _get_client().incr(f"llm_hedge.{provider}")
+
+
+def llm_hedge_win(provider: str, winner: str):
+    # 已对冲的调用由哪一方先成功返回（winner: primary / hedge）
+    _get_client().incr(f"llm_hedge_win.{provider}.{winner}")
+
+
+def llm_hedge_skipped(provider: str, reason: str):
+    # 到了对冲时间但没发（reason: budget 额度用完 / rate_limit 限流没有余量）
+    _get_client().incr(f"llm_hedge_skipped.{provider}.{reason}")
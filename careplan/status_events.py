@@ -0,0 +1,151 @@
+"""
+Care plan 状态通知 + 状态缓存
+- notify_status：generate_careplan_task / async worker 每次状态变化时发布到频道 careplan:status:<id>，
+  同时写状态缓存 careplan:status_cache:<id>（同一个 pipeline，一次往返）
+- get_cached_status / cache_status_if_missing：/api/careplan/<id>/status/ 的读路径，命中时不查 DB
+- notify_progress：流式生成写回部分内容后发布
+- subscribe：/api/careplan/<id>/stream/ 订阅，有消息才读 DB，不再定时轮询
+CAREPLAN_STATUS_NOTIFY=none 或 Redis 不可用时退回按 CAREPLAN_STREAM_POLL_INTERVAL 轮询 DB
+CAREPLAN_STATUS_CACHE=none 关闭缓存；Redis 出错时发布 / 缓存失败只记日志，读路径回退到 DB
+"""
+import json
+import logging
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "careplan:status:"
+CACHE_PREFIX = "careplan:status_cache:"
+
+
+def status_channel(careplan_id) -> str:
+    return f"{CHANNEL_PREFIX}{careplan_id}"
+
+
+def status_cache_key(careplan_id) -> str:
+    return f"{CACHE_PREFIX}{careplan_id}"
+
+
+def _enabled() -> bool:
+    return getattr(settings, "CAREPLAN_STATUS_NOTIFY", "redis") == "redis"
+
+
+def _cache_enabled() -> bool:
+    return getattr(settings, "CAREPLAN_STATUS_CACHE", "redis") == "redis"
+
+
+def _cache_ttl() -> int:
+    return int(getattr(settings, "CAREPLAN_STATUS_CACHE_TTL", 3600))
+
+
+def _redis():
+    from .queue import get_redis
+
+    return get_redis()
+
+
+def notify_status(careplan_id, status: str, *, error: str | None = None) -> None:
+    """状态变化：写缓存（覆盖）+ 发布通知；须在 DB 写入之后调用"""
+    publish, cache = _enabled(), _cache_enabled()
+    if not (publish or cache):
+        return
+    try:
+        pipe = _redis().pipeline(transaction=False)
+        if cache:
+            snapshot = {"status": status}
+            if error is not None:
+                snapshot["error"] = error
+            pipe.set(status_cache_key(careplan_id), json.dumps(snapshot), ex=_cache_ttl())
+        if publish:
+            pipe.publish(status_channel(careplan_id), json.dumps({"event": "status", "status": status}))
+        pipe.execute()
+    except Exception:
+        logger.warning("careplan %s: status notify failed", careplan_id, exc_info=True)
+
+
+def notify_progress(careplan_id) -> None:
+    if not _enabled():
+        return
+    try:
+        _redis().publish(status_channel(careplan_id), json.dumps({"event": "progress"}))
+    except Exception:
+        logger.warning("careplan %s: progress publish failed", careplan_id, exc_info=True)
+
+
+def get_cached_status(careplan_id) -> dict | None:
+    """返回 {"status": ..., "error"?: ...}；未命中 / 关闭 / Redis 出错返回 None"""
+    if not _cache_enabled():
+        return None
+    try:
+        raw = _redis().get(status_cache_key(careplan_id))
+    except Exception:
+        logger.warning("careplan %s: status cache get failed", careplan_id, exc_info=True)
+        return None
+    return json.loads(raw) if raw else None
+
+
+def cache_status_if_missing(careplan_id, snapshot: dict) -> None:
+    """
+    读路径回填：只在 key 不存在时写（SET NX）
+    避免把读到的旧状态覆盖掉 worker 刚写入的新状态
+    """
+    if not _cache_enabled():
+        return
+    try:
+        _redis().set(status_cache_key(careplan_id), json.dumps(snapshot), ex=_cache_ttl(), nx=True)
+    except Exception:
+        logger.warning("careplan %s: status cache set failed", careplan_id, exc_info=True)
+
+
+class RedisSubscription:
+    """wait(timeout) 在收到消息时返回 True，超时返回 False；同一时刻的多条消息合并成一次唤醒"""
+
+    def __init__(self, pubsub):
+        self._pubsub = pubsub
+
+    def wait(self, timeout: float) -> bool:
+        message = self._pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None:
+            return False
+        while self._pubsub.get_message(ignore_subscribe_messages=True, timeout=0) is not None:
+            pass
+        return True
+
+    def close(self) -> None:
+        try:
+            self._pubsub.close()
+        except Exception:
+            pass
+
+
+class PollingSubscription:
+    """没有 Redis 时的退路：每 poll_interval 秒唤醒一次"""
+
+    def __init__(self, poll_interval: float, *, sleep=time.sleep):
+        self.poll_interval = poll_interval
+        self._sleep = sleep
+
+    def wait(self, timeout: float) -> bool:
+        self._sleep(min(timeout, self.poll_interval))
+        return True
+
+    def close(self) -> None:
+        pass
+
+
+def subscribe(careplan_id, *, poll_interval: float = 0.5):
+    """
+    订阅单个 care plan 的状态通知
+    需在读取当前状态之前调用，这样读取之后发生的变化一定能收到
+    """
+    if _enabled():
+        pubsub = _redis().pubsub()
+        try:
+            pubsub.subscribe(status_channel(careplan_id))
+            return RedisSubscription(pubsub)
+        except Exception:
+            logger.warning("careplan %s: status subscribe failed, falling back to polling", careplan_id, exc_info=True)
+            pubsub.close()
+    return PollingSubscription(poll_interval)
@@ -0,0 +1,135 @@
+"""
+流式生成进度
+- PartialContentWriter：generate_careplan_task 边收 token 边把部分内容写回 CarePlan.generated_content
+  第一段立即写（首屏可见时间 = provider 首 token 延迟），之后最多每 flush_interval 秒写一次
+- iter_careplan_events：/api/careplan/<id>/stream/ 的 Server-Sent Events 生成器
+  由 status_events 的 Redis 通知驱动，每次只从 DB 取新增的那一段文本（Substr），不重复搬运已发送的内容
+"""
+import json
+import time
+
+from django.db.models.functions import Length, Substr
+from django.utils import timezone
+
+from .models import CarePlan
+from .status_events import PollingSubscription, notify_progress, subscribe
+
+
+class PartialContentWriter:
+    """累积 LLM 流式输出，按限定频率写回 DB（只在 processing 状态下写；给了 owner 时还须仍持有租约）"""
+
+    def __init__(self, careplan_id, *, flush_interval: float = 1.0, clock=time.monotonic, owner: str | None = None):
+        self.careplan_id = careplan_id
+        self.owner = owner
+        self.flush_interval = flush_interval
+        self._clock = clock
+        self._parts: list[str] = []
+        self._last_flush: float | None = None
+        self._dirty = False
+        self.flush_count = 0
+
+    def append(self, chunk: str) -> None:
+        self._parts.append(chunk)
+        self._dirty = True
+        now = self._clock()
+        if self._last_flush is None or now - self._last_flush >= self.flush_interval:
+            self.flush(now)
+
+    def flush(self, now: float | None = None) -> None:
+        if not self._dirty:
+            return
+        rows = CarePlan.objects.filter(id=self.careplan_id, status='processing')
+        if self.owner is not None:
+            rows = rows.filter(lease_owner=self.owner)
+        rows.update(
+            generated_content="".join(self._parts),
+            updated_at=timezone.now(),
+        )
+        self._last_flush = self._clock() if now is None else now
+        self._dirty = False
+        self.flush_count += 1
+        notify_progress(self.careplan_id)
+
+    def reset(self) -> None:
+        """重试前清空已累积的内容"""
+        self._parts = []
+        self._dirty = False
+        self._last_flush = None
+
+
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def iter_careplan_events(careplan_id, *, subscription=None, poll_interval=0.5, timeout=300.0,
+                         heartbeat_interval=15.0, clock=time.monotonic):
+    """
+    SSE 事件流：
+    - progress {"delta": "..."}：新增的生成内容
+    - reset {}：内容被重写（重试），客户端清空后继续接收 progress
+    - status {"status": "..."}：状态变化
+    - done {"status": "completed"|"failed", "error"?: "..."}：结束，随后关闭连接
+    先订阅状态通知再读当前状态；之后只在收到通知时读 DB（没有 Redis 时按 poll_interval 轮询）
+    超过 timeout 秒未结束则关闭连接，EventSource 会自动重连
+    """
+    if subscription is None:
+        subscription = subscribe(careplan_id, poll_interval=poll_interval)
+    sent = 0
+    last_status = None
+    started = last_write = clock()
+    try:
+        yield "retry: 2000\n\n"
+        changed = True
+        while True:
+            if changed:
+                row = (
+                    CarePlan.objects
+                    .filter(id=careplan_id)
+                    .annotate(length=Length('generated_content'), delta=Substr('generated_content', sent + 1))
+                    .values_list('status', 'length', 'delta', 'error_message')
+                    .first()
+                )
+                if row is None:
+                    yield format_sse("done", {"status": "not_found"})
+                    return
+                status, length, delta, error_message = row
+                length = length or 0
+
+                if status != last_status:
+                    last_status = status
+                    yield format_sse("status", {"status": status})
+                    last_write = clock()
+
+                if status != 'failed':
+                    if length < sent:
+                        sent = 0
+                        yield format_sse("reset", {})
+                        continue
+                    if delta:
+                        sent += len(delta)
+                        yield format_sse("progress", {"delta": delta})
+                        last_write = clock()
+
+                if status == 'completed':
+                    yield format_sse("done", {"status": status})
+                    return
+                if status == 'failed':
+                    yield format_sse("done", {"status": status, "error": error_message or "Generation failed"})
+                    return
+
+            now = clock()
+            if now - started >= timeout:
+                return
+            if now - last_write >= heartbeat_interval:
+                yield ": keep-alive\n\n"
+                last_write = now
+            wait = max(0.0, min(heartbeat_interval - (now - last_write), timeout - (now - started)))
+            try:
+                changed = subscription.wait(wait)
+            except Exception:
+                # Redis 连接断开：退回轮询，并立即重读一次避免漏掉变化
+                subscription.close()
+                subscription = PollingSubscription(poll_interval)
+                changed = True
+    finally:
+        subscription.close()
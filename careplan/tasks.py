@@ -1,13 +1,19 @@
 """
 Celery 异步任务：调用 LLM 生成 Care Plan，更新数据库
 支持失败重试（最多 3 次，指数退避）
+以租约认领 care plan（careplan/leases.py），worker 中途退出时由 reap_expired_leases_task 放回队列
+每次状态变化发布到 Redis（status_events），SSE 连接据此推送，不用轮询 DB
 """
 import time
 
 from celery import shared_task
+from django.conf import settings
 
+from careplan import leases, scheduling
 from careplan.models import CarePlan
 from careplan.llm_service import generate_careplan
+from careplan.status_events import notify_status
+from careplan.streaming import PartialContentWriter
 from careplan.statsd_metrics import (
     careplan_completed,
     careplan_failed,
@@ -20,21 +26,24 @@ from careplan.statsd_metrics import (
 @shared_task(bind=True, max_retries=3)
 def generate_careplan_task(self, careplan_id):
     """
-    从 DB 加载 CarePlan → 调 LLM 生成 → 更新 DB
-    失败时指数退避重试：2^retries 秒（1次:2s, 2次:4s, 3次:8s）
+    认领租约 → 从 DB 加载 CarePlan → 调 LLM 生成（流式时边生成边写部分内容）→ 持有租约时写回结果
+    失败时指数退避重试：2^retries 秒（1次:2s, 2次:4s, 3次:8s），等待期间保留租约（owner 为 task id）
     """
     start = time.perf_counter()
-    try:
-        careplan = CarePlan.objects.select_related('patient', 'provider').get(id=careplan_id)
-    except CarePlan.DoesNotExist:
-        return
-
-    if careplan.status != 'pending':
+    owner = leases.celery_owner(self.request.id)
+    if not leases.claim(careplan_id, owner):
         return
+    careplan = CarePlan.objects.select_related('patient', 'provider').get(id=careplan_id)
+    notify_status(careplan.id, 'processing')
+    if not self.request.retries:
+        scheduling.record_started(careplan)
 
-    careplan.status = 'processing'
-    careplan.save()
+    # 流式：部分内容按 LLM_STREAM_FLUSH_INTERVAL 限频写回，前端可边生成边看
+    writer = None
+    if getattr(settings, 'LLM_STREAMING', True):
+        writer = PartialContentWriter(careplan.id, flush_interval=settings.LLM_STREAM_FLUSH_INTERVAL, owner=owner)
 
+    served = []
     try:
         content = generate_careplan(
             patient=careplan.patient,
@@ -45,21 +54,43 @@ def generate_careplan_task(self, careplan_id):
             medication_history=careplan.medication_history or '',
             patient_records=careplan.patient_records,
             llm_provider=careplan.llm_provider or None,
+            use_cache=careplan.use_llm_cache,
+            on_progress=writer.append if writer else None,
+            on_provider=served.append,
         )
-        careplan.status = 'completed'
-        careplan.generated_content = content
-        careplan.save()
-        careplan_completed()
     except Exception as exc:
         if self.request.retries >= self.max_retries:
-            careplan.status = 'failed'
-            careplan.error_message = str(exc)
-            careplan.save()
-            careplan_failed()
+            if leases.finish(careplan, owner, 'failed', error=str(exc)):
+                notify_status(careplan.id, 'failed', error=careplan.error_message)
+                careplan_failed()
+                scheduling.record_finished(careplan)
             celery_task_failure()
             celery_task_duration_seconds(time.perf_counter() - start)
             raise
+        countdown = 2 ** self.request.retries
+        leases.renew(careplan.id, owner, extra_seconds=countdown)
         celery_task_retry()
-        raise self.retry(exc=exc, countdown=2 ** self.request.retries)
-    else:
-        celery_task_duration_seconds(time.perf_counter() - start)
+        raise self.retry(exc=exc, countdown=countdown)
+
+    if leases.finish(careplan, owner, 'completed', content=content, llm_provider=served[-1] if served else ''):
+        notify_status(careplan.id, 'completed')
+        careplan_completed()
+        scheduling.record_finished(careplan)
+    celery_task_duration_seconds(time.perf_counter() - start)
+
+
+@shared_task
+def reap_expired_leases_task():
+    """celery beat 周期任务：租约过期的 processing 放回队列（见 careplan/leases.py）"""
+    return leases.reap_expired()
+
+
+@shared_task
+def dispatch_careplans_task(careplan_ids):
+    """
+    一条消息带整批 id，由 worker 在同一个 producer 连接上拆成逐个 generate_careplan_task
+    新的投递走 outbox relay（careplan.outbox）；保留以消费升级前已在队列里的消息
+    """
+    with generate_careplan_task.app.producer_or_acquire() as producer:
+        for careplan_id in careplan_ids:
+            generate_careplan_task.apply_async((careplan_id,), producer=producer)
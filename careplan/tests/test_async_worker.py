@@ -0,0 +1,111 @@
+"""
+Unit tests for the async generation path (agenerate + AsyncCarePlanRunner).
+"""
+import asyncio
+
+import pytest
+from asgiref.sync import async_to_sync
+from unittest.mock import patch
+
+from careplan.async_worker import AsyncCarePlanRunner, agenerate_careplan_for
+from careplan.llm_providers import BaseLLMService, MockLLMService
+from careplan.llm_providers.mock_service import MOCK_CAREPLAN_TEXT
+from careplan.models import Patient, Provider, CarePlan
+
+
+def _make_careplans(n, status="pending"):
+    provider = Provider.objects.create(npi="1234567890", name="Dr. Jane")
+    ids = []
+    for i in range(n):
+        patient = Patient.objects.create(mrn=f"{100000 + i}", first_name="John", last_name="Doe", dob="1990-01-15")
+        cp = CarePlan.objects.create(
+            patient=patient,
+            provider=provider,
+            primary_diagnosis="E11.9",
+            medication_name="Metformin",
+            patient_records="r",
+            status=status,
+        )
+        ids.append(cp.id)
+    return ids
+
+
+class _SyncOnlyService(BaseLLMService):
+    provider_id = "sync_only"
+
+    def generate(self, system_message, user_message, *, temperature=0.7, max_tokens=2000):
+        return f"sync:{user_message}"
+
+
+class TestAgenerate:
+    def test_base_agenerate_falls_back_to_generate(self):
+        result = asyncio.run(_SyncOnlyService().agenerate("sys", "hello"))
+        assert result == "sync:hello"
+
+    def test_mock_agenerate(self):
+        assert asyncio.run(MockLLMService().agenerate("sys", "user")) == MOCK_CAREPLAN_TEXT
+
+
+@pytest.mark.django_db
+class TestAsyncCarePlanRunner:
+    def test_runs_concurrently_up_to_limit(self):
+        ids = _make_careplans(12)
+        active = {"now": 0, "peak": 0}
+
+        async def slow_generate(self, *args, **kwargs):
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+            await asyncio.sleep(0.02)
+            active["now"] -= 1
+            return "async content"
+
+        runner = AsyncCarePlanRunner(max_in_flight=4)
+        with patch.object(MockLLMService, "agenerate", slow_generate):
+            async_to_sync(runner.run)(ids)
+
+        assert runner.completed == 12
+        assert active["peak"] == 4
+        assert runner.peak_in_flight == 4
+        assert set(CarePlan.objects.filter(id__in=ids).values_list("status", flat=True)) == {"completed"}
+        assert CarePlan.objects.get(id=ids[0]).generated_content == "async content"
+
+    def test_skips_non_pending(self):
+        (cp_id,) = _make_careplans(1, status="completed")
+        assert async_to_sync(agenerate_careplan_for)(cp_id) is None
+
+    def test_marks_failed_after_retries(self):
+        (cp_id,) = _make_careplans(1)
+        calls = []
+
+        async def boom(self, *args, **kwargs):
+            calls.append(1)
+            raise RuntimeError("provider down")
+
+        with patch.object(MockLLMService, "agenerate", boom):
+            status = async_to_sync(agenerate_careplan_for)(cp_id, max_retries=2, retry_base_delay=0)
+
+        assert status == "failed"
+        assert len(calls) == 3
+        cp = CarePlan.objects.get(id=cp_id)
+        assert cp.status == "failed"
+        assert cp.error_message == "provider down"
+
+    def test_rejects_non_positive_limit(self):
+        with pytest.raises(ValueError):
+            AsyncCarePlanRunner(max_in_flight=0)
+
+
+@pytest.mark.django_db
+class TestRedisDispatch:
+    def test_relay_enqueues_when_dispatch_is_redis(self, settings, full_careplan_payload):
+        from careplan.outbox import relay_batch
+        from careplan.services import create_careplan
+
+        settings.CAREPLAN_DISPATCH = "redis"
+        data = {**full_careplan_payload, "primary_diagnosis": "E11.9"}
+        result = create_careplan(data)
+        with patch("careplan.outbox.enqueue_careplans") as enqueue, \
+                patch("careplan.outbox.generate_careplan_task") as task:
+            relay_batch()
+        enqueue.assert_called_once_with([result["data"]["careplan_id"]], lane="interactive")
+        task.apply_async.assert_not_called()
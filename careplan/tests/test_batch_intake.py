@@ -0,0 +1,179 @@
+"""
+Unit tests for batch intake (process_batch, check_duplicates_bulk, create_careplans_bulk, batch endpoints).
+"""
+import json
+from unittest.mock import patch
+
+import pytest
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from careplan.duplication_detection import check_duplicates_bulk
+from careplan.intake import get_adapter
+from careplan.intake.types import InternalOrder
+from careplan.models import Patient, Provider, CarePlan, CarePlanOutbox
+from careplan.services import create_careplans_bulk
+from careplan.tests.test_duplication_consolidated import ORDER, _legacy, _seed
+from careplan.tests.test_intake_adapters import PARTNER_C_XML
+
+
+def _order(i=0, **overrides):
+    d = {
+        "provider_npi": "1234567890",
+        "provider_name": "Dr. Jane",
+        "patient_mrn": f"{100000 + i}",
+        "patient_first_name": f"John{i}",
+        "patient_last_name": "Doe",
+        "patient_dob": "1990-01-15",
+        "primary_diagnosis": "E11.9",
+        "medication_name": "Metformin",
+        "patient_records": "Stable.",
+    }
+    d.update(overrides)
+    return d
+
+
+def _as_create_dict(order):
+    return {
+        "provider_npi": order["npi"],
+        "provider_name": order["provider_name"],
+        "patient_mrn": order["mrn"],
+        "patient_first_name": order["first_name"],
+        "patient_last_name": order["last_name"],
+        "patient_dob": order["dob"],
+        "medication_name": order["medication_name"],
+    }
+
+
+class TestProcessBatch:
+    def test_json_array_returns_orders_and_item_errors(self):
+        body = json.dumps([_order(0), _order(1, patient_mrn="bad"), "not an object"])
+        results = get_adapter("webform").process_batch(body)
+        assert isinstance(results[0], InternalOrder)
+        assert results[0].source == "webform"
+        assert results[1].code == "VALIDATION_ERROR"
+        assert results[2].code == "INVALID_BATCH_ITEM"
+
+    def test_json_orders_envelope(self):
+        body = json.dumps({"orders": [_order(0)]})
+        assert len(get_adapter("webform").process_batch(body)) == 1
+
+    def test_xml_batch_envelope(self):
+        single = PARTNER_C_XML.split("?>", 1)[1]
+        body = f"<CareOrderBatch>{single}{single}</CareOrderBatch>"
+        results = get_adapter("pharmacorp_portal").process_batch(body)
+        assert [r.patient.mrn for r in results] == ["345678", "345678"]
+
+    def test_non_array_body_rejected(self):
+        from pharmacy_plan.exceptions import ValidationError
+
+        with pytest.raises(ValidationError) as exc_info:
+            get_adapter("medcenter").process_batch(json.dumps({"pt": {}}))
+        assert exc_info.value.code == "INVALID_BATCH"
+
+
+@pytest.mark.django_db
+class TestCheckDuplicatesBulkParity:
+    """Bulk check must agree with the per-order checks for a single order."""
+
+    @pytest.mark.parametrize("scenario", [
+        "new",
+        "provider_name_mismatch",
+        "mrn_exact",
+        "mrn_mismatch",
+        "name_dob_other_mrn",
+        "same_day_order",
+        "diff_day_order",
+    ])
+    @pytest.mark.parametrize("confirm", [False, True])
+    def test_same_outcome_as_individual_checks(self, scenario, confirm):
+        _seed(scenario)
+        expected = _legacy(confirm, **ORDER)
+        errors, _, _ = check_duplicates_bulk([{**_as_create_dict(ORDER), "confirm": confirm}])
+        if isinstance(expected, str):
+            assert errors[0] is not None and errors[0].code == expected
+        else:
+            assert errors[0] is None
+
+    def test_later_items_see_earlier_items_in_batch(self):
+        items = [
+            _order(0),
+            _order(0),  # 同患者同药物同日
+            _order(1, provider_name="Dr. Other"),  # NPI 已被本批第一条占用
+            _order(2, patient_first_name="John0", patient_mrn="100009"),  # 与第一条同名同 DOB
+            _order(0, patient_first_name="Jim", medication_name="Insulin"),  # MRN 相同但姓名不同
+        ]
+        errors, _, _ = check_duplicates_bulk(items)
+        assert [e and e.code for e in errors] == [
+            None,
+            "ORDER_SAME_DAY_DUPLICATE",
+            "PROVIDER_NPI_NAME_MISMATCH",
+            "PATIENT_NAME_DOB_DUPLICATE",
+            "PATIENT_MRN_MISMATCH",
+        ]
+
+
+@pytest.mark.django_db
+class TestCreateCareplansBulk:
+    def test_per_item_results_and_outbox_rows(self):
+        entries = [_order(0), _order(1), _order(0)]
+        result = create_careplans_bulk(entries)
+        data = result["data"]
+        assert (data["total"], data["accepted"], data["rejected"]) == (3, 2, 1)
+        ids = [r["careplan_id"] for r in data["results"][:2]]
+        assert data["results"][2]["code"] == "ORDER_SAME_DAY_DUPLICATE"
+        assert data["results"][2]["index"] == 2
+        assert sorted(CarePlanOutbox.objects.values_list("careplan_id", flat=True)) == sorted(ids)
+        assert Provider.objects.count() == 1
+        assert Patient.objects.count() == 2
+        assert set(CarePlan.objects.values_list("id", flat=True)) == set(ids)
+
+    def test_query_count_independent_of_batch_size(self):
+        Provider.objects.create(npi="1234567890", name="Dr. Jane")
+
+        def run(n, offset):
+            entries = [_order(offset + i) for i in range(n)]
+            with CaptureQueriesContext(connection) as ctx:
+                create_careplans_bulk(entries)
+            return len(ctx.captured_queries)
+
+        assert run(5, 0) == run(50, 100)
+
+    def test_does_not_touch_broker(self, settings):
+        settings.CAREPLAN_DISPATCH = "redis"
+        with patch("careplan.queue.get_redis") as get_redis:
+            create_careplans_bulk([_order(0), _order(1)])
+        get_redis.assert_not_called()
+
+
+@pytest.mark.django_db
+class TestBatchEndpoints:
+    def test_webform_batch(self):
+        body = json.dumps([_order(0), _order(1, patient_mrn="x")])
+        response = Client().post("/api/generate-careplan/batch/", data=body, content_type="application/json")
+        assert response.status_code == 200
+        results = response.json()["data"]["results"]
+        assert results[0]["success"] is True
+        assert results[1]["type"] == "validation"
+
+    def test_pharmacorp_batch(self):
+        single = PARTNER_C_XML.split("?>", 1)[1]
+        response = Client().post(
+            "/api/intake/pharmacorp/batch/",
+            data=f"<CareOrderBatch>{single}</CareOrderBatch>",
+            content_type="application/xml",
+        )
+        assert response.json()["data"]["accepted"] == 1
+
+    def test_too_many_items(self, settings):
+        settings.INTAKE_BATCH_MAX_ITEMS = 1
+        body = json.dumps([_order(0), _order(1)])
+        response = Client().post("/api/generate-careplan/batch/", data=body, content_type="application/json")
+        assert response.status_code == 400
+        assert response.json()["code"] == "BATCH_TOO_LARGE"
+
+    def test_invalid_body(self):
+        response = Client().post("/api/intake/medcenter/batch/", data="{", content_type="application/json")
+        assert response.status_code == 400
+        assert response.json()["code"] == "INVALID_JSON"
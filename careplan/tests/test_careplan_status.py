@@ -0,0 +1,139 @@
+"""
+Unit tests for the care plan status read path (projection + Redis status cache).
+"""
+import json
+from unittest.mock import patch
+
+import pytest
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from pharmacy_plan.exceptions import BlockError
+
+from careplan.models import Patient, Provider, CarePlan
+from careplan.services import get_careplan_status
+from careplan.status_events import notify_status, status_cache_key
+
+
+class _FakeRedis:
+    """只实现状态缓存用到的 get / set(ex, nx) / pipeline"""
+
+    def __init__(self):
+        self.values = {}
+        self.published = []
+
+    def get(self, key):
+        value = self.values.get(key)
+        return value.encode("utf-8") if value is not None else None
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+    def pipeline(self, transaction=True):
+        redis = self
+        calls = []
+
+        class _Pipe:
+            def __getattr__(self, name):
+                return lambda *a, **kw: calls.append((name, a, kw))
+
+            def execute(self):
+                return [getattr(redis, name)(*a, **kw) for name, a, kw in calls]
+
+        return _Pipe()
+
+
+@pytest.fixture
+def fake_redis(settings):
+    settings.CAREPLAN_STATUS_CACHE = "redis"
+    redis = _FakeRedis()
+    with patch("careplan.queue.get_redis", return_value=redis):
+        yield redis
+
+
+def _make_careplan(status="pending", content="", error=""):
+    patient = Patient.objects.create(mrn="123456", first_name="John", last_name="Doe", dob="1990-01-15")
+    provider = Provider.objects.create(npi="1234567890", name="Dr. Jane")
+    return CarePlan.objects.create(
+        patient=patient,
+        provider=provider,
+        primary_diagnosis="E11.9",
+        medication_name="Metformin",
+        patient_records="x" * 5000,
+        status=status,
+        generated_content=content,
+        error_message=error,
+    )
+
+
+@pytest.mark.django_db
+class TestStatusProjection:
+    def test_pending_does_not_select_large_columns(self):
+        cp = _make_careplan(content="partial output")
+        with CaptureQueriesContext(connection) as ctx:
+            result = get_careplan_status(cp.id)
+        assert result == {"success": True, "data": {"status": "pending"}}
+        assert len(ctx.captured_queries) == 1
+        sql = ctx.captured_queries[0]["sql"]
+        assert "patient_records" not in sql
+        assert "CASE WHEN" in sql.upper()
+
+    def test_completed_returns_content(self):
+        cp = _make_careplan(status="completed", content="plan")
+        assert get_careplan_status(cp.id)["data"] == {"status": "completed", "content": "plan"}
+
+    def test_failed_returns_error(self):
+        cp = _make_careplan(status="failed")
+        assert get_careplan_status(cp.id)["data"] == {"status": "failed", "error": "Generation failed"}
+
+    def test_not_found(self):
+        with pytest.raises(BlockError) as exc_info:
+            get_careplan_status(999999)
+        assert exc_info.value.http_status == 404
+
+
+@pytest.mark.django_db
+class TestStatusCache:
+    def test_cache_hit_skips_database(self, fake_redis, django_assert_num_queries):
+        cp = _make_careplan()
+        get_careplan_status(cp.id)  # 未命中：查 DB 并回填
+        assert json.loads(fake_redis.values[status_cache_key(cp.id)]) == {"status": "pending"}
+        with django_assert_num_queries(0):
+            assert get_careplan_status(cp.id)["data"] == {"status": "pending"}
+
+    def test_worker_update_overrides_cache(self, fake_redis, django_assert_num_queries):
+        cp = _make_careplan(status="failed", error="boom")
+        get_careplan_status(cp.id)
+        notify_status(cp.id, "failed", error="boom")
+        with django_assert_num_queries(0):
+            assert get_careplan_status(cp.id)["data"] == {"status": "failed", "error": "boom"}
+
+    def test_backfill_does_not_overwrite_newer_status(self, fake_redis):
+        cp = _make_careplan(status="processing")
+        fake_redis.values[status_cache_key(cp.id)] = json.dumps({"status": "completed"})
+        CarePlan.objects.filter(id=cp.id).update(status="completed", generated_content="plan")
+        assert get_careplan_status(cp.id)["data"] == {"status": "completed", "content": "plan"}
+        assert json.loads(fake_redis.values[status_cache_key(cp.id)]) == {"status": "completed"}
+
+    def test_completed_reads_content_from_database(self, fake_redis, django_assert_num_queries):
+        cp = _make_careplan(status="completed", content="plan")
+        notify_status(cp.id, "completed")
+        with django_assert_num_queries(1):
+            assert get_careplan_status(cp.id)["data"]["content"] == "plan"
+
+    def test_redis_errors_fall_back_to_database(self, settings):
+        settings.CAREPLAN_STATUS_CACHE = "redis"
+        cp = _make_careplan()
+        with patch("careplan.queue.get_redis") as get_redis:
+            get_redis.return_value.get.side_effect = ConnectionError("down")
+            get_redis.return_value.set.side_effect = ConnectionError("down")
+            response = Client().get(f"/api/careplan/{cp.id}/status/")
+        assert response.status_code == 200
+        assert response.json()["data"] == {"status": "pending"}
@@ -0,0 +1,161 @@
+"""
+Unit tests for consolidated duplicate detection (check_duplicates).
+Same Block/Warning outcomes as check_provider → check_patient → check_order, fewer queries.
+"""
+import json
+import pytest
+from datetime import date, timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from pharmacy_plan.exceptions import BaseAppException
+
+from careplan.intake.adapters import WebFormAdapter
+from careplan.models import Patient, Provider, CarePlan
+from careplan.duplication_detection import (
+    check_duplicates,
+    check_order,
+    check_patient,
+    check_provider,
+)
+from careplan.services import create_careplan
+
+ORDER = {
+    "npi": "1234567890",
+    "provider_name": "Dr. Jane",
+    "mrn": "123456",
+    "first_name": "John",
+    "last_name": "Doe",
+    "dob": "1990-01-15",
+    "medication_name": "Metformin",
+}
+
+
+def _legacy(confirm, **order):
+    """逐项检查的原始顺序；返回 (provider_id, patient_id) 或异常 code"""
+    try:
+        provider = check_provider(order["npi"], order["provider_name"])
+        patient = check_patient(
+            order["mrn"], order["first_name"], order["last_name"], order["dob"], confirm=confirm
+        )
+        if patient is not None:
+            check_order(patient, order["medication_name"], confirm=confirm)
+    except BaseAppException as exc:
+        return exc.code
+    return (provider and provider.id, patient and patient.id)
+
+
+def _consolidated(confirm, **order):
+    try:
+        provider, patient = check_duplicates(**order, confirm=confirm)
+    except BaseAppException as exc:
+        return exc.code
+    return (provider and provider.id, patient and patient.id)
+
+
+def _seed(scenario):
+    provider = Provider.objects.create(npi="1234567890", name="Dr. Jane")
+    if scenario == "provider_name_mismatch":
+        provider.name = "Dr. Other"
+        provider.save()
+    if scenario in ("mrn_exact", "mrn_mismatch", "same_day_order", "diff_day_order"):
+        first = "Jim" if scenario == "mrn_mismatch" else "John"
+        patient = Patient.objects.create(mrn="123456", first_name=first, last_name="Doe", dob=date(1990, 1, 15))
+        if scenario in ("same_day_order", "diff_day_order"):
+            cp = CarePlan.objects.create(
+                patient=patient,
+                provider=provider,
+                primary_diagnosis="E11.9",
+                medication_name="Metformin",
+                patient_records="r",
+            )
+            if scenario == "diff_day_order":
+                CarePlan.objects.filter(id=cp.id).update(created_at=timezone.now() - timedelta(days=3))
+    if scenario == "name_dob_other_mrn":
+        Patient.objects.create(mrn="654321", first_name="John", last_name="Doe", dob=date(1990, 1, 15))
+
+
+def _count_statements(ctx):
+    """不计事务的 SAVEPOINT / RELEASE（测试本身在事务里，atomic 退化为 savepoint）"""
+    return sum(1 for q in ctx.captured_queries if "SAVEPOINT" not in q["sql"])
+
+
+@pytest.mark.django_db
+class TestCheckDuplicatesParity:
+    """Consolidated check must agree with the per-check functions."""
+
+    @pytest.mark.parametrize("scenario", [
+        "new",
+        "provider_name_mismatch",
+        "mrn_exact",
+        "mrn_mismatch",
+        "name_dob_other_mrn",
+        "same_day_order",
+        "diff_day_order",
+    ])
+    @pytest.mark.parametrize("confirm", [False, True])
+    def test_same_outcome_as_individual_checks(self, scenario, confirm):
+        _seed(scenario)
+        assert _consolidated(confirm, **ORDER) == _legacy(confirm, **ORDER)
+
+    def test_mrn_match_wins_over_name_dob_rows(self):
+        # 多个同名同 DOB 患者 + 一个 MRN 命中：必须拿到 MRN 那条
+        for mrn in ("111111", "222222", "333333"):
+            Patient.objects.create(mrn=mrn, first_name="John", last_name="Doe", dob=date(1990, 1, 15))
+        target = Patient.objects.create(mrn="123456", first_name="John", last_name="Doe", dob=date(1990, 1, 15))
+        _, patient = check_duplicates(**ORDER)
+        assert patient.id == target.id
+
+
+@pytest.mark.django_db
+class TestCheckDuplicatesQueryCount:
+    """Benchmark-style assertions on database round trips."""
+
+    def test_check_duplicates_uses_two_queries(self):
+        _seed("diff_day_order")
+        with CaptureQueriesContext(connection) as ctx:
+            check_duplicates(**ORDER, confirm=True)
+        assert len(ctx.captured_queries) == 2
+
+    def test_create_careplan_for_existing_patient(self):
+        _seed("diff_day_order")
+        data = {
+            "provider_npi": "1234567890",
+            "provider_name": "Dr. Jane",
+            "patient_mrn": "123456",
+            "patient_first_name": "John",
+            "patient_last_name": "Doe",
+            "patient_dob": "1990-01-15",
+            "primary_diagnosis": "E11.9",
+            "medication_name": "Metformin",
+            "patient_records": "r",
+            "confirm": True,
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            create_careplan(data)
+        # 2 次检查 + CarePlan / outbox 各 1 次 INSERT
+        assert _count_statements(ctx) == 4
+
+    def test_create_careplan_accepts_internal_order(self):
+        _seed("diff_day_order")
+        order = WebFormAdapter().process(json.dumps({
+            "provider_npi": "1234567890",
+            "provider_name": "Dr. Jane",
+            "patient_mrn": "123456",
+            "patient_first_name": "John",
+            "patient_last_name": "Doe",
+            "patient_dob": "1990-01-15",
+            "primary_diagnosis": "E11.9",
+            "medication_name": "Metformin",
+            "patient_records": "r",
+            "confirm": True,
+            "use_llm_cache": False,
+        }))
+        with CaptureQueriesContext(connection) as ctx:
+            result = create_careplan(order)
+        assert _count_statements(ctx) == 4
+        careplan = CarePlan.objects.get(id=result["data"]["careplan_id"])
+        assert careplan.use_llm_cache is False
+        assert careplan.patient_records == "r"
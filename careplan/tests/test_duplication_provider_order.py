@@ -2,9 +2,11 @@
 Unit tests for Provider and Order duplicate detection.
 """
 import pytest
-from datetime import date
+from datetime import date, datetime, timedelta
 from unittest.mock import patch
 
+from django.utils import timezone
+
 from pharmacy_plan.exceptions import BlockError, WarningException
 
 from careplan.models import Patient, Provider, CarePlan
@@ -108,3 +110,30 @@ class TestCheckOrder:
             dob=date(1990, 1, 15),
         )
         check_order(patient, "Metformin", confirm=False)
+
+    def test_day_boundary_uses_created_at_range(self):
+        patient = Patient.objects.create(
+            mrn="123456",
+            first_name="John",
+            last_name="Doe",
+            dob=date(1990, 1, 15),
+        )
+        provider = Provider.objects.create(npi="1234567890", name="Dr. Jane")
+        cp = CarePlan.objects.create(
+            patient=patient,
+            provider=provider,
+            primary_diagnosis="E11.9",
+            medication_name="Metformin",
+            patient_records="r",
+            status="completed",
+        )
+        # 昨天 23:59:59.999999 → 不同天
+        midnight = timezone.make_aware(datetime.combine(date.today(), datetime.min.time()))
+        CarePlan.objects.filter(id=cp.id).update(created_at=midnight - timedelta(microseconds=1))
+        with pytest.raises(WarningException):
+            check_order(patient, "Metformin", confirm=False)
+
+        # 今天 00:00:00 → 同一天
+        CarePlan.objects.filter(id=cp.id).update(created_at=midnight)
+        with pytest.raises(BlockError):
+            check_order(patient, "Metformin", confirm=False)
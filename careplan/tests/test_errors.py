@@ -4,7 +4,6 @@ Error tests: ensure incorrect inputs produce corresponding error responses.
 import json
 import pytest
 from django.test import Client
-from unittest.mock import patch
 
 from pharmacy_plan.exceptions import ValidationError, BlockError, WarningException
 
@@ -51,13 +50,11 @@ class TestGenerateCareplanErrors:
             "medication_name": "Metformin",
             "patient_records": "r",
         }
-        with patch("careplan.services.generate_careplan_task") as mock_task:
-            mock_task.delay = lambda x: None
-            resp = client.post(
-                "/api/generate-careplan/",
-                data=json.dumps(payload),
-                content_type="application/json",
-            )
+        resp = client.post(
+            "/api/generate-careplan/",
+            data=json.dumps(payload),
+            content_type="application/json",
+        )
         assert resp.status_code == 409
         data = resp.json()
         assert data["success"] is False
@@ -85,13 +82,11 @@ class TestGenerateCareplanErrors:
             "medication_name": "Metformin",
             "patient_records": "r",
         }
-        with patch("careplan.services.generate_careplan_task") as mock_task:
-            mock_task.delay = lambda x: None
-            resp = client.post(
-                "/api/generate-careplan/",
-                data=json.dumps(payload),
-                content_type="application/json",
-            )
+        resp = client.post(
+            "/api/generate-careplan/",
+            data=json.dumps(payload),
+            content_type="application/json",
+        )
         assert resp.status_code == 200
         data = resp.json()
         assert data["success"] is False
@@ -141,13 +136,11 @@ class TestGenerateCareplanErrors:
             "medication_name": "Metformin",
             "patient_records": "r",
         }
-        with patch("careplan.services.generate_careplan_task") as mock_task:
-            mock_task.delay = lambda x: None
-            resp = client.post(
-                "/api/generate-careplan/",
-                data=json.dumps(payload),
-                content_type="application/json",
-            )
+        resp = client.post(
+            "/api/generate-careplan/",
+            data=json.dumps(payload),
+            content_type="application/json",
+        )
         assert resp.status_code == 409
         data = resp.json()
         assert data["code"] == "ORDER_SAME_DAY_DUPLICATE"
@@ -0,0 +1,94 @@
+"""
+Unit tests for the NDJSON bulk import command (import_careplans) and its helpers.
+"""
+import io
+import json
+import pickle
+import pytest
+from django.core.management import call_command
+
+from careplan.bulk_import import iter_batches, parse_lines, read_checkpoint
+from careplan.models import CarePlan, CarePlanOutbox
+
+
+def _line(i, **overrides):
+    d = {
+        "provider_npi": "1234567890",
+        "provider_name": "Dr. Jane",
+        "patient_mrn": f"{100000 + i}",
+        "patient_first_name": f"John{i}",
+        "patient_last_name": "Doe",
+        "patient_dob": "1990-01-15",
+        "primary_diagnosis": "E11.9",
+        "medication_name": "Metformin",
+        "patient_records": "Stable.",
+    }
+    d.update(overrides)
+    return json.dumps(d) + "\n"
+
+
+def _import(path, *args):
+    out, err = io.StringIO(), io.StringIO()
+    call_command("import_careplans", str(path), *args, stdout=out, stderr=err)
+    return out.getvalue(), err.getvalue()
+
+
+class TestHelpers:
+    def test_iter_batches_offsets_and_blank_lines(self):
+        data = b'{"a":1}\n\n{"a":2}\n{"a":3}\n'
+        batches = list(iter_batches(io.BytesIO(data), 2))
+        assert [[n for n, _ in lines] for lines, _, _ in batches] == [[1, 3], [4]]
+        assert batches[0][1:] == (len(b'{"a":1}\n\n{"a":2}\n'), 3)
+        assert batches[-1][1:] == (len(data), 4)
+
+    def test_iter_batches_resumes_from_offset(self):
+        data = b'{"a":1}\n{"a":2}\n'
+        lines, offset, line_no = next(iter_batches(io.BytesIO(data), 10, start_offset=8, start_line=1))
+        assert lines == [(2, b'{"a":2}\n')]
+        assert (offset, line_no) == (len(data), 2)
+
+    def test_parse_lines_returns_picklable_errors(self):
+        results = pickle.loads(pickle.dumps(parse_lines("webform", [(1, _line(0).encode()), (2, b"{oops")])))
+        assert results[0][1].patient.mrn == "100000"
+        assert results[0][1].raw_data is None
+        assert results[1][0] == 2
+        assert results[1][2]["code"] == "INVALID_JSON"
+
+
+@pytest.mark.django_db
+class TestImportCommand:
+    def test_imports_and_reports_line_errors(self, tmp_path):
+        path = tmp_path / "orders.jsonl"
+        path.write_text(_line(0) + "{bad json\n" + _line(1, patient_mrn="12") + _line(2) + _line(0))
+        errors = tmp_path / "errors.jsonl"
+        out, _ = _import(path, "--workers", "0", "--batch-size", "2", "--errors-file", str(errors))
+
+        assert CarePlan.objects.count() == 2
+        records = [json.loads(line) for line in errors.read_text().splitlines()]
+        assert [(r["line"], r["code"]) for r in records] == [
+            (2, "INVALID_JSON"),
+            (3, "VALIDATION_ERROR"),
+            (5, "ORDER_SAME_DAY_DUPLICATE"),
+        ]
+        assert set(CarePlanOutbox.objects.values_list("careplan_id", flat=True)) == set(
+            CarePlan.objects.values_list("id", flat=True)
+        )
+        assert "成功 2，失败 3" in out
+        assert read_checkpoint(f"{path}.checkpoint") == (len(path.read_bytes()), 5)
+
+    def test_resume_skips_committed_lines(self, tmp_path):
+        path = tmp_path / "orders.jsonl"
+        path.write_text(_line(0) + _line(1))
+        _import(path, "--workers", "0")
+        with open(path, "a") as f:
+            f.write(_line(2))
+        out, _ = _import(path, "--workers", "0", "--resume")
+        assert CarePlan.objects.count() == 3
+        assert "从 checkpoint 继续：第 2 行之后" in out
+        assert "完成：1 行" in out
+
+    def test_process_pool(self, tmp_path):
+        path = tmp_path / "orders.jsonl"
+        path.write_text("".join(_line(i) for i in range(10)))
+        _import(path, "--workers", "2", "--batch-size", "3")
+        assert CarePlan.objects.count() == 10
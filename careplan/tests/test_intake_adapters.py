@@ -6,8 +6,11 @@ import pytest
 
 from pharmacy_plan.exceptions import ValidationError
 
-from careplan.intake import InternalOrder, get_adapter
-from careplan.intake.adapters import WebFormAdapter, PharmaCorpAdapter, MedCenterJsonAdapter
+from careplan.intake import BaseIntakeAdapter, InternalOrder, get_adapter
+from careplan.intake.adapters import WebFormAdapter, PharmaCorpAdapter, MedCenterJsonAdapter, _loads_json
+from careplan.intake import factory
+from careplan.intake.factory import register_adapter
+from careplan.intake.mapping import compile_mapping, computed, field, text
 
 
 CLINIC_B_DATA = {
@@ -157,6 +160,33 @@ class TestPharmaCorpAdapter:
         with pytest.raises(ValidationError):
             adapter.process("<invalid")
 
+    @pytest.mark.parametrize("raw", [
+        PARTNER_C_XML,
+        PARTNER_C_XML.encode("utf-8"),
+        "<CareOrderRequest><PatientInformation/></CareOrderRequest>",
+    ])
+    def test_streaming_matches_tree_mode(self, raw):
+        streamed = PharmaCorpAdapter(streaming=True).transform(PharmaCorpAdapter(streaming=True).parse(raw))
+        tree = PharmaCorpAdapter(streaming=False).transform(PharmaCorpAdapter(streaming=False).parse(raw))
+        assert streamed == tree
+
+    @pytest.mark.parametrize("streaming", [True, False])
+    def test_wrong_root_rejected(self, streaming):
+        with pytest.raises(ValidationError) as exc_info:
+            PharmaCorpAdapter(streaming=streaming).parse("<Other/>")
+        assert exc_info.value.code == "INVALID_XML"
+        assert exc_info.value.detail == {"root": "Other"}
+
+    def test_streaming_multi_order_from_file(self):
+        import io
+
+        body = PARTNER_C_XML.split("?>", 1)[1]
+        other = body.replace("345678", "456789")
+        raw = f"<CareOrderBatch><Meta>x</Meta>{body}{other}</CareOrderBatch>".encode("utf-8")
+        fields = PharmaCorpAdapter().parse_batch(io.BytesIO(raw))
+        assert [f["mrn"] for f in fields] == ["345678", "456789"]
+        assert fields[1]["secondary_icds"] == ["I10", "E78.5"]
+
 
 class TestMedCenterJsonAdapter:
     """MedCenter JSON adapter (clinic_b format)."""
@@ -201,6 +231,23 @@ class TestMedCenterJsonAdapter:
         assert order.careplan.medication_history == ""
         assert order.careplan.patient_records == "Notes here."
 
+    @pytest.mark.parametrize("dob,expected", [
+        ("12/31/1999", "1999-12-31"),
+        ("1/5/2020", "2020-01-05"),
+        ("02/30/2020", "02/30/2020"),
+        ("1985-03-22", "1985-03-22"),
+    ])
+    def test_dob_conversion_edge_cases(self, dob, expected):
+        order = MedCenterJsonAdapter().transform({**CLINIC_B_DATA, "pt": {**CLINIC_B_DATA["pt"], "dob": dob}})
+        assert order.patient.dob == expected
+
+    def test_malformed_sections_fail_validation(self):
+        adapter = MedCenterJsonAdapter()
+        with pytest.raises(ValidationError) as exc_info:
+            adapter.process(json.dumps({**CLINIC_B_DATA, "pt": "234567", "provider": ["x"]}))
+        fields = {e["field"] for e in exc_info.value.detail["errors"]}
+        assert {"patient.mrn", "provider.npi", "patient.dob"} <= fields
+
     def test_to_create_careplan_dict(self):
         adapter = MedCenterJsonAdapter()
         order = adapter.process(json.dumps(CLINIC_B_DATA))
@@ -231,6 +278,121 @@ class TestGetAdapter:
             get_adapter("unknown_hospital")
         assert "Unknown intake source" in str(exc_info.value)
 
+    def test_adapters_are_cached(self):
+        assert get_adapter("webform") is get_adapter("WebForm")
+        assert get_adapter("pharmacorp") is get_adapter("pharmacorp_portal")
+
+    def test_mapping_only_adapter(self, monkeypatch):
+        monkeypatch.setattr(factory, "_ADAPTER_REGISTRY", dict(factory._ADAPTER_REGISTRY))
+
+        class ClinicDAdapter(BaseIntakeAdapter):
+            source_id = "clinic_d"
+            mapping = {
+                "patient.mrn": text("patient.id"),
+                "patient.first_name": text("patient.given"),
+                "patient.last_name": text("patient.family"),
+                "patient.dob": field("patient.birth_date", convert="date"),
+                "provider.npi": text("prescriber.npi"),
+                "provider.name": text("prescriber.name"),
+                "careplan.primary_diagnosis": text("icd"),
+                "careplan.medication_name": text("drug"),
+                "careplan.patient_records": field("notes", convert="text", fallback="(none)"),
+            }
+
+            def parse(self, raw):
+                return _loads_json(raw)
+
+        register_adapter("clinic_d", ClinicDAdapter)
+        adapter = get_adapter("clinic_d")
+        order = adapter.process(json.dumps({
+            "patient": {"id": "123456", "given": "A", "family": "B", "birth_date": "1990-01-15T00:00:00"},
+            "prescriber": {"npi": "1234567890", "name": "Dr. C"},
+            "icd": "E11.9",
+            "drug": "IVIG",
+        }))
+        assert order.patient.dob == "1990-01-15"
+        assert order.careplan.patient_records == "(none)"
+        assert order.careplan.additional_diagnosis == ""
+        assert order.source == "clinic_d"
+        assert order.request_flags == {}
+
+    def test_register_adapter_replaces_cached_instance(self):
+        class CustomWebForm(WebFormAdapter):
+            pass
+
+        try:
+            register_adapter("webform", CustomWebForm)
+            assert isinstance(get_adapter("webform"), CustomWebForm)
+        finally:
+            register_adapter("webform", WebFormAdapter)
+        assert type(get_adapter("webform")) is WebFormAdapter
+
+
+class TestInternalOrder:
+    """Slotted intake dataclasses."""
+
+    def test_no_instance_dict(self):
+        order = WebFormAdapter().transform(json.loads(json.dumps({"patient_mrn": "123456"})))
+        for obj in (order, order.patient, order.provider, order.careplan):
+            assert not hasattr(obj, "__dict__")
+        with pytest.raises(AttributeError):
+            order.patient.middle_name = "A"
+
+    def test_create_careplan_dict_round_trip(self):
+        order = MedCenterJsonAdapter().process(json.dumps({**CLINIC_B_DATA, "llm_provider": "claude"}))
+        again = InternalOrder.from_create_careplan_dict(order.to_create_careplan_dict())
+        assert again.to_create_careplan_dict() == order.to_create_careplan_dict()
+        assert (again.confirm, again.llm_provider, again.use_llm_cache) == (False, "claude", True)
+
+
+class TestCompileMapping:
+    """Declarative field mapping compiler."""
+
+    SPEC = {
+        "patient.mrn": text("a.b.mrn"),
+        "patient.first_name": text("a.first"),
+        "patient.last_name": text("last", default="?"),
+        "patient.dob": field("dob", convert="date"),
+        "provider.npi": field("npi", convert="str"),
+        "provider.name": computed(lambda x, y: f"{x}/{y}", "a.first", "last", default="-"),
+        "careplan.primary_diagnosis": text("icd"),
+        "careplan.medication_name": field("drug", convert=str.upper),
+        "careplan.patient_records": text("notes"),
+        "request_flags.flag": field("flag", convert="is_true", default=None),
+    }
+
+    def test_nested_paths_and_converters(self):
+        extract = compile_mapping(self.SPEC, "test")
+        order = extract({
+            "a": {"b": {"mrn": " 123456 "}, "first": " Ann "},
+            "dob": "2000-01-02 10:00", "npi": 1234567890, "drug": "ivig", "flag": True,
+        })
+        assert order.patient.mrn == "123456"
+        assert order.patient.first_name == "Ann"
+        assert order.patient.last_name == "?"
+        assert order.patient.dob == "2000-01-02"
+        assert order.provider.npi == "1234567890"
+        assert order.provider.name == " Ann /-"
+        assert order.careplan.medication_name == "IVIG"
+        assert order.request_flags == {"flag": True}
+        assert order.source == "test"
+
+    @pytest.mark.parametrize("parsed", [None, [], "x", {"a": "x"}, {"a": {"b": [1]}}])
+    def test_non_dict_input_treated_as_empty(self, parsed):
+        order = compile_mapping(self.SPEC, "test")(parsed)
+        assert order.patient.mrn == ""
+        assert order.request_flags == {"flag": False}
+
+    def test_missing_required_field_rejected(self):
+        spec = {k: v for k, v in self.SPEC.items() if k != "careplan.medication_name"}
+        with pytest.raises(ValueError, match="medication_name"):
+            compile_mapping(spec, "test")
+
+    @pytest.mark.parametrize("target", ["patient.age", "billing.code", "patient"])
+    def test_unknown_target_rejected(self, target):
+        with pytest.raises(ValueError):
+            compile_mapping({**self.SPEC, target: text("x")}, "test")
+
 
 @pytest.mark.django_db
 class TestIntakeAPIIntegration:
@@ -239,7 +401,6 @@ class TestIntakeAPIIntegration:
     def test_generate_careplan_uses_webform_adapter(self):
         """POST /api/generate-careplan/ 使用 WebFormAdapter"""
         from django.test import Client
-        from unittest.mock import patch
 
         client = Client()
         payload = {
@@ -253,13 +414,11 @@ class TestIntakeAPIIntegration:
             "medication_name": "Metformin",
             "patient_records": "Stable.",
         }
-        with patch("careplan.services.generate_careplan_task") as m:
-            m.delay = lambda x: None
-            resp = client.post(
-                "/api/generate-careplan/",
-                data=json.dumps(payload),
-                content_type="application/json",
-            )
+        resp = client.post(
+            "/api/generate-careplan/",
+            data=json.dumps(payload),
+            content_type="application/json",
+        )
         assert resp.status_code == 200
         data = resp.json()
         assert data["success"] is True
@@ -267,16 +426,13 @@ class TestIntakeAPIIntegration:
     def test_intake_pharmacorp_accepts_xml(self):
         """POST /api/intake/pharmacorp/ 接受 XML"""
         from django.test import Client
-        from unittest.mock import patch
 
         client = Client()
-        with patch("careplan.services.generate_careplan_task") as m:
-            m.delay = lambda x: None
-            resp = client.post(
-                "/api/intake/pharmacorp/",
-                data=PARTNER_C_XML,
-                content_type="application/xml",
-            )
+        resp = client.post(
+            "/api/intake/pharmacorp/",
+            data=PARTNER_C_XML,
+            content_type="application/xml",
+        )
         assert resp.status_code == 200
         data = resp.json()
         assert data["success"] is True
@@ -284,16 +440,13 @@ class TestIntakeAPIIntegration:
     def test_intake_medcenter_accepts_json(self):
         """POST /api/intake/medcenter/ 接受 MedCenter JSON"""
         from django.test import Client
-        from unittest.mock import patch
 
         client = Client()
-        with patch("careplan.services.generate_careplan_task") as m:
-            m.delay = lambda x: None
-            resp = client.post(
-                "/api/intake/medcenter/",
-                data=json.dumps(CLINIC_B_DATA),
-                content_type="application/json",
-            )
+        resp = client.post(
+            "/api/intake/medcenter/",
+            data=json.dumps(CLINIC_B_DATA),
+            content_type="application/json",
+        )
         assert resp.status_code == 200
         data = resp.json()
         assert data["success"] is True
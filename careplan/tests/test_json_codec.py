@@ -0,0 +1,72 @@
+"""
+Unit tests for the pluggable JSON codec (careplan.intake.codec).
+"""
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from pharmacy_plan.exceptions import ValidationError
+
+from careplan.intake import codec
+from careplan.intake.adapters import MedCenterJsonAdapter, WebFormAdapter
+
+
+def _backends():
+    backends = [pytest.param(codec.StdlibJSONCodec, id="stdlib")]
+    if codec.orjson is not None:
+        backends.append(pytest.param(codec.OrjsonCodec, id="orjson"))
+    return backends
+
+
+@pytest.mark.parametrize("codec_cls", _backends())
+class TestCodecBackends:
+    def test_loads_bytes(self, codec_cls):
+        assert codec_cls().loads('{"name": "张三"}'.encode("utf-8")) == {"name": "张三"}
+
+    @pytest.mark.parametrize("raw", [b"{", b'{"a": }', b"\xff\xfe", b"", b'{"a": 1} x'])
+    def test_errors_match_stdlib(self, codec_cls, raw):
+        with pytest.raises(codec.JSONDecodeError) as exc_info:
+            codec_cls().loads(raw)
+        with pytest.raises((json.JSONDecodeError, UnicodeDecodeError)) as expected:
+            json.loads(raw)
+        assert str(exc_info.value) == str(expected.value)
+
+    def test_stdlib_only_inputs_still_parse(self, codec_cls):
+        result = codec_cls().loads(b'{"a": NaN, "b": 123456789012345678901234567890}')
+        assert result["b"] == 123456789012345678901234567890
+
+    def test_dumps_matches_django_encoder_types(self, codec_cls):
+        obj = {"when": datetime(2025, 1, 15, 8, 30, 0, 123456, tzinfo=timezone.utc), "dose": Decimal("1.50"), "名": "值"}
+        assert json.loads(codec_cls().dumps(obj)) == {
+            "when": "2025-01-15T08:30:00.123Z",
+            "dose": "1.50",
+            "名": "值",
+        }
+        assert "值".encode("utf-8") in codec_cls().dumps(obj)
+
+
+class TestCodecSelection:
+    def test_unknown_backend(self, settings):
+        settings.JSON_CODEC = "simdjson"
+        with pytest.raises(ValueError):
+            codec.get_json_codec()
+
+    def test_stdlib_backend(self, settings):
+        settings.JSON_CODEC = "stdlib"
+        assert codec.get_json_codec().name == "stdlib"
+
+    @pytest.mark.parametrize("backend", ["stdlib", "auto"])
+    @pytest.mark.parametrize("adapter_cls", [WebFormAdapter, MedCenterJsonAdapter])
+    def test_adapter_invalid_json_detail(self, settings, backend, adapter_cls):
+        settings.JSON_CODEC = backend
+        with pytest.raises(ValidationError) as exc_info:
+            adapter_cls().parse(b'{"patient_mrn": ')
+        assert exc_info.value.code == "INVALID_JSON"
+        assert exc_info.value.detail == {"error": "Expecting value: line 1 column 17 (char 16)"}
+
+    def test_invalid_utf8_is_invalid_json(self):
+        with pytest.raises(ValidationError) as exc_info:
+            WebFormAdapter().parse(b'{"patient_first_name": "\xff"}')
+        assert exc_info.value.code == "INVALID_JSON"
@@ -0,0 +1,116 @@
+"""
+Unit tests for lease-based claiming (careplan.leases) and the stuck-job reaper.
+"""
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.utils import timezone
+
+from careplan import leases
+from careplan.models import CarePlan, CarePlanOutbox, CarePlanSearchDocument, Patient, Provider
+from careplan.tasks import generate_careplan_task
+
+
+def _make_careplan(status="pending", **fields):
+    patient = Patient.objects.create(mrn="123456", first_name="John", last_name="Doe", dob="1990-01-15")
+    provider = Provider.objects.create(npi="1234567890", name="Dr. Jane")
+    return CarePlan.objects.create(
+        patient=patient,
+        provider=provider,
+        primary_diagnosis="E11.9",
+        medication_name="Metformin",
+        patient_records="r",
+        status=status,
+        **fields,
+    )
+
+
+def _expire(cp):
+    CarePlan.objects.filter(id=cp.id).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+
+@pytest.mark.django_db
+class TestClaim:
+    def test_only_one_owner_wins(self):
+        cp = _make_careplan()
+        with patch("careplan.leases.lease_claimed") as claimed:
+            assert leases.claim(cp.id, "a") is True
+            assert leases.claim(cp.id, "b") is False
+        claimed.assert_called_once()
+        cp.refresh_from_db()
+        assert (cp.status, cp.lease_owner, cp.claim_count) == ("processing", "a", 1)
+        assert cp.lease_expires_at > timezone.now()
+
+    def test_same_owner_reclaims_without_counting(self):
+        cp = _make_careplan()
+        leases.claim(cp.id, "a")
+        assert leases.claim(cp.id, "a") is True
+        cp.refresh_from_db()
+        assert cp.claim_count == 1
+
+    def test_finished_or_missing_is_not_claimed(self):
+        cp = _make_careplan(status="completed")
+        assert leases.claim(cp.id, "a") is False
+        assert leases.claim(cp.id + 1, "a") is False
+
+    def test_expired_lease_is_stolen_and_old_owner_result_dropped(self):
+        cp = _make_careplan()
+        leases.claim(cp.id, "a")
+        _expire(cp)
+        with patch("careplan.leases.lease_stolen") as stolen:
+            assert leases.claim(cp.id, "b") is True
+        stolen.assert_called_once()
+
+        assert leases.renew(cp.id, "a") is False
+        with patch("careplan.leases.lease_lost") as lost:
+            assert leases.finish(cp, "a", "completed", content="stale") is False
+        lost.assert_called_once()
+        assert leases.finish(cp, "b", "completed", content="fresh") is True
+        cp.refresh_from_db()
+        assert (cp.status, cp.generated_content, cp.lease_owner, cp.claim_count) == ("completed", "fresh", "", 2)
+        assert CarePlanSearchDocument.objects.filter(careplan_id=cp.id).exists()
+
+
+@pytest.mark.django_db
+class TestReaper:
+    def test_requeues_expired_through_outbox(self):
+        cp = _make_careplan()
+        leases.claim(cp.id, "a")
+        assert leases.reap_expired() == (0, 0)
+        _expire(cp)
+        with patch("careplan.leases.lease_reaped") as reaped:
+            assert leases.reap_expired() == (1, 0)
+        reaped.assert_called_once_with(1)
+        cp.refresh_from_db()
+        assert (cp.status, cp.lease_owner, cp.lease_expires_at) == ("pending", "", None)
+        assert list(CarePlanOutbox.objects.values_list("careplan_id", flat=True)) == [cp.id]
+        assert leases.claim(cp.id, "b") is True
+
+    def test_gives_up_after_max_claims(self, settings):
+        settings.CAREPLAN_MAX_CLAIMS = 1
+        cp = _make_careplan()
+        leases.claim(cp.id, "a")
+        _expire(cp)
+        assert leases.reap_expired() == (0, 1)
+        cp.refresh_from_db()
+        assert (cp.status, cp.error_message) == ("failed", leases.REAPED_ERROR)
+        assert not CarePlanOutbox.objects.exists()
+
+
+@pytest.mark.django_db
+class TestGenerateTask:
+    def test_retry_reclaims_own_lease(self, settings):
+        settings.LLM_STREAMING = False
+        cp = _make_careplan()
+        with patch("careplan.tasks.generate_careplan", side_effect=[RuntimeError("timeout"), "content"]):
+            generate_careplan_task.apply(args=(cp.id,))
+        cp.refresh_from_db()
+        assert (cp.status, cp.generated_content, cp.claim_count) == ("completed", "content", 1)
+
+    def test_skips_careplan_leased_by_another_worker(self):
+        cp = _make_careplan()
+        leases.claim(cp.id, "other")
+        with patch("careplan.tasks.generate_careplan") as generate:
+            generate_careplan_task.apply(args=(cp.id,))
+        generate.assert_not_called()
@@ -0,0 +1,197 @@
+"""
+Unit tests for the LLM result cache (llm_cache) and its use in llm_service.
+"""
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from careplan.intake.adapters import WebFormAdapter
+from careplan.llm_cache import (
+    LocalLRUCache,
+    RedisResultCache,
+    build_cache_key,
+    get_result_cache,
+    normalize_prompt,
+)
+from careplan.llm_providers import MockLLMService
+from careplan.llm_service import generate_careplan
+
+
+class _FakeRedis:
+    """只实现 RedisResultCache 用到的几个命令"""
+
+    def __init__(self):
+        self.values = {}
+        self.index = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value.encode("utf-8")
+
+    def zadd(self, key, mapping):
+        self.index.update(mapping)
+
+    def _ordered(self):
+        return [k for k, _ in sorted(self.index.items(), key=lambda kv: kv[1])]
+
+    def zrange(self, key, start, end):
+        ordered = self._ordered()
+        end = len(ordered) + end if end < 0 else end
+        return [k.encode("utf-8") for k in ordered[start:end + 1]]
+
+    def zremrangebyrank(self, key, start, end):
+        for k in [k.decode("utf-8") for k in self.zrange(key, start, end)]:
+            del self.index[k]
+
+    def delete(self, *keys):
+        for k in keys:
+            self.values.pop(k, None)
+
+    def pipeline(self):
+        redis = self
+        results = []
+
+        class _Pipe:
+            def __getattr__(self, name):
+                return lambda *a, **kw: results.append(getattr(redis, name)(*a, **kw))
+
+            def execute(self):
+                return list(results)
+
+        return _Pipe()
+
+
+def _prompt_kwargs(**overrides):
+    kwargs = dict(
+        patient=SimpleNamespace(first_name="John", last_name="Doe", mrn="123456", dob="1990-01-15"),
+        provider=SimpleNamespace(name="Dr. Jane", npi="1234567890"),
+        primary_diagnosis="E11.9",
+        additional_diagnosis="",
+        medication_name="Metformin",
+        medication_history="",
+        patient_records="Stable.",
+    )
+    kwargs.update(overrides)
+    return kwargs
+
+
+class TestCacheKey:
+    def test_normalize_prompt_ignores_line_endings_and_trailing_space(self):
+        assert normalize_prompt("a  \r\nb\t\n\n") == normalize_prompt("a\nb")
+
+    def test_key_depends_on_model_and_temperature(self):
+        base = dict(provider_id="openai", model="m", temperature=0.7, max_tokens=2000,
+                    system_message="s", user_message="u")
+        key = build_cache_key(**base)
+        assert build_cache_key(**{**base, "user_message": "u  \n"}) == key
+        assert build_cache_key(**{**base, "model": "other"}) != key
+        assert build_cache_key(**{**base, "temperature": 0.2}) != key
+
+
+class TestLocalLRUCache:
+    def test_evicts_least_recently_used(self):
+        cache = LocalLRUCache(max_entries=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        assert cache.get("a") == "1"  # a 变为最近使用
+        cache.set("c", "3")
+        assert cache.get("b") is None
+        assert cache.get("a") == "1"
+        assert len(cache) == 2
+
+    def test_ttl_expiry(self):
+        cache = LocalLRUCache(ttl_seconds=10)
+        with patch("careplan.llm_cache.time.monotonic", return_value=100.0):
+            cache.set("a", "1")
+        with patch("careplan.llm_cache.time.monotonic", return_value=105.0):
+            assert cache.get("a") == "1"
+        with patch("careplan.llm_cache.time.monotonic", return_value=111.0):
+            assert cache.get("a") is None
+
+
+class TestRedisResultCache:
+    def test_roundtrip_and_size_eviction(self):
+        redis = _FakeRedis()
+        cache = RedisResultCache(redis, max_entries=2)
+        with patch("careplan.llm_cache.time.time", side_effect=[1.0, 2.0, 3.0]):
+            cache.set("a", "1")
+            cache.set("b", "2")
+            cache.set("c", "3")
+        assert cache.get("a") is None
+        assert cache.get("b") == "2"
+        assert cache.get("c") == "3"
+
+    def test_redis_errors_are_misses(self):
+        class _Broken:
+            def get(self, key):
+                raise ConnectionError("down")
+
+            def pipeline(self):
+                raise ConnectionError("down")
+
+        cache = RedisResultCache(_Broken())
+        assert cache.get("a") is None
+        cache.set("a", "1")  # 不抛异常
+
+
+class TestGenerateCareplanCache:
+    def test_second_identical_call_hits_cache(self, settings):
+        settings.LLM_RESULT_CACHE = "local"
+        service = MockLLMService()
+        with patch("careplan.llm_service.get_llm_service", return_value=service), \
+                patch.object(MockLLMService, "generate", return_value="plan v1") as gen, \
+                patch("careplan.llm_service.llm_cache_hit") as hit:
+            assert generate_careplan(**_prompt_kwargs()) == "plan v1"
+            assert generate_careplan(**_prompt_kwargs()) == "plan v1"
+        assert gen.call_count == 1
+        hit.assert_called_once()
+
+    def test_different_inputs_miss(self, settings):
+        settings.LLM_RESULT_CACHE = "local"
+        with patch("careplan.llm_service.get_llm_service", return_value=MockLLMService()), \
+                patch.object(MockLLMService, "generate", return_value="plan") as gen:
+            generate_careplan(**_prompt_kwargs())
+            generate_careplan(**_prompt_kwargs(medication_name="Insulin"))
+        assert gen.call_count == 2
+
+    def test_opt_out_bypasses_cache(self, settings):
+        settings.LLM_RESULT_CACHE = "local"
+        with patch("careplan.llm_service.get_llm_service", return_value=MockLLMService()), \
+                patch.object(MockLLMService, "generate", return_value="plan") as gen:
+            generate_careplan(**_prompt_kwargs())
+            generate_careplan(**_prompt_kwargs(), use_cache=False)
+        assert gen.call_count == 2
+
+    def test_backend_none_disables_cache(self, settings):
+        settings.LLM_RESULT_CACHE = "none"
+        assert get_result_cache() is None
+
+    def test_unknown_backend_raises(self, settings):
+        settings.LLM_RESULT_CACHE = "memcached"
+        with pytest.raises(ValueError):
+            get_result_cache()
+
+
+class TestCacheOptOutFlag:
+    def test_webform_flag_reaches_create_dict(self):
+        payload = {
+            "provider_npi": "1234567890",
+            "provider_name": "Dr. Jane",
+            "patient_mrn": "123456",
+            "patient_first_name": "John",
+            "patient_last_name": "Doe",
+            "patient_dob": "1990-01-15",
+            "primary_diagnosis": "E11.9",
+            "medication_name": "Metformin",
+            "patient_records": "r",
+            "use_llm_cache": False,
+        }
+        order = WebFormAdapter().process(json.dumps(payload))
+        assert order.to_create_careplan_dict()["use_llm_cache"] is False
+        payload.pop("use_llm_cache")
+        order = WebFormAdapter().process(json.dumps(payload))
+        assert "use_llm_cache" not in order.to_create_careplan_dict()
@@ -0,0 +1,171 @@
+"""
+Unit tests for the per-provider circuit breaker and failover (llm_providers.circuit / factory).
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from careplan.llm_providers import get_llm_service
+from careplan.llm_providers.circuit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, get_breaker
+from careplan.llm_providers.factory import record_llm_result
+from careplan.llm_providers.faulty_service import FaultyLLMService, InjectedFault
+from careplan.llm_service import agenerate_careplan, generate_careplan
+from careplan.models import CarePlan, Patient, Provider
+from careplan.tasks import generate_careplan_task
+
+
+def _prompt_kwargs():
+    return dict(
+        patient=SimpleNamespace(first_name="John", last_name="Doe", mrn="123456", dob="1990-01-15"),
+        provider=SimpleNamespace(name="Dr. Jane", npi="1234567890"),
+        primary_diagnosis="E11.9",
+        additional_diagnosis="",
+        medication_name="Metformin",
+        medication_history="",
+        patient_records="Stable.",
+    )
+
+
+@pytest.fixture
+def faulty(settings):
+    """USE_MOCK_LLM + 故障注入：openai 全部失败，claude 正常；2 次调用即可判定"""
+    settings.USE_MOCK_LLM = True
+    settings.LLM_RESULT_CACHE = "none"
+    settings.LLM_RATE_LIMITS = {}
+    settings.LLM_PROVIDER = "openai"
+    settings.LLM_FAILOVER_ORDER = ["openai", "claude"]
+    settings.LLM_FAULT_INJECTION = {"openai": {"error_rate": 1.0}}
+    settings.LLM_BREAKER_MIN_CALLS = 2
+    settings.LLM_BREAKER_COOLDOWN = 30
+    return settings
+
+
+class TestCircuitBreaker:
+    def test_opens_on_error_rate_then_probes_after_cooldown(self):
+        breaker = CircuitBreaker("openai", window=10, min_calls=4, error_rate=0.5, cooldown=30)
+        with patch("careplan.llm_providers.circuit.time.monotonic", return_value=100.0):
+            breaker.record_success(1.0)
+            breaker.record_success(1.0)
+            breaker.record_failure()
+            assert breaker.state == CLOSED
+            breaker.record_failure()
+            assert breaker.state == OPEN and not breaker.allow()
+        with patch("careplan.llm_providers.circuit.time.monotonic", return_value=131.0):
+            # 冷却后只放一个探测
+            assert breaker.allow() and breaker.state == HALF_OPEN
+            assert not breaker.allow()
+            breaker.record_failure()
+            assert breaker.state == OPEN
+        with patch("careplan.llm_providers.circuit.time.monotonic", return_value=162.0):
+            assert breaker.allow()
+            breaker.record_success(1.0)
+            assert breaker.state == CLOSED and breaker.allow()
+            assert breaker.stats()["calls"] == 1
+
+    def test_slow_calls_open(self):
+        breaker = CircuitBreaker("claude", min_calls=3, slow_seconds=10, slow_rate=0.6)
+        breaker.record_success(30)
+        breaker.record_success(1)
+        breaker.record_success(30)
+        assert breaker.state == OPEN
+
+    def test_stats(self):
+        breaker = CircuitBreaker("openai", min_calls=100)
+        for latency in (1, 2, 3, 4):
+            breaker.record_success(latency)
+        breaker.record_failure()
+        stats = breaker.stats()
+        assert (stats["calls"], stats["error_rate"], stats["p95_latency"]) == (5, 0.2, 3)
+
+
+class TestFailover:
+    def test_routes_to_next_healthy_provider(self, faulty):
+        for _ in range(2):
+            with pytest.raises(InjectedFault):
+                generate_careplan(**_prompt_kwargs())
+        assert get_breaker("openai").state == OPEN
+
+        served = []
+        with patch("careplan.llm_providers.factory.llm_failover") as failover:
+            assert generate_careplan(**_prompt_kwargs(), on_provider=served.append)
+        assert served == ["claude"]
+        failover.assert_called_once_with("openai", "claude")
+
+    def test_async_routes_to_next_healthy_provider(self, faulty):
+        record_llm_result("openai", False)
+        record_llm_result("openai", False)
+        served = []
+        assert asyncio.run(agenerate_careplan(**_prompt_kwargs(), on_provider=served.append))
+        assert served == ["claude"]
+
+    def test_all_open_fails_fast(self, faulty):
+        for provider in ("openai", "claude"):
+            record_llm_result(provider, False)
+            record_llm_result(provider, False)
+        with pytest.raises(CircuitOpenError):
+            get_llm_service()
+
+    def test_rate_limit_errors_do_not_trip(self, faulty):
+        class RateLimited(Exception):
+            status_code = 429
+            response = SimpleNamespace(headers={})
+
+        faulty.LLM_FAULT_INJECTION = {"claude": {}}
+        with patch.object(FaultyLLMService, "generate", side_effect=RateLimited()):
+            for _ in range(3):
+                with pytest.raises(RateLimited):
+                    generate_careplan(**_prompt_kwargs())
+        assert get_breaker("openai").state == CLOSED
+
+    def test_plain_mock_mode_has_no_failover(self, settings):
+        settings.USE_MOCK_LLM = True
+        settings.LLM_FAULT_INJECTION = {}
+        assert get_llm_service("openai").provider_id == "mock"
+
+
+@pytest.mark.django_db
+class TestServedProvider:
+    def test_task_records_provider_that_served(self, faulty):
+        faulty.LLM_STREAMING = False
+        record_llm_result("openai", False)
+        record_llm_result("openai", False)
+        careplan = CarePlan.objects.create(
+            patient=Patient.objects.create(mrn="123456", first_name="John", last_name="Doe", dob="1990-01-15"),
+            provider=Provider.objects.create(npi="1234567890", name="Dr. Jane"),
+            primary_diagnosis="E11.9",
+            medication_name="Metformin",
+            patient_records="r",
+            llm_provider="openai",
+        )
+        generate_careplan_task.apply(args=(careplan.id,))
+        careplan.refresh_from_db()
+        assert (careplan.status, careplan.llm_provider) == ("completed", "claude")
+
+
+class TestHalfOpenProbe:
+    def test_cache_hit_does_not_consume_probe(self, faulty):
+        faulty.LLM_RESULT_CACHE = "local"
+        faulty.LLM_FAULT_INJECTION = {"openai": {}}
+        generate_careplan(**_prompt_kwargs())
+        record_llm_result("openai", False)
+        record_llm_result("openai", False)
+        breaker = get_breaker("openai")
+        assert breaker.state == OPEN
+
+        later = time.monotonic() + faulty.LLM_BREAKER_COOLDOWN + 1
+        with patch("careplan.llm_providers.circuit.time.monotonic", return_value=later):
+            # 冷却后命中缓存：不调 LLM，也不占探测名额
+            served = []
+            with patch.object(FaultyLLMService, "generate") as generate:
+                generate_careplan(**_prompt_kwargs(), on_provider=served.append)
+            generate.assert_not_called()
+            assert served == ["openai"]
+
+            # 下一个未命中缓存的请求仍拿到探测，成功后恢复
+            served = []
+            generate_careplan(**_prompt_kwargs(), use_cache=False, on_provider=served.append)
+        assert served == ["openai"]
+        assert breaker.state == CLOSED
@@ -0,0 +1,217 @@
+"""
+Unit tests for hedged LLM requests (llm_hedging) and their use in llm_service.
+"""
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from careplan.llm_hedging import HedgeBudget, LatencyTracker, record_latency
+from careplan.llm_providers import MockLLMService
+from careplan.llm_providers.circuit import get_breaker
+from careplan.llm_providers.factory import record_llm_result
+from careplan.llm_rate_limit import LimitedCall
+from careplan.llm_service import agenerate_careplan, generate_careplan
+
+
+def _prompt_kwargs():
+    return dict(
+        patient=SimpleNamespace(first_name="John", last_name="Doe", mrn="123456", dob="1990-01-15"),
+        provider=SimpleNamespace(name="Dr. Jane", npi="1234567890"),
+        primary_diagnosis="E11.9",
+        additional_diagnosis="",
+        medication_name="Metformin",
+        medication_history="",
+        patient_records="Stable.",
+    )
+
+
+@pytest.fixture
+def hedging(settings):
+    """对冲开启：1 个样本即可，预算每次调用攒满 1 个；mock 最近延迟 20ms"""
+    settings.LLM_RESULT_CACHE = "none"
+    settings.LLM_RATE_LIMITS = {}
+    settings.LLM_HEDGING = True
+    settings.LLM_HEDGE_MIN_SAMPLES = 1
+    settings.LLM_HEDGE_MAX_RATE = 1
+    settings.LLM_HEDGE_BURST = 1
+    settings.LLM_HEDGE_TARGET = "same"
+    record_latency("mock", 0.02)
+    return settings
+
+
+def _slow_then_fast(slow=0.5):
+    """第一次调用（主调用）慢，之后的调用立即返回"""
+    calls = []
+    lock = threading.Lock()
+
+    def generate(*args, **kwargs):
+        with lock:
+            calls.append(time.perf_counter())
+            first = len(calls) == 1
+        if first:
+            time.sleep(slow)
+            return "slow"
+        return "fast"
+
+    return generate, calls
+
+
+class TestLatencyTracker:
+    def test_percentile_needs_min_samples(self):
+        tracker = LatencyTracker(window=100)
+        for seconds in range(1, 11):
+            tracker.record("openai", seconds)
+        assert tracker.percentile("openai", 90, min_samples=10) == 10
+        assert tracker.percentile("openai", 50, min_samples=10) == 6
+        assert tracker.percentile("openai", 50, min_samples=11) is None
+        assert tracker.percentile("claude", 50, min_samples=1) is None
+
+    def test_window_keeps_recent(self):
+        tracker = LatencyTracker(window=2)
+        for seconds in (100, 1, 2):
+            tracker.record("openai", seconds)
+        assert tracker.percentile("openai", 99, min_samples=1) == 2
+
+
+class TestHedgeBudget:
+    def test_caps_hedges_to_rate(self):
+        budget = HedgeBudget(rate=0.5, burst=2)
+        budget.earn()
+        assert not budget.spend()
+        budget.earn()
+        assert budget.spend() and not budget.spend()
+        for _ in range(10):
+            budget.earn()
+        assert budget.spend() and budget.spend() and not budget.spend()
+
+
+class TestGenerateCareplan:
+    def test_slow_primary_is_hedged_and_hedge_wins(self, hedging):
+        generate, calls = _slow_then_fast()
+        with patch.object(MockLLMService, "generate", side_effect=generate), \
+                patch("careplan.llm_hedging.llm_hedge") as hedge, \
+                patch("careplan.llm_hedging.llm_hedge_win") as win:
+            start = time.perf_counter()
+            assert generate_careplan(**_prompt_kwargs()) == "fast"
+            assert time.perf_counter() - start < 0.4
+        assert len(calls) == 2
+        hedge.assert_called_once_with("mock")
+        win.assert_called_once_with("mock", "hedge")
+
+    def test_fast_primary_is_not_hedged(self, hedging):
+        with patch("careplan.llm_hedging.llm_hedge") as hedge:
+            generate_careplan(**_prompt_kwargs())
+        hedge.assert_not_called()
+
+    def test_disabled_or_without_samples(self, hedging):
+        generate, calls = _slow_then_fast(slow=0.1)
+        hedging.LLM_HEDGE_MIN_SAMPLES = 5
+        with patch.object(MockLLMService, "generate", side_effect=generate):
+            assert generate_careplan(**_prompt_kwargs()) == "slow"
+        hedging.LLM_HEDGING = False
+        with patch("careplan.llm_hedging.hedge_delay") as delay:
+            generate_careplan(**_prompt_kwargs())
+        delay.assert_not_called()
+
+    def test_budget_exhausted_waits_for_primary(self, hedging):
+        hedging.LLM_HEDGE_MAX_RATE = 0.1
+        generate, calls = _slow_then_fast(slow=0.1)
+        with patch.object(MockLLMService, "generate", side_effect=generate), \
+                patch("careplan.llm_hedging.llm_hedge_skipped") as skipped:
+            assert generate_careplan(**_prompt_kwargs()) == "slow"
+        assert len(calls) == 1
+        skipped.assert_called_once_with("mock", "budget")
+
+    def test_hedge_failure_falls_back_to_primary(self, hedging):
+        calls = []
+
+        def generate(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(0.1)
+                return "slow"
+            raise RuntimeError("hedge failed")
+
+        with patch.object(MockLLMService, "generate", side_effect=generate), \
+                patch("careplan.llm_hedging.llm_hedge_win") as win:
+            assert generate_careplan(**_prompt_kwargs()) == "slow"
+        win.assert_called_once_with("mock", "primary")
+
+    def test_both_fail_raises_primary_error(self, hedging):
+        calls = []
+
+        def generate(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(0.1)
+                raise ValueError("primary failed")
+            raise RuntimeError("hedge failed")
+
+        with patch.object(MockLLMService, "generate", side_effect=generate):
+            with pytest.raises(ValueError):
+                generate_careplan(**_prompt_kwargs())
+
+    def test_alternate_provider_hedge_is_recorded_as_served(self, hedging):
+        hedging.USE_MOCK_LLM = True
+        hedging.LLM_HEDGE_TARGET = "alternate"
+        hedging.LLM_FAILOVER_ORDER = ["openai", "claude"]
+        hedging.LLM_FAULT_INJECTION = {"openai": {"latency": 0.5}}
+        record_latency("openai", 0.02)
+        served = []
+        assert generate_careplan(**_prompt_kwargs(), llm_provider="openai", on_provider=served.append)
+        assert served == ["openai", "claude"]
+
+    def test_rate_limited_hedge_keeps_alternate_probe(self, hedging):
+        hedging.USE_MOCK_LLM = True
+        hedging.LLM_HEDGE_TARGET = "alternate"
+        hedging.LLM_FAILOVER_ORDER = ["openai", "claude"]
+        hedging.LLM_FAULT_INJECTION = {"openai": {"latency": 0.1}}
+        hedging.LLM_BREAKER_MIN_CALLS = 2
+        hedging.LLM_BREAKER_COOLDOWN = 30
+        record_latency("openai", 0.02)
+        # claude 熔断；熔断器的时钟拨到冷却之后，等一个探测
+        record_llm_result("claude", False)
+        record_llm_result("claude", False)
+        later = SimpleNamespace(monotonic=lambda: time.monotonic() + 31)
+
+        # claude 限流没有余量，对冲不发
+        hedging.LLM_RATE_LIMITS = {"claude": {"rpm": 1, "tpm": 0}}
+        with patch("careplan.llm_providers.circuit.time", later), \
+                patch.object(LimitedCall, "try_acquire", return_value=False), \
+                patch("careplan.llm_hedging.llm_hedge_skipped") as skipped:
+            served = []
+            generate_careplan(**_prompt_kwargs(), llm_provider="openai", on_provider=served.append)
+            # 对冲没发出，claude 的探测名额还在
+            assert get_breaker("claude").allow()
+        skipped.assert_called_once_with("openai", "rate_limit")
+        assert served == ["openai"]
+
+
+class TestAgenerateCareplan:
+    def test_loser_is_cancelled(self, hedging):
+        cancelled = []
+        calls = []
+
+        async def agenerate(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 1:
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    cancelled.append(1)
+                    raise
+                return "slow"
+            return "fast"
+
+        async def run():
+            result = await agenerate_careplan(**_prompt_kwargs())
+            await asyncio.sleep(0)
+            return result
+
+        with patch.object(MockLLMService, "agenerate", side_effect=agenerate):
+            assert asyncio.run(run()) == "fast"
+        assert cancelled == [1]
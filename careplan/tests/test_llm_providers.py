@@ -1,6 +1,12 @@
 """
 Unit tests for LLM service abstraction layer
 """
+import asyncio
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 import pytest
 from unittest.mock import patch, MagicMock
 
@@ -11,6 +17,7 @@ from careplan.llm_providers import (
     MockLLMService,
     get_llm_service,
 )
+from careplan.llm_providers.clients import get_client
 from careplan.llm_providers.mock_service import MOCK_CAREPLAN_TEXT
 
 
@@ -166,3 +173,124 @@ class TestGenerateCareplanIntegration:
                 llm_provider="claude",
             )
             mock_get.assert_called_once_with(provider="claude")
+
+
+class _StubLLMHandler(BaseHTTPRequestHandler):
+    """同时模拟 OpenAI chat.completions 和 Anthropic messages，HTTP/1.1 keep-alive"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.request_count += 1
+        if self.path.endswith("/chat/completions"):
+            body = {
+                "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "stub openai"}}],
+            }
+        else:
+            body = {
+                "id": "msg_1", "type": "message", "role": "assistant", "model": "claude",
+                "stop_reason": "end_turn", "stop_sequence": None,
+                "content": [{"type": "text", "text": "stub claude"}],
+                "usage": {"input_tokens": 1, "output_tokens": 1},
+            }
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class _CountingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _StubLLMHandler)
+        self.connection_count = 0
+        self.request_count = 0
+
+    def process_request(self, request, client_address):
+        self.connection_count += 1
+        super().process_request(request, client_address)
+
+
+@pytest.fixture
+def stub_llm_server():
+    server = _CountingServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestClientReuse:
+    """SDK client / 连接池在进程内复用"""
+
+    def test_openai_reuses_connection_across_calls(self, stub_llm_server):
+        base_url = f"http://127.0.0.1:{stub_llm_server.server_port}/v1"
+        for _ in range(3):
+            # 每次新建 Service，模拟每个任务各自 get_llm_service
+            service = OpenAIService(api_key="test-key", base_url=base_url)
+            assert service.generate("sys", "user") == "stub openai"
+        assert stub_llm_server.request_count == 3
+        assert stub_llm_server.connection_count == 1
+
+    def test_claude_reuses_connection_across_calls(self, stub_llm_server):
+        base_url = f"http://127.0.0.1:{stub_llm_server.server_port}"
+        for _ in range(3):
+            service = ClaudeService(api_key="test-key", base_url=base_url)
+            assert service.generate("sys", "user") == "stub claude"
+        assert stub_llm_server.request_count == 3
+        assert stub_llm_server.connection_count == 1
+
+    def test_openai_agenerate_against_stub(self, stub_llm_server):
+        base_url = f"http://127.0.0.1:{stub_llm_server.server_port}/v1"
+        service = OpenAIService(api_key="test-key", base_url=base_url)
+
+        async def run():
+            return await asyncio.gather(*(service.agenerate("sys", "user") for _ in range(5)))
+
+        assert asyncio.run(run()) == ["stub openai"] * 5
+        assert stub_llm_server.request_count == 5
+
+    def test_claude_agenerate_against_stub(self, stub_llm_server):
+        base_url = f"http://127.0.0.1:{stub_llm_server.server_port}"
+        service = ClaudeService(api_key="test-key", base_url=base_url)
+        assert asyncio.run(service.agenerate("sys", "user")) == "stub claude"
+
+    def test_registry_keys_on_model_and_api_key(self):
+        a = get_client("openai", "m1", "k1", object)
+        assert get_client("openai", "m1", "k1", object) is a
+        assert get_client("openai", "m2", "k1", object) is not a
+        assert get_client("openai", "m1", "k2", object) is not a
+        assert get_client("claude", "m1", "k1", object) is not a
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="需要 fork")
+    def test_child_process_does_not_inherit_clients(self):
+        parent_client = get_client("openai", "m", "k", object)
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                child_client = get_client("openai", "m", "k", object)
+                os.write(write_fd, b"1" if child_client is not parent_client else b"0")
+            finally:
+                os._exit(0)
+        os.close(write_fd)
+        result = os.read(read_fd, 1)
+        os.close(read_fd)
+        os.waitpid(pid, 0)
+        assert result == b"1"
+        assert get_client("openai", "m", "k", object) is parent_client
+
+    def test_get_llm_service_reuses_instance(self):
+        with patch("careplan.llm_providers.factory.settings") as mock_settings:
+            mock_settings.USE_MOCK_LLM = False
+            assert get_llm_service(provider="openai") is get_llm_service(provider="openai")
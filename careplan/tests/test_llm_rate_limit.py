@@ -0,0 +1,154 @@
+"""
+Unit tests for the per-provider LLM rate limiter (llm_rate_limit) and its use in llm_service.
+"""
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from careplan.llm_providers import MockLLMService
+from careplan.llm_rate_limit import (
+    LocalRateLimiter,
+    RateLimitTimeout,
+    RedisRateLimiter,
+    retry_after_seconds,
+)
+from careplan.llm_service import agenerate_careplan, generate_careplan
+
+
+class _RateLimited(Exception):
+    """模拟 SDK 的 RateLimitError：status_code + response.headers"""
+
+    status_code = 429
+
+    def __init__(self, headers):
+        super().__init__("rate limited")
+        self.response = SimpleNamespace(headers=headers)
+
+
+def _prompt_kwargs():
+    return dict(
+        patient=SimpleNamespace(first_name="John", last_name="Doe", mrn="123456", dob="1990-01-15"),
+        provider=SimpleNamespace(name="Dr. Jane", npi="1234567890"),
+        primary_diagnosis="E11.9",
+        additional_diagnosis="",
+        medication_name="Metformin",
+        medication_history="",
+        patient_records="Stable.",
+    )
+
+
+@pytest.fixture
+def limited(settings):
+    settings.LLM_RESULT_CACHE = "none"
+    settings.LLM_RATE_LIMIT = "local"
+    settings.LLM_RATE_LIMIT_MAX_WAIT = 1
+    settings.LLM_RATE_LIMIT_BURST_SECONDS = 60
+    settings.LLM_RATE_LIMITS = {"mock": {"rpm": 600, "tpm": 0}}
+    return settings
+
+
+class TestLocalRateLimiter:
+    def test_request_bucket_refills_per_minute(self):
+        limiter = LocalRateLimiter()
+        with patch("careplan.llm_rate_limit.time.monotonic", return_value=100.0):
+            assert limiter.acquire("k", 2, 0, 10, 60)[0] == 0
+            assert limiter.acquire("k", 2, 0, 10, 60)[0] == 0
+            assert limiter.acquire("k", 2, 0, 10, 60)[0] == pytest.approx(30)
+        with patch("careplan.llm_rate_limit.time.monotonic", return_value=130.0):
+            assert limiter.acquire("k", 2, 0, 10, 60)[0] == 0
+
+    def test_burst_caps_bucket(self):
+        limiter = LocalRateLimiter()
+        with patch("careplan.llm_rate_limit.time.monotonic", return_value=100.0):
+            # 600 rpm、10 秒突发：一次最多 100 个，之后每 0.1 秒补一个
+            assert all(limiter.acquire("k", 600, 0, 1, 10)[0] == 0 for _ in range(100))
+            assert limiter.acquire("k", 600, 0, 1, 10)[0] == pytest.approx(0.1)
+
+    def test_token_bucket_and_refund(self):
+        limiter = LocalRateLimiter()
+        with patch("careplan.llm_rate_limit.time.monotonic", return_value=100.0):
+            wait, _, tokens_left = limiter.acquire("k", 0, 600, 500, 60)
+            assert (wait, tokens_left) == (0, 100)
+            assert limiter.acquire("k", 0, 600, 500, 60)[0] == pytest.approx(40)
+            limiter.refund("k", 400)
+            assert limiter.acquire("k", 0, 600, 500, 60)[0] == 0
+
+    def test_block_pauses_key(self):
+        limiter = LocalRateLimiter()
+        with patch("careplan.llm_rate_limit.time.monotonic", return_value=100.0):
+            limiter.acquire("k", 100, 0, 1, 60)
+            limiter.block("k", 5)
+            assert limiter.acquire("k", 100, 0, 1, 60)[0] == pytest.approx(5)
+
+
+class TestRetryAfter:
+    def test_reads_headers(self):
+        assert retry_after_seconds(_RateLimited({"retry-after": "2"})) == 2
+        assert retry_after_seconds(_RateLimited({"retry-after-ms": "250", "retry-after": "1"})) == 0.25
+        assert retry_after_seconds(_RateLimited({})) == 1.0
+        assert retry_after_seconds(RuntimeError("boom")) is None
+
+
+class TestRedisRateLimiter:
+    def test_fails_open_when_redis_errors(self):
+        client = MagicMock()
+        client.register_script.return_value.side_effect = ConnectionError("down")
+        limiter = RedisRateLimiter(client)
+        assert limiter.acquire("k", 10, 1000, 50, 60) == (0.0, 10, 1000)
+        limiter.block("k", 1)
+        limiter.refund("k", 1)
+
+
+class TestGenerateCareplan:
+    def test_waits_for_capacity_then_times_out(self, limited):
+        limited.LLM_RATE_LIMITS = {"mock": {"rpm": 2, "tpm": 0}}
+        limited.LLM_RATE_LIMIT_MAX_WAIT = 60
+        clock = [100.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            clock[0] += seconds
+
+        with patch("careplan.llm_rate_limit.time.monotonic", side_effect=lambda: clock[0]), \
+                patch("careplan.llm_rate_limit.time.sleep", sleep):
+            generate_careplan(**_prompt_kwargs())
+            generate_careplan(**_prompt_kwargs())
+            # 一分钟的 2 个额度用完，第三个要等 30 秒：sleep 后再取
+            generate_careplan(**_prompt_kwargs())
+            assert sleeps == [pytest.approx(30)]
+
+            limited.LLM_RATE_LIMIT_MAX_WAIT = 0.1
+            with pytest.raises(RateLimitTimeout):
+                generate_careplan(**_prompt_kwargs())
+
+    def test_429_honors_retry_after_without_failing(self, limited):
+        side_effect = [_RateLimited({"retry-after-ms": "20"}), "content"]
+        with patch.object(MockLLMService, "generate", side_effect=side_effect) as generate, \
+                patch("careplan.llm_rate_limit.llm_rate_limited") as rate_limited, \
+                patch("careplan.llm_service.llm_api_error") as api_error:
+            assert generate_careplan(**_prompt_kwargs()) == "content"
+        assert generate.call_count == 2
+        rate_limited.assert_called_once_with("mock")
+        api_error.assert_not_called()
+
+    def test_async_429_retries(self, limited):
+        side_effect = [_RateLimited({"retry-after-ms": "20"}), "content"]
+        with patch.object(MockLLMService, "agenerate", side_effect=side_effect):
+            assert asyncio.run(agenerate_careplan(**_prompt_kwargs())) == "content"
+
+    def test_unconfigured_provider_is_not_limited(self, limited):
+        limited.LLM_RATE_LIMITS = {}
+        with patch("careplan.llm_rate_limit.LimitedCall") as limited_call:
+            generate_careplan(**_prompt_kwargs())
+        limited_call.assert_not_called()
+
+    def test_reports_headroom(self, limited):
+        limited.LLM_RATE_LIMITS = {"mock": {"rpm": 10, "tpm": 100000}}
+        with patch("careplan.llm_rate_limit.llm_rate_headroom") as headroom:
+            generate_careplan(**_prompt_kwargs())
+        dims = {c.args[2]: c.args[3] for c in headroom.call_args_list}
+        assert dims["requests"] == pytest.approx(0.9)
+        assert 0 < dims["tokens"] < 1
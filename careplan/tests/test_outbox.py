@@ -0,0 +1,98 @@
+"""
+Unit tests for the transactional outbox (careplan.outbox) and run_outbox_relay.
+"""
+import io
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from careplan import outbox
+from careplan.models import CarePlan, CarePlanOutbox
+from careplan.services import create_careplan
+
+
+def _payload(i=0):
+    return {
+        "provider_npi": "1234567890",
+        "provider_name": "Dr. Jane",
+        "patient_mrn": f"{100000 + i}",
+        "patient_first_name": f"John{i}",
+        "patient_last_name": "Doe",
+        "patient_dob": "1990-01-15",
+        "primary_diagnosis": "E11.9",
+        "medication_name": "Metformin",
+        "patient_records": "Stable.",
+    }
+
+
+@pytest.mark.django_db
+class TestWrite:
+    def test_create_careplan_writes_outbox_row_without_broker(self):
+        with patch("careplan.outbox.publish") as publish:
+            result = create_careplan(_payload())
+        publish.assert_not_called()
+        row = CarePlanOutbox.objects.get()
+        assert row.careplan_id == result["data"]["careplan_id"]
+        assert row.attempts == 0
+
+    def test_rollback_leaves_neither_careplan_nor_row(self):
+        with patch("careplan.outbox.add", side_effect=RuntimeError("db down")):
+            with pytest.raises(RuntimeError):
+                create_careplan(_payload())
+        assert not CarePlan.objects.exists()
+        assert not CarePlanOutbox.objects.exists()
+
+
+@pytest.mark.django_db
+class TestRelay:
+    def test_publishes_in_one_producer_and_deletes(self):
+        ids = [create_careplan(_payload(i))["data"]["careplan_id"] for i in range(3)]
+        with patch("careplan.outbox.generate_careplan_task") as task:
+            assert outbox.relay_batch(10) == 3
+        task.app.producer_or_acquire.assert_called_once()
+        assert [c.args[0] for c in task.apply_async.call_args_list] == [(i,) for i in ids]
+        assert not CarePlanOutbox.objects.exists()
+
+    def test_batch_size_limits_rows(self):
+        for i in range(3):
+            create_careplan(_payload(i))
+        with patch("careplan.outbox.generate_careplan_task"):
+            assert outbox.relay_batch(2) == 2
+        assert outbox.pending_count() == 1
+
+    def test_redis_dispatch_is_one_push(self, settings):
+        settings.CAREPLAN_DISPATCH = "redis"
+        ids = [create_careplan(_payload(i))["data"]["careplan_id"] for i in range(2)]
+        with patch("careplan.queue.get_redis") as get_redis:
+            outbox.relay_batch()
+        get_redis.return_value.rpush.assert_called_once_with("careplan:queue", *ids)
+
+    def test_failure_keeps_rows_and_backs_off(self, settings):
+        settings.CAREPLAN_OUTBOX_MAX_BACKOFF = 3
+        create_careplan(_payload())
+        with patch("careplan.outbox.publish", side_effect=ConnectionError("broker down")):
+            assert outbox.relay_batch() == 0
+            row = CarePlanOutbox.objects.get()
+            assert (row.attempts, row.last_error) == (1, "broker down")
+            assert row.available_at > timezone.now() + timedelta(seconds=1)
+            # 未到期的行不会被取出
+            assert outbox.relay_batch() == 0
+
+            CarePlanOutbox.objects.update(available_at=timezone.now(), attempts=5)
+            outbox.relay_batch()
+        row = CarePlanOutbox.objects.get()
+        assert row.attempts == 6
+        assert row.available_at <= timezone.now() + timedelta(seconds=3)
+
+    def test_relay_command_once_drains_backlog(self):
+        for i in range(5):
+            create_careplan(_payload(i))
+        out = io.StringIO()
+        with patch("careplan.outbox.generate_careplan_task") as task:
+            call_command("run_outbox_relay", "--once", "--batch-size", "2", stdout=out)
+        assert task.apply_async.call_count == 5
+        assert "已投递 5 条" in out.getvalue()
+        assert not CarePlanOutbox.objects.exists()
@@ -0,0 +1,142 @@
+"""
+Unit tests for priority lanes and per-source fair scheduling (careplan.scheduling).
+"""
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.utils import timezone
+
+from careplan import leases, outbox, scheduling
+from careplan.models import CarePlan, CarePlanOutbox, Patient, Provider
+from careplan.services import create_careplan, create_careplans_bulk
+from careplan.tasks import generate_careplan_task
+
+
+def _payload(i=0, source="webform"):
+    return {
+        "provider_npi": "1234567890",
+        "provider_name": "Dr. Jane",
+        "patient_mrn": f"{100000 + i}",
+        "patient_first_name": f"John{i}",
+        "patient_last_name": "Doe",
+        "patient_dob": "1990-01-15",
+        "primary_diagnosis": "E11.9",
+        "medication_name": "Metformin",
+        "patient_records": "Stable.",
+        "source": source,
+    }
+
+
+def _bulk_rows(sources):
+    """按顺序为每个 source 建一个 bulk CarePlan + outbox 行，available_at 逐条递增"""
+    provider = Provider.objects.create(npi="1234567890", name="Dr. Jane")
+    start = timezone.now() - timedelta(minutes=10)
+    ids = []
+    for i, source in enumerate(sources):
+        patient = Patient.objects.create(mrn=f"{200000 + i}", first_name="John", last_name="Doe", dob="1990-01-15")
+        careplan = CarePlan.objects.create(
+            patient=patient,
+            provider=provider,
+            primary_diagnosis="E11.9",
+            medication_name="Metformin",
+            patient_records="r",
+            source=source,
+            lane="bulk",
+        )
+        CarePlanOutbox.objects.create(
+            careplan=careplan, lane="bulk", source=source, provider="openai", available_at=start + timedelta(seconds=i)
+        )
+        ids.append(careplan.id)
+    return ids
+
+
+def _published(task):
+    return [(c.args[0][0], c.kwargs["queue"]) for c in task.apply_async.call_args_list]
+
+
+class TestShares:
+    def test_weighted_split_sums_to_n(self):
+        assert scheduling.shares({"a": 1, "b": 3}, 8) == {"a": 2, "b": 6}
+        assert sum(scheduling.shares({"a": 1, "b": 1, "c": 1}, 10).values()) == 10
+
+    def test_remainder_goes_to_earliest_group(self):
+        assert scheduling.shares({"old": 1, "new": 1}, 1) == {"old": 1, "new": 0}
+
+    def test_interleave_by_virtual_finish_time(self):
+        groups = {"a": ["a1", "a2", "a3", "a4"], "b": ["b1", "b2"]}
+        assert scheduling.interleave(groups, {"a": 2, "b": 1}) == ["a1", "a2", "b1", "a3", "a4", "b2"]
+
+
+@pytest.mark.django_db
+class TestLanes:
+    def test_single_submit_is_interactive_and_bulk_is_bulk(self, settings):
+        settings.LLM_PROVIDER = "claude"
+        single = create_careplan(_payload(0))["data"]["careplan_id"]
+        bulk = create_careplans_bulk([_payload(1, source="pharmacorp_portal")])["data"]["results"][0]["careplan_id"]
+
+        assert CarePlan.objects.get(id=single).lane == "interactive"
+        assert CarePlanOutbox.objects.get(careplan_id=single).lane == "interactive"
+        row = CarePlanOutbox.objects.get(careplan_id=bulk)
+        assert (row.lane, row.source, row.provider) == ("bulk", "pharmacorp_portal", "claude")
+
+    def test_relay_publishes_interactive_first_to_its_queue(self):
+        bulk_ids = _bulk_rows(["pharmacorp_portal"] * 3)
+        single = create_careplan(_payload())["data"]["careplan_id"]
+        with patch("careplan.outbox.generate_careplan_task") as task:
+            assert outbox.relay_batch(2) == 2
+        assert _published(task) == [(single, "careplan.interactive"), (bulk_ids[0], "careplan.bulk")]
+
+    def test_bulk_lane_is_fair_across_sources(self):
+        # 夜间大批量先到，webform 的批量后到：本批两家交替，而不是先发完 pharmacorp_portal
+        ids = _bulk_rows(["pharmacorp_portal"] * 6 + ["webform"] * 2)
+        with patch("careplan.outbox.generate_careplan_task") as task:
+            outbox.relay_batch(4)
+        assert [careplan_id for careplan_id, _ in _published(task)] == [ids[0], ids[6], ids[1], ids[7]]
+
+    def test_source_weights(self, settings):
+        settings.CAREPLAN_SOURCE_WEIGHTS = {"webform": 3}
+        ids = _bulk_rows(["pharmacorp_portal"] * 4 + ["webform"] * 4)
+        with patch("careplan.outbox.generate_careplan_task") as task:
+            outbox.relay_batch(4)
+        assert [careplan_id for careplan_id, _ in _published(task)] == [ids[4], ids[5], ids[0], ids[6]]
+
+    def test_bulk_backpressure_leaves_rows_in_outbox(self, settings):
+        settings.CAREPLAN_BULK_MAX_DEPTH = 3
+        _bulk_rows(["pharmacorp_portal"] * 3)
+        with patch("careplan.outbox.generate_careplan_task"), \
+                patch("careplan.scheduling.broker_depths", return_value={"interactive": 0, "bulk": 2}):
+            assert outbox.relay_batch(10) == 1
+        with patch("careplan.outbox.generate_careplan_task"), \
+                patch("careplan.scheduling.broker_depths", return_value={"interactive": 0, "bulk": 3}):
+            assert outbox.relay_batch(10) == 0
+        assert outbox.pending_count() == 2
+
+    def test_reaper_requeues_into_original_lane(self):
+        careplan_id = _bulk_rows(["pharmacorp_portal"])[0]
+        CarePlanOutbox.objects.all().delete()
+        CarePlan.objects.filter(id=careplan_id).update(
+            status="processing", lease_owner="a", lease_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        assert leases.reap_expired() == (1, 0)
+        row = CarePlanOutbox.objects.get()
+        assert (row.lane, row.source) == ("bulk", "pharmacorp_portal")
+
+
+@pytest.mark.django_db
+class TestLaneMetrics:
+    def test_task_records_wait_and_completion_per_lane(self, settings):
+        settings.LLM_STREAMING = False
+        careplan_id = _bulk_rows(["pharmacorp_portal"])[0]
+        with patch("careplan.tasks.generate_careplan", return_value="content"), \
+                patch("careplan.scheduling.lane_wait_seconds") as wait, \
+                patch("careplan.scheduling.lane_submit_to_complete_seconds") as complete:
+            generate_careplan_task.apply(args=(careplan_id,))
+        assert wait.call_args.args[0] == "bulk" and wait.call_args.args[1] >= 0
+        assert complete.call_args.args[0] == "bulk"
+
+    def test_report_backlog(self):
+        _bulk_rows(["pharmacorp_portal"] * 2)
+        with patch("careplan.scheduling.lane_backlog") as backlog:
+            scheduling.report_backlog()
+        assert sorted(c.args for c in backlog.call_args_list) == [("bulk", 2), ("interactive", 0)]
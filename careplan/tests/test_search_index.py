@@ -0,0 +1,161 @@
+"""
+Unit tests for care plan search index (search_index).
+"""
+import pytest
+from django.test import Client
+
+from pharmacy_plan.exceptions import ValidationError
+
+from careplan.models import Patient, Provider, CarePlan, CarePlanSearchDocument
+from careplan.search_index import (
+    build_search_document,
+    normalize_query,
+    rebuild_search_index,
+    search_documents,
+)
+from careplan.services import search_careplans
+
+
+def _make_careplan(mrn="123456", first="John", last="Doe", npi="1234567890",
+                   provider_name="Dr. Jane", medication="Metformin", status="completed"):
+    patient = Patient.objects.create(mrn=mrn, first_name=first, last_name=last, dob="1990-01-15")
+    provider, _ = Provider.objects.get_or_create(npi=npi, defaults={"name": provider_name})
+    return CarePlan.objects.create(
+        patient=patient,
+        provider=provider,
+        primary_diagnosis="E11.9",
+        medication_name=medication,
+        patient_records="r",
+        status=status,
+    )
+
+
+class TestNormalizeQuery:
+    def test_lowercases_and_collapses_whitespace(self):
+        assert normalize_query("  John   DOE ") == "john doe"
+
+    def test_none_is_empty(self):
+        assert normalize_query(None) == ""
+
+
+@pytest.mark.django_db
+class TestIndexing:
+    def test_completed_careplan_gets_document(self):
+        cp = _make_careplan()
+        doc = CarePlanSearchDocument.objects.get(careplan_id=cp.id)
+        assert doc.document == "john doe 123456 dr. jane 1234567890 metformin e11.9"
+        assert doc.created_at == cp.created_at
+
+    def test_pending_careplan_has_no_document(self):
+        cp = _make_careplan(status="pending")
+        assert not CarePlanSearchDocument.objects.filter(careplan_id=cp.id).exists()
+
+    def test_document_created_when_marked_completed(self):
+        cp = _make_careplan(status="pending")
+        cp.status = "completed"
+        cp.save()
+        assert CarePlanSearchDocument.objects.filter(careplan_id=cp.id).exists()
+
+    def test_rebuild_search_index(self):
+        cp = _make_careplan()
+        CarePlanSearchDocument.objects.all().delete()
+        assert rebuild_search_index() == 1
+        assert CarePlanSearchDocument.objects.get(careplan_id=cp.id).document == build_search_document(cp)
+
+
+@pytest.mark.django_db
+class TestSearchDocuments:
+    def test_matches_any_field_case_insensitive(self):
+        cp = _make_careplan()
+        for q in ("JOHN", "123456", "dr. jane", "1234567890", "metformin", "e11.9", "john doe"):
+            assert [d.careplan_id for d in search_documents(q)] == [cp.id], q
+
+    def test_no_match(self):
+        _make_careplan()
+        assert list(search_documents("insulin")) == []
+
+    def test_word_prefix_ranks_above_substring(self):
+        prefix = _make_careplan(mrn="111111", first="Bob", medication="Formoterol")
+        substring = _make_careplan(mrn="222222", first="Alice", medication="Informix")
+        # substring 后建（created_at / id 都更大），按时间会排前面；prefix 只能靠词首命中排到前面
+        assert [d.careplan_id for d in search_documents("form")] == [prefix.id, substring.id]
+
+    def test_empty_query_orders_by_created_at_desc(self):
+        first = _make_careplan(mrn="111111")
+        second = _make_careplan(mrn="222222")
+        assert [d.careplan_id for d in search_documents("")] == [second.id, first.id]
+
+    def test_search_careplans_excludes_pending(self):
+        _make_careplan(mrn="111111", status="pending")
+        done = _make_careplan(mrn="222222")
+        results = search_careplans("")["data"]["results"]
+        assert [r["id"] for r in results] == [done.id]
+
+
+@pytest.mark.django_db
+class TestKeysetPagination:
+    def _walk(self, q, page_size):
+        seen, cursor = [], None
+        while True:
+            data = search_careplans(q, cursor=cursor, page_size=page_size)["data"]
+            seen.extend(r["id"] for r in data["results"])
+            cursor = data["next"]
+            if cursor is None:
+                return seen
+
+    def test_pages_cover_all_rows_once(self):
+        ids = [_make_careplan(mrn=f"{100000 + i}").id for i in range(7)]
+        assert self._walk("", page_size=3) == list(reversed(ids))
+
+    def test_ranked_pages_match_unpaged_order(self):
+        for i in range(4):
+            _make_careplan(mrn=f"{100000 + i}", medication="Informix")
+            _make_careplan(mrn=f"{200000 + i}", medication="Formoterol")
+        expected = [d.careplan_id for d in search_documents("form")]
+        assert self._walk("form", page_size=3) == expected
+
+    def test_last_page_has_no_next(self):
+        _make_careplan()
+        assert search_careplans("", page_size=5)["data"]["next"] is None
+
+    def test_invalid_cursor_raises(self):
+        with pytest.raises(ValidationError) as exc_info:
+            search_careplans("", cursor="not-a-cursor")
+        assert exc_info.value.code == "INVALID_CURSOR"
+
+    def test_api_page_size_and_cursor(self):
+        for i in range(3):
+            _make_careplan(mrn=f"{100000 + i}")
+        client = Client()
+        first = client.get("/api/search-careplans/?page_size=2").json()["data"]
+        assert len(first["results"]) == 2
+        second = client.get(f"/api/search-careplans/?page_size=2&cursor={first['next']}").json()["data"]
+        assert len(second["results"]) == 1
+        assert second["next"] is None
+
+    def test_api_rejects_non_integer_page_size(self):
+        resp = Client().get("/api/search-careplans/?page_size=abc")
+        assert resp.status_code == 400
+        assert resp.json()["code"] == "INVALID_PAGE_SIZE"
+
+
+@pytest.mark.django_db
+class TestStreamingExport:
+    def test_export_streams_csv_rows(self):
+        _make_careplan(mrn="111111", first="Alice")
+        _make_careplan(mrn="222222", first="Bob", status="pending")
+        resp = search_careplans("", export=True)
+        assert resp.streaming
+        assert resp["Content-Disposition"] == 'attachment; filename="careplans_report.csv"'
+        lines = b"".join(resp.streaming_content).decode("utf-8").splitlines()
+        assert lines[0].startswith("patient_mrn,patient_first_name")
+        assert len(lines) == 2
+        assert lines[1].startswith("111111,Alice,Doe,1990-01-15,Dr. Jane,1234567890,Metformin,E11.9,")
+
+    def test_export_respects_query(self):
+        _make_careplan(mrn="111111", first="Alice")
+        _make_careplan(mrn="222222", first="Bob")
+        resp = Client().get("/api/search-careplans/?q=bob&export=1")
+        assert resp.status_code == 200
+        lines = b"".join(resp.streaming_content).decode("utf-8").splitlines()
+        assert [line.split(",")[0] for line in lines[1:]] == ["222222"]
@@ -0,0 +1,268 @@
+"""
+Unit tests for streaming generation (PartialContentWriter, SSE events, status notifications, provider stream).
+"""
+import json
+from unittest.mock import patch
+
+import pytest
+from django.test import Client
+
+from careplan.llm_providers import MockLLMService
+from careplan.llm_providers.mock_service import MOCK_CAREPLAN_TEXT
+from careplan.llm_service import generate_careplan
+from careplan.models import Patient, Provider, CarePlan
+from careplan.status_events import (
+    PollingSubscription,
+    RedisSubscription,
+    notify_status,
+    status_channel,
+    subscribe,
+)
+from careplan.streaming import PartialContentWriter, format_sse, iter_careplan_events
+
+
+def _make_careplan(status="processing", content=""):
+    patient = Patient.objects.create(mrn="123456", first_name="John", last_name="Doe", dob="1990-01-15")
+    provider = Provider.objects.create(npi="1234567890", name="Dr. Jane")
+    return CarePlan.objects.create(
+        patient=patient,
+        provider=provider,
+        primary_diagnosis="E11.9",
+        medication_name="Metformin",
+        patient_records="r",
+        status=status,
+        generated_content=content,
+    )
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class _FakeSubscription:
+    """每次 wait 执行一步（模拟 worker 写 DB + 发布通知）；没有步骤时按超时处理"""
+
+    def __init__(self, clock, steps=()):
+        self.clock = clock
+        self.steps = list(steps)
+        self.waits = 0
+        self.closed = False
+
+    def wait(self, timeout):
+        self.waits += 1
+        if not self.steps:
+            self.clock.sleep(timeout)
+            return False
+        self.clock.sleep(0.01)
+        self.steps.pop(0)()
+        return True
+
+    def close(self):
+        self.closed = True
+
+
+class _FakePubSub:
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.closed = False
+
+    def subscribe(self, channel):
+        self.channel = channel
+
+    def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        return self.messages.pop(0) if self.messages else None
+
+    def close(self):
+        self.closed = True
+
+
+def _parse(events):
+    """把 SSE 文本拆成 [(event, data)]，忽略 retry / 注释行"""
+    parsed = []
+    for raw in events:
+        if not raw.startswith("event: "):
+            continue
+        event_line, data_line = raw.strip().split("\n")
+        parsed.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+    return parsed
+
+
+class TestMockStream:
+    def test_stream_joins_to_generate_output(self):
+        chunks = list(MockLLMService().stream("sys", "user"))
+        assert len(chunks) > 1
+        assert "".join(chunks) == MOCK_CAREPLAN_TEXT
+
+    def test_generate_careplan_reports_progress(self, settings):
+        settings.LLM_RESULT_CACHE = "none"
+        cp_kwargs = dict(
+            patient=Patient(first_name="John", last_name="Doe", mrn="123456", dob="1990-01-15"),
+            provider=Provider(name="Dr. Jane", npi="1234567890"),
+            primary_diagnosis="E11.9",
+            additional_diagnosis="",
+            medication_name="Metformin",
+            medication_history="",
+            patient_records="r",
+        )
+        chunks = []
+        with patch("careplan.llm_service.get_llm_service", return_value=MockLLMService()), \
+                patch("careplan.llm_service.llm_first_token_latency_seconds") as first_token:
+            result = generate_careplan(**cp_kwargs, on_progress=chunks.append)
+        assert result == MOCK_CAREPLAN_TEXT
+        assert "".join(chunks) == result
+        first_token.assert_called_once()
+
+
+@pytest.mark.django_db
+class TestPartialContentWriter:
+    def test_first_chunk_flushes_then_throttles(self):
+        cp = _make_careplan()
+        clock = _FakeClock()
+        writer = PartialContentWriter(cp.id, flush_interval=1.0, clock=clock)
+
+        writer.append("a")
+        cp.refresh_from_db()
+        assert cp.generated_content == "a"
+
+        clock.now = 0.5
+        writer.append("b")
+        cp.refresh_from_db()
+        assert cp.generated_content == "a"
+
+        clock.now = 1.2
+        writer.append("c")
+        cp.refresh_from_db()
+        assert cp.generated_content == "abc"
+        assert writer.flush_count == 2
+
+    def test_does_not_overwrite_finished_careplan(self):
+        cp = _make_careplan(status="completed", content="final")
+        PartialContentWriter(cp.id).append("partial")
+        cp.refresh_from_db()
+        assert cp.generated_content == "final"
+
+
+@pytest.mark.django_db
+class TestCareplanEvents:
+    def test_progress_deltas_then_done(self):
+        cp = _make_careplan(content="Hello")
+        clock = _FakeClock()
+        sub = _FakeSubscription(clock, [
+            lambda: CarePlan.objects.filter(id=cp.id).update(generated_content="Hello world"),
+            lambda: CarePlan.objects.filter(id=cp.id).update(generated_content="Hello world!", status="completed"),
+        ])
+
+        events = _parse(iter_careplan_events(cp.id, subscription=sub, clock=clock))
+        assert sub.closed
+        assert events == [
+            ("status", {"status": "processing"}),
+            ("progress", {"delta": "Hello"}),
+            ("progress", {"delta": " world"}),
+            ("status", {"status": "completed"}),
+            ("progress", {"delta": "!"}),
+            ("done", {"status": "completed"}),
+        ]
+
+    def test_reset_when_content_shrinks(self):
+        cp = _make_careplan(content="Attempt one")
+        clock = _FakeClock()
+        sub = _FakeSubscription(clock, [
+            lambda: CarePlan.objects.filter(id=cp.id).update(generated_content="Two"),
+            lambda: CarePlan.objects.filter(id=cp.id).update(status="completed"),
+        ])
+
+        events = [e for e, _ in _parse(iter_careplan_events(cp.id, subscription=sub, clock=clock))]
+        assert events == ["status", "progress", "reset", "progress", "status", "done"]
+
+    def test_failed_sends_error(self):
+        cp = _make_careplan(status="failed")
+        CarePlan.objects.filter(id=cp.id).update(error_message="boom")
+        events = _parse(iter_careplan_events(cp.id))
+        assert events[-1] == ("done", {"status": "failed", "error": "boom"})
+
+    def test_timeout_closes_stream_with_heartbeat(self, django_assert_num_queries):
+        cp = _make_careplan(status="pending")
+        clock = _FakeClock()
+        sub = _FakeSubscription(clock)
+        with django_assert_num_queries(1):
+            raw = list(iter_careplan_events(cp.id, subscription=sub, timeout=30, heartbeat_interval=10, clock=clock))
+        assert raw[0] == "retry: 2000\n\n"
+        assert raw.count(": keep-alive\n\n") == 2
+        assert not any(r.startswith("event: done") for r in raw)
+
+    def test_redis_error_falls_back_to_polling(self):
+        cp = _make_careplan(content="a")
+
+        class _Broken(_FakeSubscription):
+            def wait(self, timeout):
+                CarePlan.objects.filter(id=cp.id).update(status="completed", generated_content="ab")
+                raise ConnectionError("down")
+
+        events = _parse(iter_careplan_events(cp.id, subscription=_Broken(_FakeClock())))
+        assert events[-2:] == [("progress", {"delta": "b"}), ("done", {"status": "completed"})]
+
+
+class TestStatusEvents:
+    def test_notify_publishes_to_careplan_channel(self, settings):
+        settings.CAREPLAN_STATUS_NOTIFY = "redis"
+        settings.CAREPLAN_STATUS_CACHE = "none"
+        with patch("careplan.queue.get_redis") as get_redis:
+            notify_status(42, "completed")
+        pipe = get_redis.return_value.pipeline.return_value
+        pipe.publish.assert_called_once_with(
+            "careplan:status:42", json.dumps({"event": "status", "status": "completed"})
+        )
+        pipe.set.assert_not_called()
+        pipe.execute.assert_called_once()
+
+    def test_notify_disabled_or_failing_is_silent(self, settings):
+        settings.CAREPLAN_STATUS_NOTIFY = "none"
+        with patch("careplan.queue.get_redis") as get_redis:
+            notify_status(42, "completed")
+        get_redis.assert_not_called()
+
+        settings.CAREPLAN_STATUS_NOTIFY = "redis"
+        with patch("careplan.queue.get_redis") as get_redis:
+            get_redis.return_value.pipeline.return_value.execute.side_effect = ConnectionError("down")
+            notify_status(42, "completed")
+
+    def test_redis_subscription_coalesces_messages(self, settings):
+        settings.CAREPLAN_STATUS_NOTIFY = "redis"
+        pubsub = _FakePubSub([{"type": "message"}, {"type": "message"}])
+        with patch("careplan.queue.get_redis") as get_redis:
+            get_redis.return_value.pubsub.return_value = pubsub
+            sub = subscribe(7)
+        assert isinstance(sub, RedisSubscription)
+        assert pubsub.channel == status_channel(7)
+        assert sub.wait(1.0) is True
+        assert sub.wait(1.0) is False
+        sub.close()
+        assert pubsub.closed
+
+    def test_subscribe_without_redis_polls(self, settings):
+        settings.CAREPLAN_STATUS_NOTIFY = "none"
+        assert isinstance(subscribe(7, poll_interval=0.2), PollingSubscription)
+
+
+@pytest.mark.django_db
+class TestStreamEndpoint:
+    def test_streams_event_source_response(self):
+        cp = _make_careplan(status="completed", content="plan")
+        response = Client().get(f"/api/careplan/{cp.id}/stream/")
+        assert response.status_code == 200
+        assert response["Content-Type"] == "text/event-stream"
+        assert response["Cache-Control"] == "no-cache"
+        body = b"".join(response.streaming_content).decode("utf-8")
+        assert format_sse("progress", {"delta": "plan"}) in body
+        assert format_sse("done", {"status": "completed"}) in body
+
+    def test_unknown_careplan_is_404(self):
+        response = Client().get("/api/careplan/999999/stream/")
+        assert response.status_code == 404
@@ -0,0 +1,111 @@
+"""
+Unit tests for the shared order validator (careplan.validation).
+"""
+import json
+
+import pytest
+
+from pharmacy_plan.exceptions import ValidationError
+
+from careplan.intake.adapters import WebFormAdapter
+from careplan.serializers import validate_generate_careplan_data
+from careplan.validation import FIELD_PATHS, check_dob, dict_validator, order_validator
+
+
+def valid_payload():
+    return {
+        "provider_npi": "1234567890",
+        "provider_name": "Dr. Jane",
+        "patient_mrn": "123456",
+        "patient_first_name": "John",
+        "patient_last_name": "Doe",
+        "patient_dob": "1990-01-15",
+        "primary_diagnosis": "E11.9",
+        "medication_name": "Metformin",
+        "patient_records": "Patient stable.",
+    }
+
+
+CASES = [
+    {},
+    {"provider_npi": "12345"},
+    {"provider_npi": " 1234567890 ", "patient_mrn": "12345a"},
+    {"patient_dob": "1990-02-30"},
+    {"patient_dob": "01-15-1990"},
+    {"patient_dob": "1990-01-15T08:00:00"},
+    {"primary_diagnosis": ""},
+    {"primary_diagnosis": "D1"},
+    {"patient_first_name": "   ", "patient_last_name": "", "provider_name": ""},
+    {"medication_name": "", "patient_records": " \n"},
+    {"provider_npi": "", "patient_mrn": "", "patient_dob": "", "primary_diagnosis": "", "patient_records": ""},
+]
+
+
+def _serializer_errors(data):
+    try:
+        validate_generate_careplan_data(data)
+    except ValidationError as e:
+        return e.detail["errors"]
+    return []
+
+
+def _adapter_errors(data):
+    try:
+        WebFormAdapter().process(json.dumps(data))
+    except ValidationError as e:
+        return e.detail["errors"]
+    return []
+
+
+class TestSharedRules:
+    @pytest.mark.parametrize("overrides", CASES)
+    def test_serializer_and_adapter_report_same_errors(self, overrides):
+        data = {**valid_payload(), **overrides}
+        expected = [{**e, "field": FIELD_PATHS[e["field"]]} for e in _serializer_errors(data)]
+        assert _adapter_errors(data) == expected
+
+    @pytest.mark.parametrize("overrides", CASES)
+    def test_order_and_dict_views_agree(self, overrides):
+        order = WebFormAdapter().transform({**valid_payload(), **overrides})
+        from_dict = dict_validator.errors(order.to_create_careplan_dict())
+        assert order_validator.errors(order) == [{**e, "field": FIELD_PATHS[e["field"]]} for e in from_dict]
+
+    def test_missing_key_is_required_only_for_dicts(self):
+        data = valid_payload()
+        del data["patient_mrn"]
+        assert dict_validator.errors(data) == [{"field": "patient_mrn", "message": "该字段为必填"}]
+
+    @pytest.mark.parametrize("field", ["provider_npi", "patient_mrn", "patient_dob", "primary_diagnosis"])
+    def test_null_format_fields_rejected(self, field):
+        errors = dict_validator.errors({**valid_payload(), field: None})
+        assert [e["field"] for e in errors] == [field]
+
+    @pytest.mark.parametrize("value,message", [
+        ("1990-01-15", None),
+        (" 1990-01-15 ", None),
+        ("1990-01-15T10:00", None),
+        ("1990-01- 5", None),  # strptime 接受的写法
+        ("1990-1-15", "出生日期格式应为 YYYY-MM-DD"),
+        ("", "出生日期格式应为 YYYY-MM-DD"),
+        (19900115, "出生日期格式应为 YYYY-MM-DD"),
+        ("1990-02-30", "出生日期必须是合法日期"),
+        ("0000-01-01", "出生日期必须是合法日期"),
+        ("abcd-ef-gh", "出生日期必须是合法日期"),
+    ])
+    def test_dob(self, value, message):
+        assert check_dob(value) == message
+
+
+class TestBatchValidation:
+    def test_errors_many_matches_single(self):
+        adapter = WebFormAdapter()
+        orders = [adapter.transform({**valid_payload(), **overrides}) for overrides in CASES]
+        assert order_validator.errors_many(orders) == [order_validator.errors(o) for o in orders]
+
+    def test_process_batch_keeps_positions(self):
+        body = json.dumps([valid_payload(), {**valid_payload(), "patient_mrn": "1"}, "x", valid_payload()])
+        results = WebFormAdapter().process_batch(body)
+        assert [getattr(r, "code", None) for r in results] == [None, "VALIDATION_ERROR", "INVALID_BATCH_ITEM", None]
+        assert results[1].detail["errors"] == [{"field": "patient.mrn", "message": "MRN 必须为 6 位数字"}]
+        assert results[3].patient.mrn == "123456"
+        assert results[3].raw_data == valid_payload()
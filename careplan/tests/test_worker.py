@@ -0,0 +1,205 @@
+"""
+Unit tests for the reliable Redis queue (careplan.queue) and run_careplan_worker (careplan.worker).
+"""
+import asyncio
+import fnmatch
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from careplan import leases, queue
+from careplan.llm_providers import MockLLMService
+from careplan.models import CarePlan, Patient, Provider
+from careplan.worker import CarePlanWorker, generate_claimed
+
+QUEUE = "careplan:queue"
+
+
+class _FakeRedis:
+    """只实现可靠队列用到的 list / key 命令（线程安全）"""
+
+    def __init__(self):
+        self.lists = {}
+        self.keys = {}
+        self._lock = threading.Lock()
+
+    def rpush(self, key, *values):
+        with self._lock:
+            self.lists.setdefault(key, []).extend(str(v).encode() for v in values)
+
+    def lmove(self, src, dst, wherefrom, whereto):
+        with self._lock:
+            items = self.lists.get(src)
+            if not items:
+                return None
+            value = items.pop(0 if wherefrom == "LEFT" else -1)
+            target = self.lists.setdefault(dst, [])
+            target.insert(0 if whereto == "LEFT" else len(target), value)
+            return value
+
+    def blmove(self, src, dst, timeout, wherefrom, whereto):
+        value = self.lmove(src, dst, wherefrom, whereto)
+        if value is None:
+            time.sleep(min(timeout, 0.01))
+        return value
+
+    def lrem(self, key, count, value):
+        with self._lock:
+            items = self.lists.get(key, [])
+            value = str(value).encode()
+            if value in items:
+                items.remove(value)
+                return 1
+            return 0
+
+    def llen(self, key):
+        return len(self.lists.get(key, []))
+
+    def set(self, key, value, ex=None):
+        self.keys[key] = value
+
+    def exists(self, key):
+        return int(key in self.keys)
+
+    def delete(self, key):
+        self.keys.pop(key, None)
+
+    def scan_iter(self, match):
+        return [k.encode() for k in list(self.lists) if fnmatch.fnmatch(k, match) and self.lists[k]]
+
+    def pipeline(self, transaction=True):
+        redis = self
+        calls = []
+
+        class _Pipe:
+            def __getattr__(self, name):
+                return lambda *a, **kw: calls.append((name, a, kw))
+
+            def execute(self):
+                return [getattr(redis, name)(*a, **kw) for name, a, kw in calls]
+
+        return _Pipe()
+
+    def queued(self, key=QUEUE):
+        return [int(v) for v in self.lists.get(key, [])]
+
+
+def _make_careplans(n, status="pending"):
+    provider = Provider.objects.create(npi="1234567890", name="Dr. Jane")
+    ids = []
+    for i in range(n):
+        patient = Patient.objects.create(mrn=f"{100000 + i}", first_name="John", last_name="Doe", dob="1990-01-15")
+        ids.append(CarePlan.objects.create(
+            patient=patient,
+            provider=provider,
+            primary_diagnosis="E11.9",
+            medication_name="Metformin",
+            patient_records="r",
+            status=status,
+        ).id)
+    return ids
+
+
+class TestReliableQueue:
+    def test_reserve_moves_batch_and_ack_removes(self):
+        r = _FakeRedis()
+        r.rpush(QUEUE, 1, 2, 3)
+        processing = queue.processing_key("w1")
+        assert queue.reserve(r, processing, 2, timeout=1) == [1, 2]
+        assert r.queued() == [3]
+        assert r.queued(processing) == [1, 2]
+        queue.ack(r, processing, [1])
+        assert r.queued(processing) == [2]
+        assert queue.reserve(r, processing, 5, timeout=1) == [3]
+        assert queue.reserve(r, processing, 5, timeout=0.01) == []
+
+    def test_reserve_takes_interactive_before_bulk(self):
+        r = _FakeRedis()
+        r.rpush(queue.lane_key("bulk"), 1, 2, 3)
+        r.rpush(QUEUE, 4)
+        processing = queue.processing_key("w1")
+        assert queue.reserve(r, processing, 2, timeout=1) == [4, 1]
+        assert r.queued(queue.lane_key("bulk")) == [2, 3]
+
+    def test_recover_orphans_only_for_dead_workers(self):
+        r = _FakeRedis()
+        r.rpush(QUEUE, 1, 2, 3, 4)
+        queue.reserve(r, queue.processing_key("dead"), 2, timeout=1)
+        queue.reserve(r, queue.processing_key("alive"), 1, timeout=1)
+        queue.heartbeat(r, "alive", ttl=30)
+        assert queue.recover_orphans(r) == 2
+        assert r.queued() == [1, 2, 4]
+        assert r.queued(queue.processing_key("alive")) == [3]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCarePlanWorker:
+    @pytest.mark.parametrize("mode", ["thread", "async"])
+    def test_drains_queue_concurrently(self, mode):
+        # 只测出队 / 认领 / 并发 / ack；生成本身见 test_generate_claimed（SQLite 不支持多线程并发写）
+        ids = _make_careplans(6)
+        r = _FakeRedis()
+        r.rpush(QUEUE, *ids, ids[0])
+        generated = []
+
+        def generate(careplan, owner, **options):
+            generated.append(careplan.id)
+            time.sleep(0.05)
+            return "completed"
+
+        async def agenerate(careplan, owner, **options):
+            generated.append(careplan.id)
+            await asyncio.sleep(0.05)
+            return "completed"
+
+        worker = CarePlanWorker(concurrency=3, batch_size=2, mode=mode, redis=r, owner="w1", poll_timeout=0.05)
+        with patch("careplan.worker.generate_claimed", generate), patch("careplan.worker.agenerate_claimed", agenerate):
+            worker.run(threading.Event(), drain=True)
+
+        assert sorted(generated) == ids
+        assert (worker.completed, worker.skipped) == (6, 1)
+        assert worker.peak_in_flight == 3
+        assert set(CarePlan.objects.filter(id__in=ids).values_list("lease_owner", flat=True)) == {"w1"}
+        assert r.queued() == [] and r.queued(worker.processing) == []
+        assert not r.exists(queue.heartbeat_key("w1"))
+
+    def test_generate_claimed_retries_and_finishes(self, settings):
+        settings.LLM_STREAMING = False
+        ids = _make_careplans(1)
+        careplan = leases.claim_many(ids, "w1")[ids[0]]
+        with patch.object(MockLLMService, "generate", side_effect=[RuntimeError("timeout"), "content"]):
+            assert generate_claimed(careplan, "w1", retry_base_delay=0) == "completed"
+        careplan.refresh_from_db()
+        assert (careplan.status, careplan.generated_content, careplan.lease_owner) == ("completed", "content", "")
+
+    def test_stop_returns_unstarted_ids_and_skips_taken(self, settings):
+        settings.LLM_STREAMING = False
+        ids = _make_careplans(2)
+        CarePlan.objects.filter(id=ids[1]).update(status="processing", lease_owner="other")
+        r = _FakeRedis()
+        r.rpush(QUEUE, *ids)
+        # 上一次运行留下的、未 ack 的 id 放回队列
+        r.rpush(queue.processing_key("w1"), 99)
+        stop = threading.Event()
+
+        def generate(self, *args, **kwargs):
+            stop.set()
+            return "content"
+
+        worker = CarePlanWorker(concurrency=2, batch_size=2, redis=r, owner="w1", poll_timeout=0.05)
+        with patch.object(MockLLMService, "generate", generate):
+            worker.run(stop)
+
+        assert CarePlan.objects.get(id=ids[0]).status == "completed"
+        assert CarePlan.objects.get(id=ids[1]).lease_owner == "other"
+        assert (worker.completed, worker.skipped) == (1, 1)
+        assert r.queued(worker.processing) == []
+        assert 99 in r.queued()
+
+    def test_rejects_bad_config(self):
+        with pytest.raises(ValueError):
+            CarePlanWorker(concurrency=0, batch_size=1, redis=_FakeRedis())
+        with pytest.raises(ValueError):
+            CarePlanWorker(concurrency=1, batch_size=1, mode="process", redis=_FakeRedis())
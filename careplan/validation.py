@@ -0,0 +1,162 @@
+"""
+订单格式校验：serializers（请求 dict）与 intake Adapter（InternalOrder）共用同一套规则
+- 规则在模块加载时编译为一个扁平函数（同 intake/mapping.py 的做法），每个字段只取值、只匹配一次
+- 正则直接匹配原值（允许首尾空白），不做 .strip() 拷贝
+- 出生日期常见的 YYYY-MM-DD 走正则 + date()，只有不符合时才回退到 strptime 判定错误类型
+错误列表：[{"field": ..., "message": ...}]，字段名由调用方决定（dict 键或 InternalOrder 路径）
+"""
+import re
+from datetime import date, datetime
+from typing import Callable, Iterable
+
+from pharmacy_plan.exceptions import ValidationError
+
+# NPI: 10 位数字
+NPI_PATTERN = re.compile(r"\s*\d{10}\s*")
+
+# MRN: 6 位数字
+MRN_PATTERN = re.compile(r"\s*\d{6}\s*")
+
+# ICD-10: 1 字母 + 2 数字 + 可选 . + 1-4 位字母数字（如 A00, E11.9, A18.32）
+ICD10_PATTERN = re.compile(r"\s*[A-Za-z][0-9]{2}(\.[0-9A-Za-z]{1,4})?\s*")
+
+# 出生日期快速路径：去掉前导空白后前 10 个字符为 YYYY-MM-DD（后面可以有时间等内容）
+_DOB_PATTERN = re.compile(r"\s*(\d{4})-(\d{2})-(\d{2})", re.ASCII)
+
+NPI_MESSAGE = "NPI 必须为 10 位数字"
+MRN_MESSAGE = "MRN 必须为 6 位数字"
+DOB_FORMAT_MESSAGE = "出生日期格式应为 YYYY-MM-DD"
+DOB_INVALID_MESSAGE = "出生日期必须是合法日期"
+ICD10_MESSAGE = "主要诊断需符合 ICD-10 格式（如 A00, E11.9）"
+MISSING_MESSAGE = "该字段为必填"
+
+
+def check_npi(value) -> str | None:
+    if value.__class__ is not str or NPI_PATTERN.fullmatch(value) is None:
+        return NPI_MESSAGE
+    return None
+
+
+def check_mrn(value) -> str | None:
+    if value.__class__ is not str or MRN_PATTERN.fullmatch(value) is None:
+        return MRN_MESSAGE
+    return None
+
+
+def check_dob(value) -> str | None:
+    """YYYY-MM-DD 格式的合法日期（取去掉首尾空白后的前 10 个字符）"""
+    if value.__class__ is not str or not value:
+        return DOB_FORMAT_MESSAGE
+    m = _DOB_PATTERN.match(value)
+    if m is not None:
+        try:
+            date(int(m[1]), int(m[2]), int(m[3]))
+        except ValueError:
+            return DOB_INVALID_MESSAGE
+        return None
+    # 少见格式：按原规则判定是格式错误还是非法日期
+    s = value.strip()[:10]
+    if len(s) != 10 or s[4] != "-" or s[7] != "-":
+        return DOB_FORMAT_MESSAGE
+    try:
+        datetime.strptime(s, "%Y-%m-%d")
+    except ValueError:
+        return DOB_INVALID_MESSAGE
+    return None
+
+
+def _is_blank(value) -> bool:
+    return value is None or (value.__class__ is str and (not value or value.isspace()))
+
+
+def check_icd10(value) -> str | None:
+    if _is_blank(value):
+        return "主要诊断不能为空"
+    if value.__class__ is not str or ICD10_PATTERN.fullmatch(value) is None:
+        return ICD10_MESSAGE
+    return None
+
+
+def required_text(label: str) -> Callable[[object], str | None]:
+    """必填文本：None / 空串 / 全空白"""
+    message = f"{label}不能为空"
+
+    def check(value) -> str | None:
+        return message if _is_blank(value) else None
+    return check
+
+
+# (请求 dict 键, InternalOrder 路径, 检查)；顺序即错误列表顺序
+RULES: tuple[tuple[str, str, Callable[[object], str | None]], ...] = (
+    ("provider_npi", "provider.npi", check_npi),
+    ("provider_name", "provider.name", required_text("医生姓名")),
+    ("patient_mrn", "patient.mrn", check_mrn),
+    ("patient_first_name", "patient.first_name", required_text("患者名")),
+    ("patient_last_name", "patient.last_name", required_text("患者姓")),
+    ("patient_dob", "patient.dob", check_dob),
+    ("primary_diagnosis", "careplan.primary_diagnosis", check_icd10),
+    ("medication_name", "careplan.medication_name", required_text("药物名称")),
+    ("patient_records", "careplan.patient_records", required_text("患者记录")),
+)
+
+# 请求 dict 键 -> InternalOrder 路径
+FIELD_PATHS = {key: path for key, path, _ in RULES}
+
+_MISSING = object()
+
+
+class OrderValidator:
+    """
+    编译后的校验器：source="dict" 校验请求 dict（缺键报「必填」），source="order" 校验 InternalOrder
+    RULES 在构造时生成为一个扁平函数（InternalOrder 的 patient / provider / careplan 各取一次）
+    errors(obj) 返回错误列表；validate(obj) 有错误时抛 ValidationError；
+    errors_many(objs) 一次校验整批，返回与输入等长的错误列表
+    """
+
+    def __init__(self, source: str):
+        if source not in ("dict", "order"):
+            raise ValueError(f"Unknown validator source: {source}")
+        namespace = {"_MISSING": _MISSING, "MISSING_MESSAGE": MISSING_MESSAGE}
+        lines = ["def errors(obj):", "    errors = []"]
+        if source == "dict":
+            lines.append("    get = obj.get")
+        parents = {}
+        for i, (key, path, check) in enumerate(RULES):
+            namespace[f"_c{i}"] = check
+            if source == "dict":
+                field = key
+                lines.append(f"    v = get({key!r}, _MISSING)")
+                lines.append(f"    m = MISSING_MESSAGE if v is _MISSING else _c{i}(v)")
+            else:
+                field = path
+                parent, _, attr = path.rpartition(".")
+                if parent not in parents:
+                    parents[parent] = f"_o{len(parents)}"
+                    lines.append(f"    {parents[parent]} = obj.{parent}")
+                lines.append(f"    m = _c{i}({parents[parent]}.{attr})")
+            lines.append("    if m is not None:")
+            lines.append(f"        errors.append({{'field': {field!r}, 'message': m}})")
+        lines.append("    return errors")
+        exec(compile("\n".join(lines), f"<order validator {source}>", "exec"), namespace)
+        self.errors = namespace["errors"]
+
+    def errors_many(self, objs: Iterable) -> list[list[dict]]:
+        errors = self.errors
+        return [errors(obj) for obj in objs]
+
+    def validate(self, obj) -> None:
+        errors = self.errors(obj)
+        if errors:
+            raise validation_error(errors)
+
+
+def validation_error(errors: list[dict]) -> ValidationError:
+    return ValidationError(
+        message="数据格式校验失败",
+        code="VALIDATION_ERROR",
+        detail={"errors": errors},
+    )
+
+
+dict_validator = OrderValidator("dict")
+order_validator = OrderValidator("order")
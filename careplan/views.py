@@ -2,14 +2,22 @@
 views.py：只负责接收请求和返回响应，不做任何业务逻辑
 所有 BaseAppException 由 middleware 统一处理
 """
+from django.conf import settings
 from django.shortcuts import render
-from django.http import JsonResponse, HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 
-from pharmacy_plan.exceptions import BlockError
+from pharmacy_plan.exceptions import BlockError, ValidationError
 
 from . import services
-from .intake import get_adapter
+from .intake import codec, get_adapter
+from .pagination import parse_page_size
+from .streaming import iter_careplan_events
+
+
+def _json_response(result, status=200) -> HttpResponse:
+    """用 intake.codec 直接编码成 UTF-8 bytes（装了 orjson 时走 orjson），代替 JsonResponse"""
+    return HttpResponse(codec.dumps(result), status=status, content_type="application/json")
 
 
 def index(request):
@@ -40,9 +48,8 @@ def generate_careplan(request):
             http_status=400,
         )
     order = adapter.process(request.body, source=source)
-    data = order.to_create_careplan_dict()
-    result = services.create_careplan(data)
-    return JsonResponse(result, json_dumps_params={"ensure_ascii": False})
+    result = services.create_careplan(order)
+    return _json_response(result)
 
 
 @csrf_exempt
@@ -59,9 +66,8 @@ def intake_medcenter(request):
         )
     adapter = get_adapter("medcenter")
     order = adapter.process(request.body, source="medcenter")
-    data = order.to_create_careplan_dict()
-    result = services.create_careplan(data)
-    return JsonResponse(result, json_dumps_params={"ensure_ascii": False})
+    result = services.create_careplan(order)
+    return _json_response(result)
 
 @csrf_exempt
 def intake_pharmacorp(request):
@@ -77,20 +83,98 @@ def intake_pharmacorp(request):
         )
     adapter = get_adapter("pharmacorp_portal")
     order = adapter.process(request.body, source="pharmacorp_portal")
-    data = order.to_create_careplan_dict()
-    result = services.create_careplan(data)
-    return JsonResponse(result, json_dumps_params={"ensure_ascii": False})
+    result = services.create_careplan(order)
+    return _json_response(result)
+
+
+def _read_batch_body(request) -> bytes:
+    """
+    批量请求体可能超过 DATA_UPLOAD_MAX_MEMORY_SIZE，直接读流，上限为 INTAKE_BATCH_MAX_BYTES
+    """
+    limit = settings.INTAKE_BATCH_MAX_BYTES
+    body = request.read(limit + 1)
+    if len(body) > limit:
+        raise ValidationError(
+            message=f"Batch body exceeds {limit} bytes",
+            code="BATCH_TOO_LARGE",
+        )
+    return body
+
+
+def _intake_batch(request, source):
+    if request.method != "POST":
+        raise BlockError(
+            message="Method not allowed",
+            code="METHOD_NOT_ALLOWED",
+            http_status=405,
+        )
+    try:
+        adapter = get_adapter(source)
+    except ValueError as e:
+        raise BlockError(
+            message=str(e),
+            code="UNKNOWN_INTAKE_SOURCE",
+            http_status=400,
+        )
+    orders = adapter.process_batch(_read_batch_body(request), source=source)
+    if len(orders) > settings.INTAKE_BATCH_MAX_ITEMS:
+        raise ValidationError(
+            message=f"Batch exceeds {settings.INTAKE_BATCH_MAX_ITEMS} orders",
+            code="BATCH_TOO_LARGE",
+            detail={"count": len(orders)},
+        )
+    result = services.create_careplans_bulk(orders)
+    return _json_response(result)
+
+
+@csrf_exempt
+def generate_careplan_batch(request):
+    """
+    批量接入：请求体为订单数组（JSON）或 CareOrderBatch 信封（XML），来源同 generate_careplan 取 X-Intake-Source
+    返回每条的结果（careplan_id 或错误），单条失败不影响其他条
+    """
+    return _intake_batch(request, _get_intake_source(request))
+
+
+@csrf_exempt
+def intake_medcenter_batch(request):
+    """MedCenter JSON 批量接入点"""
+    return _intake_batch(request, "medcenter")
+
+
+@csrf_exempt
+def intake_pharmacorp_batch(request):
+    """PharmaCorp Portal 批量接入点：<CareOrderBatch> 下多个 <CareOrderRequest>"""
+    return _intake_batch(request, "pharmacorp_portal")
 
 
 @csrf_exempt
 def get_careplan(request, careplan_id):
     result = services.get_careplan_detail(careplan_id)
-    return JsonResponse(result, json_dumps_params={"ensure_ascii": False})
+    return _json_response(result)
 
 
 def careplan_status(request, careplan_id):
     result = services.get_careplan_status(careplan_id)
-    return JsonResponse(result, json_dumps_params={"ensure_ascii": False})
+    return _json_response(result)
+
+
+def careplan_stream(request, careplan_id):
+    """
+    Server-Sent Events：推送生成进度（progress 增量文本）和最终状态（done）
+    """
+    services.get_careplan_status(careplan_id)  # 不存在时 404
+    response = StreamingHttpResponse(
+        iter_careplan_events(
+            careplan_id,
+            poll_interval=settings.CAREPLAN_STREAM_POLL_INTERVAL,
+            timeout=settings.CAREPLAN_STREAM_TIMEOUT,
+        ),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 
 def download_careplan(request, careplan_id):
@@ -103,9 +187,11 @@ def download_careplan(request, careplan_id):
 def search_careplans(request):
     q = (request.GET.get("q") or "").strip()
     export = request.GET.get("export") == "1"
+    cursor = request.GET.get("cursor") or None
+    page_size = parse_page_size(request.GET.get("page_size"))
 
-    result = services.search_careplans(q, export=export)
+    result = services.search_careplans(q, export=export, cursor=cursor, page_size=page_size)
 
     if export:
         return result
-    return JsonResponse(result, json_dumps_params={"ensure_ascii": False})
+    return _json_response(result)
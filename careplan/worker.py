@@ -0,0 +1,255 @@
+"""
+Redis 队列 worker（run_careplan_worker）：批量可靠出队，一次查询认领并取出 CarePlan，在线程池或事件循环里并发生成
+- 出队：按空闲槽位数一次取一批 id（queue.reserve，先 interactive 后 bulk），id 移到本 worker 的 processing 列表，生成结束后才 ack
+  worker 崩溃时心跳过期，其他 worker 的 recover_orphans 把 processing 列表里的 id 放回队列
+- 认领：leases.claim_many，一批一条条件 UPDATE + 一条 SELECT（带 patient / provider）；没认领到的 id 直接 ack
+- 并发：mode=thread 为线程池（同步 generate_careplan，流式写部分内容），mode=async 为一个事件循环线程
+  （agenerate_careplan）；两者都最多同时生成 concurrency 个
+- 退出：stop 之后不再出队，等在途生成结束、ack，processing 列表中剩余的 id 放回队列头
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from . import leases, queue, scheduling
+from .async_worker import MAX_RETRIES, agenerate_claimed
+from .llm_service import generate_careplan
+from .status_events import notify_status
+from .streaming import PartialContentWriter
+from .statsd_metrics import (
+    careplan_completed,
+    careplan_failed,
+    celery_task_duration_seconds,
+    celery_task_failure,
+    celery_task_retry,
+)
+
+logger = logging.getLogger(__name__)
+
+MODES = ('thread', 'async')
+
+
+def generate_claimed(careplan, owner, *, max_retries=MAX_RETRIES, retry_base_delay=1.0):
+    """
+    同步生成已由 owner 认领的 care plan（agenerate_claimed 的线程版本）
+    返回 'completed' / 'failed'；中途租约被其他 worker 接手时返回 None
+    """
+    start = time.perf_counter()
+    notify_status(careplan.id, 'processing')
+    scheduling.record_started(careplan)
+    writer = None
+    if getattr(settings, 'LLM_STREAMING', True):
+        writer = PartialContentWriter(careplan.id, flush_interval=settings.LLM_STREAM_FLUSH_INTERVAL, owner=owner)
+
+    retries = 0
+    served = []
+    while True:
+        try:
+            content = generate_careplan(
+                patient=careplan.patient,
+                provider=careplan.provider,
+                primary_diagnosis=careplan.primary_diagnosis,
+                additional_diagnosis=careplan.additional_diagnosis or '',
+                medication_name=careplan.medication_name,
+                medication_history=careplan.medication_history or '',
+                patient_records=careplan.patient_records,
+                llm_provider=careplan.llm_provider or None,
+                use_cache=careplan.use_llm_cache,
+                on_progress=writer.append if writer else None,
+                on_provider=served.append,
+            )
+        except Exception as exc:
+            if retries >= max_retries:
+                if leases.finish(careplan, owner, 'failed', error=str(exc)):
+                    notify_status(careplan.id, 'failed', error=careplan.error_message)
+                    careplan_failed()
+                    scheduling.record_finished(careplan)
+                celery_task_failure()
+                celery_task_duration_seconds(time.perf_counter() - start)
+                return 'failed'
+            celery_task_retry()
+            delay = retry_base_delay * 2 ** retries
+            if not leases.renew(careplan.id, owner, delay):
+                return None
+            time.sleep(delay)
+            if writer:
+                writer.reset()
+            retries += 1
+            continue
+
+        if not leases.finish(careplan, owner, 'completed', content=content, llm_provider=served[-1] if served else ''):
+            return None
+        notify_status(careplan.id, 'completed')
+        careplan_completed()
+        scheduling.record_finished(careplan)
+        celery_task_duration_seconds(time.perf_counter() - start)
+        return 'completed'
+
+
+def _generate_in_thread(careplan, owner, options):
+    try:
+        return generate_claimed(careplan, owner, **options)
+    finally:
+        # 线程池线程长期存在，按 CONN_MAX_AGE 回收本线程的 DB 连接
+        close_old_connections()
+
+
+class _ThreadPool:
+    def __init__(self, size: int):
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix='careplan-worker')
+
+    def submit(self, careplan, owner, options) -> Future:
+        return self._executor.submit(_generate_in_thread, careplan, owner, options)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+class _AsyncPool:
+    """一个后台线程跑事件循环，生成以协程提交；在途数量由 CarePlanWorker 的槽位控制"""
+
+    def __init__(self, size: int):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='careplan-worker-loop', daemon=True)
+        self._thread.start()
+
+    def submit(self, careplan, owner, options) -> Future:
+        return asyncio.run_coroutine_threadsafe(agenerate_claimed(careplan, owner, **options), self._loop)
+
+    def shutdown(self) -> None:
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+class CarePlanWorker:
+    """
+    用法：worker = CarePlanWorker(concurrency=8); worker.run(stop_event)
+    drain=True 时队列取空且没有在途生成后返回（用于一次性处理积压）
+    """
+
+    def __init__(
+        self,
+        *,
+        concurrency: int,
+        batch_size: int,
+        mode: str = 'thread',
+        redis=None,
+        owner: str | None = None,
+        poll_timeout: float = 5.0,
+        heartbeat_ttl: int | None = None,
+        retry_base_delay: float = 1.0,
+    ):
+        if concurrency < 1 or batch_size < 1:
+            raise ValueError("concurrency and batch_size must be >= 1")
+        if mode not in MODES:
+            raise ValueError(f"Unknown worker mode: {mode}")
+        if poll_timeout <= 0:
+            raise ValueError("poll_timeout must be > 0")
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.mode = mode
+        self.redis = redis if redis is not None else queue.get_redis()
+        self.owner = owner or leases.new_owner()
+        self.processing = queue.processing_key(self.owner)
+        self.poll_timeout = poll_timeout
+        self.heartbeat_ttl = heartbeat_ttl or settings.CAREPLAN_WORKER_HEARTBEAT_TTL
+        self.options = {'retry_base_delay': retry_base_delay}
+        self.completed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.peak_in_flight = 0
+        self._in_flight = 0
+        self._done: list[int] = []
+        self._cond = threading.Condition()
+        self._last_recover = 0.0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def run(self, stop: threading.Event, *, drain: bool = False) -> None:
+        pool = _ThreadPool(self.concurrency) if self.mode == 'thread' else _AsyncPool(self.concurrency)
+        try:
+            while not stop.is_set():
+                self._beat()
+                self._ack_done()
+                free = self._wait_for_slot(self.poll_timeout)
+                if not free:
+                    continue
+                ids = queue.reserve(self.redis, self.processing, min(self.batch_size, free), self.poll_timeout)
+                if ids:
+                    self._dispatch(pool, ids)
+                elif drain and not self._in_flight:
+                    break
+        finally:
+            self._wait_idle()
+            self._ack_done()
+            pool.shutdown()
+            returned = queue.requeue_processing(self.redis, self.processing)
+            if returned:
+                logger.info("worker %s: returned %d reserved ids to the queue", self.owner, returned)
+            self.redis.delete(queue.heartbeat_key(self.owner))
+
+    def _beat(self) -> None:
+        queue.heartbeat(self.redis, self.owner, self.heartbeat_ttl)
+        now = time.monotonic()
+        if now - self._last_recover >= self.heartbeat_ttl:
+            self._last_recover = now
+            recovered = queue.recover_orphans(self.redis)
+            if recovered:
+                logger.warning("worker %s: recovered %d ids from dead workers", self.owner, recovered)
+
+    def _dispatch(self, pool, ids: list[int]) -> None:
+        careplans = leases.claim_many(ids, self.owner)
+        skipped = []
+        for careplan_id in ids:
+            careplan = careplans.pop(careplan_id, None)
+            if careplan is None:
+                # 已完成 / 被其他 worker 持有 / 不存在，或同一批里重复的 id
+                skipped.append(careplan_id)
+                continue
+            with self._cond:
+                self._in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self._in_flight)
+            future = pool.submit(careplan, self.owner, self.options)
+            future.add_done_callback(lambda f, careplan_id=careplan_id: self._on_done(careplan_id, f))
+        self.skipped += len(skipped)
+        queue.ack(self.redis, self.processing, skipped)
+
+    def _on_done(self, careplan_id: int, future: Future) -> None:
+        try:
+            status = future.result()
+        except Exception:
+            # 租约到期后由 reaper 放回队列
+            logger.exception("careplan %s: generation crashed", careplan_id)
+            status = 'failed'
+        with self._cond:
+            if status == 'completed':
+                self.completed += 1
+            elif status == 'failed':
+                self.failed += 1
+            self._in_flight -= 1
+            self._done.append(careplan_id)
+            self._cond.notify_all()
+
+    def _ack_done(self) -> None:
+        with self._cond:
+            done, self._done = self._done, []
+        queue.ack(self.redis, self.processing, done)
+
+    def _wait_for_slot(self, timeout: float) -> int:
+        with self._cond:
+            if self._in_flight >= self.concurrency:
+                self._cond.wait(timeout)
+            return self.concurrency - self._in_flight
+
+    def _wait_idle(self) -> None:
+        with self._cond:
+            while self._in_flight:
+                self._cond.wait()
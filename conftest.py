@@ -5,6 +5,25 @@ import pytest
 from datetime import date, datetime
 
 
+@pytest.fixture(autouse=True)
+def _reset_llm_clients():
+    """LLM Service / SDK client / 结果缓存 / 限流桶 / 对冲样本都是进程级缓存，每个测试前后清空，避免 mock 串用"""
+    from careplan.llm_cache import reset_result_cache
+    from careplan.llm_hedging import reset_hedging
+    from careplan.llm_providers import clear_llm_services
+    from careplan.llm_rate_limit import reset_rate_limiter
+
+    clear_llm_services()
+    reset_result_cache()
+    reset_rate_limiter()
+    reset_hedging()
+    yield
+    clear_llm_services()
+    reset_result_cache()
+    reset_rate_limiter()
+    reset_hedging()
+
+
 @pytest.fixture
 def sample_patient_data():
     """Sample patient data for tests."""
@@ -12,7 +12,7 @@ def app_exception_handler(request, exception):
     兼容 DRF ValidationError（当 rest_framework 存在时）
     """
     if isinstance(exception, BaseAppException):
-        _record_exception_metric(exception)
+        record_exception_metric(exception)
         return JsonResponse(
             exception.to_dict(),
             status=exception.http_status,
@@ -57,8 +57,8 @@ def _record_validation_error():
         pass
 
 
-def _record_exception_metric(exception):
-    """记录异常指标（避免循环导入）"""
+def record_exception_metric(exception):
+    """记录异常指标（避免循环导入）；批量接入逐条失败时也用它"""
     try:
         from careplan.metrics import (
             VALIDATION_ERROR,
@@ -1,3 +1,4 @@
+import json
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -89,6 +90,65 @@ LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 CLAUDE_MODEL = os.getenv("CLAUDE_MODEL", "claude-3-5-sonnet-20241022")
 
+# LLM 结果缓存：local（进程内 LRU）| redis（多 worker 共享）| none
+LLM_RESULT_CACHE = os.getenv("LLM_RESULT_CACHE", "local")
+LLM_RESULT_CACHE_TTL = int(os.getenv("LLM_RESULT_CACHE_TTL", "86400"))
+LLM_RESULT_CACHE_MAX_ENTRIES = int(os.getenv("LLM_RESULT_CACHE_MAX_ENTRIES", "1000"))
+
+# LLM 客户端限流（careplan/llm_rate_limit.py）：redis（多 worker 共享）| local（进程内）| none
+# LLM_RATE_LIMITS 按 "provider" 或 "provider:model" 配每分钟请求数 / token 数（0 为不限），未配置的 provider 不限流
+# 桶容量为 LLM_RATE_LIMIT_BURST_SECONDS 秒的额度（限制瞬时突发）
+# 等额度 / Retry-After 最多 LLM_RATE_LIMIT_MAX_WAIT 秒（须远小于 CAREPLAN_LEASE_SECONDS），超时后按任务重试处理
+LLM_RATE_LIMIT = os.getenv("LLM_RATE_LIMIT", "redis")
+LLM_RATE_LIMITS = json.loads(os.getenv(
+    "LLM_RATE_LIMITS",
+    '{"openai": {"rpm": 500, "tpm": 200000}, "claude": {"rpm": 50, "tpm": 40000}}',
+))
+LLM_RATE_LIMIT_BURST_SECONDS = float(os.getenv("LLM_RATE_LIMIT_BURST_SECONDS", "10"))
+LLM_RATE_LIMIT_MAX_WAIT = float(os.getenv("LLM_RATE_LIMIT_MAX_WAIT", "60"))
+
+# Provider 熔断与切换（careplan/llm_providers/circuit.py）：按最近 LLM_BREAKER_WINDOW 次调用统计，
+# 至少 LLM_BREAKER_MIN_CALLS 次且失败率 ≥ LLM_BREAKER_ERROR_RATE（或超过 LLM_BREAKER_SLOW_SECONDS 的慢调用比例 ≥ LLM_BREAKER_SLOW_RATE）时熔断，
+# LLM_BREAKER_COOLDOWN 秒后放一个探测请求；熔断期间新的生成按 LLM_FAILOVER_ORDER 换下一个健康的 provider
+LLM_FAILOVER_ORDER = os.getenv("LLM_FAILOVER_ORDER", "openai,claude").split(",")
+LLM_BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", "20"))
+LLM_BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "5"))
+LLM_BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+LLM_BREAKER_SLOW_SECONDS = float(os.getenv("LLM_BREAKER_SLOW_SECONDS", "60"))
+LLM_BREAKER_SLOW_RATE = float(os.getenv("LLM_BREAKER_SLOW_RATE", "0.8"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+# 故障注入（仅 USE_MOCK_LLM=1 时生效，JSON）：如 {"openai": {"error_rate": 1.0, "latency": 2}}，离线演练熔断切换
+LLM_FAULT_INJECTION = json.loads(os.getenv("LLM_FAULT_INJECTION", "{}"))
+
+# 请求对冲（careplan/llm_hedging.py，仅非流式调用）：LLM_HEDGING=1 开启；主调用超过该 provider 最近 LLM_HEDGE_WINDOW 次延迟的
+# LLM_HEDGE_PERCENTILE 分位仍未返回时再发一个（LLM_HEDGE_TARGET：same | alternate），取先返回的；样本少于 LLM_HEDGE_MIN_SAMPLES 不对冲
+# 对冲请求数不超过调用数的 LLM_HEDGE_MAX_RATE（额度最多攒 LLM_HEDGE_BURST 个）
+LLM_HEDGING = os.getenv("LLM_HEDGING", "0") == "1"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_TARGET = os.getenv("LLM_HEDGE_TARGET", "same")
+LLM_HEDGE_MAX_RATE = float(os.getenv("LLM_HEDGE_MAX_RATE", "0.05"))
+LLM_HEDGE_BURST = float(os.getenv("LLM_HEDGE_BURST", "10"))
+LLM_HEDGE_WINDOW = int(os.getenv("LLM_HEDGE_WINDOW", "200"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+
+# 流式生成：部分内容写回 CarePlan 的最小间隔（秒）；LLM_STREAMING=0 关闭
+LLM_STREAMING = os.getenv("LLM_STREAMING", "1") == "1"
+LLM_STREAM_FLUSH_INTERVAL = float(os.getenv("LLM_STREAM_FLUSH_INTERVAL", "1.0"))
+
+# /api/careplan/<id>/stream/（SSE）：状态变化通过 Redis pub/sub 通知（CAREPLAN_STATUS_NOTIFY=redis|none）
+# none / Redis 不可用时按 CAREPLAN_STREAM_POLL_INTERVAL 轮询 DB；CAREPLAN_STREAM_TIMEOUT 为单次连接最长时间（秒）
+CAREPLAN_STATUS_NOTIFY = os.getenv("CAREPLAN_STATUS_NOTIFY", "redis")
+
+# /api/careplan/<id>/status/ 的 Redis 状态缓存（redis|none），worker 状态变化时写入，TTL 秒
+CAREPLAN_STATUS_CACHE = os.getenv("CAREPLAN_STATUS_CACHE", "redis")
+CAREPLAN_STATUS_CACHE_TTL = int(os.getenv("CAREPLAN_STATUS_CACHE_TTL", "3600"))
+CAREPLAN_STREAM_POLL_INTERVAL = float(os.getenv("CAREPLAN_STREAM_POLL_INTERVAL", "0.5"))
+CAREPLAN_STREAM_TIMEOUT = float(os.getenv("CAREPLAN_STREAM_TIMEOUT", "300"))
+
+# 可选：自定义 API 地址（代理/网关），空则用 SDK 默认
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "")
+ANTHROPIC_BASE_URL = os.getenv("ANTHROPIC_BASE_URL", "")
+
 # Redis（Celery broker + result backend）
 REDIS_HOST = os.getenv('REDIS_HOST', 'redis')
 REDIS_PORT = int(os.getenv('REDIS_PORT', '6379'))
@@ -98,9 +158,70 @@ REDIS_URL = f'redis://{REDIS_HOST}:{REDIS_PORT}/0'
 CELERY_BROKER_URL = REDIS_URL
 CELERY_RESULT_BACKEND = REDIS_URL
 
+# Care plan 生成任务派发：celery（默认，generate_careplan_task）| redis（推到 CAREPLAN_QUEUE_KEY，由手写 worker 消费）
+CAREPLAN_DISPATCH = os.getenv("CAREPLAN_DISPATCH", "celery")
+CAREPLAN_QUEUE_KEY = os.getenv("CAREPLAN_QUEUE_KEY", "careplan:queue")
+
+# 生成优先级 lane（careplan/scheduling.py）：单条提交 interactive，批量接口 / 导入 bulk，各自一个 celery 队列
+# interactive 有专用 worker（docker-compose 的 celery_worker_interactive），共享 worker 两个队列都消费
+CAREPLAN_LANE_QUEUES = {
+    "interactive": os.getenv("CAREPLAN_INTERACTIVE_QUEUE", "careplan.interactive"),
+    "bulk": os.getenv("CAREPLAN_BULK_QUEUE", "careplan.bulk"),
+}
+# relay 只在 broker 里 bulk 队列少于这么多条时补投（其余留在 outbox 按权重公平排），0 为不限
+CAREPLAN_BULK_MAX_DEPTH = int(os.getenv("CAREPLAN_BULK_MAX_DEPTH", "200"))
+# bulk 公平调度权重（JSON，如 {"pharmacorp_portal": 1, "webform": 3}），未配置的来源 / provider 为 1
+CAREPLAN_SOURCE_WEIGHTS = json.loads(os.getenv("CAREPLAN_SOURCE_WEIGHTS", "{}"))
+CAREPLAN_PROVIDER_WEIGHTS = json.loads(os.getenv("CAREPLAN_PROVIDER_WEIGHTS", "{}"))
+# 直接 delay 的 generate_careplan_task 进 interactive；LLM 任务耗时长，每个 worker 进程只预取一条，不囤积 bulk 消息
+CELERY_TASK_ROUTES = {
+    "careplan.tasks.generate_careplan_task": {"queue": CAREPLAN_LANE_QUEUES["interactive"]},
+}
+CELERY_WORKER_PREFETCH_MULTIPLIER = int(os.getenv("CELERY_WORKER_PREFETCH_MULTIPLIER", "1"))
+
+# Outbox relay（run_outbox_relay）：每批投递行数、没有积压时的轮询间隔（秒）、投递失败的最长退避（秒）
+CAREPLAN_OUTBOX_BATCH_SIZE = int(os.getenv("CAREPLAN_OUTBOX_BATCH_SIZE", "500"))
+CAREPLAN_OUTBOX_POLL_INTERVAL = float(os.getenv("CAREPLAN_OUTBOX_POLL_INTERVAL", "0.5"))
+CAREPLAN_OUTBOX_MAX_BACKOFF = int(os.getenv("CAREPLAN_OUTBOX_MAX_BACKOFF", "60"))
+
+# 生成租约（careplan/leases.py）：单次 LLM 调用须在 CAREPLAN_LEASE_SECONDS 内完成，否则可被其他 worker 接手
+# reaper 每 CAREPLAN_REAPER_INTERVAL 秒把过期的 processing 放回队列；认领满 CAREPLAN_MAX_CLAIMS 次仍未完成则标记 failed
+CAREPLAN_LEASE_SECONDS = int(os.getenv("CAREPLAN_LEASE_SECONDS", "300"))
+CAREPLAN_MAX_CLAIMS = int(os.getenv("CAREPLAN_MAX_CLAIMS", "5"))
+CAREPLAN_REAPER_INTERVAL = float(os.getenv("CAREPLAN_REAPER_INTERVAL", "60"))
+CAREPLAN_REAPER_BATCH_SIZE = int(os.getenv("CAREPLAN_REAPER_BATCH_SIZE", "500"))
+# celery beat（docker-compose 的 celery_beat 服务）
+CELERY_BEAT_SCHEDULE = {
+    'reap-expired-careplan-leases': {
+        'task': 'careplan.tasks.reap_expired_leases_task',
+        'schedule': CAREPLAN_REAPER_INTERVAL,
+    },
+}
+
+# JSON 编解码（intake 解析请求体 / views 输出响应）：auto（装了 orjson 就用）| orjson | stdlib
+JSON_CODEC = os.getenv("JSON_CODEC", "auto")
+
+# 批量接入（/api/.../batch/）：单次请求最多订单数与请求体字节数
+INTAKE_BATCH_MAX_ITEMS = int(os.getenv("INTAKE_BATCH_MAX_ITEMS", "5000"))
+INTAKE_BATCH_MAX_BYTES = int(os.getenv("INTAKE_BATCH_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# 异步 worker（run_careplan_async_worker）单进程同时在途的生成数上限
+CAREPLAN_ASYNC_MAX_IN_FLIGHT = int(os.getenv("CAREPLAN_ASYNC_MAX_IN_FLIGHT", "200"))
+
+# Redis 队列 worker（run_careplan_worker）：thread | async、同时生成数、每次出队数、心跳 TTL（秒，过期后 processing 列表被放回队列）
+CAREPLAN_WORKER_MODE = os.getenv("CAREPLAN_WORKER_MODE", "thread")
+CAREPLAN_WORKER_CONCURRENCY = int(os.getenv("CAREPLAN_WORKER_CONCURRENCY", "8"))
+CAREPLAN_WORKER_BATCH_SIZE = int(os.getenv("CAREPLAN_WORKER_BATCH_SIZE", "16"))
+CAREPLAN_WORKER_HEARTBEAT_TTL = int(os.getenv("CAREPLAN_WORKER_HEARTBEAT_TTL", "30"))
+
 # Tests: use SQLite when running locally without Docker (set USE_SQLITE_FOR_TESTS=1)
 if os.getenv("USE_SQLITE_FOR_TESTS") == "1":
     DATABASES["default"] = {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": ":memory:",
     }
+    # 本地测试没有 Redis
+    CAREPLAN_STATUS_NOTIFY = "none"
+    CAREPLAN_STATUS_CACHE = "none"
+    CAREPLAN_BULK_MAX_DEPTH = 0
+    LLM_RATE_LIMIT = "local"
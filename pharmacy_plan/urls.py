@@ -17,8 +17,12 @@ urlpatterns = [
     path('api/generate-careplan/', views.generate_careplan, name='generate_careplan'),
     path('api/intake/pharmacorp/', views.intake_pharmacorp, name='intake_pharmacorp'),
     path('api/intake/medcenter/', views.intake_medcenter, name='intake_medcenter'),
+    path('api/generate-careplan/batch/', views.generate_careplan_batch, name='generate_careplan_batch'),
+    path('api/intake/pharmacorp/batch/', views.intake_pharmacorp_batch, name='intake_pharmacorp_batch'),
+    path('api/intake/medcenter/batch/', views.intake_medcenter_batch, name='intake_medcenter_batch'),
     path('api/careplan/<int:careplan_id>/', views.get_careplan, name='get_careplan'),
     path('api/careplan/<int:careplan_id>/status/', views.careplan_status, name='careplan_status'),
+    path('api/careplan/<int:careplan_id>/stream/', views.careplan_stream, name='careplan_stream'),
     path('download-careplan/<int:careplan_id>/', views.download_careplan, name='download_careplan'),
     path('api/search-careplans/', views.search_careplans, name='search_careplans'),
     path('metrics', views_metrics.metrics, name='metrics'),